@@ -6,13 +6,14 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
 from typing import Optional, Tuple
 import logging
+import time
 
 from models.database import get_db, User
 from utils.jwt_auth import TokenManager, decode_token, get_token_type
 from config.settings import get_fastapi_settings
+from services.auth_token_service import AuthTokenService, principal_cache
 
 logger = logging.getLogger(__name__)
 security = HTTPBearer(auto_error=False)
@@ -40,6 +41,20 @@ async def get_current_user_v2(
 
     token = credentials.credentials
 
+    # 已验证令牌缓存：命中时跳过JWT解码和令牌索引查询
+    token_hash = AuthTokenService.hash_token(token)
+    cached = principal_cache.get(token_hash)
+    if cached is not None:
+        user_id, token_type = cached
+        user = await db.get(User, user_id)
+        if user:
+            return user, token_type
+        principal_cache.invalidate_user(user_id)
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="用户不存在"
+        )
+
     # 验证并解码令牌
     valid, payload, token_type = TokenManager.verify_and_decode(token)
 
@@ -59,11 +74,8 @@ async def get_current_user_v2(
                 detail="令牌格式错误"
             )
 
-        # 查询用户
-        result = await db.execute(
-            select(User).where(User.id == user_id)
-        )
-        user = result.scalar_one_or_none()
+        # 按主键查询用户
+        user = await db.get(User, user_id)
 
         if not user:
             raise HTTPException(
@@ -71,15 +83,16 @@ async def get_current_user_v2(
                 detail="用户不存在"
             )
 
+        # 缓存时间不超过令牌剩余有效期
+        exp = payload.get("exp")
+        ttl = exp - time.time() if exp else None
+        principal_cache.set(token_hash, user.id, "jwt", ttl)
         return user, "jwt"
 
     elif token_type == "legacy":
-        # 旧版令牌，使用原有逻辑（但改进）
-        # 原逻辑直接返回第一个用户，现在需要根据令牌找到对应用户
-        # 由于旧令牌不包含用户信息，我们需要一个映射机制
-        # 暂时保持原有逻辑，但标记为旧令牌
-        result = await db.execute(select(User).limit(1))
-        user = result.scalar_one_or_none()
+        # 旧版令牌不包含用户信息，通过令牌索引表定位对应用户
+        user_id = await AuthTokenService.resolve_user_id(db, token)
+        user = await db.get(User, user_id) if user_id is not None else None
 
         if not user:
             raise HTTPException(
@@ -158,7 +158,7 @@ async def get_streak_leaderboard(
 
 @router.get("/leaderboard/my-rank")
 async def get_my_rank(
-    type: str = "points",  # points, achievements
+    type: str = "points",  # points, achievements, streak
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
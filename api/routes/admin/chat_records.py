@@ -4,22 +4,33 @@
 """
 
 import enum
-from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, desc, asc, and_, or_, func, between
 from sqlalchemy.orm import selectinload, aliased
 from pydantic import BaseModel, Field
 from typing import Optional, List, Dict, Any
-from datetime import datetime, timedelta, date
+from datetime import datetime, date
 import logging
 import json
-import csv
-import io
 
 from models.database import get_db, ChatHistory, User, MessageRole, MessageType
 from api.dependencies.auth_v2 import get_current_admin
 from config.settings import get_fastapi_settings
+from services.admin_analytics_service import AdminAnalyticsService
+from services.chat_search_service import ChatSearchService
+from services.streaming_export_service import (
+    XLSX_MEDIA_TYPE,
+    XlsxSheet,
+    attachment_headers,
+    csv_chunks,
+    iter_rows,
+    json_array_chunks,
+    ndjson_chunks,
+    xlsx_chunks,
+)
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -88,7 +99,16 @@ class ChatStatsResponse(BaseModel):
 class ExportFormat(str, enum.Enum):
     """导出格式"""
     JSON = "json"
+    JSONL = "jsonl"
     CSV = "csv"
+    XLSX = "xlsx"
+
+
+# CSV / XLSX 导出的表头
+EXPORT_COLUMNS = [
+    "ID", "用户ID", "用户昵称", "用户手机", "角色", "消息类型",
+    "内容", "元数据", "创建时间"
+]
 
 
 # ============ 辅助函数 ============
@@ -121,7 +141,7 @@ async def search_chat_messages(
         conditions.append(ChatHistory.user_id == user_id)
     
     if search_text:
-        conditions.append(ChatHistory.content.ilike(f"%{search_text}%"))
+        conditions.append(ChatSearchService.match_condition(db, search_text))
     
     if role:
         conditions.append(ChatHistory.role == role)
@@ -177,7 +197,7 @@ async def list_chat_messages(
         conditions.append(ChatHistory.user_id == user_id)
     
     if search:
-        conditions.append(ChatHistory.content.ilike(f"%{search}%"))
+        conditions.append(ChatSearchService.match_condition(db, search))
     
     if role:
         conditions.append(ChatHistory.role == role)
@@ -303,160 +323,126 @@ async def get_chat_stats(
     
     需要管理员权限
     """
-    # 统计总消息数
-    total_result = await db.execute(select(func.count(ChatHistory.id)))
-    total_messages = total_result.scalar_one()
-    
-    # 按角色统计
-    user_count_result = await db.execute(
-        select(func.count(ChatHistory.id)).where(ChatHistory.role == MessageRole.USER)
-    )
-    user_messages = user_count_result.scalar_one()
-    
-    assistant_count_result = await db.execute(
-        select(func.count(ChatHistory.id)).where(ChatHistory.role == MessageRole.ASSISTANT)
-    )
-    assistant_messages = assistant_count_result.scalar_one()
-    
-    system_count_result = await db.execute(
-        select(func.count(ChatHistory.id)).where(ChatHistory.role == MessageRole.SYSTEM)
-    )
-    system_messages = system_count_result.scalar_one()
-    
-    # 今日消息
-    today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-    today_result = await db.execute(
-        select(func.count(ChatHistory.id)).where(ChatHistory.created_at >= today_start)
-    )
-    today_messages = today_result.scalar_one()
-    
-    # 用户消息数排名（前10）
-    user_stats_result = await db.execute(
+    return await AdminAnalyticsService.get_chat_summary(db, days)
+
+
+def _export_rows(
+    user_id: Optional[int],
+    start_date: Optional[date],
+    end_date: Optional[date],
+    limit: Optional[int],
+):
+    """按条件分页读取要导出的聊天记录（按 ID 倒序，即最新的在前）"""
+    conditions = [ChatHistory.role != MessageRole.SYSTEM]
+
+    if user_id:
+        conditions.append(ChatHistory.user_id == user_id)
+
+    if start_date:
+        start_dt = datetime.combine(start_date, datetime.min.time())
+        conditions.append(ChatHistory.created_at >= start_dt)
+
+    if end_date:
+        end_dt = datetime.combine(end_date, datetime.max.time())
+        conditions.append(ChatHistory.created_at <= end_dt)
+
+    stmt = (
         select(
-            User.id,
+            ChatHistory.id,
+            ChatHistory.user_id,
             User.nickname,
-            func.count(ChatHistory.id).label("message_count")
+            User.phone,
+            ChatHistory.role,
+            ChatHistory.msg_type,
+            ChatHistory.content,
+            ChatHistory.meta_data,
+            ChatHistory.created_at,
         )
-        .join(ChatHistory, User.id == ChatHistory.user_id)
-        .where(ChatHistory.role != MessageRole.SYSTEM)
-        .group_by(User.id, User.nickname)
-        .order_by(desc("message_count"))
-        .limit(10)
+        .outerjoin(User, User.id == ChatHistory.user_id)
+        .where(*conditions)
     )
-    messages_per_user = {}
-    for row in user_stats_result:
-        messages_per_user[f"{row.nickname}(ID:{row.id})"] = row.message_count
-    
-    # 每日统计
-    daily_stats = []
-    end_date = date.today()
-    start_date = end_date - timedelta(days=days-1)
-    
-    current_date = start_date
-    while current_date <= end_date:
-        day_start = datetime.combine(current_date, datetime.min.time())
-        day_end = datetime.combine(current_date, datetime.max.time())
-        
-        # 当日消息数
-        day_count_result = await db.execute(
-            select(func.count(ChatHistory.id)).where(
-                ChatHistory.created_at >= day_start,
-                ChatHistory.created_at <= day_end,
-                ChatHistory.role != MessageRole.SYSTEM
-            )
-        )
-        day_count = day_count_result.scalar_one()
-        
-        # 当日活跃用户数
-        active_users_result = await db.execute(
-            select(func.count(func.distinct(ChatHistory.user_id))).where(
-                ChatHistory.created_at >= day_start,
-                ChatHistory.created_at <= day_end,
-                ChatHistory.role != MessageRole.SYSTEM
-            )
-        )
-        active_users = active_users_result.scalar_one()
-        
-        daily_stats.append({
-            "date": current_date,
-            "message_count": day_count,
-            "active_users": active_users
-        })
-        
-        current_date += timedelta(days=1)
-    
+    return iter_rows(stmt, ChatHistory.id, limit=limit)
+
+
+def _export_record(row) -> Dict[str, Any]:
+    """JSON 导出的单条记录"""
     return {
-        "total_messages": total_messages,
-        "user_messages": user_messages,
-        "assistant_messages": assistant_messages,
-        "system_messages": system_messages,
-        "today_messages": today_messages,
-        "messages_per_user": messages_per_user,
-        "daily_stats": daily_stats
+        "id": row.id,
+        "user_id": row.user_id,
+        "user_nickname": row.nickname,
+        "user_phone": row.phone,
+        "role": row.role.value,
+        "msg_type": row.msg_type.value,
+        "content": row.content,
+        "meta_data": row.meta_data,
+        "created_at": row.created_at.isoformat()
     }
 
 
+def _export_values(row, max_content: Optional[int] = None) -> List[Any]:
+    """CSV / XLSX 导出的单行（列顺序同 EXPORT_COLUMNS）"""
+    meta_str = json.dumps(row.meta_data, ensure_ascii=False) if row.meta_data else ""
+    content = row.content or ""
+    if max_content:
+        # CSV 限制长度，避免CSV问题
+        content = content.replace('\n', ' ').replace('\r', ' ')[:max_content]
+        meta_str = meta_str[:200]
+    return [
+        row.id,
+        row.user_id,
+        row.nickname or "",
+        row.phone or "",
+        row.role.value,
+        row.msg_type.value,
+        content,
+        meta_str,
+        row.created_at.isoformat()
+    ]
+
+
+def _export_filename(extension: str) -> str:
+    return f"chat_records_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.{extension}"
+
+
 @router.get("/export/json")
 async def export_chat_json(
     user_id: Optional[int] = Query(None, description="按用户ID筛选"),
     start_date: Optional[date] = Query(None, description="开始日期"),
     end_date: Optional[date] = Query(None, description="结束日期"),
-    limit: int = Query(1000, ge=1, le=10000, description="导出记录数限制"),
-    user: User = Depends(get_current_admin),
-    db: AsyncSession = Depends(get_db)
+    limit: Optional[int] = Query(None, ge=1, description="导出记录数限制（默认全部）"),
+    user: User = Depends(get_current_admin)
 ):
     """
-    导出聊天记录为JSON格式
+    导出聊天记录为JSON格式（JSON 数组，分页读取、流式输出）
     
     需要管理员权限
     """
-    # 构建查询条件
-    conditions = [ChatHistory.role != MessageRole.SYSTEM]
-    
-    if user_id:
-        conditions.append(ChatHistory.user_id == user_id)
-    
-    if start_date:
-        start_dt = datetime.combine(start_date, datetime.min.time())
-        conditions.append(ChatHistory.created_at >= start_dt)
-    
-    if end_date:
-        end_dt = datetime.combine(end_date, datetime.max.time())
-        conditions.append(ChatHistory.created_at <= end_dt)
-    
-    # 获取数据
-    result = await db.execute(
-        select(ChatHistory)
-        .options(selectinload(ChatHistory.user))
-        .where(*conditions)
-        .order_by(desc(ChatHistory.created_at))
-        .limit(limit)
+    rows = _export_rows(user_id, start_date, end_date, limit)
+    return StreamingResponse(
+        json_array_chunks(_export_record(row) async for row in rows),
+        media_type="application/json",
+        headers=attachment_headers(_export_filename(ExportFormat.JSON.value))
     )
-    messages = result.scalars().all()
+
+
+@router.get("/export/jsonl")
+async def export_chat_jsonl(
+    user_id: Optional[int] = Query(None, description="按用户ID筛选"),
+    start_date: Optional[date] = Query(None, description="开始日期"),
+    end_date: Optional[date] = Query(None, description="结束日期"),
+    limit: Optional[int] = Query(None, ge=1, description="导出记录数限制（默认全部）"),
+    user: User = Depends(get_current_admin)
+):
+    """
+    导出聊天记录为JSON Lines格式（每行一条记录，流式输出）
     
-    # 构建导出数据
-    export_data = []
-    for msg in messages:
-        export_data.append({
-            "id": msg.id,
-            "user_id": msg.user_id,
-            "user_nickname": msg.user.nickname,
-            "user_phone": msg.user.phone,
-            "role": msg.role.value,
-            "msg_type": msg.msg_type.value,
-            "content": msg.content,
-            "meta_data": msg.meta_data,
-            "created_at": msg.created_at.isoformat()
-        })
-    
-    # 返回JSON文件
-    json_str = json.dumps(export_data, ensure_ascii=False, indent=2)
-    return Response(
-        content=json_str,
-        media_type="application/json",
-        headers={
-            "Content-Disposition": f"attachment; filename=chat_records_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.json"
-        }
+    需要管理员权限
+    """
+    rows = _export_rows(user_id, start_date, end_date, limit)
+    return StreamingResponse(
+        ndjson_chunks(_export_record(row) async for row in rows),
+        media_type="application/x-ndjson",
+        headers=attachment_headers(_export_filename(ExportFormat.JSONL.value))
     )
 
 
@@ -465,73 +451,47 @@ async def export_chat_csv(
     user_id: Optional[int] = Query(None, description="按用户ID筛选"),
     start_date: Optional[date] = Query(None, description="开始日期"),
     end_date: Optional[date] = Query(None, description="结束日期"),
-    limit: int = Query(1000, ge=1, le=10000, description="导出记录数限制"),
-    user: User = Depends(get_current_admin),
-    db: AsyncSession = Depends(get_db)
+    limit: Optional[int] = Query(None, ge=1, description="导出记录数限制（默认全部）"),
+    user: User = Depends(get_current_admin)
 ):
     """
-    导出聊天记录为CSV格式
+    导出聊天记录为CSV格式（流式输出）
     
     需要管理员权限
     """
-    # 构建查询条件
-    conditions = [ChatHistory.role != MessageRole.SYSTEM]
-    
-    if user_id:
-        conditions.append(ChatHistory.user_id == user_id)
-    
-    if start_date:
-        start_dt = datetime.combine(start_date, datetime.min.time())
-        conditions.append(ChatHistory.created_at >= start_dt)
-    
-    if end_date:
-        end_dt = datetime.combine(end_date, datetime.max.time())
-        conditions.append(ChatHistory.created_at <= end_dt)
-    
-    # 获取数据
-    result = await db.execute(
-        select(ChatHistory)
-        .options(selectinload(ChatHistory.user))
-        .where(*conditions)
-        .order_by(desc(ChatHistory.created_at))
-        .limit(limit)
+    rows = _export_rows(user_id, start_date, end_date, limit)
+    return StreamingResponse(
+        csv_chunks(
+            EXPORT_COLUMNS, (_export_values(row, max_content=500) async for row in rows)
+        ),
+        media_type="text/csv",
+        headers=attachment_headers(_export_filename(ExportFormat.CSV.value))
     )
-    messages = result.scalars().all()
-    
-    # 创建CSV
-    output = io.StringIO()
-    writer = csv.writer(output)
-    
-    # 写入表头
-    writer.writerow([
-        "ID", "用户ID", "用户昵称", "用户手机", "角色", "消息类型", 
-        "内容", "元数据", "创建时间"
-    ])
+
+
+@router.get("/export/xlsx")
+async def export_chat_xlsx(
+    user_id: Optional[int] = Query(None, description="按用户ID筛选"),
+    start_date: Optional[date] = Query(None, description="开始日期"),
+    end_date: Optional[date] = Query(None, description="结束日期"),
+    limit: Optional[int] = Query(None, ge=1, description="导出记录数限制（默认全部）"),
+    user: User = Depends(get_current_admin)
+):
+    """
+    导出聊天记录为Excel格式（只写模式写入临时文件后流式输出）
     
-    # 写入数据
-    for msg in messages:
-        meta_str = json.dumps(msg.meta_data, ensure_ascii=False) if msg.meta_data else ""
-        writer.writerow([
-            msg.id,
-            msg.user_id,
-            msg.user.nickname or "",
-            msg.user.phone or "",
-            msg.role.value,
-            msg.msg_type.value,
-            msg.content.replace('\n', ' ').replace('\r', ' ')[:500],  # 限制长度，避免CSV问题
-            meta_str[:200],  # 限制长度
-            msg.created_at.isoformat()
-        ])
-    
-    csv_content = output.getvalue()
-    output.close()
-    
-    return Response(
-        content=csv_content,
-        media_type="text/csv",
-        headers={
-            "Content-Disposition": f"attachment; filename=chat_records_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.csv"
-        }
+    需要管理员权限
+    """
+    rows = _export_rows(user_id, start_date, end_date, limit)
+    sheet = XlsxSheet(
+        title="聊天记录",
+        header=EXPORT_COLUMNS,
+        rows=(_export_values(row) async for row in rows),
+    )
+    return StreamingResponse(
+        xlsx_chunks([sheet]),
+        media_type=XLSX_MEDIA_TYPE,
+        headers=attachment_headers(_export_filename(ExportFormat.XLSX.value))
     )
 
 
@@ -543,54 +503,33 @@ async def advanced_search(
     start_date: Optional[date] = Query(None, description="开始日期"),
     end_date: Optional[date] = Query(None, description="结束日期"),
     limit: int = Query(100, ge=1, le=500, description="返回数量"),
+    cursor: Optional[str] = Query(None, description="上一页最后一条结果的 cursor"),
     user: User = Depends(get_current_admin),
     db: AsyncSession = Depends(get_db)
 ):
     """
-    高级搜索聊天记录
+    高级搜索聊天记录（全文索引，按相关度排序，带高亮片段）
+    
+    翻页时传入上一页最后一条结果的 cursor
     
     需要管理员权限
     """
-    # 构建条件
-    conditions = [ChatHistory.content.ilike(f"%{query}%")]
-    
-    if user_id:
-        conditions.append(ChatHistory.user_id == user_id)
-    
-    if role:
-        conditions.append(ChatHistory.role == role)
-    else:
-        conditions.append(ChatHistory.role != MessageRole.SYSTEM)
-    
-    if start_date:
-        start_dt = datetime.combine(start_date, datetime.min.time())
-        conditions.append(ChatHistory.created_at >= start_dt)
-    
-    if end_date:
-        end_dt = datetime.combine(end_date, datetime.max.time())
-        conditions.append(ChatHistory.created_at <= end_dt)
-    
-    # 执行查询
-    result = await db.execute(
-        select(ChatHistory)
-        .options(selectinload(ChatHistory.user))
-        .where(*conditions)
-        .order_by(desc(ChatHistory.created_at))
-        .limit(limit)
-    )
-    messages = result.scalars().all()
-    
-    # 返回结果
-    return [
-        {
-            "id": msg.id,
-            "user_id": msg.user_id,
-            "user_nickname": msg.user.nickname,
-            "role": msg.role.value,
-            "msg_type": msg.msg_type.value,
-            "content": msg.content[:200] + ("..." if len(msg.content) > 200 else ""),
-            "created_at": msg.created_at,
-            "highlight_content": msg.content.replace(query, f"**{query}**")  # 高亮显示
-        }
-        for msg in messages
-    ]
\ No newline at end of file
+    start_dt = datetime.combine(start_date, datetime.min.time()) if start_date else None
+    end_dt = datetime.combine(end_date, datetime.max.time()) if end_date else None
+
+    try:
+        return await ChatSearchService.search(
+            db,
+            query,
+            user_id=user_id,
+            role=role,
+            start_time=start_dt,
+            end_time=end_dt,
+            limit=limit,
+            cursor=cursor,
+        )
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="无效的 cursor"
+        )
@@ -21,6 +21,7 @@ import shutil
 from models.database import get_db, SystemConfig, SystemBackup, User
 from api.dependencies.auth_v2 import get_current_admin
 from config.settings import get_fastapi_settings
+from utils.session_registry import get_registry_stats, sweep_all
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -251,6 +252,42 @@ async def get_resource_statistics(
     return resources
 
 
+@router.get("/stats/sessions")
+async def get_session_statistics(
+    user: User = Depends(get_current_admin)
+):
+    """
+    获取会话注册表统计（每用户 Agent / 记忆管理器 / 向量存储的常驻数量与估算内存）
+
+    统计前先淘汰空闲超时的对象。需要管理员权限
+    """
+    evicted = sweep_all()
+    stats = get_registry_stats()
+    stats["evicted_idle"] = evicted
+    return stats
+
+
+@router.get("/stats/llm")
+async def get_llm_statistics(
+    user: User = Depends(get_current_admin)
+):
+    """
+    获取 LLM 调用统计：响应缓存命中率与节省的 token/费用，各提供商熔断状态与延迟，
+    对话记忆摘要队列的积压、延迟与每条摘要的 token 数
+
+    需要管理员权限
+    """
+    from services.ai_service import llm_cache
+    from services.llm_transport import llm_transport
+    from services.vectorstore.summary_queue import summary_queue
+
+    return {
+        "cache": llm_cache.stats(),
+        "providers": llm_transport.stats(),
+        "memory_summary": summary_queue.stats(),
+    }
+
+
 @router.get("/configs")
 async def list_system_configs(
     search: Optional[str] = Query(None, description="搜索配置键"),
@@ -15,6 +15,7 @@ import logging
 
 from models.database import get_db, User, UserProfile, WeightRecord, MealRecord, ExerciseRecord, WaterRecord, SleepRecord, ChatHistory, Goal, MessageRole, MotivationType
 from api.dependencies.auth_v2 import get_current_admin
+from services.admin_analytics_service import AdminAnalyticsService
 from config.settings import get_fastapi_settings
 
 logger = logging.getLogger(__name__)
@@ -374,80 +375,8 @@ async def get_user_stats_summary(
     
     需要管理员权限
     """
-    # 总用户数
-    total_result = await db.execute(select(func.count(User.id)))
-    total_users = total_result.scalar_one()
-    
-    # VIP用户数
-    vip_result = await db.execute(select(func.count(User.id)).where(User.is_vip == True))
-    vip_users = vip_result.scalar_one()
-    
-    # 活跃用户（7天内登录）
-    seven_days_ago = datetime.utcnow() - timedelta(days=7)
-    active_7d_result = await db.execute(
-        select(func.count(User.id)).where(User.last_login >= seven_days_ago)
-    )
-    active_users_7d = active_7d_result.scalar_one()
-    
-    # 活跃用户（30天内登录）
-    thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-    active_30d_result = await db.execute(
-        select(func.count(User.id)).where(User.last_login >= thirty_days_ago)
-    )
-    active_users_30d = active_30d_result.scalar_one()
-    
-    # 今日新增用户
-    today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-    new_today_result = await db.execute(
-        select(func.count(User.id)).where(User.created_at >= today_start)
-    )
-    new_users_today = new_today_result.scalar_one()
-    
-    # 7日新增用户
-    seven_days_start = datetime.utcnow() - timedelta(days=7)
-    new_7d_result = await db.execute(
-        select(func.count(User.id)).where(User.created_at >= seven_days_start)
-    )
-    new_users_7d = new_7d_result.scalar_one()
-    
-    # 平均记录数
-    avg_records = {}
-    
-    # 计算留存率（7日留存）
-    fourteen_days_ago = datetime.utcnow() - timedelta(days=14)
-    seven_to_fourteen_days_ago = fourteen_days_ago + timedelta(days=7)
-    
-    # 7-14天前注册的用户
-    cohort_result = await db.execute(
-        select(func.count(User.id)).where(
-            User.created_at >= fourteen_days_ago,
-            User.created_at < seven_to_fourteen_days_ago
-        )
-    )
-    cohort_size = cohort_result.scalar_one()
-    
-    # 7-14天前注册且在7天内活跃的用户
-    retained_result = await db.execute(
-        select(func.count(User.id)).where(
-            User.created_at >= fourteen_days_ago,
-            User.created_at < seven_to_fourteen_days_ago,
-            User.last_login >= seven_days_ago
-        )
-    )
-    retained_users = retained_result.scalar_one()
-    
-    retention_rate_7d = (retained_users / cohort_size * 100) if cohort_size > 0 else 0
-    
-    return UserStatsResponse(
-        total_users=total_users,
-        active_users_7d=active_users_7d,
-        active_users_30d=active_users_30d,
-        vip_users=vip_users,
-        new_users_today=new_users_today,
-        new_users_7d=new_users_7d,
-        avg_records_per_user=avg_records,
-        retention_rate_7d=round(retention_rate_7d, 2)
-    )
+    summary = await AdminAnalyticsService.get_user_summary(db)
+    return UserStatsResponse(**summary)
 
 
 @router.get("/stats/activity")
@@ -461,76 +390,7 @@ async def get_user_activity(
     
     需要管理员权限
     """
-    activities = []
-    
-    # 生成日期范围
-    end_date = date.today()
-    start_date = end_date - timedelta(days=days-1)
-    
-    current_date = start_date
-    while current_date <= end_date:
-        # 计算每日活跃用户数（当天有登录）
-        day_start = datetime.combine(current_date, datetime.min.time())
-        day_end = datetime.combine(current_date, datetime.max.time())
-        
-        # 活跃用户
-        active_result = await db.execute(
-            select(func.count(User.id)).where(
-                User.last_login >= day_start,
-                User.last_login <= day_end
-            )
-        )
-        active_users = active_result.scalar_one()
-        
-        # 新增用户
-        new_result = await db.execute(
-            select(func.count(User.id)).where(
-                User.created_at >= day_start,
-                User.created_at <= day_end
-            )
-        )
-        new_users = new_result.scalar_one()
-        
-        # 聊天消息数
-        chat_result = await db.execute(
-            select(func.count(ChatHistory.id)).where(
-                ChatHistory.created_at >= day_start,
-                ChatHistory.created_at <= day_end,
-            ChatHistory.role != MessageRole.SYSTEM
-            )
-        )
-        chat_messages = chat_result.scalar_one()
-        
-        # 体重记录数
-        weight_result = await db.execute(
-            select(func.count(WeightRecord.id)).where(
-                WeightRecord.created_at >= day_start,
-                WeightRecord.created_at <= day_end
-            )
-        )
-        weight_records = weight_result.scalar_one()
-        
-        # 餐食记录数
-        meal_result = await db.execute(
-            select(func.count(MealRecord.id)).where(
-                MealRecord.created_at >= day_start,
-                MealRecord.created_at <= day_end
-            )
-        )
-        meal_records = meal_result.scalar_one()
-        
-        activities.append({
-            "date": current_date,
-            "active_users": active_users,
-            "new_users": new_users,
-            "chat_messages": chat_messages,
-            "weight_records": weight_records,
-            "meal_records": meal_records
-        })
-        
-        current_date += timedelta(days=1)
-    
-    return activities
+    return await AdminAnalyticsService.get_activity_series(db, days)
 
 
 @router.get("/{user_id}/records/weight")
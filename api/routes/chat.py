@@ -17,7 +17,7 @@ from fastapi import (
 from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, desc, and_, func
-from typing import List, Optional, Dict, Any, AsyncGenerator
+from typing import List, Optional, Dict, AsyncGenerator
 from datetime import datetime, timedelta
 import json
 import asyncio
@@ -37,13 +37,14 @@ from models.database import (
 from api.routes.user import get_current_user
 from config.settings import fastapi_settings
 from services.ai_service import ai_service, AIResponse
+from services.llm_transport import llm_context
+from utils.sse import format_sse_event
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
 # ============ 配置 ============
-AI_TIMEOUT = 60.0  # AI 请求超时时间（秒）
-MAX_RETRIES = 2  # 最大重试次数
+AI_TIMEOUT = 60.0  # AI 请求截止时间（秒，包含排队与重试）
 
 
 async def build_system_prompt(user: User, db: AsyncSession) -> str:
@@ -130,51 +131,16 @@ async def save_message_to_db(
             await db.rollback()
 
 
-async def call_ai_with_retry(
-    messages: List[Dict[str, str]], max_retries: int = MAX_RETRIES
-) -> AIResponse:
-    """带重试机制的 AI 调用"""
-    last_error = None
-
-    for attempt in range(max_retries + 1):
-        try:
-            # 使用 asyncio.wait_for 包装 AI 调用，设置超时
-            response = await asyncio.wait_for(
-                ai_service.chat(messages, max_tokens=500),  # 限制token数，加快响应
-                timeout=AI_TIMEOUT,
-            )
-
-            if not response.error:
-                return response
-
-            last_error = response.error
-
-            # 如果是最后一次尝试，返回错误
-            if attempt == max_retries:
-                return response
-
-            # 等待后重试
-            await asyncio.sleep(1 * (attempt + 1))
-
-        except asyncio.TimeoutError:
-            last_error = f"AI 请求超时（{AI_TIMEOUT}秒）"
-            if attempt == max_retries:
-                return AIResponse(
-                    content="", model=ai_service.provider, error=last_error
-                )
-            await asyncio.sleep(1 * (attempt + 1))
-
-        except Exception as e:
-            last_error = str(e)
-            if attempt == max_retries:
-                return AIResponse(
-                    content="", model=ai_service.provider, error=last_error
-                )
-            await asyncio.sleep(1 * (attempt + 1))
+async def call_ai(messages: List[Dict[str, str]], user_id: int) -> AIResponse:
+    """
+    调用 AI（旧对话流程的兜底路径）
 
-    return AIResponse(
-        content="", model=ai_service.provider, error=last_error or "未知错误"
-    )
+    重试、超时、并发限制和提供商切换都由共享 LLM 传输层统一处理，这里只设置
+    本次请求的用户与截止时间。
+    """
+    with llm_context(user_id=user_id, timeout=AI_TIMEOUT):
+        # 限制token数，加快响应
+        return await ai_service.chat(messages, max_tokens=500)
 
 
 @router.post("/send")
@@ -285,7 +251,7 @@ async def send_message(
             ]
 
             # 调用旧 AI 服务
-            response = await call_ai_with_retry(messages)
+            response = await call_ai(messages, current_user.id)
 
             if response.error:
                 # AI 调用失败，返回友好错误
@@ -460,6 +426,21 @@ async def send_message_async(
         )
 
 
+async def save_stream_reply(user_id: int, parts: List[str]) -> None:
+    """流式回复结束（或客户端中途断开）时一次性保存完整回复"""
+    if not parts:
+        return
+    # shield：客户端断开导致生成器被取消时仍完成保存
+    await asyncio.shield(
+        save_message_to_db(
+            user_id=user_id,
+            role=MessageRole.ASSISTANT,
+            content="".join(parts),
+            msg_type=MessageType.TEXT,
+        )
+    )
+
+
 @router.get("/stream")
 async def stream_chat(
     content: str,
@@ -480,7 +461,7 @@ async def stream_chat(
     };
     ```
 
-    注意：目前仅支持 OpenAI，Qwen 暂不支持流式
+    OpenAI 与 Qwen 均为真正的逐 token 流式输出
     """
     # 保存用户消息
     message = ChatHistory(
@@ -504,61 +485,30 @@ async def stream_chat(
     ]
 
     async def generate_stream() -> AsyncGenerator[str, None]:
-        """生成流式响应"""
-        full_content = ""
+        """生成流式响应（逐 token 转发，结束后一次性保存完整回复）"""
+        parts: List[str] = []
+        saved = False
 
         try:
-            # 使用 OpenAI 流式 API
-            if ai_service.provider == "openai":
-                from openai import AsyncOpenAI
-
-                client = AsyncOpenAI(
-                    api_key=fastapi_settings.OPENAI_API_KEY,
-                    base_url=fastapi_settings.OPENAI_API_BASE,
-                )
-
-                stream = await client.chat.completions.create(
-                    model=fastapi_settings.OPENAI_MODEL,
-                    messages=messages,
-                    max_tokens=500,
-                    stream=True,
-                )
+            with llm_context(user_id=current_user.id):
+                async for content_chunk in ai_service.stream_chat(
+                    messages, max_tokens=500
+                ):
+                    parts.append(content_chunk)
+                    yield f"data: {json.dumps({'content': content_chunk, 'done': False})}\n\n"
 
-                async for chunk in stream:
-                    if chunk.choices[0].delta.content:
-                        content_chunk = chunk.choices[0].delta.content
-                        full_content += content_chunk
-                        yield f"data: {json.dumps({'content': content_chunk, 'done': False})}\n\n"
-
-                # 保存完整回复
-                await save_message_to_db(
-                    user_id=current_user.id,
-                    role=MessageRole.ASSISTANT,
-                    content=full_content,
-                    msg_type=MessageType.TEXT,
-                )
+            # 保存完整回复
+            saved = True
+            await save_stream_reply(current_user.id, parts)
 
-                yield f"data: {json.dumps({'content': '', 'done': True})}\n\n"
-
-            else:
-                # Qwen 暂不支持流式，使用普通模式
-                yield f"data: {json.dumps({'content': '流式响应当前仅支持 OpenAI 模型', 'done': False})}\n\n"
-
-                response = await call_ai_with_retry(messages)
-                if response.content:
-                    yield f"data: {json.dumps({'content': response.content, 'done': False})}\n\n"
-
-                    await save_message_to_db(
-                        user_id=current_user.id,
-                        role=MessageRole.ASSISTANT,
-                        content=response.content,
-                        msg_type=MessageType.TEXT,
-                    )
-
-                yield f"data: {json.dumps({'content': '', 'done': True})}\n\n"
+            yield f"data: {json.dumps({'content': '', 'done': True})}\n\n"
 
         except Exception as e:
             yield f"data: {json.dumps({'error': str(e), 'done': True})}\n\n"
+        finally:
+            # 出错或客户端中途断开时保存已生成的部分
+            if not saved:
+                await save_stream_reply(current_user.id, parts)
 
     return StreamingResponse(
         generate_stream(),
@@ -643,79 +593,47 @@ async def stream_chat_post(
     ]
 
     async def generate_stream() -> AsyncGenerator[str, None]:
-        """生成流式响应，支持多种内容类型"""
-        full_content = ""
-        current_type = "text"
+        """生成流式响应，支持多种内容类型（逐 token 转发，结束后一次性保存完整回复）"""
+        parts: List[str] = []
+        saved = False
 
         try:
-            if ai_service.provider == "openai":
-                from openai import AsyncOpenAI
-
-                client = AsyncOpenAI(
-                    api_key=fastapi_settings.OPENAI_API_KEY,
-                    base_url=fastapi_settings.OPENAI_API_BASE,
-                )
-
-                stream = await client.chat.completions.create(
-                    model=fastapi_settings.OPENAI_MODEL,
-                    messages=messages,
-                    max_tokens=1000,
-                    stream=True,
-                )
-
-                async for chunk in stream:
-                    if chunk.choices[0].delta.content:
-                        content_chunk = chunk.choices[0].delta.content
-                        full_content += content_chunk
-
-                        # 检查是否是特殊标记（用于识别内容类型）
-                        if content_chunk.startswith("[IMAGE:"):
-                            # 图片标记
-                            image_url = content_chunk[7:-1].strip()
-                            yield f"data: {json.dumps({'type': 'image', 'content': image_url, 'done': False})}\n\n"
-                        elif content_chunk.startswith("[CARD:"):
-                            # 卡片标记
-                            card_data = content_chunk[6:-1].strip()
-                            yield f"data: {json.dumps({'type': 'card', 'content': card_data, 'done': False})}\n\n"
-                        elif content_chunk.startswith("[ACTIONS:"):
-                            # 快捷操作
-                            actions = content_chunk[9:-1].strip()
-                            yield f"data: {json.dumps({'type': 'quick_actions', 'content': actions, 'done': False})}\n\n"
-                        else:
-                            # 普通文本
-                            yield f"data: {json.dumps({'type': 'text', 'content': content_chunk, 'done': False})}\n\n"
-
-                # 保存完整回复
-                await save_message_to_db(
-                    user_id=current_user.id,
-                    role=MessageRole.ASSISTANT,
-                    content=full_content,
-                    msg_type=MessageType.TEXT,
-                )
-
-                yield f"data: {json.dumps({'type': 'done', 'content': '', 'done': True})}\n\n"
-
-            else:
-                # Qwen 或其他模型
-                yield f"data: {json.dumps({'type': 'info', 'content': '流式响应当前仅支持 OpenAI 模型，将使用普通模式', 'done': False})}\n\n"
-
-                response = await call_ai_with_retry(messages)
-                if response.content:
-                    full_content = response.content
-                    yield f"data: {json.dumps({'type': 'text', 'content': full_content, 'done': False})}\n\n"
-
-                    await save_message_to_db(
-                        user_id=current_user.id,
-                        role=MessageRole.ASSISTANT,
-                        content=full_content,
-                        msg_type=MessageType.TEXT,
-                    )
-
-                yield f"data: {json.dumps({'type': 'done', 'content': '', 'done': True})}\n\n"
+            with llm_context(user_id=current_user.id):
+                async for content_chunk in ai_service.stream_chat(
+                    messages, max_tokens=1000
+                ):
+                    parts.append(content_chunk)
+
+                    # 检查是否是特殊标记（用于识别内容类型）
+                    if content_chunk.startswith("[IMAGE:"):
+                        # 图片标记
+                        image_url = content_chunk[7:-1].strip()
+                        yield f"data: {json.dumps({'type': 'image', 'content': image_url, 'done': False})}\n\n"
+                    elif content_chunk.startswith("[CARD:"):
+                        # 卡片标记
+                        card_data = content_chunk[6:-1].strip()
+                        yield f"data: {json.dumps({'type': 'card', 'content': card_data, 'done': False})}\n\n"
+                    elif content_chunk.startswith("[ACTIONS:"):
+                        # 快捷操作
+                        actions = content_chunk[9:-1].strip()
+                        yield f"data: {json.dumps({'type': 'quick_actions', 'content': actions, 'done': False})}\n\n"
+                    else:
+                        # 普通文本
+                        yield f"data: {json.dumps({'type': 'text', 'content': content_chunk, 'done': False})}\n\n"
+
+            # 保存完整回复
+            saved = True
+            await save_stream_reply(current_user.id, parts)
+
+            yield f"data: {json.dumps({'type': 'done', 'content': '', 'done': True})}\n\n"
 
         except Exception as e:
             error_msg = f"生成失败: {str(e)}"
             yield f"data: {json.dumps({'type': 'error', 'content': error_msg, 'done': True})}\n\n"
+        finally:
+            # 出错或客户端中途断开时保存已生成的部分
+            if not saved:
+                await save_stream_reply(current_user.id, parts)
 
     return StreamingResponse(
         generate_stream(),
@@ -813,7 +731,7 @@ async def get_context_info(
             "today_messages": today_messages,
             "ai_provider": ai_service.provider,
             "ai_timeout": AI_TIMEOUT,
-            "max_retries": MAX_RETRIES,
+            "max_retries": fastapi_settings.LLM_MAX_RETRIES,
             "system_prompt_preview": system_prompt[:300] + "..."
             if len(system_prompt) > 300
             else system_prompt,
@@ -826,44 +744,9 @@ async def get_context_info(
 from datetime import timedelta
 from functools import lru_cache
 from typing import Optional
-import time
-
-# 缓存用户的每日建议（带过期机制）
-_suggestion_cache: Dict[int, Dict[str, Any]] = {}
-_CACHE_MAX_SIZE = 100  # 最大缓存用户数
-_CACHE_EXPIRE_SECONDS = 3600  # 缓存过期时间（1小时）
-
 
-def _get_cached_suggestion(user_id: int) -> Optional[Dict[str, Any]]:
-    """获取缓存的建议（带过期检查）"""
-    if user_id not in _suggestion_cache:
-        return None
-
-    cached = _suggestion_cache[user_id]
-    # 检查是否过期
-    cached_time = cached.get("_cached_at", 0)
-    if time.time() - cached_time > _CACHE_EXPIRE_SECONDS:
-        del _suggestion_cache[user_id]
-        return None
-
-    return cached.get("suggestion")
-
-
-def _set_cached_suggestion(user_id: int, suggestion: Dict[str, Any]) -> None:
-    """设置缓存的建议（带大小限制）"""
-    # 简单的缓存清理：如果超过最大size，删除最早的缓存
-    if len(_suggestion_cache) >= _CACHE_MAX_SIZE:
-        oldest_key = min(
-            _suggestion_cache.keys(),
-            key=lambda k: _suggestion_cache[k].get("_cached_at", 0),
-        )
-        del _suggestion_cache[oldest_key]
-
-    _suggestion_cache[user_id] = {
-        "suggestion": suggestion,
-        "date": suggestion.get("created_at", "")[:10],  # 提取日期
-        "_cached_at": time.time(),
-    }
+# 每日建议的 AI 回复缓存时间（提示词只由今日数据状态和时段决定，经 LLM 响应缓存复用）
+_SUGGESTION_CACHE_TTL = 3600
 
 
 @router.get("/daily-suggestion")
@@ -888,13 +771,6 @@ async def get_daily_suggestion(
     )
 
     today = date.today()
-    cache_key = current_user.id
-
-    # 检查缓存（除非强制刷新）- 使用带过期检查的新函数
-    if not refresh:
-        cached = _get_cached_suggestion(cache_key)
-        if cached is not None:
-            return {"success": True, "suggestion": cached, "cached": True}
 
     try:
         # 1. 获取今日体重记录
@@ -1063,6 +939,9 @@ async def get_daily_suggestion(
             ],
             max_tokens=300,
             temperature=0.7,
+            # 强制刷新时跳过缓存查询，但仍写入新结果
+            cache="refresh" if refresh else "exact",
+            cache_ttl=_SUGGESTION_CACHE_TTL,
         )
 
         if ai_response.error:
@@ -1132,10 +1011,11 @@ async def get_daily_suggestion(
             },
         }
 
-        # 9. 缓存建议（使用带大小限制的新函数）
-        _set_cached_suggestion(cache_key, suggestion)
-
-        return {"success": True, "suggestion": suggestion, "cached": False}
+        return {
+            "success": True,
+            "suggestion": suggestion,
+            "cached": ai_response.cached,
+        }
 
     except Exception as e:
         logger.warning("生成每日建议失败: %s", e)
@@ -1244,7 +1124,7 @@ async def send_message_langchain(
             ]
 
             # 调用旧 AI 服务
-            response = await call_ai_with_retry(messages)
+            response = await call_ai(messages, current_user.id)
 
             if response.error:
                 raise Exception(response.error)
@@ -1306,6 +1186,105 @@ async def send_message_langchain(
         )
 
 
+@router.post("/send-langchain/stream")
+async def send_message_langchain_stream(
+    request_data: dict = Body(...),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+) -> StreamingResponse:
+    """
+    流式版 /send-langchain：教练对话图边执行边推送（SSE）
+
+    先立即返回 start 事件，之后按执行顺序推送：
+    - progress: 节点进度 {"node": "load_profile" | ... | "finalize", "status": "start" | "end"}
+    - token: 教练回复的一段文本 {"content": "..."}
+    - final: 最终结构化响应（最后一个事件），content 为完整回复（含工具补充的数据）
+
+    使用方式：
+    ```javascript
+    const response = await fetch('/api/chat/send-langchain/stream', {
+        method: 'POST',
+        headers: {'Authorization': `Bearer ${token}`, 'Content-Type': 'application/json'},
+        body: JSON.stringify({content: '用户消息'})
+    });
+    // 按 "event: <类型>\\ndata: <JSON>\\n\\n" 解析 response.body
+    ```
+    """
+    from services.langchain.graph.checkpointer import coach_thread_id
+    from services.langchain.graph.graph import stream_graph
+
+    content = request_data.get("content", "")
+    image_url = request_data.get("image_url", "")
+    if not content and image_url:
+        content = "请帮我分析这张图片中的食物"
+    if not content:
+        raise HTTPException(status_code=400, detail="消息内容不能为空")
+
+    full_content = f"{content}\n[图片:{image_url}]" if image_url else content
+
+    # 保存用户消息
+    message = ChatHistory(
+        user_id=current_user.id,
+        role=MessageRole.USER,
+        content=full_content,
+        msg_type=MessageType(request_data.get("msg_type", "text")),
+        meta_data={"image_url": image_url} if image_url else None,
+        created_at=datetime.utcnow(),
+    )
+    db.add(message)
+    await db.commit()
+
+    user_id = current_user.id
+
+    async def generate_stream() -> AsyncGenerator[str, None]:
+        """转发图执行事件（逐 token），结束后一次性保存完整回复"""
+        parts: List[str] = []
+        saved = False
+
+        yield format_sse_event("start", {"thread_id": coach_thread_id(user_id)})
+        try:
+            async for event in stream_graph(user_id, full_content):
+                if event["type"] == "token":
+                    parts.append(event["content"])
+                    yield format_sse_event("token", {"content": event["content"]})
+                elif event["type"] == "node":
+                    yield format_sse_event(
+                        "progress", {"node": event["node"], "status": event["status"]}
+                    )
+                else:
+                    reply = event.get("assistant_response") or "".join(parts)
+                    saved = True
+                    await save_stream_reply(user_id, [reply])
+                    yield format_sse_event(
+                        "final",
+                        {
+                            "success": event["success"],
+                            "content": reply,
+                            "role": "assistant",
+                            "structured_response": event.get("structured_response", {}),
+                            "error": event.get("error"),
+                            "timestamp": datetime.utcnow().isoformat(),
+                            "model": "coach-graph",
+                        },
+                    )
+        except Exception as e:
+            yield format_sse_event("error", {"content": f"生成失败: {str(e)}"})
+        finally:
+            # 出错或客户端中途断开时保存已生成的部分
+            if not saved:
+                await save_stream_reply(user_id, parts)
+
+    return StreamingResponse(
+        generate_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no",
+        },
+    )
+
+
 @router.post("/memory/search")
 async def search_user_memory(
     request_data: dict = Body(...),
@@ -1377,7 +1356,7 @@ async def get_memory_stats(current_user: User = Depends(get_current_user)):
         return {
             "success": True,
             "stats": {
-                "vector_documents": store.count_documents(),
+                "vector_documents": await asyncio.to_thread(store.count_documents),
                 "user_id": current_user.id,
             },
         }
@@ -20,7 +20,9 @@ from models.database import (
 )
 from api.routes.user import get_current_user
 from services.integration_service import AchievementIntegrationService
+from services.daily_activity_service import DailyActivityService
 from services.langchain.memory import CheckinSyncService
+from utils.result_cache import invalidate_user
 from config.logging_config import get_module_logger
 
 logger = get_module_logger(__name__)
@@ -94,6 +96,7 @@ async def record_exercise(
     )
 
     db.add(record)
+    await DailyActivityService.record_added(db, record)
     await db.commit()
 
     # 异步处理成就和积分检查
@@ -314,8 +317,10 @@ async def delete_exercise_record(
     if not record:
         raise HTTPException(status_code=404, detail="记录不存在")
 
+    await DailyActivityService.record_removed(db, record)
     await db.delete(record)
     await db.commit()
+    await invalidate_user(current_user.id)
 
     return {"success": True, "message": "运动记录已删除"}
 
@@ -362,7 +367,9 @@ async def checkin_exercise(
     )
 
     db.add(record)
+    await DailyActivityService.record_added(db, record)
     await db.commit()
+    await invalidate_user(current_user.id)
 
     return {
         "success": True,
@@ -14,11 +14,10 @@ from fastapi import (
     Query,
 )
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, and_, desc
+from sqlalchemy import select, and_, desc
 from typing import List, Optional
 from datetime import datetime, date, timedelta
 import json
-import os
 import uuid
 
 from models.database import (
@@ -33,8 +32,12 @@ from models.database import (
     MessageType,
 )
 from api.routes.user import get_current_user
-from config.settings import fastapi_settings
+from utils.query_helpers import on_day
+from utils.result_cache import invalidate_user
 from services.ai_service import ai_service
+from services.image_ingest_service import ImageTooLargeError, image_ingest
+from services.daily_activity_service import DailyActivityService
+from services.food_index_service import food_index
 from services.integration_service import AchievementIntegrationService
 from services.langchain.memory import CheckinSyncService
 from utils.alert_utils import alert_error, alert_warning, AlertCategory
@@ -160,6 +163,7 @@ async def init_food_database(db: AsyncSession):
         db.add(food)
 
     await db.commit()
+    await food_index.load(db)
     print(f"✅ 已初始化食物数据库，共 {len(DEFAULT_FOODS)} 种食物")
 
 
@@ -254,14 +258,17 @@ async def record_meal(
     # 如果有多条旧记录，删除多余的（只保留最新的一条用于更新）
     if len(existing_records) > 1:
         for old_record in existing_records[1:]:
+            await DailyActivityService.record_removed(db, old_record)
             await db.delete(old_record)
 
     if existing_record:
-        # 更新已有记录
+        # 更新已有记录（同步调整每日活动汇总）
+        await DailyActivityService.record_removed(db, existing_record)
         existing_record.food_items = [{"name": content, "calories": calories}]
         existing_record.total_calories = calories or 0
         existing_record.photo_url = photo_url
         existing_record.record_time = datetime.utcnow()
+        await DailyActivityService.record_added(db, existing_record)
         message = "餐食记录已更新"
         record_id = existing_record.id
     else:
@@ -278,6 +285,7 @@ async def record_meal(
         )
         db.add(record)
         await db.flush()  # 获取新记录的ID
+        await DailyActivityService.record_added(db, record)
         record_id = record.id
         message = "餐食记录成功"
 
@@ -447,59 +455,30 @@ async def analyze_meal_photo(
 
     返回 AI 识别的食物信息和热量估算
     """
-    import base64
-
-    # 保存上传的文件
-    file_ext = os.path.splitext(file.filename)[1] or ".jpg"
-    file_name = f"{uuid.uuid4()}{file_ext}"
-    file_path = os.path.join(fastapi_settings.UPLOAD_DIR, file_name)
-
+    # 分块异步写盘，按内容哈希命名（相同照片只保存一份）
     try:
-        contents = await file.read()
-        with open(file_path, "wb") as f:
-            f.write(contents)
+        image = await image_ingest.save_upload(file)
+    except ImageTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"文件保存失败: {str(e)}")
 
     # 构建文件 URL（本地访问）
-    file_url = f"/uploads/{file_name}"
+    file_name = image.file_name
+    file_url = image.file_url
 
     # 使用 AI 分析图片 - 通过base64编码直接传给AI
     ai_result = None
     try:
-        # 压缩图片，限制大小以加快上传和API调用
-        from PIL import Image
-        import io
-
-        # 打开图片
-        img = Image.open(io.BytesIO(contents))
-
-        # 转换为RGB（处理PNG等格式）
-        if img.mode in ("RGBA", "P"):
-            img = img.convert("RGB")
-
-        # 压缩图片：最大宽度1024px，质量85%
-        max_size = 1024
-        if max(img.size) > max_size:
-            ratio = max_size / max(img.size)
-            new_size = (int(img.size[0] * ratio), int(img.size[1] * ratio))
-            img = img.resize(new_size, Image.Resampling.LANCZOS)
-
-        # 保存为JPEG，压缩质量
-        buffer = io.BytesIO()
-        img.save(buffer, format="JPEG", quality=85, optimize=True)
-        compressed_contents = buffer.getvalue()
-
-        print(
-            f"图片压缩前: {len(contents) / 1024:.1f}KB, 压缩后: {len(compressed_contents) / 1024:.1f}KB"
+        # 在进程池中压缩图片（最大边长1024px，质量85%），限制大小以加快API调用
+        data_url = await image_ingest.to_data_url(image)
+        logger.info(
+            "餐食照片预处理完成: 原图 %.1fKB, data URL %d 字符, 重复照片=%s",
+            image.size / 1024,
+            len(data_url),
+            image.duplicate,
         )
 
-        # 将压缩后的图片转为base64
-        image_base64 = base64.b64encode(compressed_contents).decode("utf-8")
-        data_url = f"data:image/jpeg;base64,{image_base64}"
-
-        print(f"Base64长度: {len(data_url)} 字符")
-
         # 构建提示词
         prompt = """请分析这张餐食照片，识别出所有食物，并估算每种食物的热量和分量。
 
@@ -523,7 +502,8 @@ async def analyze_meal_photo(
 3. 返回必须是有效的JSON格式"""
 
         # 调用AI进行视觉分析
-        ai_response = await ai_service.analyze_image(data_url, prompt)
+        # 同一张照片重复上传时直接复用识别结果
+        ai_response = await ai_service.analyze_image(data_url, prompt, cache="exact")
 
         print(f"AI Response: {ai_response}")
         print(f"AI Content type: {type(ai_response.content)}")
@@ -670,41 +650,22 @@ async def search_food(
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
-    """搜索食物"""
+    """搜索食物（内存索引：完全匹配 > 前缀 > 拼音首字母 > 子串）"""
     # 搜索系统食物库
-    result = await db.execute(
-        select(FoodItem).where(FoodItem.name.contains(keyword)).limit(limit)
-    )
-    system_foods = result.scalars().all()
+    await food_index.ensure_loaded(db)
+    system_foods = food_index.search(keyword, limit)
 
     # 搜索用户自定义食物
-    result = await db.execute(
-        select(UserFood)
-        .where(
-            and_(
-                UserFood.user_id == current_user.id,
-                UserFood.food_name.contains(keyword),
-            )
-        )
-        .limit(limit)
+    user_foods = await food_index.search_user_foods(
+        current_user.id, keyword, db, limit
     )
-    user_foods = result.scalars().all()
 
     return {
         "success": True,
         "keyword": keyword,
-        "system_foods": [
-            {
-                "id": f.id,
-                "name": f.name,
-                "category": f.category.value if f.category else None,
-                "calories_per_100g": f.calories_per_100g,
-                "common_portions": f.common_portions,
-            }
-            for f in system_foods
-        ],
+        "system_foods": [f.to_dict() for f in system_foods],
         "user_foods": [
-            {"id": f.id, "name": f.food_name, "calories": f.calories}
+            {"id": f.id, "name": f.name, "calories": f.calories}
             for f in user_foods
         ],
     }
@@ -723,6 +684,7 @@ async def add_custom_food(
     )
     db.add(user_food)
     await db.commit()
+    food_index.add_user_food(current_user.id, user_food.id, food_name, calories)
 
     return {
         "success": True,
@@ -735,34 +697,9 @@ async def add_custom_food(
 
 
 async def estimate_calories(content: str, db: AsyncSession) -> Optional[int]:
-    """估算食物热量"""
-    # 简单匹配食物数据库
-    total_calories = 0
-    found_foods = []
-
-    # 分词并匹配（简化版）
-    for food_name in content.split():
-        result = await db.execute(
-            select(FoodItem).where(FoodItem.name.contains(food_name))
-        )
-        food = result.scalar_one_or_none()
-        if food:
-            # 使用常见分量估算
-            portion = 100  # 默认100克
-            if food.common_portions:
-                # 使用第一个常见分量
-                portion = list(food.common_portions.values())[0]
-
-            calories = int(food.calories_per_100g * portion / 100)
-            total_calories += calories
-            found_foods.append(
-                {"name": food.name, "portion": portion, "calories": calories}
-            )
-
-    # 如果没找到匹配的食物，返回 None
-    if not found_foods:
-        return None
-
+    """估算食物热量（内存食物索引一次解析所有词，没有匹配时返回 None）"""
+    await food_index.ensure_loaded(db)
+    total_calories, _ = food_index.estimate_calories(content)
     return total_calories
 
 
@@ -801,8 +738,6 @@ async def analyze_meal_with_confirm(
         return result
 
     # 生成确认ID
-    import uuid
-
     confirm_id = str(uuid.uuid4())
 
     # 保存到临时存储
@@ -895,18 +830,20 @@ async def confirm_meal_record(
             and_(
                 MealRecord.user_id == current_user.id,
                 MealRecord.meal_type == meal_enum,
-                func.date(MealRecord.record_time) == today,
+                on_day(MealRecord.record_time, today),
             )
         )
     )
     existing_record = result.scalar_one_or_none()
 
     if existing_record:
-        # 覆盖已有记录
+        # 覆盖已有记录（同步调整每日活动汇总）
+        await DailyActivityService.record_removed(db, existing_record)
         existing_record.food_items = foods
         existing_record.total_calories = total_calories
         existing_record.photo_url = ai_data.get("photo_url")
         existing_record.record_time = datetime.utcnow()
+        await DailyActivityService.record_added(db, existing_record)
         message = "餐食记录已更新"
     else:
         # 创建新记录
@@ -919,9 +856,11 @@ async def confirm_meal_record(
             record_time=datetime.utcnow(),
         )
         db.add(record)
+        await DailyActivityService.record_added(db, record)
         message = "餐食记录成功"
 
     await db.commit()
+    await invalidate_user(current_user.id)
 
     # 获取记录ID（如果是新记录）
     record_id = existing_record.id if existing_record else record.id
@@ -17,6 +17,7 @@ from models.database import get_db, User, UserProfile, ProfilingAnswer
 from api.routes.user import get_current_user
 from config.profiling_questions import UserProfilingQuestions, get_profiling_questions
 from services.user_profile_service import UserProfileService
+from utils.result_cache import invalidate_user
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -81,6 +82,7 @@ async def submit_form_answer(
         if "weight" in answers:
             try:
                 from models.database import WeightRecord
+                from services.daily_activity_service import DailyActivityService
 
                 weight_value = float(answers["weight"])
                 weight_record = WeightRecord(
@@ -91,12 +93,14 @@ async def submit_form_answer(
                     note="来自用户画像问卷",
                 )
                 db.add(weight_record)
+                await DailyActivityService.record_added(db, weight_record)
                 logger.info(f"[submit-form] Saved weight record: {weight_value}kg")
             except Exception as e:
                 logger.warning(f"[submit-form] Failed to save weight record: {e}")
 
         await db.commit()
         logger.info(f"[submit-form] Committed to database")
+        await invalidate_user(user_id)
 
         # 保存回答记录
         answer_text = json.dumps(answers, ensure_ascii=False)
@@ -112,6 +116,7 @@ async def submit_form_answer(
         db.add(new_answer)
         await db.commit()
         logger.info(f"[submit-form] Saved answer record")
+        await UserProfileService.invalidate_cache(user_id, db)
 
         return {
             "success": True,
@@ -161,6 +166,7 @@ async def submit_profiling_answer(
         db.add(new_answer)
         await db.commit()
         logger.info(f"[answer] Saved answer record")
+        await UserProfileService.invalidate_cache(user_id, db)
 
         # 生成AI反馈
         from config.profiling_questions import UserProfilingQuestions
@@ -588,6 +594,7 @@ async def complete_core_profiling(
         profile.diet_preferences = json.dumps(diet_prefs, ensure_ascii=False)
 
         await db.commit()
+        await UserProfileService.invalidate_cache(user_id, db)
 
         return {
             "success": True,
@@ -792,6 +799,7 @@ async def _save_answer(
     )
     db.add(answer)
     await db.commit()
+    await UserProfileService.invalidate_cache(user_id, db)
 
 
 async def _update_user_profile(
@@ -832,6 +840,7 @@ async def _update_user_profile(
                 print(f"Error setting {model_field}: {e}")
 
     await db.commit()
+    await UserProfileService.invalidate_cache(user_id, db)
 
 
 async def _calculate_profile_completion(
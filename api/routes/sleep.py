@@ -20,7 +20,9 @@ from models.database import (
 from api.routes.user import get_current_user
 from services.sleep_analysis_service import SleepAnalysisService
 from services.integration_service import AchievementIntegrationService
+from services.daily_activity_service import DailyActivityService
 from services.langchain.memory import CheckinSyncService
+from utils.result_cache import invalidate_user
 from config.logging_config import get_module_logger
 
 logger = get_module_logger(__name__)
@@ -129,29 +131,6 @@ async def record_sleep(
             },
         }
 
-
-@router.post("/sync-memory")
-async def sync_sleep_memory(
-    current_user: User = Depends(get_current_user),
-):
-    """
-    同步睡眠记录到LangChain记忆系统
-    """
-    try:
-        sync_service = CheckinSyncService()
-        sync_result = await sync_service.sync_user_checkins(
-            int(current_user.id), force=True
-        )
-
-        return {
-            "success": True,
-            "message": "睡眠记录同步完成",
-            "data": sync_result,
-        }
-    except Exception as e:
-        logger.error(f"同步睡眠记录到记忆系统失败: {e}")
-        raise HTTPException(status_code=500, detail=f"同步失败: {str(e)}")
-
     record = SleepRecord(
         user_id=current_user.id,
         bed_time=bed_datetime,
@@ -162,8 +141,10 @@ async def sync_sleep_memory(
     )
 
     db.add(record)
+    await DailyActivityService.record_added(db, record)
     await db.commit()
     await db.refresh(record)
+    await invalidate_user(current_user.id)
 
     # 异步处理成就和积分检查
     try:
@@ -238,6 +219,29 @@ async def sync_sleep_memory(
     }
 
 
+@router.post("/sync-memory")
+async def sync_sleep_memory(
+    current_user: User = Depends(get_current_user),
+):
+    """
+    同步睡眠记录到LangChain记忆系统
+    """
+    try:
+        sync_service = CheckinSyncService()
+        sync_result = await sync_service.sync_user_checkins(
+            int(current_user.id), force=True
+        )
+
+        return {
+            "success": True,
+            "message": "睡眠记录同步完成",
+            "data": sync_result,
+        }
+    except Exception as e:
+        logger.error(f"同步睡眠记录到记忆系统失败: {e}")
+        raise HTTPException(status_code=500, detail=f"同步失败: {str(e)}")
+
+
 @router.put("/overwrite/{record_id}")
 async def overwrite_sleep_record(
     record_id: int,
@@ -283,12 +287,16 @@ async def overwrite_sleep_record(
     if duration > 720 or duration < 60:
         raise HTTPException(status_code=400, detail="睡眠时长必须在1-12小时之间")
 
+    # 覆盖前后分别扣减/累加每日活动汇总（入睡日期可能变化）
+    await DailyActivityService.record_removed(db, record)
     record.bed_time = bed_datetime
     record.wake_time = wake_datetime
     record.total_minutes = int(duration)
     record.quality = quality
+    await DailyActivityService.record_added(db, record)
 
     await db.commit()
+    await invalidate_user(current_user.id)
 
     return {
         "success": True,
@@ -483,8 +491,10 @@ async def delete_sleep_record(
     if not record:
         raise HTTPException(status_code=404, detail="记录不存在")
 
+    await DailyActivityService.record_removed(db, record)
     await db.delete(record)
     await db.commit()
+    await invalidate_user(current_user.id)
 
     return {"success": True, "message": "睡眠记录已删除"}
 
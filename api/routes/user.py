@@ -13,7 +13,7 @@ import hashlib
 import secrets
 
 from models.database import get_db, User, UserProfile, AgentConfig, PersonalityType
-from config.settings import fastapi_settings
+from services.auth_token_service import AuthTokenService
 
 router = APIRouter()
 security = HTTPBearer(auto_error=False)
@@ -23,8 +23,7 @@ security = HTTPBearer(auto_error=False)
 
 def generate_token(user_id: int) -> str:
     """生成简单的访问令牌（实际生产环境应使用 JWT）"""
-    data = f"{user_id}:{fastapi_settings.SECRET_KEY}"
-    return hashlib.sha256(data.encode()).hexdigest()[:32]
+    return AuthTokenService.generate_token(user_id)
 
 
 async def get_current_user(
@@ -41,27 +40,16 @@ async def get_current_user(
     # 从 Authorization header 获取 token
     token = credentials.credentials
 
-    import hashlib
-    from config.settings import fastapi_settings
-
-    # 遍历所有用户，找到匹配的 token
-    result = await db.execute(select(User))
-    all_users = result.scalars().all()
-
-    for user in all_users:
-        # 生成期望的token（不包含时间戳，使其永久有效）
-        expected_token_data = f"{user.id}:{fastapi_settings.SECRET_KEY}"
-        expected_token = hashlib.sha256(expected_token_data.encode()).hexdigest()[:32]
-
-        if token == expected_token:
-            # 找到匹配的用户
-            return user
-
-    # 没有匹配的用户，抛出认证错误
-    raise HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="无效令牌"
-    )
+    # 令牌 -> 用户ID（已验证令牌缓存 / 令牌索引表主键查找）
+    user_id = await AuthTokenService.resolve_user_id(db, token)
+    user = await db.get(User, user_id) if user_id is not None else None
+    if user is None:
+        # 没有匹配的用户，抛出认证错误
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="无效令牌"
+        )
+    return user
 
 
 # ============ API 路由 ============
@@ -120,8 +108,9 @@ async def wechat_login(
         user.last_login = datetime.utcnow()
         await db.commit()
     
-    # 生成 token
+    # 生成 token 并写入令牌索引
     token = generate_token(user.id)
+    await AuthTokenService.register_token(db, user.id, token)
     
     return {
         "success": True,
@@ -344,6 +333,10 @@ async def update_agent_config(
             raise HTTPException(status_code=400, detail="无效的性格类型")
     
     await db.commit()
+
+    # 清理用户画像缓存（Agent 名称/风格属于完整画像）
+    from services.user_profile_service import UserProfileService
+    await UserProfileService.invalidate_cache(current_user.id, db)
     
     return {
         "success": True,
@@ -19,7 +19,10 @@ from models.database import (
 )
 from api.routes.user import get_current_user
 from services.integration_service import AchievementIntegrationService
+from services.daily_activity_service import DailyActivityService
 from services.langchain.memory import CheckinSyncService
+from services.user_profile_service import UserProfileService
+from utils.result_cache import invalidate_user
 from config.logging_config import get_module_logger
 
 logger = get_module_logger(__name__)
@@ -60,13 +63,15 @@ async def record_weight(
     existing = result.scalar_one_or_none()
 
     if existing:
-        # 更新已有记录
+        # 更新已有记录（同步调整每日活动汇总）
+        await DailyActivityService.record_removed(db, existing)
         existing.weight = weight
         if body_fat is not None:
             existing.body_fat = body_fat
         if note:
             existing.note = note
         existing.record_time = target_time
+        await DailyActivityService.record_added(db, existing)
         message = "体重记录已更新"
         record_id = existing.id
         is_new_record = False
@@ -81,6 +86,7 @@ async def record_weight(
             note=note,
         )
         db.add(record)
+        await DailyActivityService.record_added(db, record)
         await db.commit()
         await db.refresh(record)
         message = "体重记录成功"
@@ -426,7 +432,11 @@ async def delete_weight_record(
     if not record:
         raise HTTPException(status_code=404, detail="记录不存在")
 
+    await DailyActivityService.record_removed(db, record)
     await db.delete(record)
     await db.commit()
+    await invalidate_user(current_user.id)
+    # 最新体重属于完整画像
+    UserProfileService.invalidate_shared_cache(current_user.id)
 
     return {"success": True, "message": "记录已删除"}
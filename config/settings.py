@@ -57,6 +57,32 @@ class FastAPISettings(BaseSettings):
     
     # 默认使用的AI模型: openai / qwen
     DEFAULT_AI_PROVIDER: str = "qwen"
+
+    # AI 提供商共享 HTTP 连接池（每个提供商一个长连接客户端）
+    AI_HTTP_MAX_CONNECTIONS: int = 100  # 最大并发连接数
+    AI_HTTP_MAX_KEEPALIVE: int = 20  # 最大空闲保活连接数
+    AI_HTTP_KEEPALIVE_EXPIRY: float = 30.0  # 空闲连接保活时间（秒）
+
+    # LLM 共享传输层（并发限制 / 重试 / 对冲请求 / 熔断）
+    LLM_MAX_IN_FLIGHT: int = 32  # 全局同时在途的 LLM 请求数
+    LLM_PER_USER_IN_FLIGHT: int = 2  # 单个用户同时在途的 LLM 请求数
+    LLM_REQUEST_TIMEOUT: float = 60.0  # 单次尝试的超时（秒），受调用链截止时间约束
+    LLM_MAX_RETRIES: int = 1  # 连接错误/超时/429/5xx 的重试次数
+    LLM_RETRY_BACKOFF: float = 0.5  # 首次重试前的基础等待（秒），指数增长并带抖动
+    LLM_HEDGE_PERCENTILE: Optional[float] = None  # 超过该延迟分位数时发对冲请求，如 0.95
+    LLM_HEDGE_MIN_SAMPLES: int = 20  # 计算对冲延迟所需的最少成功样本数
+    LLM_BREAKER_FAILURES: int = 5  # 连续失败多少次后熔断
+    LLM_BREAKER_RESET: float = 30.0  # 熔断后多久放行探测请求（秒）
+
+    # LLM 响应缓存（结构化输入的确定性调用：报告点评、餐食识别、每日建议）
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_MAX_ENTRIES: int = 5000  # 最大缓存条数，超出后淘汰最久未使用的
+    LLM_CACHE_TTL: float = 86400.0  # 缓存时间上限（秒）
+    LLM_CACHE_PATH: str = "./data/llm_cache.json"  # 持久化文件，为空时不落盘
+    LLM_CACHE_FLUSH_INTERVAL: int = 300  # 写入磁盘的间隔（秒）
+    LLM_CACHE_SIMILARITY: float = 0.97  # 近似匹配的最低余弦相似度
+    # 每千 token 价格（美元），用于估算缓存节省的费用
+    LLM_TOKEN_PRICES: Dict[str, float] = {"openai": 0.03, "qwen": 0.0006}
     
     # 微信
     WECHAT_APPID: Optional[str] = None
@@ -65,6 +91,8 @@ class FastAPISettings(BaseSettings):
     # 安全
     SECRET_KEY: str = "your-secret-key-change-in-production"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 7
+    AUTH_CACHE_MAX_ENTRIES: int = 10000  # 已验证令牌缓存的最大条目数
+    AUTH_CACHE_TTL: float = 300.0  # 已验证令牌缓存时间（秒）
     ADMIN_PASSWORD: str = "admin123"
     
     # 日志
@@ -75,6 +103,71 @@ class FastAPISettings(BaseSettings):
     UPLOAD_DIR: str = "./uploads"
     MAX_UPLOAD_SIZE: int = 10 * 1024 * 1024  # 10MB
 
+    # 餐食照片预处理（进程池中解码/缩放/编码）
+    IMAGE_PROCESS_WORKERS: int = 2  # 进程池大小，0 表示在线程中处理
+    IMAGE_PROCESS_MAX_PENDING: int = 8  # 同时提交给进程池的照片数上限
+    IMAGE_DATA_URL_CACHE_SIZE: int = 32  # 按内容哈希缓存的预处理结果数
+    IMAGE_MAX_DIMENSION: int = 1024  # 送给视觉模型的最大边长（像素）
+    IMAGE_JPEG_QUALITY: int = 85  # 重新编码的 JPEG 质量
+
+    # 流式导出（按主键分页读取，边查询边输出 NDJSON / CSV / XLSX）
+    EXPORT_PAGE_SIZE: int = 2000  # 每页行数（每页一个短会话）
+    EXPORT_CHUNK_BYTES: int = 64 * 1024  # 攒够该字节数再发送给客户端
+
+    # 仪表盘
+    DASHBOARD_SECTION_TIMEOUT: float = 3.0  # 单个分区超时（秒），超时返回降级数据
+    DASHBOARD_CHART_TIMEOUT: float = 5.0  # 单个图表分区超时（秒）
+    DASHBOARD_MAX_CONCURRENCY: int = 6  # 单次仪表盘请求最多同时占用的数据库连接数
+
+    # 结果缓存（仪表盘分区/图表，写入记录后按用户失效）
+    RESULT_CACHE_MAX_ENTRIES: int = 2048  # 进程内 LRU 最大条目数
+    RESULT_CACHE_TTL: float = 600.0  # 条目最长存活时间（秒），兜底非记录类数据的变化
+
+    # 共享用户画像缓存（读取时按画像更新时间校验版本）
+    PROFILE_CACHE_TTL: float = 300.0  # 条目最长存活时间（秒），兜底不校验版本的读取
+
+    # 管理后台统计（每日计数表 + 按分钟缓存）
+    ADMIN_STATS_CACHE_TTL: int = 60  # 统计结果缓存时间（秒），同一分钟内的请求共享结果
+
+    # 会话注册表（每用户 Agent / 记忆管理器 / 向量存储实例）
+    SESSION_REGISTRY_MAX_ENTRIES: int = 256  # 每类对象最多常驻的用户数
+    SESSION_REGISTRY_IDLE_TTL: float = 1800.0  # 空闲超过该秒数后淘汰
+    SESSION_REGISTRY_MEMORY_BUDGET_MB: int = 256  # 每类对象的估算内存预算
+
+    # 向量存储后台写入队列（对话记忆批量写入 Chroma）
+    VECTOR_WRITE_BATCH_SIZE: int = 64  # 单次 collection.add 的最大文档数
+    VECTOR_WRITE_FLUSH_INTERVAL: float = 0.5  # 最长攒批时间（秒）
+    VECTOR_WRITE_MAX_BACKLOG: int = 5000  # 最大积压文档数，超出后同步写入
+    VECTOR_WRITE_READ_FLUSH_TIMEOUT: float = 0.2  # 读取前等待积压写完的上限（秒，事件循环上不等待）
+
+    # 对话记忆摘要队列（先存截断原文，后台把多轮对话合并到一次 LLM 调用生成摘要）
+    MEMORY_SUMMARY_BATCH_SIZE: int = 8  # 单次 LLM 调用最多总结的对话条数
+    MEMORY_SUMMARY_FLUSH_INTERVAL: float = 5.0  # 最长攒批时间（秒）
+    MEMORY_SUMMARY_MAX_PENDING: int = 1000  # 最多排队条数，超出后只保留截断原文
+    MEMORY_SUMMARY_RAW_CHARS: int = 200  # 先行写入的原文截断长度
+    MEMORY_SUMMARY_INPUT_CHARS: int = 1000  # 每条对话送给模型的最大字符数
+
+    # 教练对话图检查点（数据库持久化，每个用户一个滚动线程）
+    GRAPH_CHECKPOINT_TTL_HOURS: float = 72.0  # 线程超过该时长未更新则视为过期并清理
+    GRAPH_CHECKPOINT_MAX_PER_THREAD: int = 4  # 每个线程保留的最近检查点数
+    GRAPH_CHECKPOINT_MAX_BYTES: int = 1024 * 1024  # 每个线程检查点总大小上限（始终保留最新一个）
+    GRAPH_CHECKPOINT_PURGE_INTERVAL: float = 3600.0  # 过期检查点清理间隔（秒）
+
+    # 连续打卡表（user_streaks 记录写入时增量维护，定期按每日活动汇总对账）
+    STREAK_RECONCILE_INTERVAL: float = 86400.0  # 对账间隔（秒）
+    STREAK_RECONCILE_BATCH_SIZE: int = 500  # 对账时每块用户数
+
+    # 统一任务调度器（提醒 / 报告 / 通知检查的运行间隔，秒）
+    SCHEDULER_REMINDER_INTERVAL: float = 300.0  # 定时提醒检查
+    SCHEDULER_REMINDER_GRACE: float = 900.0  # 提醒允许的最大延迟，超过后不再补发
+    SCHEDULER_REPORT_INTERVAL: float = 300.0  # 日报/周报生成检查
+    SCHEDULER_NOTIFICATION_INTERVAL: float = 1800.0  # 事件/成就/目标/异常通知检查
+    SCHEDULER_JITTER: float = 30.0  # 通知检查每次随机延后的最大秒数
+
+    # 通知触发条件批量检查（按用户分块，每块用分组查询计算所有触发条件）
+    NOTIFICATION_BATCH_SIZE: int = 500  # 每块用户数
+    NOTIFICATION_BATCH_CONCURRENCY: int = 4  # 同时处理的块数（每块独立会话）
+
 
 @lru_cache()
 def get_fastapi_settings() -> FastAPISettings:
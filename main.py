@@ -14,9 +14,13 @@ from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from contextlib import asynccontextmanager
+from functools import partial
+from typing import Any, Awaitable, Callable, List, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from config.settings import fastapi_settings
-from models.database import init_db
+from models.database import AsyncSessionLocal, init_db
 from config.logging_config import get_module_logger
 
 logger = get_module_logger(__name__)
@@ -25,22 +29,107 @@ logger = get_module_logger(__name__)
 # ============ 生命周期管理 ============
 
 
+async def _run_startup_tasks(
+    tasks: List[Tuple[str, Callable[[AsyncSession], Awaitable[Any]]]]
+) -> None:
+    """依次执行启动时的数据任务（回填、索引加载），失败只记录告警，不影响后续任务"""
+    for name, task in tasks:
+        try:
+            async with AsyncSessionLocal() as db:
+                await task(db)
+        except Exception as e:
+            logger.warning("%s失败: %s", name, e)
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """应用生命周期管理"""
+    from services.ai_service import llm_cache
+    from services.auth_token_service import AuthTokenService
+    from services.channels import init_channels
+    from services.chat_search_service import ChatSearchService
+    from services.daily_activity_service import DailyActivityService
+    from services.food_index_service import food_index
+    from services.image_ingest_service import image_ingest
+    from services.job_scheduler import job_scheduler
+    from services.llm_transport import llm_transport
+    from services.notification_scheduler import scheduler
+    from services.reminder_index_service import ReminderIndexService
+    from services.report_scheduler import report_scheduler
+    from services.streak_service import StreakService
+    from services.vectorstore.summary_queue import summary_queue
+    from services.vectorstore.write_queue import write_queue
+
+    try:
+        from services.langchain.graph.checkpointer import get_checkpointer
+    except ImportError as e:
+        get_checkpointer = None
+        logger.warning("图检查点清理任务未注册: %s", e)
+
     # 启动时执行
     logger.info("正在启动应用...")
     await init_db()
 
-    # 初始化通知渠道
-    from services.channels import init_channels
+    # 令牌索引为空（首次上线）时必须在接收请求前回填，否则存量用户的令牌都无法认证；
+    # 之后每次启动只是一次计数查询
+    await _run_startup_tasks([("令牌索引回填", AuthTokenService.backfill_if_empty)])
 
-    init_channels()
+    # 加载持久化的 LLM 响应缓存
+    try:
+        loaded = llm_cache.load()
+        logger.info("LLM 响应缓存已加载: %d 条", loaded)
+    except Exception as e:
+        logger.warning("LLM 响应缓存加载失败: %s", e)
 
-    # 启动通知调度器
-    from services.notification_scheduler import scheduler
+    # 预先启动餐食照片预处理进程池
+    image_ingest.start()
+
+    # 初始化通知渠道
+    init_channels()
 
-    scheduler.start()
+    # 注册提醒/报告/通知任务并启动统一任务调度器
+    scheduler.register(job_scheduler)
+    report_scheduler.register(job_scheduler)
+    job_scheduler.add_job(
+        "llm_cache_flush",
+        llm_cache.flush,
+        fastapi_settings.LLM_CACHE_FLUSH_INTERVAL,
+    )
+    job_scheduler.add_job(
+        "streak_reconcile",
+        StreakService.run_reconciliation,
+        fastapi_settings.STREAK_RECONCILE_INTERVAL,
+        jitter=600.0,
+    )
+    if get_checkpointer is not None:
+        job_scheduler.add_job(
+            "graph_checkpoint_purge",
+            get_checkpointer().purge_expired,
+            fastapi_settings.GRAPH_CHECKPOINT_PURGE_INTERVAL,
+            jitter=60.0,
+        )
+
+    # 其余回填与索引加载在后台运行一次，不阻塞启动（均可重复执行）。完成前：
+    # 仪表盘与连续打卡排行榜缺少历史汇总，聊天搜索退回 ILIKE 或结果不全，
+    # 食物索引在首次搜索时加载
+    job_scheduler.add_job(
+        "startup_backfill",
+        partial(
+            _run_startup_tasks,
+            [
+                ("每日活动汇总回填", DailyActivityService.backfill_if_empty),
+                # 连续打卡表由每日活动汇总计算，须在其后
+                ("连续打卡表回填", StreakService.backfill_if_empty),
+                ("聊天全文索引初始化", ChatSearchService.ensure_index),
+                ("提醒设置 minute_of_day 回填", ReminderIndexService.backfill_minutes),
+                ("食物索引加载", food_index.load),
+            ],
+        ),
+        1.0,
+        run_on_start=True,
+        once=True,
+    )
+    job_scheduler.start()
 
     logger.info(
         "应用已启动: %s v%s", fastapi_settings.APP_NAME, fastapi_settings.APP_VERSION
@@ -50,9 +139,22 @@ async def lifespan(app: FastAPI):
     yield
 
     # 关闭时执行
-    from services.notification_scheduler import scheduler
+    await job_scheduler.stop()
+
+    # 写入 LLM 响应缓存
+    await llm_cache.flush()
+
+    # 为排队中的对话生成摘要（写入向量存储前完成）
+    await summary_queue.close()
+
+    # 刷新向量存储写入队列中的积压记忆
+    write_queue.close()
+
+    # 关闭餐食照片预处理进程池
+    image_ingest.shutdown()
 
-    scheduler.stop()
+    # 关闭 AI 提供商共享连接池
+    await llm_transport.close()
     logger.info("应用正在关闭...")
 
 
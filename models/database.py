@@ -16,10 +16,14 @@ from sqlalchemy import (
     Time,
     Text,
     JSON,
+    LargeBinary,
     ForeignKey,
     Enum,
     create_engine,
     Index,
+    event,
+    inspect,
+    text,
 )
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import declarative_base, relationship
@@ -227,6 +231,11 @@ class User(Base):
     )
     chat_history = relationship("ChatHistory", back_populates="user")
 
+    __table_args__ = (
+        Index("idx_users_created_at", "created_at"),
+        Index("idx_users_last_login", "last_login"),
+    )
+
 
 class WeightRecord(Base):
     """体重记录表"""
@@ -244,7 +253,10 @@ class WeightRecord(Base):
 
     user = relationship("User", back_populates="weight_records")
 
-    __table_args__ = (Index("idx_weight_record_user_time", "user_id", "record_time"),)
+    __table_args__ = (
+        Index("idx_weight_record_user_time", "user_id", "record_time"),
+        Index("idx_weight_record_created", "created_at"),
+    )
 
 
 class MealRecord(Base):
@@ -265,6 +277,11 @@ class MealRecord(Base):
 
     user = relationship("User", back_populates="meal_records")
 
+    __table_args__ = (
+        Index("idx_meal_record_user_time", "user_id", "record_time"),
+        Index("idx_meal_record_created", "created_at"),
+    )
+
 
 class ExerciseRecord(Base):
     """运动记录表"""
@@ -287,6 +304,11 @@ class ExerciseRecord(Base):
 
     user = relationship("User", back_populates="exercise_records")
 
+    __table_args__ = (
+        Index("idx_exercise_record_user_time", "user_id", "record_time"),
+        Index("idx_exercise_record_user_checkin", "user_id", "checkin_date"),
+    )
+
 
 class WaterRecord(Base):
     """饮水记录表"""
@@ -301,6 +323,8 @@ class WaterRecord(Base):
 
     user = relationship("User", back_populates="water_records")
 
+    __table_args__ = (Index("idx_water_record_user_time", "user_id", "record_time"),)
+
 
 class SleepRecord(Base):
     """睡眠记录表"""
@@ -317,6 +341,132 @@ class SleepRecord(Base):
 
     user = relationship("User", back_populates="sleep_records")
 
+    __table_args__ = (Index("idx_sleep_record_user_bed", "user_id", "bed_time"),)
+
+
+class DailyActivity(Base):
+    """每日活动汇总表（按用户按天汇总五类健康记录，随记录写入实时维护）"""
+
+    __tablename__ = "daily_activity"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    activity_date = Column(Date, nullable=False, comment="日期")
+    weight_count = Column(Integer, default=0, nullable=False, comment="体重记录数")
+    meal_count = Column(Integer, default=0, nullable=False, comment="餐食记录数")
+    breakfast_count = Column(Integer, default=0, nullable=False, comment="早餐记录数")
+    lunch_count = Column(Integer, default=0, nullable=False, comment="午餐记录数")
+    dinner_count = Column(Integer, default=0, nullable=False, comment="晚餐记录数")
+    snack_count = Column(Integer, default=0, nullable=False, comment="加餐记录数")
+    exercise_count = Column(Integer, default=0, nullable=False, comment="运动记录数")
+    water_count = Column(Integer, default=0, nullable=False, comment="饮水记录数")
+    sleep_count = Column(Integer, default=0, nullable=False, comment="睡眠记录数")
+    calories_in = Column(Integer, default=0, nullable=False, comment="摄入热量合计（千卡）")
+    calories_burned = Column(
+        Integer, default=0, nullable=False, comment="运动消耗热量合计（千卡）"
+    )
+    exercise_minutes = Column(
+        Integer, default=0, nullable=False, comment="运动时长合计（分钟）"
+    )
+    water_ml = Column(Integer, default=0, nullable=False, comment="饮水量合计（毫升）")
+    sleep_minutes = Column(
+        Integer, default=0, nullable=False, comment="睡眠时长合计（分钟）"
+    )
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        Index("idx_daily_activity_user_date", "user_id", "activity_date", unique=True),
+    )
+
+
+class HabitCompletion(Base):
+    """习惯打卡完成记录（仪表盘、图表与月报统计习惯完成情况）"""
+
+    __tablename__ = "habit_completions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    checkin_type = Column(String(50), nullable=False, comment="打卡类型")
+    completion_date = Column(Date, nullable=False, comment="完成日期")
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("idx_habit_completion_user_date", "user_id", "completion_date"),
+    )
+
+
+class UserStreak(Base):
+    """用户连续打卡表（每个用户一行，随每日活动汇总增量维护，每日对账）"""
+
+    __tablename__ = "user_streaks"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    current_streak = Column(
+        Integer, default=0, nullable=False, comment="截止最近打卡日的连续天数"
+    )
+    longest_streak = Column(Integer, default=0, nullable=False, comment="最长连续天数")
+    last_active_date = Column(Date, nullable=True, comment="最近打卡日期")
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        # 排行榜：WHERE last_active_date = 今天 ORDER BY current_streak DESC LIMIT k
+        Index("idx_user_streak_active", "last_active_date", "current_streak"),
+    )
+
+
+class AdminDailyStats(Base):
+    """管理后台每日计数表（全站按天汇总，已结束的日期写入后不再变化）"""
+
+    __tablename__ = "admin_daily_stats"
+
+    id = Column(Integer, primary_key=True, index=True)
+    stat_date = Column(Date, nullable=False, comment="日期")
+    new_users = Column(Integer, default=0, nullable=False, comment="新增用户数")
+    user_messages = Column(Integer, default=0, nullable=False, comment="用户消息数")
+    assistant_messages = Column(
+        Integer, default=0, nullable=False, comment="助手消息数"
+    )
+    system_messages = Column(Integer, default=0, nullable=False, comment="系统消息数")
+    chat_users = Column(
+        Integer, default=0, nullable=False, comment="发送过消息的用户数（去重）"
+    )
+    weight_records = Column(Integer, default=0, nullable=False, comment="体重记录数")
+    meal_records = Column(Integer, default=0, nullable=False, comment="餐食记录数")
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        Index("idx_admin_daily_stats_date", "stat_date", unique=True),
+    )
+
+
+class GraphCheckpoint(Base):
+    """LangGraph 检查点表（教练对话图按用户滚动保存状态，每线程只保留最近几个）"""
+
+    __tablename__ = "graph_checkpoints"
+
+    id = Column(Integer, primary_key=True, index=True)
+    thread_id = Column(String(128), nullable=False, comment="线程ID")
+    checkpoint_ns = Column(String(255), nullable=False, default="", comment="命名空间")
+    checkpoint_id = Column(String(64), nullable=False, comment="检查点ID（按时间递增）")
+    parent_checkpoint_id = Column(String(64), nullable=True, comment="父检查点ID")
+    checkpoint_type = Column(String(32), nullable=False, comment="检查点序列化类型")
+    checkpoint = Column(LargeBinary, nullable=False, comment="序列化的检查点")
+    metadata_type = Column(String(32), nullable=False, comment="元数据序列化类型")
+    checkpoint_metadata = Column(LargeBinary, nullable=False, comment="序列化的元数据")
+    size_bytes = Column(Integer, default=0, nullable=False, comment="序列化大小")
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index(
+            "idx_graph_checkpoint_thread",
+            "thread_id",
+            "checkpoint_ns",
+            "checkpoint_id",
+            unique=True,
+        ),
+        Index("idx_graph_checkpoint_created", "created_at"),
+    )
+
 
 class UserProfile(Base):
     """用户画像表（长期记忆）"""
@@ -406,6 +556,11 @@ class ChatHistory(Base):
 
     user = relationship("User", back_populates="chat_history")
 
+    __table_args__ = (
+        Index("idx_chat_history_created", "created_at"),
+        Index("idx_chat_history_user_created", "user_id", "created_at"),
+    )
+
 
 class ConversationSummary(Base):
     """对话摘要表"""
@@ -600,11 +755,27 @@ class ReminderSetting(Base):
     reminder_type = Column(Enum(ReminderType), comment="提醒类型")
     enabled = Column(Boolean, default=True, comment="是否启用")
     reminder_time = Column(Time, nullable=True, comment="提醒时间")
+    minute_of_day = Column(
+        Integer, nullable=True, comment="提醒时间的当日分钟数（随 reminder_time 自动维护）"
+    )
     interval_minutes = Column(Integer, nullable=True, comment="间隔分钟数（饮水用）")
     weekdays_only = Column(Boolean, default=False, comment="仅工作日提醒")
     last_triggered = Column(DateTime, nullable=True, comment="上次触发时间")
     skip_count = Column(Integer, default=0, comment="连续忽略次数")
 
+    # 调度时按分钟区间查找到期提醒
+    __table_args__ = (
+        Index("idx_reminder_setting_due", "enabled", "minute_of_day"),
+    )
+
+
+@event.listens_for(ReminderSetting.reminder_time, "set")
+def _sync_reminder_minute(target, value, oldvalue, initiator):
+    """修改提醒时间时同步 minute_of_day；时间变化后清空上次触发时间，使新时间当天可触发"""
+    target.minute_of_day = value.hour * 60 + value.minute if value is not None else None
+    if value != oldvalue:
+        target.last_triggered = None
+
 
 class NotificationQueue(Base):
     """通知队列表"""
@@ -777,6 +948,18 @@ class UserProfileCache(Base):
     user = relationship("User", back_populates="profile_cache")
 
 
+class AuthToken(Base):
+    """访问令牌索引表（令牌哈希 -> 用户ID，认证时按主键直接定位用户）"""
+
+    __tablename__ = "auth_tokens"
+
+    token_hash = Column(String(64), primary_key=True, comment="令牌的SHA-256哈希")
+    user_id = Column(
+        Integer, ForeignKey("users.id"), index=True, nullable=False, comment="用户ID"
+    )
+    created_at = Column(DateTime, default=datetime.utcnow, comment="创建时间")
+
+
 # ============ 系统提示词管理 ============
 
 
@@ -943,11 +1126,36 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
         raise
 
 
+def _add_missing_columns(sync_conn):
+    """为已存在的表补加新增的可空列（create_all 不会修改已存在的表）"""
+    inspector = inspect(sync_conn)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing or column.primary_key or not column.nullable:
+                continue
+            column_type = column.type.compile(dialect=sync_conn.dialect)
+            sync_conn.execute(
+                text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}")
+            )
+
+
+def _create_missing_indexes(sync_conn):
+    """为已存在的表补建新增的索引（create_all 只会为新建的表创建索引）"""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(sync_conn, checkfirst=True)
+
+
 async def init_db():
     """初始化数据库（创建所有表）"""
     try:
         async with engine.begin() as conn:
             await conn.run_sync(Base.metadata.create_all)
+            await conn.run_sync(_add_missing_columns)
+            await conn.run_sync(_create_missing_indexes)
         # 记录数据库初始化成功信息
         alert_warning(
             category=AlertCategory.DATABASE,
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+令牌认证基准测试
+
+在内存 SQLite 中生成 N 个用户，对比每次认证的耗时：
+- scan: 原实现，遍历所有用户逐个计算令牌比对（只在用户数不超过 --scan-limit 时测量）
+- index: 令牌索引表主键查找 + 按主键加载用户（缓存未命中）
+- cached: 已验证令牌缓存命中 + 按主键加载用户
+
+用法:
+    python scripts/benchmark_auth.py
+    python scripts/benchmark_auth.py --users 100 10000 1000000 --requests 200
+"""
+
+import argparse
+import asyncio
+import hashlib
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from config.settings import fastapi_settings
+from models.database import AuthToken, Base, User
+from services.auth_token_service import AuthTokenService, principal_cache
+
+INSERT_BATCH_SIZE = 50000
+
+
+def percentile(values, ratio):
+    ordered = sorted(values)
+    return ordered[max(int(len(ordered) * ratio) - 1, 0)]
+
+
+def report(name, seconds):
+    ms = [s * 1000 for s in seconds]
+    print(
+        f"  {name:<8} p50 {statistics.median(ms):9.3f} ms | "
+        f"p95 {percentile(ms, 0.95):9.3f} ms"
+    )
+
+
+async def scan_lookup(db: AsyncSession, token: str):
+    """原 get_current_user 的线性扫描实现"""
+    result = await db.execute(select(User))
+    for user in result.scalars().all():
+        data = f"{user.id}:{fastapi_settings.SECRET_KEY}"
+        if hashlib.sha256(data.encode()).hexdigest()[:32] == token:
+            return user
+    return None
+
+
+async def index_lookup(db: AsyncSession, token: str):
+    user_id = await AuthTokenService.resolve_user_id(db, token)
+    return await db.get(User, user_id) if user_id is not None else None
+
+
+async def run(users: int, requests: int, scan_limit: int):
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(
+            Base.metadata.create_all,
+            tables=[User.__table__, AuthToken.__table__],
+        )
+
+    async with AsyncSession(engine) as db:
+        for start in range(1, users + 1, INSERT_BATCH_SIZE):
+            end = min(start + INSERT_BATCH_SIZE, users + 1)
+            await db.execute(
+                insert(User),
+                [{"id": i, "openid": f"openid_{i}", "nickname": f"用户{i}"} for i in range(start, end)],
+            )
+        await db.commit()
+
+        start = time.perf_counter()
+        await AuthTokenService.backfill_if_empty(db)
+        print(f"用户数 {users}，回填令牌索引耗时 {time.perf_counter() - start:.2f} s")
+
+        rng = random.Random(5)
+        tokens = [
+            AuthTokenService.generate_token(rng.randint(1, users))
+            for _ in range(requests)
+        ]
+
+        if users <= scan_limit:
+            timings = []
+            for token in tokens[: max(requests // 10, 10)]:
+                db.expunge_all()
+                start = time.perf_counter()
+                assert await scan_lookup(db, token) is not None
+                timings.append(time.perf_counter() - start)
+            report("scan", timings)
+
+        principal_cache.clear()
+        timings = []
+        for token in tokens:
+            db.expunge_all()
+            principal_cache.clear()
+            start = time.perf_counter()
+            assert await index_lookup(db, token) is not None
+            timings.append(time.perf_counter() - start)
+        report("index", timings)
+
+        timings = []
+        for token in tokens:
+            db.expunge_all()
+            start = time.perf_counter()
+            assert await index_lookup(db, token) is not None
+            timings.append(time.perf_counter() - start)
+        report("cached", timings)
+
+    await engine.dispose()
+
+
+async def main(user_counts, requests: int, scan_limit: int):
+    for users in user_counts:
+        await run(users, requests, scan_limit)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="令牌认证基准测试")
+    parser.add_argument(
+        "--users", type=int, nargs="+", default=[100, 10000, 1000000], help="用户数"
+    )
+    parser.add_argument("--requests", type=int, default=200, help="认证请求数")
+    parser.add_argument(
+        "--scan-limit", type=int, default=10000, help="超过该用户数时跳过线性扫描"
+    )
+    args = parser.parse_args()
+
+    asyncio.run(main(args.users, args.requests, args.scan_limit))
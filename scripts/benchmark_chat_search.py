@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+聊天记录搜索基准测试
+
+在临时 SQLite 数据库中生成 N 条聊天记录（默认 500 万），建立全文索引后对比：
+- ilike: 原 content ILIKE '%关键词%' 全表扫描（按时间倒序取前 limit 条）
+- fts: FTS5 全文索引（bm25 排序 + 高亮片段），以及按 cursor 翻到第 2 页
+
+ilike 在大表上单次查询可能需要数秒，默认只跑 --ilike-queries 次。
+
+用法:
+    python scripts/benchmark_chat_search.py
+    python scripts/benchmark_chat_search.py --rows 500000 --queries 200
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import desc, insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from models.database import Base, ChatHistory, MessageRole, MessageType, User
+from services.chat_search_service import ChatSearchService
+
+INSERT_BATCH_SIZE = 20000
+USERS = 1000
+SENTENCES = [
+    "今天午饭吃了一碗牛肉面，大概多少热量？",
+    "建议晚餐以蔬菜和优质蛋白为主，主食减半，饭后散步三十分钟。",
+    "体重比上周下降了0.8公斤，继续保持！",
+    "最近睡眠不太好，会影响减重吗？",
+    "早餐喝了燕麦牛奶，加了一个水煮蛋。",
+    "Today I did 30 minutes of running and some stretching.",
+    "喝水目标是每天2000毫升，今天还差500毫升。",
+    "周末聚餐吃了火锅，热量超标了怎么办？",
+]
+QUERIES = ["体重", "牛肉面", "散步", "睡眠", "火锅 热量", "燕麦", "running", "毫升"]
+
+
+def percentile(values, ratio):
+    ordered = sorted(values)
+    return ordered[max(int(len(ordered) * ratio) - 1, 0)]
+
+
+def report(name, seconds):
+    ms = [s * 1000 for s in seconds]
+    print(
+        f"{name:<16} p50 {statistics.median(ms):9.2f} ms | "
+        f"p95 {percentile(ms, 0.95):9.2f} ms | 最大 {max(ms):9.2f} ms"
+    )
+
+
+async def seed(session_factory, rows: int):
+    rng = random.Random(20)
+    start = datetime(2025, 1, 1)
+    async with session_factory() as db:
+        await db.execute(
+            insert(User),
+            [
+                {"id": i, "openid": f"openid_{i}", "nickname": f"用户{i}"}
+                for i in range(1, USERS + 1)
+            ],
+        )
+        for offset in range(0, rows, INSERT_BATCH_SIZE):
+            await db.execute(
+                insert(ChatHistory),
+                [
+                    {
+                        "user_id": rng.randint(1, USERS),
+                        "role": MessageRole.USER if i % 2 else MessageRole.ASSISTANT,
+                        "msg_type": MessageType.TEXT,
+                        "content": " ".join(rng.choices(SENTENCES, k=2)),
+                        "created_at": start + timedelta(seconds=i * 5),
+                    }
+                    for i in range(offset, min(offset + INSERT_BATCH_SIZE, rows))
+                ],
+            )
+        await db.commit()
+
+
+async def ilike_search(db, query: str, limit: int):
+    result = await db.execute(
+        select(ChatHistory.id)
+        .where(
+            ChatHistory.content.ilike(f"%{query}%"),
+            ChatHistory.role != MessageRole.SYSTEM,
+        )
+        .order_by(desc(ChatHistory.created_at))
+        .limit(limit)
+    )
+    return result.all()
+
+
+async def main(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(tmp, 'chat.db')}")
+        async with engine.begin() as conn:
+            await conn.run_sync(
+                Base.metadata.create_all, tables=[User.__table__, ChatHistory.__table__]
+            )
+        session_factory = async_sessionmaker(engine, expire_on_commit=False)
+
+        started = time.perf_counter()
+        await seed(session_factory, args.rows)
+        print(f"生成 {args.rows:,d} 条聊天记录，耗时 {time.perf_counter() - started:.1f} s")
+
+        async with session_factory() as db:
+            started = time.perf_counter()
+            indexed = await ChatSearchService.ensure_index(db)
+            print(f"建立全文索引 {indexed:,d} 条，耗时 {time.perf_counter() - started:.1f} s")
+
+            rng = random.Random(1)
+            queries = [rng.choice(QUERIES) for _ in range(args.queries)]
+
+            timings = []
+            for query in queries[: args.ilike_queries]:
+                started = time.perf_counter()
+                await ilike_search(db, query.split()[0], args.limit)
+                timings.append(time.perf_counter() - started)
+            report("ilike", timings)
+
+            timings, page_timings = [], []
+            for query in queries:
+                started = time.perf_counter()
+                page = await ChatSearchService.search(db, query, limit=args.limit)
+                timings.append(time.perf_counter() - started)
+                if page:
+                    started = time.perf_counter()
+                    await ChatSearchService.search(
+                        db, query, limit=args.limit, cursor=page[-1]["cursor"]
+                    )
+                    page_timings.append(time.perf_counter() - started)
+            report("fts", timings)
+            if page_timings:
+                report("fts 第2页", page_timings)
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="聊天记录搜索基准测试")
+    parser.add_argument("--rows", type=int, default=5_000_000, help="聊天记录数")
+    parser.add_argument("--queries", type=int, default=100, help="全文检索查询次数")
+    parser.add_argument("--ilike-queries", type=int, default=5, help="ILIKE 查询次数")
+    parser.add_argument("--limit", type=int, default=100, help="每页结果数")
+    asyncio.run(main(parser.parse_args()))
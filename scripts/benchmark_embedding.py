@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+本地嵌入服务微基准测试
+
+测量 SimpleEmbedding 的单条 embed / 批量 embed_batch 吞吐量以及缓存命中延迟。
+
+用法:
+    python scripts/benchmark_embedding.py
+    python scripts/benchmark_embedding.py --texts 5000 --batch 256
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.vectorstore.embedding import SimpleEmbedding
+
+SAMPLES = [
+    "今天早餐吃了两个鸡蛋和一杯牛奶",
+    "晚上跑步五公里，感觉膝盖有点酸",
+    "体重比上周下降了0.8kg，继续保持",
+    "最近睡眠不太好，经常凌晨两点才睡",
+    "中午外卖点了黄焖鸡米饭，热量有点高",
+    "I walked 8000 steps today and drank 2L water",
+]
+
+
+def make_texts(count: int):
+    rng = random.Random(42)
+    return [f"{rng.choice(SAMPLES)} #{i}" for i in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地嵌入服务微基准测试")
+    parser.add_argument("--texts", type=int, default=2000, help="不重复文本数")
+    parser.add_argument("--batch", type=int, default=128, help="批大小")
+    args = parser.parse_args()
+
+    texts = make_texts(args.texts)
+
+    # 单条 embed（全部未命中缓存）
+    embedding = SimpleEmbedding(cache_size=args.texts)
+    start = time.perf_counter()
+    for text in texts:
+        embedding.embed(text)
+    single = time.perf_counter() - start
+
+    # 批量 embed_batch（全部未命中缓存）
+    embedding = SimpleEmbedding(cache_size=args.texts)
+    start = time.perf_counter()
+    for i in range(0, len(texts), args.batch):
+        embedding.embed_batch(texts[i : i + args.batch])
+    batch = time.perf_counter() - start
+
+    # 缓存命中
+    rounds = 10
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for text in texts:
+            embedding.embed(text)
+    hit = (time.perf_counter() - start) / (rounds * len(texts))
+
+    print(f"文本数 {len(texts)}，批大小 {args.batch}")
+    print(f"embed        {len(texts) / single:10.0f} 条/秒")
+    print(f"embed_batch  {len(texts) / batch:10.0f} 条/秒")
+    print(f"缓存命中     {hit * 1e6:10.2f} 微秒/次")
+
+
+if __name__ == "__main__":
+    main()
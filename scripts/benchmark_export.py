@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+聊天记录导出基准测试（峰值内存）
+
+在临时 SQLite 数据库中生成 N 条聊天记录（默认 100 万），每种导出方式在独立子进程中
+运行、输出写入 /dev/null，用 ru_maxrss 统计峰值 RSS 相对导出前的增量：
+- legacy: 原实现，查出全部 ORM 对象（selectinload 用户）后 json.dumps(indent=2)
+- jsonl / csv / xlsx: keyset 分页 + 流式编码（XLSX 为 openpyxl 只写模式）
+
+流式导出分别导出 1/10 和全部记录，峰值内存应基本不变；legacy 只跑较小的规模
+（--legacy-rows），否则内存占用可达数 GB。
+
+用法:
+    python scripts/benchmark_export.py
+    python scripts/benchmark_export.py --rows 200000 --formats jsonl,csv
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import desc, insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import selectinload
+
+from models.database import Base, ChatHistory, MessageRole, MessageType, User
+from services.streaming_export_service import (
+    XlsxSheet,
+    csv_chunks,
+    iter_rows,
+    ndjson_chunks,
+    xlsx_chunks,
+)
+
+INSERT_BATCH_SIZE = 20000
+USERS = 1000
+TABLES = [User.__table__, ChatHistory.__table__]
+COLUMNS = ["ID", "用户ID", "用户昵称", "用户手机", "角色", "消息类型", "内容", "元数据", "创建时间"]
+SENTENCES = [
+    "今天午饭吃了一碗牛肉面，大概多少热量？",
+    "建议晚餐以蔬菜和优质蛋白为主，主食减半，饭后散步三十分钟。",
+    "体重比上周下降了0.8公斤，继续保持！",
+    "最近睡眠不太好，会影响减重吗？",
+]
+
+
+async def seed(path: str, rows: int):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all, tables=TABLES)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+
+    rng = random.Random(18)
+    start = datetime(2026, 1, 1)
+    async with session_factory() as db:
+        await db.execute(
+            insert(User),
+            [
+                {"id": i, "openid": f"openid_{i}", "nickname": f"用户{i}"}
+                for i in range(1, USERS + 1)
+            ],
+        )
+        for offset in range(0, rows, INSERT_BATCH_SIZE):
+            batch = []
+            for i in range(offset, min(offset + INSERT_BATCH_SIZE, rows)):
+                batch.append(
+                    {
+                        "user_id": rng.randint(1, USERS),
+                        "role": MessageRole.USER if i % 2 else MessageRole.ASSISTANT,
+                        "msg_type": MessageType.TEXT,
+                        "content": " ".join(rng.choices(SENTENCES, k=3)),
+                        "meta_data": {"source": "miniapp", "seq": i},
+                        "created_at": start + timedelta(seconds=i * 10),
+                    }
+                )
+            await db.execute(insert(ChatHistory), batch)
+        await db.commit()
+    await engine.dispose()
+
+
+# ============ 子进程：执行一次导出 ============
+
+
+def _record(row) -> dict:
+    return {
+        "id": row.id,
+        "user_id": row.user_id,
+        "user_nickname": row.nickname,
+        "user_phone": row.phone,
+        "role": row.role.value,
+        "msg_type": row.msg_type.value,
+        "content": row.content,
+        "meta_data": row.meta_data,
+        "created_at": row.created_at.isoformat(),
+    }
+
+
+def _values(row) -> list:
+    meta = json.dumps(row.meta_data, ensure_ascii=False) if row.meta_data else ""
+    return [
+        row.id,
+        row.user_id,
+        row.nickname or "",
+        row.phone or "",
+        row.role.value,
+        row.msg_type.value,
+        row.content,
+        meta,
+        row.created_at.isoformat(),
+    ]
+
+
+async def legacy_export(session_factory, limit: int):
+    async with session_factory() as db:
+        result = await db.execute(
+            select(ChatHistory)
+            .options(selectinload(ChatHistory.user))
+            .where(ChatHistory.role != MessageRole.SYSTEM)
+            .order_by(desc(ChatHistory.created_at))
+            .limit(limit)
+        )
+        messages = result.scalars().all()
+        export_data = []
+        for msg in messages:
+            export_data.append(
+                {
+                    "id": msg.id,
+                    "user_id": msg.user_id,
+                    "user_nickname": msg.user.nickname,
+                    "user_phone": msg.user.phone,
+                    "role": msg.role.value,
+                    "msg_type": msg.msg_type.value,
+                    "content": msg.content,
+                    "meta_data": msg.meta_data,
+                    "created_at": msg.created_at.isoformat(),
+                }
+            )
+    yield json.dumps(export_data, ensure_ascii=False, indent=2).encode("utf-8")
+
+
+def stream_export(session_factory, fmt: str, limit: int):
+    stmt = (
+        select(
+            ChatHistory.id,
+            ChatHistory.user_id,
+            User.nickname,
+            User.phone,
+            ChatHistory.role,
+            ChatHistory.msg_type,
+            ChatHistory.content,
+            ChatHistory.meta_data,
+            ChatHistory.created_at,
+        )
+        .outerjoin(User, User.id == ChatHistory.user_id)
+        .where(ChatHistory.role != MessageRole.SYSTEM)
+    )
+    rows = iter_rows(stmt, ChatHistory.id, limit=limit, session_factory=session_factory)
+    if fmt == "jsonl":
+        return ndjson_chunks(_record(row) async for row in rows)
+    if fmt == "csv":
+        return csv_chunks(COLUMNS, (_values(row) async for row in rows))
+    return xlsx_chunks([XlsxSheet("聊天记录", COLUMNS, (_values(r) async for r in rows))])
+
+
+def _max_rss_mb() -> float:
+    # Linux 上 ru_maxrss 单位为 KB
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def child(path: str, fmt: str, limit: int):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    async with session_factory() as db:
+        await db.execute(select(User.id).limit(1))
+    base = _max_rss_mb()
+
+    start = time.perf_counter()
+    if fmt == "legacy":
+        chunks = legacy_export(session_factory, limit)
+    else:
+        chunks = stream_export(session_factory, fmt, limit)
+    size = 0
+    with open(os.devnull, "wb") as sink:
+        async for chunk in chunks:
+            sink.write(chunk)
+            size += len(chunk)
+    elapsed = time.perf_counter() - start
+    await engine.dispose()
+
+    print(
+        json.dumps(
+            {"bytes": size, "seconds": elapsed, "base": base, "peak": _max_rss_mb()}
+        )
+    )
+
+
+# ============ 主进程 ============
+
+
+def run_child(path: str, fmt: str, limit: int):
+    output = subprocess.run(
+        [
+            sys.executable,
+            os.path.abspath(__file__),
+            *("--child", fmt, "--db", path, "--rows", str(limit)),
+        ],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    print(
+        f"{fmt:7s} {limit:>9,d} 行  输出 {result['bytes'] / 1024 / 1024:7.1f}MB  "
+        f"耗时 {result['seconds']:6.1f} s  "
+        f"峰值 RSS {result['peak']:7.1f}MB（增量 {result['peak'] - result['base']:7.1f}MB）"
+    )
+
+
+def main(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.db or os.path.join(tmp, "export.db")
+        if not os.path.exists(path):
+            start = time.perf_counter()
+            asyncio.run(seed(path, args.rows))
+            print(f"生成 {args.rows:,d} 条聊天记录，耗时 {time.perf_counter() - start:.1f} s")
+
+        print(f"导出非系统消息（共 {args.rows:,d} 条）")
+        for limit in sorted({min(args.legacy_rows, args.rows) // 10, args.legacy_rows}):
+            run_child(path, "legacy", min(limit, args.rows))
+        for fmt in args.formats.split(","):
+            for limit in (args.rows // 10, args.rows):
+                run_child(path, fmt, limit)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="聊天记录导出基准测试（峰值内存）")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="聊天记录数")
+    parser.add_argument(
+        "--legacy-rows", type=int, default=100_000, help="原实现最多导出的记录数"
+    )
+    parser.add_argument(
+        "--formats", default="jsonl,csv,xlsx", help="流式导出格式，逗号分隔"
+    )
+    parser.add_argument("--db", help="复用已生成的数据库文件")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        asyncio.run(child(args.db, args.child, args.rows))
+    else:
+        main(args)
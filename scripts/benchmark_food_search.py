@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+食物搜索基准测试
+
+在内存 SQLite 中生成 N 条食物（默认 5 万），对比：
+- like: 原 LIKE '%关键词%' 全表扫描（搜索 / 逐词热量估算）
+- index: 内存食物索引（前缀 / 子串 / 拼音首字母 + 批量热量估算）
+
+用法:
+    python scripts/benchmark_food_search.py
+    python scripts/benchmark_food_search.py --foods 100000 --queries 500
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from models.database import Base, FoodCategory, FoodItem
+from services.food_index_service import HAS_PYPINYIN, FoodIndex
+
+PREFIXES = ["清炒", "红烧", "凉拌", "香煎", "水煮", "蒸", "炖", "烤", "麻辣", "糖醋"]
+BASES = ["鸡蛋", "米饭", "牛肉", "豆腐", "白菜", "土豆", "鸡胸肉", "三文鱼", "西兰花", "面条"]
+SUFFIXES = ["", "汤", "饭", "盖饭", "套餐", "沙拉", "卷", "粥"]
+
+
+def make_names(count: int):
+    rng = random.Random(7)
+    return [
+        f"{rng.choice(PREFIXES)}{rng.choice(BASES)}{rng.choice(SUFFIXES)}{i}"
+        for i in range(count)
+    ]
+
+
+def percentile(values, ratio):
+    ordered = sorted(values)
+    return ordered[max(int(len(ordered) * ratio) - 1, 0)]
+
+
+def report(name, seconds):
+    ms = [s * 1000 for s in seconds]
+    print(
+        f"{name:<22} p50 {statistics.median(ms):8.3f} ms | "
+        f"p95 {percentile(ms, 0.95):8.3f} ms | 最大 {max(ms):8.3f} ms"
+    )
+
+
+async def main(foods: int, queries: int):
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all, tables=[FoodItem.__table__])
+
+    names = make_names(foods)
+    async with AsyncSession(engine) as db:
+        db.add_all(
+            FoodItem(
+                name=name,
+                category=FoodCategory.STAPLE,
+                calories_per_100g=100 + i % 400,
+                common_portions={"一份": 200},
+            )
+            for i, name in enumerate(names)
+        )
+        await db.commit()
+
+        index = FoodIndex()
+        start = time.perf_counter()
+        await index.load(db)
+        print(f"食物数 {foods}，加载索引耗时 {time.perf_counter() - start:.2f} s")
+        if not HAS_PYPINYIN:
+            print("未安装 pypinyin，跳过拼音首字母匹配")
+
+        rng = random.Random(11)
+        keywords = [rng.choice(BASES + PREFIXES) for _ in range(queries)]
+        meals = [
+            " ".join(rng.choice(BASES) for _ in range(4)) for _ in range(queries)
+        ]
+
+        like, indexed = [], []
+        for keyword in keywords:
+            start = time.perf_counter()
+            result = await db.execute(
+                select(FoodItem).where(FoodItem.name.contains(keyword)).limit(10)
+            )
+            result.scalars().all()
+            like.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            index.search(keyword, 10)
+            indexed.append(time.perf_counter() - start)
+        report("search like", like)
+        report("search index", indexed)
+
+        like, indexed = [], []
+        for meal in meals:
+            start = time.perf_counter()
+            for token in meal.split():
+                result = await db.execute(
+                    select(FoodItem).where(FoodItem.name.contains(token)).limit(1)
+                )
+                result.scalars().first()
+            like.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            index.estimate_calories(meal)
+            indexed.append(time.perf_counter() - start)
+        report("estimate like", like)
+        report("estimate index", indexed)
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="食物搜索基准测试")
+    parser.add_argument("--foods", type=int, default=50000, help="食物数")
+    parser.add_argument("--queries", type=int, default=200, help="查询次数")
+    args = parser.parse_args()
+
+    asyncio.run(main(args.foods, args.queries))
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+教练对话图检查点基准测试
+
+在临时 SQLite 数据库中模拟 N 轮对话（默认 1000 轮，分布在 50 个用户上，AI 调用替换为
+固定回复），对比：
+- legacy: 原实现，进程内 MemorySaver + 每次调用新的 thread_id，完整初始状态
+- rolling: 数据库检查点 + 每个用户一个滚动线程（invoke_graph）
+
+报告每轮耗时、进程内存增长（tracemalloc）、打卡缓存（refresh_checkins 节点）命中率，
+以及 rolling 模式下检查点表的行数与大小。
+
+用法:
+    python scripts/benchmark_graph_checkpoint.py
+    python scripts/benchmark_graph_checkpoint.py --turns 10000 --users 200
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_tmpdir = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = (
+    f"sqlite+aiosqlite:///{os.path.join(_tmpdir.name, 'graph.db')}"
+)
+
+from langgraph.checkpoint.memory import MemorySaver
+from sqlalchemy import func, insert, select
+
+from models.database import (
+    AsyncSessionLocal,
+    GraphCheckpoint,
+    User,
+    WeightRecord,
+    engine,
+    init_db,
+)
+from services.langchain.graph import nodes
+from services.langchain.graph.graph import (
+    build_turn_input,
+    create_coach_graph,
+    invoke_graph,
+)
+from services.langchain.graph.monitor import performance_monitor, reset_metrics
+
+MESSAGES = ["早上好", "今天适合吃点什么", "晚饭后散步半小时可以吗", "谢谢教练"]
+
+
+async def fake_ai(messages, user_id=None):
+    return "好的，继续保持规律作息和均衡饮食。"
+
+
+async def seed(users: int):
+    now = datetime.now()
+    async with AsyncSessionLocal() as db:
+        await db.execute(
+            insert(User),
+            [
+                {"id": i, "openid": f"openid_{i}", "nickname": f"用户{i}"}
+                for i in range(1, users + 1)
+            ],
+        )
+        await db.execute(
+            insert(WeightRecord),
+            [
+                {
+                    "user_id": i,
+                    "weight": 70 - day * 0.1,
+                    "record_date": (now - timedelta(days=day)).date(),
+                    "record_time": now - timedelta(days=day),
+                }
+                for i in range(1, users + 1)
+                for day in range(5)
+            ],
+        )
+        await db.commit()
+
+
+def legacy_input(user_id: int, message: str):
+    state = build_turn_input(user_id, message)
+    state.update(
+        {
+            "profile": {},
+            "checkins": [],
+            "checkins_last_refresh": None,
+            "conversation_history": [],
+            "needs_refresh": True,
+        }
+    )
+    return state
+
+
+async def run_mode(mode: str, turns, users: int):
+    await reset_metrics("coach_graph")
+    legacy_graph = create_coach_graph(checkpointer=MemorySaver())
+
+    timings = []
+    tracemalloc.start()
+    baseline, _ = tracemalloc.get_traced_memory()
+    for user_id, message in turns:
+        started = time.perf_counter()
+        if mode == "legacy":
+            await legacy_graph.ainvoke(
+                legacy_input(user_id, message),
+                config={
+                    "configurable": {
+                        "thread_id": f"user_{user_id}_{time.time_ns()}"
+                    }
+                },
+            )
+        else:
+            await invoke_graph(user_id, message)
+        timings.append(time.perf_counter() - started)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    cache = performance_monitor.get_summary("coach_graph")["caches"].get("checkins", {})
+    ms = sorted(t * 1000 for t in timings)
+    print(
+        f"{mode:<8} p50 {statistics.median(ms):7.2f} ms | "
+        f"p95 {ms[int(len(ms) * 0.95) - 1]:7.2f} ms | "
+        f"内存增长 {(current - baseline) / 1024 / 1024:7.2f} MB "
+        f"(峰值 {(peak - baseline) / 1024 / 1024:7.2f} MB) | "
+        f"打卡缓存命中率 {cache.get('hit_rate', 0):6.2f}%"
+    )
+
+
+async def main(args):
+    await init_db()
+    await seed(args.users)
+    nodes._call_ai_service = fake_ai
+
+    rng = random.Random(22)
+    turns = [
+        (rng.randint(1, args.users), rng.choice(MESSAGES)) for _ in range(args.turns)
+    ]
+    print(f"模拟 {args.turns:,d} 轮对话，{args.users} 个用户")
+    for mode in ("legacy", "rolling"):
+        await run_mode(mode, turns, args.users)
+
+    async with AsyncSessionLocal() as db:
+        rows, size = (
+            await db.execute(
+                select(func.count(), func.coalesce(func.sum(GraphCheckpoint.size_bytes), 0))
+            )
+        ).one()
+    print(f"rolling 检查点表: {rows:,d} 行, {size / 1024:.1f} KB")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="教练对话图检查点基准测试")
+    parser.add_argument("--turns", type=int, default=1_000, help="模拟对话轮数")
+    parser.add_argument("--users", type=int, default=50, help="用户数")
+    try:
+        asyncio.run(main(parser.parse_args()))
+    finally:
+        _tmpdir.cleanup()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+餐食照片接收与预处理基准测试
+
+生成一张约 5MB 的 4032x3024 JPEG，用 N 个并发上传请求（默认 20）分别测试：
+- legacy: 原实现，整体读入内存、同步写盘、全尺寸解码 + LANCZOS 缩放 + 编码都在事件循环上
+- ingest: 分块异步写盘 + 进程池预处理（JPEG draft 解码时缩小）
+
+同时每 10ms 请求一次 /ping，统计其延迟以衡量事件循环被阻塞的程度。
+每轮上传使用不同的照片内容，避免内容去重缓存影响结果。
+
+用法:
+    python scripts/benchmark_image_ingest.py
+    python scripts/benchmark_image_ingest.py --uploads 40 --workers 4
+"""
+
+import argparse
+import asyncio
+import base64
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+import numpy as np
+from fastapi import FastAPI, File, UploadFile
+from PIL import Image
+
+from services.image_ingest_service import ImageIngestService
+
+WIDTH, HEIGHT = 4032, 3024
+
+
+def make_photo(seed: int) -> bytes:
+    """渐变 + 噪声，JPEG 质量 90 时约 5MB"""
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:HEIGHT, 0:WIDTH]
+    base = np.stack(
+        [x * 255 // WIDTH, y * 255 // HEIGHT, (x + y) * 255 // (WIDTH + HEIGHT)], -1
+    )
+    noise = rng.integers(-30, 30, (HEIGHT, WIDTH, 3))
+    pixels = np.clip(base + noise, 0, 255).astype(np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def build_app(upload_dir: str, service: ImageIngestService) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    @app.post("/legacy")
+    async def legacy(file: UploadFile = File(...)):
+        """原 analyze_meal_photo 的接收与压缩逻辑"""
+        contents = await file.read()
+        with open(os.path.join(upload_dir, f"{uuid.uuid4()}.jpg"), "wb") as f:
+            f.write(contents)
+        img = Image.open(io.BytesIO(contents))
+        if img.mode in ("RGBA", "P"):
+            img = img.convert("RGB")
+        max_size = 1024
+        if max(img.size) > max_size:
+            ratio = max_size / max(img.size)
+            new_size = (int(img.size[0] * ratio), int(img.size[1] * ratio))
+            img = img.resize(new_size, Image.Resampling.LANCZOS)
+        buffer = io.BytesIO()
+        img.save(buffer, format="JPEG", quality=85, optimize=True)
+        data_url = base64.b64encode(buffer.getvalue()).decode("utf-8")
+        return {"length": len(data_url)}
+
+    @app.post("/ingest")
+    async def ingest(file: UploadFile = File(...)):
+        image = await service.save_upload(file, upload_dir, 20 * 1024 * 1024)
+        data_url = await service.to_data_url(image, 1024, 85)
+        return {"length": len(data_url)}
+
+    return app
+
+
+def _percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+
+async def run_mode(app: FastAPI, path: str, photos, concurrency: int):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench", timeout=300
+    ) as client:
+        pings = []
+        done = asyncio.Event()
+
+        async def pinger():
+            while not done.is_set():
+                start = time.perf_counter()
+                await client.get("/ping")
+                pings.append(time.perf_counter() - start)
+                await asyncio.sleep(0.01)
+
+        async def upload(photo: bytes):
+            start = time.perf_counter()
+            response = await client.post(
+                path, files={"file": ("meal.jpg", photo, "image/jpeg")}
+            )
+            response.raise_for_status()
+            return time.perf_counter() - start
+
+        ping_task = asyncio.create_task(pinger())
+        start = time.perf_counter()
+        latencies = await asyncio.gather(
+            *(upload(photos[i % len(photos)]) for i in range(concurrency))
+        )
+        elapsed = time.perf_counter() - start
+        done.set()
+        await ping_task
+
+    print(
+        f"{path[1:]:7s} 上传 p50 {_percentile(latencies, 0.5) * 1000:7.0f} ms  "
+        f"p99 {_percentile(latencies, 0.99) * 1000:7.0f} ms  总耗时 {elapsed:5.1f} s | "
+        f"ping p50 {_percentile(pings, 0.5) * 1000:6.1f} ms  "
+        f"p99 {_percentile(pings, 0.99) * 1000:7.1f} ms  "
+        f"max {max(pings) * 1000:7.1f} ms"
+    )
+
+
+async def main(uploads: int, workers: int):
+    start = time.perf_counter()
+    photos = [make_photo(seed) for seed in range(uploads)]
+    size = statistics.mean(len(photo) for photo in photos) / 1024 / 1024
+    print(
+        f"生成 {uploads} 张 {WIDTH}x{HEIGHT} 照片，平均 {size:.1f}MB，"
+        f"耗时 {time.perf_counter() - start:.1f} s"
+    )
+
+    service = ImageIngestService(workers=workers, max_pending=workers * 2)
+    service.start()
+    try:
+        with tempfile.TemporaryDirectory() as upload_dir:
+            app = build_app(upload_dir, service)
+            await run_mode(app, "/legacy", photos, uploads)
+            await run_mode(app, "/ingest", photos, uploads)
+    finally:
+        service.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="餐食照片接收与预处理基准测试")
+    parser.add_argument("--uploads", type=int, default=20, help="并发上传数")
+    parser.add_argument("--workers", type=int, default=2, help="预处理进程数")
+    args = parser.parse_args()
+
+    asyncio.run(main(args.uploads, args.workers))
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+通知触发条件检查基准测试
+
+在临时 SQLite 数据库中生成 N 个用户（部分有体重/餐食/目标数据），对比：
+- per_user: 原实现，逐个用户查询偏好和各触发条件（每个用户约 10 次查询）
+- batch: 按用户分块，每块用分组查询计算所有触发条件并批量写入通知
+
+用法:
+    python scripts/benchmark_notification_check.py
+    python scripts/benchmark_notification_check.py --users 50000 --batch-size 1000
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import and_, func, insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from models.database import (
+    Base,
+    Goal,
+    GoalStatus,
+    MealRecord,
+    MealType,
+    NotificationQueue,
+    User,
+    UserProfile,
+    WeightRecord,
+)
+from services.notification_service import NotificationService, NotificationTrigger
+from utils.query_helpers import on_day
+
+INSERT_BATCH_SIZE = 20000
+TABLES = [
+    User.__table__,
+    UserProfile.__table__,
+    WeightRecord.__table__,
+    MealRecord.__table__,
+    Goal.__table__,
+    NotificationQueue.__table__,
+]
+MEALS = [MealType.BREAKFAST, MealType.LUNCH, MealType.DINNER]
+
+
+async def seed(session_factory, users: int):
+    rng = random.Random(9)
+    now = datetime.now()
+    today = date.today()
+    async with session_factory() as db:
+        for start in range(1, users + 1, INSERT_BATCH_SIZE):
+            ids = range(start, min(start + INSERT_BATCH_SIZE, users + 1))
+            await db.execute(
+                insert(User), [{"id": i, "openid": f"openid_{i}"} for i in ids]
+            )
+            weights, meals, goals = [], [], []
+            for i in ids:
+                for day in range(rng.randint(0, 5)):
+                    weights.append(
+                        {
+                            "user_id": i,
+                            "weight": 60 + rng.random() * 30,
+                            "record_date": today - timedelta(days=day),
+                            "record_time": now - timedelta(days=day),
+                        }
+                    )
+                for meal in rng.sample(MEALS, rng.randint(0, 3)):
+                    meals.append(
+                        {
+                            "user_id": i,
+                            "meal_type": meal,
+                            "record_time": now,
+                            "total_calories": rng.randint(300, 1500),
+                        }
+                    )
+                if rng.random() < 0.3:
+                    goals.append(
+                        {
+                            "user_id": i,
+                            "target_weight": 60,
+                            "status": GoalStatus.ACTIVE,
+                            "created_at": now - timedelta(days=10),
+                        }
+                    )
+            for model, rows in (
+                (WeightRecord, weights),
+                (MealRecord, meals),
+                (Goal, goals),
+            ):
+                if rows:
+                    await db.execute(insert(model), rows)
+        await db.commit()
+
+
+async def per_user_check(session_factory) -> int:
+    """原实现的查询模式：每个用户依次查询偏好和各触发条件"""
+    today = date.today()
+    queries = 0
+    async with session_factory() as db:
+        user_ids = (await db.execute(select(User.id))).scalars().all()
+        for user_id in user_ids:
+            await db.execute(
+                select(UserProfile).where(UserProfile.user_id == user_id)
+            )
+            await db.execute(
+                select(WeightRecord).where(
+                    and_(
+                        WeightRecord.user_id == user_id,
+                        WeightRecord.record_date == today,
+                    )
+                )
+            )
+            for meal in MEALS:
+                await db.execute(
+                    select(MealRecord).where(
+                        and_(
+                            MealRecord.user_id == user_id,
+                            MealRecord.meal_type == meal,
+                            on_day(MealRecord.record_time, today),
+                        )
+                    )
+                )
+            await db.execute(
+                select(Goal).where(
+                    and_(Goal.user_id == user_id, Goal.status == GoalStatus.ACTIVE)
+                )
+            )
+            await db.execute(
+                select(WeightRecord)
+                .where(WeightRecord.user_id == user_id)
+                .order_by(WeightRecord.record_date.desc())
+                .limit(2)
+            )
+            await db.execute(
+                select(func.sum(MealRecord.total_calories)).where(
+                    and_(
+                        MealRecord.user_id == user_id,
+                        on_day(MealRecord.record_time, today),
+                    )
+                )
+            )
+            queries += 8
+            db.expunge_all()
+    return queries
+
+
+async def main(users: int, batch_size: int, concurrency: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp}/bench.db")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all, tables=TABLES)
+        session_factory = async_sessionmaker(engine, expire_on_commit=False)
+
+        start = time.perf_counter()
+        await seed(session_factory, users)
+        print(f"用户数 {users}，生成数据耗时 {time.perf_counter() - start:.1f} s")
+
+        start = time.perf_counter()
+        queries = await per_user_check(session_factory)
+        elapsed = time.perf_counter() - start
+        print(
+            f"per_user  {elapsed:7.2f} s  {users / elapsed:9.0f} 用户/秒"
+            f"（只查询不写入，{queries} 次查询）"
+        )
+
+        service = NotificationService()
+        triggers = set(NotificationTrigger) - {NotificationTrigger.TIME_BASED}
+        result = await service.run_batch(
+            session_factory,
+            triggers=triggers,
+            batch_size=batch_size,
+            concurrency=concurrency,
+        )
+        print(
+            f"batch     {result['elapsed_seconds']:7.2f} s  "
+            f"{result['users_per_second']:9.0f} 用户/秒"
+            f"（创建通知 {result['notifications_created']} 条）"
+        )
+
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="通知触发条件检查基准测试")
+    parser.add_argument("--users", type=int, default=20000, help="用户数")
+    parser.add_argument("--batch-size", type=int, default=500, help="每块用户数")
+    parser.add_argument("--concurrency", type=int, default=4, help="同时处理的块数")
+    args = parser.parse_args()
+
+    asyncio.run(main(args.users, args.batch_size, args.concurrency))
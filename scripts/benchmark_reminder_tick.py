@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+提醒调度检查基准测试
+
+在临时 SQLite 数据库中生成 N 条提醒设置（默认 100 万，提醒时间均匀分布在一天内），
+对比一次调度检查的耗时：
+- scan: 原实现，加载全部启用的提醒设置后在 Python 中逐条判断是否到期
+- index: minute_of_day 索引范围查询 + UPDATE ... RETURNING 认领
+
+用法:
+    python scripts/benchmark_reminder_tick.py
+    python scripts/benchmark_reminder_tick.py --reminders 200000 --ticks 20
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, time as dt_time, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from models.database import Base, ReminderSetting, ReminderType
+from services.reminder_index_service import ReminderIndexService
+
+INSERT_BATCH_SIZE = 50000
+TICK_INTERVAL = 300
+GRACE = 900
+TYPES = [
+    ReminderType.WEIGHT,
+    ReminderType.BREAKFAST,
+    ReminderType.LUNCH,
+    ReminderType.DINNER,
+    ReminderType.EXERCISE,
+    ReminderType.SLEEP,
+]
+
+
+async def scan_tick(db: AsyncSession, now: datetime) -> int:
+    """原 NotificationScheduler._check_and_trigger_reminders 的判断逻辑"""
+    result = await db.execute(
+        select(ReminderSetting).where(ReminderSetting.enabled.is_(True))
+    )
+    due = 0
+    for setting in result.scalars().all():
+        if setting.weekdays_only and now.weekday() >= 5:
+            continue
+        if setting.reminder_time is None:
+            continue
+        diff = (now - datetime.combine(now.date(), setting.reminder_time)).total_seconds()
+        if 0 <= diff <= TICK_INTERVAL:
+            due += 1
+    db.expunge_all()
+    return due
+
+
+async def main(reminders: int, ticks: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp}/bench.db")
+        async with engine.begin() as conn:
+            await conn.run_sync(
+                Base.metadata.create_all, tables=[ReminderSetting.__table__]
+            )
+
+        rng = random.Random(3)
+        start = time.perf_counter()
+        async with AsyncSession(engine) as db:
+            for offset in range(0, reminders, INSERT_BATCH_SIZE):
+                rows = []
+                for i in range(offset, min(offset + INSERT_BATCH_SIZE, reminders)):
+                    minute = rng.randrange(24 * 60)
+                    rows.append(
+                        {
+                            "user_id": i // len(TYPES) + 1,
+                            "reminder_type": TYPES[i % len(TYPES)],
+                            "enabled": rng.random() < 0.9,
+                            "reminder_time": dt_time(minute // 60, minute % 60),
+                            "minute_of_day": minute,
+                            "weekdays_only": rng.random() < 0.2,
+                        }
+                    )
+                await db.execute(insert(ReminderSetting), rows)
+            await db.commit()
+        print(f"提醒设置 {reminders} 条，写入耗时 {time.perf_counter() - start:.1f} s")
+
+        base = datetime(2026, 10, 16, 7, 0)
+        async with AsyncSession(engine) as db:
+            scan = []
+            for i in range(min(ticks, 3)):
+                now = base + timedelta(seconds=TICK_INTERVAL * i)
+                start = time.perf_counter()
+                due = await scan_tick(db, now)
+                scan.append(time.perf_counter() - start)
+            print(f"scan   每次 {statistics.median(scan) * 1000:9.1f} ms（到期约 {due} 条）")
+
+            index, claimed = [], 0
+            for i in range(ticks):
+                now = base + timedelta(seconds=TICK_INTERVAL * i)
+                start = time.perf_counter()
+                due = await ReminderIndexService.claim_due(db, now=now, grace=GRACE)
+                await db.commit()
+                index.append(time.perf_counter() - start)
+                claimed += len(due)
+            print(
+                f"index  每次 {statistics.median(index) * 1000:9.1f} ms"
+                f"（共认领 {claimed} 条，平均每次 {claimed // ticks} 条）"
+            )
+
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="提醒调度检查基准测试")
+    parser.add_argument("--reminders", type=int, default=1000000, help="提醒设置条数")
+    parser.add_argument("--ticks", type=int, default=12, help="模拟的调度检查次数")
+    args = parser.parse_args()
+
+    asyncio.run(main(args.reminders, args.ticks))
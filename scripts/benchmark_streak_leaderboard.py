@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+连续打卡排行榜基准测试
+
+在临时 SQLite 数据库中为 N 个用户（默认 1 万）生成最近 --days 天的每日活动汇总，对比：
+- per_user: 逐个用户调用 StreakService.get_current_streak（每用户一次查询）
+- batched: StreakService.get_current_streaks 一次取出所有用户的活跃日期后在内存中计算
+- user_streaks: LeaderboardService.get_streak_leaderboard（user_streaks 表索引取前 K 名）
+
+并给出原实现（每个用户逐天探测五类记录表）的查询次数区间，以及 user_streaks
+首次回填（对账）耗时和记录写入时增量维护的平均额外查询数。
+
+用法:
+    python scripts/benchmark_streak_leaderboard.py
+    python scripts/benchmark_streak_leaderboard.py --users 2000 --days 120
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_tmpdir = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = (
+    f"sqlite+aiosqlite:///{os.path.join(_tmpdir.name, 'streak.db')}"
+)
+
+from sqlalchemy import event, insert
+
+from models.database import (
+    AsyncSessionLocal,
+    DailyActivity,
+    User,
+    WaterRecord,
+    engine,
+    init_db,
+)
+from services.daily_activity_service import DailyActivityService
+from services.leaderboard_service import LeaderboardService
+from services.streak_service import StreakService
+
+counter = {"queries": 0}
+
+
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def _on_execute(conn, cursor, statement, parameters, context, executemany):
+    counter["queries"] += 1
+
+
+async def seed(users: int, days: int) -> int:
+    """生成用户与每日活动汇总：每个用户一段截止今天/昨天的连续打卡，加上更早的零散打卡"""
+    rng = random.Random(25)
+    today = date.today()
+    rows = []
+    for uid in range(1, users + 1):
+        active = set()
+        run = rng.randint(0, days // 2)
+        end = rng.choice([0, 0, 1])
+        active.update(range(end, end + run))
+        active.update(rng.sample(range(days), rng.randint(0, days // 4)))
+        rows.extend(
+            {
+                "user_id": uid,
+                "activity_date": today - timedelta(days=offset),
+                "water_count": 1,
+                "water_ml": 250,
+            }
+            for offset in active
+        )
+
+    async with AsyncSessionLocal() as db:
+        await db.execute(
+            insert(User),
+            [
+                {"id": i, "openid": f"openid_{i}", "nickname": f"用户{i}"}
+                for i in range(1, users + 1)
+            ],
+        )
+        for start in range(0, len(rows), 5000):
+            await db.execute(insert(DailyActivity), rows[start : start + 5000])
+        await db.commit()
+    return len(rows)
+
+
+async def measure(label: str, func):
+    async with AsyncSessionLocal() as db:
+        counter["queries"] = 0
+        started = time.perf_counter()
+        result = await func(db)
+        elapsed = (time.perf_counter() - started) * 1000
+        print(f"{label:<14} 查询 {counter['queries']:>7,d} 次 | 耗时 {elapsed:9.1f} ms")
+        return result
+
+
+async def main(args):
+    await init_db()
+    rows = await seed(args.users, args.days)
+    print(f"{args.users:,d} 个用户, {rows:,d} 行每日活动汇总")
+
+    user_ids = list(range(1, args.users + 1))
+
+    async def per_user(db):
+        return {uid: await StreakService.get_current_streak(uid, db) for uid in user_ids}
+
+    streaks = await measure("per_user", per_user)
+    await measure("batched", lambda db: StreakService.get_current_streaks(None, db))
+
+    # 原实现：每个用户从今天起逐天探测，每天最多查询 5 张记录表，直到某天无记录
+    checked_days = sum(streak + 1 for streak in streaks.values())
+    print(
+        f"{'legacy':<14} 查询 {checked_days:,d} ~ {checked_days * 5:,d} 次（按逐天探测估算）"
+    )
+
+    await measure("reconcile", lambda db: StreakService.reconcile(db))
+    board = await measure(
+        "user_streaks",
+        lambda db: LeaderboardService.get_streak_leaderboard(db, args.limit),
+    )
+    await measure(
+        "my_rank", lambda db: LeaderboardService.get_user_rank(1, db, "streak")
+    )
+
+    # 校验：排行榜与逐用户计算一致
+    expected = sorted((-s, uid) for uid, s in streaks.items() if s > 0)[: args.limit]
+    actual = [(-r["streak_days"], r["user_id"]) for r in board["data"]["rankings"]]
+    assert actual == expected, "排行榜与逐用户计算结果不一致"
+
+    # 记录写入时的增量维护开销
+    async with AsyncSessionLocal() as db:
+        counter["queries"] = 0
+        now = datetime.now()
+        for uid in user_ids[: args.writes]:
+            record = WaterRecord(user_id=uid, amount_ml=200, record_time=now)
+            db.add(record)
+            await DailyActivityService.record_added(db, record)
+        await db.commit()
+        print(
+            f"写入 {args.writes} 条记录，平均每条 {counter['queries'] / args.writes:.2f} 次查询"
+            "（含记录插入与汇总累加）"
+        )
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="连续打卡排行榜基准测试")
+    parser.add_argument("--users", type=int, default=10_000, help="用户数")
+    parser.add_argument("--days", type=int, default=90, help="历史天数")
+    parser.add_argument("--limit", type=int, default=10, help="排行榜人数")
+    parser.add_argument("--writes", type=int, default=1000, help="增量维护测试的写入条数")
+    try:
+        asyncio.run(main(parser.parse_args()))
+    finally:
+        _tmpdir.cleanup()
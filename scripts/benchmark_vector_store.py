@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+向量存储写入基准测试
+
+对比两种方式在 N 个用户、每人写入若干条记忆时的单条写入延迟与打开的文件句柄数：
+- per_client: 旧方式，每个用户创建自己的 PersistentClient 并逐条 collection.add
+- shared_queue: 进程内共享客户端 + 后台写入队列批量提交
+
+用法:
+    python scripts/benchmark_vector_store.py                       # 1000 用户，每人 3 条
+    python scripts/benchmark_vector_store.py --users 200 --messages 5
+    python scripts/benchmark_vector_store.py --hash-embeddings     # 不下载默认嵌入模型，只测存储开销
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import chromadb
+
+from services.vectorstore.chroma_store import ChromaVectorStore
+from services.vectorstore.write_queue import write_queue
+
+
+def count_open_fds() -> int:
+    """当前进程打开的文件句柄数（仅 Linux）"""
+    try:
+        return len(os.listdir("/proc/self/fd"))
+    except OSError:
+        return -1
+
+
+def use_hash_embeddings():
+    """用确定性的哈希向量替换 Chroma 默认嵌入模型（避免下载 ONNX 模型）"""
+    from chromadb.utils.embedding_functions import DefaultEmbeddingFunction
+
+    def _embed(self, input):
+        return [
+            [((hash(text) >> shift) & 0xFF) / 255.0 for shift in range(0, 64, 2)]
+            for text in input
+        ]
+
+    DefaultEmbeddingFunction.__call__ = _embed
+
+
+def bench_per_client(path: str, users: int, messages: int):
+    latencies = []
+    clients = []
+    for user_id in range(users):
+        client = chromadb.PersistentClient(path=path)
+        clients.append(client)
+        collection = client.get_or_create_collection(name=f"user_{user_id}_memory")
+        for i in range(messages):
+            start = time.perf_counter()
+            collection.add(
+                documents=[f"用户{user_id}的第{i}条记忆"],
+                metadatas=[{"user_id": user_id, "type": "conversation"}],
+                ids=[f"conversation_{i}"],
+            )
+            latencies.append(time.perf_counter() - start)
+    return latencies, count_open_fds(), 0.0
+
+
+def bench_shared_queue(path: str, users: int, messages: int):
+    latencies = []
+    stores = []
+    for user_id in range(users):
+        store = ChromaVectorStore(
+            collection_name=f"user_{user_id}_memory", persist_dir=path
+        )
+        stores.append(store)
+        for i in range(messages):
+            start = time.perf_counter()
+            store.add_documents(
+                documents=[f"用户{user_id}的第{i}条记忆"],
+                metadatas=[{"user_id": user_id, "type": "conversation"}],
+                ids=[f"conversation_{i}"],
+                defer=True,
+            )
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    write_queue.flush(timeout=600)
+    flush_seconds = time.perf_counter() - start
+    return latencies, count_open_fds(), flush_seconds
+
+
+def report(name: str, latencies, fds: int, flush_seconds: float):
+    ordered = sorted(latencies)
+    p95 = ordered[int(len(ordered) * 0.95) - 1] if ordered else 0.0
+    print(
+        f"{name:<13} 写入 {len(latencies):>6} 条 | "
+        f"p50 {statistics.median(ordered) * 1000:8.3f} ms | "
+        f"p95 {p95 * 1000:8.3f} ms | "
+        f"总计 {sum(ordered):7.2f} s | "
+        f"刷新 {flush_seconds:6.2f} s | "
+        f"文件句柄 {fds}"
+    )
+
+
+BENCHES = {"per_client": bench_per_client, "shared_queue": bench_shared_queue}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="向量存储写入基准测试")
+    parser.add_argument("--users", type=int, default=1000, help="用户数")
+    parser.add_argument("--messages", type=int, default=3, help="每个用户写入的记忆条数")
+    parser.add_argument(
+        "--hash-embeddings", action="store_true", help="使用哈希向量代替默认嵌入模型"
+    )
+    parser.add_argument(
+        "--mode", choices=sorted(BENCHES), default=None, help="只运行指定方式（内部使用）"
+    )
+    args = parser.parse_args()
+
+    if args.mode is None:
+        # 每种方式在独立子进程中运行，文件句柄数互不影响
+        print(f"用户数 {args.users}，每人 {args.messages} 条")
+        for mode in BENCHES:
+            cmd = [sys.executable, os.path.abspath(__file__), "--mode", mode,
+                   "--users", str(args.users), "--messages", str(args.messages)]
+            if args.hash_embeddings:
+                cmd.append("--hash-embeddings")
+            subprocess.run(cmd, check=True)
+        return
+
+    if args.hash_embeddings:
+        use_hash_embeddings()
+
+    path = tempfile.mkdtemp(prefix=f"bench_{args.mode}_")
+    try:
+        report(args.mode, *BENCHES[args.mode](path, args.users, args.messages))
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
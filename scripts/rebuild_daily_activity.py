@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+重建每日活动汇总表（daily_activity）
+
+用法:
+    python scripts/rebuild_daily_activity.py            # 重建所有用户
+    python scripts/rebuild_daily_activity.py --user 12  # 只重建某个用户
+"""
+
+import argparse
+import asyncio
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.database import AsyncSessionLocal, init_db
+from services.daily_activity_service import DailyActivityService
+
+
+async def rebuild_daily_activity(user_id=None):
+    """建表/补建索引后从原始记录重建汇总"""
+    await init_db()
+
+    async with AsyncSessionLocal() as db:
+        rows = await DailyActivityService.rebuild(db, user_id=user_id)
+
+    print(f"每日活动汇总重建完成，共写入 {rows} 行")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="重建每日活动汇总表")
+    parser.add_argument("--user", type=int, default=None, help="只重建指定用户")
+    args = parser.parse_args()
+
+    asyncio.run(rebuild_daily_activity(args.user))
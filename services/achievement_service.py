@@ -13,6 +13,7 @@ import json
 
 from models.database import User, UserProfile
 from models.points_history import PointsHistory, PointsType
+from services.user_profile_service import UserProfileService
 from config.logging_config import get_module_logger
 
 logger = get_module_logger(__name__)
@@ -402,6 +403,7 @@ class AchievementService:
         if newly_unlocked and profile:
             profile.achievements = json.dumps(unlocked)
             await db.commit()
+            UserProfileService.invalidate_shared_cache(user_id)
 
         return newly_unlocked
 
@@ -491,6 +493,7 @@ class PointsService:
         db.add(history)
 
         await db.commit()
+        UserProfileService.invalidate_shared_cache(user_id)
 
         return {
             "success": True,
@@ -538,6 +541,7 @@ class PointsService:
         db.add(history)
 
         await db.commit()
+        UserProfileService.invalidate_shared_cache(user_id)
 
         return {
             "success": True,
@@ -0,0 +1,394 @@
+"""
+管理后台统计服务
+
+原来的活跃度趋势、用户/聊天统计摘要按天循环，每天对五张表各做一次 COUNT，
+请求 30 天就是 150 次查询，且每次都要扫描原始记录。这里改为：
+1. 按表各一次 GROUP BY 日期 查询（created_at 上有索引，范围过滤可走索引）
+2. 已经结束的日期写入 admin_daily_stats 计数表，之后只读计数行；只有今天（以及
+   计数表中缺失的日期）才查询原始记录，统计耗时只与天数有关
+3. 结果按分钟缓存，同一分钟内的后台刷新共享一次计算
+
+计数按记录的 created_at 归属日期（写入时间，不会落到已结束的日期），
+计数行写入后不再回溯：之后删除的记录仍计入当时的活跃度。
+"""
+
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List
+
+from sqlalchemy import and_, case, desc, func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.database import (
+    AdminDailyStats,
+    ChatHistory,
+    MealRecord,
+    MessageRole,
+    User,
+    WeightRecord,
+)
+from utils.query_helpers import between_days, since_day, to_date
+from utils.result_cache import MISSING, MemoryCacheBackend
+from utils.performance import increment_counter
+from config.settings import fastapi_settings
+from config.logging_config import get_module_logger
+
+logger = get_module_logger(__name__)
+
+# 计数表中的计数列
+COUNTER_COLUMNS = (
+    "new_users",
+    "user_messages",
+    "assistant_messages",
+    "system_messages",
+    "chat_users",
+    "weight_records",
+    "meal_records",
+)
+
+_cache = MemoryCacheBackend(
+    max_entries=256, default_ttl=fastapi_settings.ADMIN_STATS_CACHE_TTL
+)
+
+
+def _empty_counters() -> Dict[str, int]:
+    return {col: 0 for col in COUNTER_COLUMNS}
+
+
+def _days(start_date: date, end_date: date) -> List[date]:
+    return [
+        start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1)
+    ]
+
+
+def _sealed_before() -> date:
+    """
+    早于该日期的天已经结束，计数不会再变化
+
+    created_at 写入的是 UTC 时间，而统计范围按服务器本地日期划分，取两者较早的一天，
+    避免时区差导致还在写入的日期被提前固化。
+    """
+    return min(date.today(), datetime.utcnow().date())
+
+
+async def _cached(key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+    """按分钟缓存统计结果（键中带上当前分钟）"""
+    bucket = int(time.time() // fastapi_settings.ADMIN_STATS_CACHE_TTL)
+    key = f"{key}:{bucket}"
+    value = await _cache.get(key)
+    if value is not MISSING:
+        increment_counter("admin_stats.cache_hits")
+        return value
+
+    increment_counter("admin_stats.cache_misses")
+    value = await compute()
+    await _cache.set(key, value)
+    return value
+
+
+class AdminAnalyticsService:
+    """管理后台统计服务"""
+
+    @staticmethod
+    async def count_by_day(
+        db: AsyncSession, start_date: date, end_date: date
+    ) -> Dict[date, Dict[str, int]]:
+        """
+        从原始记录统计 [start_date, end_date] 每天的计数（每张表一次 GROUP BY）
+
+        Returns:
+            {日期: {计数列: 数量}}，范围内没有记录的日期也有（全零）
+        """
+        counters = {day: _empty_counters() for day in _days(start_date, end_date)}
+
+        def add(day, column: str, value) -> None:
+            day = to_date(day)
+            if day in counters:
+                counters[day][column] += value or 0
+
+        # 新增用户
+        day_expr = func.date(User.created_at)
+        result = await db.execute(
+            select(day_expr, func.count())
+            .where(between_days(User.created_at, start_date, end_date))
+            .group_by(day_expr)
+        )
+        for day, count in result:
+            add(day, "new_users", count)
+
+        # 聊天消息（按角色计数 + 去重的发消息用户数）
+        day_expr = func.date(ChatHistory.created_at)
+
+        def role_count(role: MessageRole):
+            return func.sum(case((ChatHistory.role == role, 1), else_=0))
+
+        result = await db.execute(
+            select(
+                day_expr,
+                role_count(MessageRole.USER),
+                role_count(MessageRole.ASSISTANT),
+                role_count(MessageRole.SYSTEM),
+                func.count(
+                    func.distinct(
+                        case(
+                            (ChatHistory.role != MessageRole.SYSTEM, ChatHistory.user_id),
+                        )
+                    )
+                ),
+            )
+            .where(between_days(ChatHistory.created_at, start_date, end_date))
+            .group_by(day_expr)
+        )
+        for day, user_count, assistant_count, system_count, chat_users in result:
+            add(day, "user_messages", user_count)
+            add(day, "assistant_messages", assistant_count)
+            add(day, "system_messages", system_count)
+            add(day, "chat_users", chat_users)
+
+        # 体重 / 餐食记录
+        for model, column in (
+            (WeightRecord, "weight_records"),
+            (MealRecord, "meal_records"),
+        ):
+            day_expr = func.date(model.created_at)
+            result = await db.execute(
+                select(day_expr, func.count())
+                .where(between_days(model.created_at, start_date, end_date))
+                .group_by(day_expr)
+            )
+            for day, count in result:
+                add(day, column, count)
+
+        return counters
+
+    @staticmethod
+    async def _save(db: AsyncSession, counters: Dict[date, Dict[str, int]]) -> None:
+        """写入已结束日期的计数行（并发请求写入同一天时保留先写入的行）"""
+        if not counters:
+            return
+        rows = [
+            {"stat_date": day, "updated_at": datetime.utcnow(), **values}
+            for day, values in counters.items()
+        ]
+        dialect = db.bind.dialect.name if db.bind is not None else ""
+
+        try:
+            if dialect in ("sqlite", "postgresql"):
+                if dialect == "sqlite":
+                    from sqlalchemy.dialects.sqlite import insert
+                else:
+                    from sqlalchemy.dialects.postgresql import insert
+
+                await db.execute(
+                    insert(AdminDailyStats)
+                    .values(rows)
+                    .on_conflict_do_nothing(index_elements=["stat_date"])
+                )
+            else:
+                db.add_all(AdminDailyStats(**row) for row in rows)
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()
+        increment_counter("admin_stats.days_sealed", len(rows))
+
+    @staticmethod
+    async def get_daily_counters(
+        db: AsyncSession, start_date: date, end_date: date
+    ) -> Dict[date, Dict[str, int]]:
+        """
+        获取 [start_date, end_date] 每天的计数
+
+        已结束的日期读取计数表，缺失的日期连同今天用一次范围统计补齐，
+        补齐的已结束日期写回计数表。
+        """
+        sealed_before = _sealed_before()
+        result = await db.execute(
+            select(AdminDailyStats).where(
+                and_(
+                    AdminDailyStats.stat_date >= start_date,
+                    AdminDailyStats.stat_date <= end_date,
+                )
+            )
+        )
+        counters = {
+            to_date(row.stat_date): {col: getattr(row, col) for col in COUNTER_COLUMNS}
+            for row in result.scalars()
+        }
+
+        pending = [day for day in _days(start_date, end_date) if day not in counters]
+        if pending:
+            fresh = await AdminAnalyticsService.count_by_day(db, pending[0], end_date)
+            await AdminAnalyticsService._save(
+                db, {day: fresh[day] for day in pending if day < sealed_before}
+            )
+            for day in pending:
+                counters[day] = fresh[day]
+
+        return dict(sorted(counters.items()))
+
+    @staticmethod
+    async def _login_users_by_day(
+        db: AsyncSession, start_date: date, end_date: date
+    ) -> Dict[date, int]:
+        """按最后登录日期统计用户数（last_login 会变化，不写入计数表）"""
+        day_expr = func.date(User.last_login)
+        result = await db.execute(
+            select(day_expr, func.count())
+            .where(between_days(User.last_login, start_date, end_date))
+            .group_by(day_expr)
+        )
+        return {to_date(day): count for day, count in result}
+
+    @staticmethod
+    async def get_activity_series(db: AsyncSession, days: int) -> List[Dict[str, Any]]:
+        """
+        用户活跃度趋势（最近 days 天，每天一项）
+        """
+        end_date = date.today()
+        start_date = end_date - timedelta(days=days - 1)
+
+        async def compute():
+            counters = await AdminAnalyticsService.get_daily_counters(
+                db, start_date, end_date
+            )
+            logins = await AdminAnalyticsService._login_users_by_day(
+                db, start_date, end_date
+            )
+            return [
+                {
+                    "date": day,
+                    "active_users": logins.get(day, 0),
+                    "new_users": values["new_users"],
+                    "chat_messages": values["user_messages"]
+                    + values["assistant_messages"],
+                    "weight_records": values["weight_records"],
+                    "meal_records": values["meal_records"],
+                }
+                for day, values in counters.items()
+            ]
+
+        return await _cached(f"activity:{start_date}:{days}", compute)
+
+    @staticmethod
+    async def get_user_summary(db: AsyncSession) -> Dict[str, Any]:
+        """用户统计摘要（一次条件聚合查询）"""
+
+        async def compute():
+            now = datetime.utcnow()
+            seven_days_ago = now - timedelta(days=7)
+            thirty_days_ago = now - timedelta(days=30)
+            fourteen_days_ago = now - timedelta(days=14)
+            today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+
+            # 7-14天前注册的用户（7日留存的分母）
+            in_cohort = and_(
+                User.created_at >= fourteen_days_ago,
+                User.created_at < seven_days_ago,
+            )
+
+            def count_if(condition):
+                return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+            row = (
+                await db.execute(
+                    select(
+                        func.count(User.id),
+                        count_if(User.is_vip == True),
+                        count_if(User.last_login >= seven_days_ago),
+                        count_if(User.last_login >= thirty_days_ago),
+                        count_if(User.created_at >= today_start),
+                        count_if(User.created_at >= seven_days_ago),
+                        count_if(in_cohort),
+                        count_if(and_(in_cohort, User.last_login >= seven_days_ago)),
+                    )
+                )
+            ).one()
+            (
+                total_users,
+                vip_users,
+                active_users_7d,
+                active_users_30d,
+                new_users_today,
+                new_users_7d,
+                cohort_size,
+                retained_users,
+            ) = row
+
+            retention_rate_7d = (
+                (retained_users / cohort_size * 100) if cohort_size > 0 else 0
+            )
+            return {
+                "total_users": total_users,
+                "active_users_7d": active_users_7d,
+                "active_users_30d": active_users_30d,
+                "vip_users": vip_users,
+                "new_users_today": new_users_today,
+                "new_users_7d": new_users_7d,
+                "avg_records_per_user": {},
+                "retention_rate_7d": round(retention_rate_7d, 2),
+            }
+
+        return await _cached("users", compute)
+
+    @staticmethod
+    async def get_chat_summary(db: AsyncSession, days: int) -> Dict[str, Any]:
+        """聊天统计摘要：按角色计数、消息数前 10 的用户、最近 days 天的每日统计"""
+        end_date = date.today()
+        start_date = end_date - timedelta(days=days - 1)
+
+        async def compute():
+            # 按角色计数（一次 GROUP BY）
+            result = await db.execute(
+                select(ChatHistory.role, func.count()).group_by(ChatHistory.role)
+            )
+            by_role = {role: count for role, count in result}
+
+            today_result = await db.execute(
+                select(func.count(ChatHistory.id)).where(
+                    since_day(ChatHistory.created_at, datetime.utcnow().date())
+                )
+            )
+
+            # 用户消息数排名（前10）
+            user_stats_result = await db.execute(
+                select(
+                    User.id,
+                    User.nickname,
+                    func.count(ChatHistory.id).label("message_count"),
+                )
+                .join(ChatHistory, User.id == ChatHistory.user_id)
+                .where(ChatHistory.role != MessageRole.SYSTEM)
+                .group_by(User.id, User.nickname)
+                .order_by(desc("message_count"))
+                .limit(10)
+            )
+            messages_per_user = {
+                f"{row.nickname}(ID:{row.id})": row.message_count
+                for row in user_stats_result
+            }
+
+            counters = await AdminAnalyticsService.get_daily_counters(
+                db, start_date, end_date
+            )
+            daily_stats = [
+                {
+                    "date": day,
+                    "message_count": values["user_messages"]
+                    + values["assistant_messages"],
+                    "active_users": values["chat_users"],
+                }
+                for day, values in counters.items()
+            ]
+
+            return {
+                "total_messages": sum(by_role.values()),
+                "user_messages": by_role.get(MessageRole.USER, 0),
+                "assistant_messages": by_role.get(MessageRole.ASSISTANT, 0),
+                "system_messages": by_role.get(MessageRole.SYSTEM, 0),
+                "today_messages": today_result.scalar_one(),
+                "messages_per_user": messages_per_user,
+                "daily_stats": daily_stats,
+            }
+
+        return await _cached(f"chat:{start_date}:{days}", compute)
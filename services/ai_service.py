@@ -6,52 +6,27 @@ AI 服务模块
 import httpx
 import json
 import asyncio
-from typing import AsyncGenerator, Optional, List, Dict, Any, Union
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from typing import AsyncGenerator, Optional, List, Dict, Any, Set, Tuple, Union
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
+import numpy as np
 import openai
 from openai.types.chat import ChatCompletionMessageParam
-from functools import wraps
 
+from config.logging_config import get_module_logger
 from config.settings import fastapi_settings
+from services.llm_transport import LLMUnavailableError, llm_transport
 from utils.alert_utils import alert_error, alert_warning, AlertCategory
+from utils.performance import increment_counter
 
+logger = get_module_logger(__name__)
 
-def retry_with_backoff(max_retries: int = 3, base_delay: float = 1.0):
-    """重试装饰器，带指数退避"""
-
-    def decorator(func):
-        @wraps(func)
-        async def wrapper(*args, **kwargs):
-            last_exception = None
-            for attempt in range(max_retries):
-                try:
-                    return await func(*args, **kwargs)
-                except (httpx.HTTPError, httpx.TimeoutException) as e:
-                    last_exception = e
-                    if attempt == max_retries - 1:
-                        break
-
-                    # 指数退避延迟
-                    delay = base_delay * (2**attempt)
-                    logger = args[0].__class__.__module__  # 获取类模块作为logger
-                    print(
-                        f"[{logger}] 第{attempt + 1}次重试失败，等待{delay:.1f}秒后重试: {str(e)}"
-                    )
-                    await asyncio.sleep(delay)
-                except Exception as e:
-                    # 其他异常不重试
-                    raise e
-
-            # 所有重试都失败
-            if last_exception:
-                raise last_exception
-            else:
-                raise Exception("重试失败，未知错误")
-
-        return wrapper
-
-    return decorator
+# 主提供商不可用（熔断/重试耗尽）时切换的备用提供商
+FALLBACK_PROVIDERS = {"qwen": "openai", "openai": "qwen"}
 
 
 @dataclass
@@ -62,6 +37,10 @@ class AIResponse:
     model: str
     usage: Optional[Dict[str, int]] = None
     error: Optional[str] = None
+    # 提供商暂不可用导致的失败（熔断/超时/重试耗尽），可切换备用提供商
+    unavailable: bool = False
+    # 是否来自响应缓存
+    cached: bool = False
 
     def __post_init__(self):
         # 确保content始终是字符串，即使为None也转换为空字符串
@@ -91,6 +70,27 @@ class BaseAIClient(ABC):
         """图像分析（用于餐食识别）"""
         pass
 
+    async def stream_chat_completion(
+        self,
+        messages: List[Dict[str, str]],
+        model: Optional[str] = None,
+        max_tokens: Optional[int] = None,
+        temperature: Optional[float] = None,
+    ) -> AsyncGenerator[str, None]:
+        """
+        流式聊天完成，逐段产出生成的文本
+
+        默认实现退化为一次性返回完整结果；支持流式的客户端覆盖此方法。
+        出错时抛出异常（已产出的内容不会撤回）。
+        """
+        response = await self.chat_completion(
+            messages, model=model, max_tokens=max_tokens, temperature=temperature
+        )
+        if response.error:
+            raise RuntimeError(response.error)
+        if response.content:
+            yield response.content
+
 
 class OpenAIClient(BaseAIClient):
     """OpenAI 客户端"""
@@ -99,14 +99,26 @@ class OpenAIClient(BaseAIClient):
         if not fastapi_settings.OPENAI_API_KEY:
             raise ValueError("未配置 OPENAI_API_KEY")
 
-        self.client = openai.AsyncOpenAI(
-            api_key=fastapi_settings.OPENAI_API_KEY,
-            base_url=fastapi_settings.OPENAI_API_BASE,
-        )
+        self._client: Optional[openai.AsyncOpenAI] = None
+        self._http_client: Optional[httpx.AsyncClient] = None
         self.default_model = fastapi_settings.OPENAI_MODEL
         self.default_max_tokens = fastapi_settings.OPENAI_MAX_TOKENS
         self.default_temperature = fastapi_settings.OPENAI_TEMPERATURE
 
+    @property
+    def client(self) -> openai.AsyncOpenAI:
+        """基于共享连接池的 AsyncOpenAI 客户端（重试由共享传输层负责，SDK 不再重试）"""
+        http_client = llm_transport.http_client("openai")
+        if self._client is None or self._http_client is not http_client:
+            self._client = openai.AsyncOpenAI(
+                api_key=fastapi_settings.OPENAI_API_KEY,
+                base_url=fastapi_settings.OPENAI_API_BASE,
+                http_client=http_client,
+                max_retries=0,
+            )
+            self._http_client = http_client
+        return self._client
+
     async def chat_completion(
         self,
         messages: List[Dict[str, str]],
@@ -140,33 +152,40 @@ class OpenAIClient(BaseAIClient):
 
             if stream:
                 # 流式响应处理
-                response_stream = await self.client.chat.completions.create(
-                    model=model or self.default_model,
-                    messages=openai_messages,
-                    max_tokens=max_tokens or self.default_max_tokens,
-                    temperature=temperature or self.default_temperature,
-                    stream=stream,
-                )
+                async def send(timeout: float) -> str:
+                    response_stream = await self.client.chat.completions.create(
+                        model=model or self.default_model,
+                        messages=openai_messages,
+                        max_tokens=max_tokens or self.default_max_tokens,
+                        temperature=temperature or self.default_temperature,
+                        stream=stream,
+                        timeout=timeout,
+                    )
 
-                # 对于流式响应，我们收集所有内容
-                content_parts = []
-                async for chunk in response_stream:
-                    if chunk.choices[0].delta.content:
-                        content_parts.append(chunk.choices[0].delta.content)
+                    # 对于流式响应，我们收集所有内容
+                    content_parts = []
+                    async for chunk in response_stream:
+                        if chunk.choices[0].delta.content:
+                            content_parts.append(chunk.choices[0].delta.content)
+                    return "".join(content_parts)
 
-                content = "".join(content_parts)
+                content = await llm_transport.request("openai", send)
                 return AIResponse(
                     content=content,
                     model=model or self.default_model,
                 )
             else:
                 # 非流式响应
-                response = await self.client.chat.completions.create(
-                    model=model or self.default_model,
-                    messages=openai_messages,
-                    max_tokens=max_tokens or self.default_max_tokens,
-                    temperature=temperature or self.default_temperature,
-                    stream=stream,
+                response = await llm_transport.request(
+                    "openai",
+                    lambda timeout: self.client.chat.completions.create(
+                        model=model or self.default_model,
+                        messages=openai_messages,
+                        max_tokens=max_tokens or self.default_max_tokens,
+                        temperature=temperature or self.default_temperature,
+                        stream=stream,
+                        timeout=timeout,
+                    ),
                 )
 
                 return AIResponse(
@@ -196,6 +215,7 @@ class OpenAIClient(BaseAIClient):
                 content="",
                 model=model or self.default_model,
                 error=f"OpenAI API 错误: {str(e)}",
+                unavailable=isinstance(e, LLMUnavailableError),
             )
 
     async def vision_analysis(
@@ -214,10 +234,15 @@ class OpenAIClient(BaseAIClient):
                 }  # type: ignore
             ]
 
-            response = await self.client.chat.completions.create(
-                model=model or "gpt-4-vision-preview",
-                messages=messages,
-                max_tokens=1000,
+            response = await llm_transport.request(
+                "openai",
+                lambda timeout: self.client.chat.completions.create(
+                    model=model or "gpt-4-vision-preview",
+                    messages=messages,
+                    max_tokens=1000,
+                    timeout=timeout,
+                ),
+                hedge=False,
             )
 
             return AIResponse(
@@ -241,18 +266,61 @@ class OpenAIClient(BaseAIClient):
                 content="",
                 model=model or "gpt-4-vision-preview",
                 error=f"OpenAI Vision 错误: {str(e)}",
+                unavailable=isinstance(e, LLMUnavailableError),
+            )
+
+
+    async def stream_chat_completion(
+        self,
+        messages: List[Dict[str, str]],
+        model: Optional[str] = None,
+        max_tokens: Optional[int] = None,
+        temperature: Optional[float] = None,
+    ) -> AsyncGenerator[str, None]:
+        """OpenAI 流式聊天完成"""
+
+        async def open_stream(timeout: float) -> AsyncGenerator[str, None]:
+            stream = await self.client.chat.completions.create(
+                model=model or self.default_model,
+                messages=messages,  # type: ignore
+                max_tokens=max_tokens or self.default_max_tokens,
+                temperature=temperature or self.default_temperature,
+                stream=True,
+                timeout=timeout,
+            )
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+
+        try:
+            async for content in llm_transport.stream("openai", open_stream):
+                yield content
+        except Exception as e:
+            alert_error(
+                category=AlertCategory.AI_SERVICE,
+                message="OpenAI 流式API调用失败",
+                details={
+                    "model": model or self.default_model,
+                    "error": str(e),
+                    "endpoint": "chat/completions",
+                    "stream": True,
+                },
+                module="ai_service.OpenAIClient",
             )
+            raise
 
 
 class QwenClient(BaseAIClient):
     """通义千问(Qwen)客户端 - 阿里云 DashScope"""
 
-    def __init__(self):
-        if not fastapi_settings.QWEN_API_KEY:
+    def __init__(
+        self, api_key: Optional[str] = None, api_base: Optional[str] = None
+    ):
+        self.api_key = api_key or fastapi_settings.QWEN_API_KEY
+        if not self.api_key:
             raise ValueError("未配置 QWEN_API_KEY")
 
-        self.api_key = fastapi_settings.QWEN_API_KEY
-        self.api_base = fastapi_settings.QWEN_API_BASE
+        self.api_base = api_base or fastapi_settings.QWEN_API_BASE
         self.default_model = fastapi_settings.QWEN_MODEL
         self.default_max_tokens = fastapi_settings.QWEN_MAX_TOKENS
         self.default_temperature = fastapi_settings.QWEN_TEMPERATURE
@@ -265,9 +333,28 @@ class QwenClient(BaseAIClient):
         # 超时设置（秒）
         self.timeout = 30.0  # 总超时
         self.connect_timeout = 10.0  # 连接超时
-        self.read_timeout = 20.0  # 读取超时
+        self.read_timeout = 20.0  # 读取超时（流式时为两段输出之间的最长间隔）
+
+    def _chat_url(self) -> str:
+        """OpenAI 兼容接口地址"""
+        # 如果base_url已经包含compatible-mode/v1，直接使用
+        if "compatible-mode/v1" in self.api_base:
+            return f"{self.api_base}/chat/completions"
+        # 否则添加compatible-mode/v1路径
+        return f"{self.api_base}/compatible-mode/v1/chat/completions"
+
+    async def _post(self, payload: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+        """发送一次请求（单次尝试，重试/熔断由共享传输层负责）"""
+        client = llm_transport.http_client("qwen")
+        response = await client.post(
+            self._chat_url(),
+            headers=self.headers,
+            json=payload,
+            timeout=min(self.timeout, timeout),
+        )
+        response.raise_for_status()
+        return response.json()
 
-    @retry_with_backoff(max_retries=2, base_delay=1.0)
     async def chat_completion(
         self,
         messages: List[Dict[str, str]],
@@ -278,14 +365,6 @@ class QwenClient(BaseAIClient):
     ) -> AIResponse:
         """Qwen 聊天完成 - 使用OpenAI兼容接口"""
         try:
-            # 使用OpenAI兼容接口
-            # 如果base_url已经包含compatible-mode/v1，直接使用
-            if "compatible-mode/v1" in self.api_base:
-                url = f"{self.api_base}/chat/completions"
-            else:
-                # 否则添加compatible-mode/v1路径
-                url = f"{self.api_base}/compatible-mode/v1/chat/completions"
-
             payload = {
                 "model": model or self.default_model,
                 "messages": messages,
@@ -293,34 +372,23 @@ class QwenClient(BaseAIClient):
                 "temperature": temperature or self.default_temperature,
             }
 
-            async with httpx.AsyncClient(
-                timeout=httpx.Timeout(
-                    connect=self.connect_timeout,
-                    read=self.read_timeout,
-                    write=10.0,
-                    pool=5.0,
+            data = await llm_transport.request(
+                "qwen", lambda timeout: self._post(payload, timeout)
+            )
+
+            if "choices" in data and len(data["choices"]) > 0:
+                choice = data["choices"][0]
+                return AIResponse(
+                    content=choice["message"]["content"],
+                    model=data.get("model", model or self.default_model),
+                    usage=data.get("usage"),
                 )
-            ) as client:
-                response = await client.post(
-                    url, headers=self.headers, json=payload, timeout=self.timeout
+            else:
+                return AIResponse(
+                    content="",
+                    model=model or self.default_model,
+                    error=f"Qwen API 响应格式错误: {data}",
                 )
-                response.raise_for_status()
-
-                data = response.json()
-
-                if "choices" in data and len(data["choices"]) > 0:
-                    choice = data["choices"][0]
-                    return AIResponse(
-                        content=choice["message"]["content"],
-                        model=data.get("model", model or self.default_model),
-                        usage=data.get("usage"),
-                    )
-                else:
-                    return AIResponse(
-                        content="",
-                        model=model or self.default_model,
-                        error=f"Qwen API 响应格式错误: {data}",
-                    )
 
         except httpx.HTTPError as e:
             # 记录Qwen HTTP错误告警
@@ -357,21 +425,15 @@ class QwenClient(BaseAIClient):
                 content="",
                 model=model or self.default_model,
                 error=f"Qwen API 错误: {str(e)}",
+                unavailable=isinstance(e, LLMUnavailableError),
             )
 
-    @retry_with_backoff(max_retries=1, base_delay=2.0)
     async def vision_analysis(
         self, image_url: str, prompt: str, model: Optional[str] = None
     ) -> AIResponse:
         """Qwen 图像分析 - 使用OpenAI兼容接口"""
         try:
-            # 使用OpenAI兼容接口
-            # 如果base_url已经包含compatible-mode/v1，直接使用
-            if "compatible-mode/v1" in self.api_base:
-                url = f"{self.api_base}/chat/completions"
-            else:
-                # 否则添加compatible-mode/v1路径
-                url = f"{self.api_base}/compatible-mode/v1/chat/completions"
+            url = self._chat_url()
 
             # 尝试使用支持视觉的模型，如果未指定则使用默认
             vision_model = model or "qwen-vl-plus"
@@ -404,33 +466,22 @@ class QwenClient(BaseAIClient):
                 f"图片URL类型: {'data URL' if image_url.startswith('data:image') else '普通URL'}"
             )
 
-            async with httpx.AsyncClient(
-                timeout=httpx.Timeout(
-                    connect=self.connect_timeout,
-                    read=self.read_timeout,
-                    write=10.0,
-                    pool=5.0,
+            data = await llm_transport.request(
+                "qwen", lambda timeout: self._post(payload, timeout), hedge=False
+            )
+
+            if "choices" in data and len(data["choices"]) > 0:
+                choice = data["choices"][0]
+                return AIResponse(
+                    content=choice["message"]["content"],
+                    model=data.get("model", vision_model),
                 )
-            ) as client:
-                response = await client.post(
-                    url, headers=self.headers, json=payload, timeout=self.timeout
+            else:
+                return AIResponse(
+                    content="",
+                    model=vision_model,
+                    error=f"Qwen Vision 响应格式错误: {data}",
                 )
-                response.raise_for_status()
-
-                data = response.json()
-
-                if "choices" in data and len(data["choices"]) > 0:
-                    choice = data["choices"][0]
-                    return AIResponse(
-                        content=choice["message"]["content"],
-                        model=data.get("model", vision_model),
-                    )
-                else:
-                    return AIResponse(
-                        content="",
-                        model=vision_model,
-                        error=f"Qwen Vision 响应格式错误: {data}",
-                    )
         except httpx.HTTPError as e:
             # 记录Qwen Vision HTTP错误告警
             error_msg = str(e)
@@ -480,7 +531,363 @@ class QwenClient(BaseAIClient):
                 content="",
                 model=model or "qwen-vl-plus",
                 error=f"Qwen Vision 错误: {error_msg}",
+                unavailable=isinstance(e, LLMUnavailableError),
+            )
+
+
+    async def stream_chat_completion(
+        self,
+        messages: List[Dict[str, str]],
+        model: Optional[str] = None,
+        max_tokens: Optional[int] = None,
+        temperature: Optional[float] = None,
+    ) -> AsyncGenerator[str, None]:
+        """
+        Qwen 流式聊天完成 - OpenAI兼容接口的 SSE 输出
+
+        尚未产出任何内容前的网络错误由共享传输层重试；已开始输出后出错直接抛出，避免重复内容。
+        """
+        payload = {
+            "model": model or self.default_model,
+            "messages": messages,
+            "max_tokens": max_tokens or self.default_max_tokens,
+            "temperature": temperature or self.default_temperature,
+            "stream": True,
+        }
+
+        async def open_stream(budget: float) -> AsyncGenerator[str, None]:
+            timeout = httpx.Timeout(
+                connect=min(self.connect_timeout, budget),
+                read=min(self.read_timeout, budget),
+                write=10.0,
+                pool=5.0,
+            )
+            client = llm_transport.http_client("qwen")
+            async with client.stream(
+                "POST",
+                self._chat_url(),
+                headers=self.headers,
+                json=payload,
+                timeout=timeout,
+            ) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[5:].strip()
+                    # [DONE] 后继续读到响应结束，连接才能放回连接池复用
+                    if data == "[DONE]":
+                        continue
+                    choices = json.loads(data).get("choices") or []
+                    delta = (choices[0].get("delta") or {}) if choices else {}
+                    if delta.get("content"):
+                        yield delta["content"]
+
+        try:
+            async for content in llm_transport.stream("qwen", open_stream):
+                yield content
+        except (httpx.HTTPError, LLMUnavailableError) as e:
+            alert_error(
+                category=AlertCategory.AI_SERVICE,
+                message="Qwen 流式API调用失败",
+                details={
+                    "model": model or self.default_model,
+                    "error": str(e),
+                    "endpoint": "chat/completions",
+                    "provider": "qwen",
+                    "stream": True,
+                },
+                module="ai_service.QwenClient",
             )
+            raise
+
+
+# ============ LLM 响应缓存 ============
+
+
+def _normalize_content(content: Any) -> Any:
+    """文本内容合并连续空白，多模态内容原样保留"""
+    if isinstance(content, str):
+        return " ".join(content.split())
+    return content
+
+
+def _digest(payload: Any) -> str:
+    data = json.dumps(
+        payload, ensure_ascii=False, sort_keys=True, separators=(",", ":")
+    )
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    LLM 响应缓存
+
+    很多调用是结构化输入的确定性函数（日报/周报/月报点评、餐食图片识别、每日建议），
+    同样的输入没必要再请求一次模型：
+    - 精确匹配：按规范化后的 (提供商, 模型, 消息, 参数) 计算 sha256 作为键
+    - 近似匹配（可选）：除最后一条用户消息外都相同时，用嵌入服务比较最后一条消息，
+      余弦相似度不低于阈值即视为命中。只适合措辞不同的同一问题，含具体数值的提示词
+      不要开启
+    - 按 TTL 过期，超过条数上限时淘汰最久未使用的条目
+    - 定期及关闭时写入磁盘（原子替换），重启后加载，避免冷启动
+    """
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        ttl: Optional[float] = None,
+        path: Optional[str] = None,
+        similarity_threshold: Optional[float] = None,
+    ):
+        self.max_entries = max_entries or fastapi_settings.LLM_CACHE_MAX_ENTRIES
+        self.ttl = ttl or fastapi_settings.LLM_CACHE_TTL
+        self.path = fastapi_settings.LLM_CACHE_PATH if path is None else path
+        self.similarity_threshold = (
+            similarity_threshold or fastapi_settings.LLM_CACHE_SIMILARITY
+        )
+        # 键 -> 条目，按访问顺序排列（最久未使用在前）
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        # 近似匹配范围 -> 键集合；键 -> 最后一条用户消息的嵌入向量（按需计算）
+        self._scopes: Dict[str, Set[str]] = {}
+        self._vectors: Dict[str, np.ndarray] = {}
+        self._loaded = False
+        self._dirty = False
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.tokens_saved = 0
+        self.cost_saved = 0.0
+
+    @staticmethod
+    def make_keys(
+        provider: str,
+        model: Optional[str],
+        messages: List[Dict[str, Any]],
+        params: Dict[str, Any],
+    ) -> Tuple[str, str, str]:
+        """
+        计算缓存键
+
+        Returns:
+            (精确匹配键, 近似匹配范围, 最后一条用户消息文本)
+        """
+        normalized = [
+            {
+                "role": message.get("role", "user"),
+                "content": _normalize_content(message.get("content")),
+            }
+            for message in messages
+        ]
+        base = {
+            "provider": provider,
+            "model": model,
+            "params": {k: v for k, v in params.items() if v is not None},
+        }
+        key = _digest({**base, "messages": normalized})
+
+        last = normalized[-1] if normalized else {}
+        text = last.get("content") if last.get("role") == "user" else None
+        if not isinstance(text, str):
+            return key, "", ""
+        scope = _digest({**base, "messages": normalized[:-1]})
+        return key, scope, text
+
+    # ============ 查询 / 写入 ============
+
+    async def lookup(
+        self, key: str, scope: str = "", text: str = "", semantic: bool = False
+    ) -> Optional[AIResponse]:
+        """查询缓存，semantic=True 时精确未命中再做近似匹配"""
+        self._ensure_loaded()
+        now = time.time()
+        entry = self._entries.get(key)
+        if entry is not None and entry["expires_at"] <= now:
+            self._remove(key)
+            entry = None
+
+        if entry is None and semantic and scope and text:
+            key = await self._nearest(scope, text, now)
+            entry = self._entries.get(key) if key else None
+            if entry is not None:
+                self.semantic_hits += 1
+
+        if entry is None:
+            self.misses += 1
+            increment_counter("llm_cache.misses")
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        increment_counter("llm_cache.hits")
+        tokens = (entry.get("usage") or {}).get("total_tokens") or 0
+        self.tokens_saved += tokens
+        price = fastapi_settings.LLM_TOKEN_PRICES.get(entry["provider"], 0.0)
+        self.cost_saved += tokens / 1000 * price
+        return AIResponse(
+            content=entry["content"],
+            model=entry["model"],
+            usage=entry.get("usage"),
+            cached=True,
+        )
+
+    async def store(
+        self,
+        key: str,
+        provider: str,
+        response: AIResponse,
+        ttl: Optional[float] = None,
+        scope: str = "",
+        text: str = "",
+    ) -> None:
+        """缓存成功的响应（出错或内容为空时不缓存）"""
+        if response.error or not response.content:
+            return
+        self._ensure_loaded()
+        self._remove(key)
+        now = time.time()
+        self._entries[key] = {
+            "provider": provider,
+            "model": response.model,
+            "content": response.content,
+            "usage": response.usage,
+            "expires_at": now + min(ttl or self.ttl, self.ttl),
+            "scope": scope,
+            "text": text,
+        }
+        if scope:
+            self._scopes.setdefault(scope, set()).add(key)
+        self._dirty = True
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._scopes.clear()
+        self._vectors.clear()
+        self._dirty = True
+
+    def stats(self) -> Dict[str, Any]:
+        """命中率与节省的 token / 费用"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "tokens_saved": self.tokens_saved,
+            "cost_saved_usd": round(self.cost_saved, 4),
+        }
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        self._vectors.pop(key, None)
+        if entry and entry.get("scope"):
+            keys = self._scopes.get(entry["scope"])
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._scopes[entry["scope"]]
+
+    # ============ 近似匹配 ============
+
+    async def _embed(self, text: str) -> np.ndarray:
+        from services.vectorstore.embedding import (
+            SimpleEmbedding,
+            get_embedding_service,
+        )
+
+        service = get_embedding_service()
+        if isinstance(service, SimpleEmbedding):
+            return service.embed_array(text)
+        # 远程嵌入接口是同步调用，放到线程中执行
+        vector = np.asarray(await asyncio.to_thread(service.embed, text), np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    async def _nearest(self, scope: str, text: str, now: float) -> Optional[str]:
+        keys = [
+            key
+            for key in self._scopes.get(scope, ())
+            if self._entries[key]["expires_at"] > now
+        ]
+        if not keys:
+            return None
+        query = await self._embed(text)
+        best_key, best_score = None, self.similarity_threshold
+        for key in keys:
+            vector = self._vectors.get(key)
+            if vector is None:
+                vector = self._vectors[key] = await self._embed(
+                    self._entries[key]["text"]
+                )
+            score = float(np.dot(query, vector))
+            if score >= best_score:
+                best_key, best_score = key, score
+        return best_key
+
+    # ============ 持久化 ============
+
+    def _ensure_loaded(self) -> None:
+        if not self._loaded:
+            self.load()
+
+    def load(self) -> int:
+        """从磁盘加载未过期的条目，返回加载条数"""
+        self._loaded = True
+        if not self.path or not os.path.exists(self.path):
+            return 0
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning("LLM 响应缓存加载失败: %s", e)
+            return 0
+
+        now = time.time()
+        loaded = 0
+        for key, entry in data.get("entries", []):
+            if entry.get("expires_at", 0) <= now or key in self._entries:
+                continue
+            self._entries[key] = entry
+            if entry.get("scope"):
+                self._scopes.setdefault(entry["scope"], set()).add(key)
+            loaded += 1
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+        return loaded
+
+    async def flush(self) -> bool:
+        """有变化时写入磁盘（在线程中写文件，不阻塞事件循环），返回是否写入"""
+        if not self.path or not self._dirty:
+            return False
+        now = time.time()
+        snapshot = [
+            [key, entry]
+            for key, entry in self._entries.items()
+            if entry["expires_at"] > now
+        ]
+        self._dirty = False
+        try:
+            await asyncio.to_thread(self._write, snapshot)
+        except OSError as e:
+            self._dirty = True
+            logger.warning("LLM 响应缓存写入失败: %s", e)
+            return False
+        return True
+
+    def _write(self, snapshot: List[List[Any]]) -> None:
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "entries": snapshot}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+
+# 全局 LLM 响应缓存
+llm_cache = LLMResponseCache()
 
 
 class AIService:
@@ -494,47 +901,170 @@ class AIService:
             provider: 模型提供商，'openai' 或 'qwen'，默认从配置读取
         """
         self.provider = provider or fastapi_settings.DEFAULT_AI_PROVIDER
-        self._client: Optional[BaseAIClient] = None
+        self._clients: Dict[str, BaseAIClient] = {}
 
-    def _get_client(self) -> BaseAIClient:
+    def _get_client(self, provider: Optional[str] = None) -> BaseAIClient:
         """获取或创建客户端"""
-        if self._client is None:
-            if self.provider == "openai":
-                self._client = OpenAIClient()
-            elif self.provider == "qwen":
-                self._client = QwenClient()
+        provider = provider or self.provider
+        if provider not in self._clients:
+            if provider == "openai":
+                self._clients[provider] = OpenAIClient()
+            elif provider == "qwen":
+                self._clients[provider] = QwenClient()
             else:
-                raise ValueError(f"不支持的 AI 提供商: {self.provider}")
-        return self._client
+                raise ValueError(f"不支持的 AI 提供商: {provider}")
+        return self._clients[provider]
+
+    def _providers(self) -> List[str]:
+        """
+        按尝试顺序返回提供商：主提供商 + 已配置密钥的备用提供商
+
+        主提供商熔断中而备用提供商可用时，直接先用备用提供商。
+        """
+        providers = [self.provider]
+        fallback = FALLBACK_PROVIDERS.get(self.provider)
+        fallback_key = {
+            "openai": fastapi_settings.OPENAI_API_KEY,
+            "qwen": fastapi_settings.QWEN_API_KEY,
+        }.get(fallback)
+        if fallback and fallback_key:
+            providers.append(fallback)
+            if not llm_transport.available(self.provider) and llm_transport.available(
+                fallback
+            ):
+                providers.reverse()
+        return providers
+
+    async def _call_with_fallback(self, method: str, *args, **kwargs) -> AIResponse:
+        """依次尝试各提供商，只有 "提供商不可用" 的失败才切换"""
+        response = None
+        for index, provider in enumerate(self._providers()):
+            if index:
+                # 模型名称只对指定的提供商有效，切换后使用备用提供商的默认模型
+                kwargs.pop("model", None)
+                increment_counter("llm.fallback")
+            response = await getattr(self._get_client(provider), method)(
+                *args, **kwargs
+            )
+            if not response.unavailable:
+                break
+        return response
 
-    async def chat(self, messages: List[Dict[str, str]], **kwargs) -> AIResponse:
+    async def _cached_call(
+        self,
+        method: str,
+        key_messages: List[Dict[str, Any]],
+        args: tuple,
+        kwargs: Dict[str, Any],
+        cache: Optional[str],
+        cache_ttl: Optional[float],
+    ) -> AIResponse:
+        """
+        经响应缓存调用
+
+        cache: None 不使用缓存；"exact" 精确匹配；"semantic" 精确 + 近似匹配；
+        "refresh" 跳过查询但写入新结果（用户主动刷新时）
+        """
+        if cache is None or not fastapi_settings.LLM_CACHE_ENABLED:
+            return await self._call_with_fallback(method, *args, **kwargs)
+
+        client = self._get_client()
+        model = kwargs.get("model") or getattr(client, "default_model", None)
+        params = {k: v for k, v in kwargs.items() if k != "model"}
+        params["method"] = method
+        key, scope, text = llm_cache.make_keys(
+            self.provider, model, key_messages, params
+        )
+        if cache != "refresh":
+            cached = await llm_cache.lookup(
+                key, scope, text, semantic=cache == "semantic"
+            )
+            if cached is not None:
+                return cached
+
+        response = await self._call_with_fallback(method, *args, **kwargs)
+        await llm_cache.store(key, self.provider, response, cache_ttl, scope, text)
+        return response
+
+    async def chat(
+        self,
+        messages: List[Dict[str, str]],
+        cache: Optional[str] = None,
+        cache_ttl: Optional[float] = None,
+        **kwargs,
+    ) -> AIResponse:
         """
         通用聊天接口
 
         Args:
             messages: 消息列表，格式 [{"role": "user", "content": "..."}]
+            cache: 响应缓存模式（None/"exact"/"semantic"/"refresh"），
+                只对结构化输入的确定性调用开启，对话不要开启
+            cache_ttl: 缓存时间（秒），不超过 LLM_CACHE_TTL
             **kwargs: 其他参数（max_tokens, temperature 等）
 
         Returns:
             AIResponse 对象
         """
-        client = self._get_client()
-        return await client.chat_completion(messages, **kwargs)
+        return await self._cached_call(
+            "chat_completion", messages, (messages,), kwargs, cache, cache_ttl
+        )
 
-    async def analyze_image(self, image_url: str, prompt: str, **kwargs) -> AIResponse:
+    async def stream_chat(
+        self, messages: List[Dict[str, str]], **kwargs
+    ) -> AsyncGenerator[str, None]:
+        """
+        流式聊天接口，逐段产出生成的文本
+
+        Args:
+            messages: 消息列表，格式 [{"role": "user", "content": "..."}]
+            **kwargs: 其他参数（max_tokens, temperature 等）
+        """
+        providers = self._providers()
+        for index, provider in enumerate(providers):
+            if index:
+                kwargs.pop("model", None)
+                increment_counter("llm.fallback")
+            client = self._get_client(provider)
+            try:
+                async for chunk in client.stream_chat_completion(messages, **kwargs):
+                    yield chunk
+                return
+            except LLMUnavailableError:
+                # 尚未输出任何内容（已输出后的错误不会包装为 LLMUnavailableError）
+                if index == len(providers) - 1:
+                    raise
+
+    async def analyze_image(
+        self,
+        image_url: str,
+        prompt: str,
+        cache: Optional[str] = None,
+        cache_ttl: Optional[float] = None,
+        **kwargs,
+    ) -> AIResponse:
         """
         图像分析接口（用于餐食识别）
 
         Args:
-            image_url: 图片 URL
+            image_url: 图片 URL（或 base64 data URL）
             prompt: 分析提示词
+            cache: 响应缓存模式，同 chat（近似匹配对图片无效）
+            cache_ttl: 缓存时间（秒）
             **kwargs: 其他参数
 
         Returns:
             AIResponse 对象
         """
-        client = self._get_client()
-        return await client.vision_analysis(image_url, prompt, **kwargs)
+        key_messages = [{"role": "user", "content": [prompt, image_url]}]
+        return await self._cached_call(
+            "vision_analysis",
+            key_messages,
+            (image_url, prompt),
+            kwargs,
+            cache,
+            cache_ttl,
+        )
 
     async def analyze_meal(self, image_url: str) -> Dict[str, Any]:
         """
@@ -561,7 +1091,8 @@ class AIService:
 2. 热量估算是大概值，仅供参考
 3. 如果是中餐，请尽量使用中文菜名"""
 
-        response = await self.analyze_image(image_url, prompt)
+        # 同一张图片的识别结果直接复用
+        response = await self.analyze_image(image_url, prompt, cache="exact")
 
         if response.error:
             # 记录餐食分析失败告警
@@ -610,7 +1141,7 @@ class AIService:
 
         Args:
             prompt: 提示词
-            **kwargs: 其他参数（max_tokens, temperature 等）
+            **kwargs: 其他参数（max_tokens, temperature, cache 等）
 
         Returns:
             生成的文本内容
@@ -664,6 +1195,4 @@ async def test_ai():
 
 
 if __name__ == "__main__":
-    import asyncio
-
     asyncio.run(test_ai())
@@ -0,0 +1,183 @@
+"""
+访问令牌认证服务
+
+小程序令牌是 sha256(user_id:SECRET_KEY) 的前 32 位，不包含用户ID，
+原先认证时要遍历 users 表逐个计算哈希比对，耗时随用户数线性增长。
+
+这里改为：
+1. 令牌索引表 auth_tokens（令牌哈希 -> 用户ID）：登录时写入，首次上线时为存量用户回填，
+   认证时按主键查找
+2. 已验证令牌缓存 principal_cache（有界 LRU + TTL）：命中时不访问索引表，
+   由 get_current_user 与 auth_v2.get_current_user_v2 共用
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config.logging_config import get_module_logger
+from config.settings import fastapi_settings
+from models.database import AuthToken, User
+
+logger = get_module_logger(__name__)
+
+# 回填存量用户时每批处理的用户数
+BACKFILL_BATCH_SIZE = 5000
+
+
+class PrincipalCache:
+    """已验证令牌缓存：令牌哈希 -> (过期时间, 用户ID, 令牌类型)"""
+
+    def __init__(self, max_entries: Optional[int] = None, ttl: Optional[float] = None):
+        self.max_entries = max_entries or fastapi_settings.AUTH_CACHE_MAX_ENTRIES
+        self.ttl = ttl if ttl is not None else fastapi_settings.AUTH_CACHE_TTL
+        self._entries: "OrderedDict[str, Tuple[float, int, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token_hash: str) -> Optional[Tuple[int, str]]:
+        """返回 (用户ID, 令牌类型)，未命中或已过期返回 None"""
+        with self._lock:
+            entry = self._entries.get(token_hash)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[token_hash]
+                return None
+            self._entries.move_to_end(token_hash)
+            return entry[1], entry[2]
+
+    def set(
+        self,
+        token_hash: str,
+        user_id: int,
+        token_type: str,
+        ttl: Optional[float] = None,
+    ) -> None:
+        """写入已验证令牌；ttl 不超过默认 TTL（JWT 按剩余有效期缩短）"""
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[token_hash] = (time.monotonic() + ttl, user_id, token_type)
+            self._entries.move_to_end(token_hash)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_user(self, user_id: int) -> int:
+        """移除某个用户的所有缓存令牌（用户被删除/权限变化时调用）"""
+        with self._lock:
+            keys = [key for key, entry in self._entries.items() if entry[1] == user_id]
+            for key in keys:
+                del self._entries[key]
+        return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+principal_cache = PrincipalCache()
+
+
+class AuthTokenService:
+    """令牌索引服务"""
+
+    @staticmethod
+    def hash_token(token: str) -> str:
+        """令牌哈希（索引表与缓存的键，避免明文令牌落库）"""
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    @staticmethod
+    def generate_token(user_id: int) -> str:
+        """生成小程序访问令牌（确定性，同一用户始终相同，保持与已发放令牌兼容）"""
+        data = f"{user_id}:{fastapi_settings.SECRET_KEY}"
+        return hashlib.sha256(data.encode()).hexdigest()[:32]
+
+    @staticmethod
+    async def register_token(db: AsyncSession, user_id: int, token: str) -> None:
+        """登录发放令牌时写入索引（已存在则跳过）"""
+        token_hash = AuthTokenService.hash_token(token)
+        existing = await db.get(AuthToken, token_hash)
+        if existing is None:
+            db.add(AuthToken(token_hash=token_hash, user_id=user_id))
+            await db.commit()
+
+    @staticmethod
+    async def resolve_user_id(db: AsyncSession, token: str) -> Optional[int]:
+        """
+        把小程序令牌解析为用户ID（先查缓存，再按主键查索引表）
+
+        Returns:
+            用户ID；令牌无效时返回 None
+        """
+        token_hash = AuthTokenService.hash_token(token)
+        cached = principal_cache.get(token_hash)
+        if cached is not None and cached[1] == "legacy":
+            return cached[0]
+
+        result = await db.execute(
+            select(AuthToken.user_id).where(AuthToken.token_hash == token_hash)
+        )
+        user_id = result.scalar_one_or_none()
+        if user_id is not None:
+            principal_cache.set(token_hash, user_id, "legacy")
+        return user_id
+
+    @staticmethod
+    async def revoke_user(db: AsyncSession, user_id: int) -> None:
+        """撤销用户的所有令牌"""
+        await db.execute(delete(AuthToken).where(AuthToken.user_id == user_id))
+        await db.commit()
+        principal_cache.invalidate_user(user_id)
+
+    @staticmethod
+    def _token_rows(user_ids: Iterable[int]) -> List[Dict]:
+        return [
+            {
+                "token_hash": AuthTokenService.hash_token(
+                    AuthTokenService.generate_token(user_id)
+                ),
+                "user_id": user_id,
+            }
+            for user_id in user_ids
+        ]
+
+    @staticmethod
+    async def rebuild(db: AsyncSession) -> int:
+        """为所有用户重建令牌索引（按用户ID分批），返回写入行数"""
+        await db.execute(delete(AuthToken))
+        written = 0
+        last_id = 0
+        while True:
+            result = await db.execute(
+                select(User.id)
+                .where(User.id > last_id)
+                .order_by(User.id)
+                .limit(BACKFILL_BATCH_SIZE)
+            )
+            user_ids = result.scalars().all()
+            if not user_ids:
+                break
+            await db.execute(insert(AuthToken), AuthTokenService._token_rows(user_ids))
+            written += len(user_ids)
+            last_id = user_ids[-1]
+        await db.commit()
+        principal_cache.clear()
+        logger.info("令牌索引重建完成: %d 个用户", written)
+        return written
+
+    @staticmethod
+    async def backfill_if_empty(db: AsyncSession) -> int:
+        """索引表为空时为存量用户回填（首次上线时自动执行）"""
+        result = await db.execute(select(func.count()).select_from(AuthToken))
+        if result.scalar():
+            return 0
+        return await AuthTokenService.rebuild(db)
@@ -6,11 +6,13 @@
 from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime, date, timedelta
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, and_, cast, Date
+from sqlalchemy import select, func, and_, or_, cast, Date
 import numpy as np
 
 from models.database import MealRecord, ExerciseRecord, UserProfile
 from services.calorie_calculator import CalorieCalculator
+from services.daily_activity_service import DailyActivityService
+from utils.query_helpers import between_days
 
 
 class CalorieBalanceService:
@@ -51,36 +53,11 @@ class CalorieBalanceService:
         if profile:
             print(f"DEBUG: User {user_id} BMR value: {profile.bmr}, type: {type(profile.bmr)}")
         
-        # 获取每日摄入热量（餐食记录）
-        intake_query = select(
-            func.date(MealRecord.record_time).label("record_date"),
-            func.sum(MealRecord.total_calories).label("total_calories")
-        ).where(
-            and_(
-                MealRecord.user_id == user_id,
-                func.date(MealRecord.record_time) >= start_date,
-                func.date(MealRecord.record_time) <= end_date
-            )
-        ).group_by(func.date(MealRecord.record_time))
-        
-        intake_result = await db.execute(intake_query)
-        intake_data = {row.record_date: row.total_calories for row in intake_result}
-        
-        # 获取每日消耗热量（运动记录）
-        # 优先使用checkin_date字段（运动打卡专用），其次使用record_time
-        exercise_query = select(
-            func.coalesce(ExerciseRecord.checkin_date, func.date(ExerciseRecord.record_time)).label("record_date"),
-            func.sum(ExerciseRecord.calories_burned).label("calories_burned")
-        ).where(
-            and_(
-                ExerciseRecord.user_id == user_id,
-                func.coalesce(ExerciseRecord.checkin_date, func.date(ExerciseRecord.record_time)) >= start_date,
-                func.coalesce(ExerciseRecord.checkin_date, func.date(ExerciseRecord.record_time)) <= end_date
-            )
-        ).group_by(func.coalesce(ExerciseRecord.checkin_date, func.date(ExerciseRecord.record_time)))
-        
-        exercise_result = await db.execute(exercise_query)
-        exercise_data = {row.record_date: row.calories_burned for row in exercise_result}
+        # 获取每日摄入/消耗热量（每日活动汇总，每天一行）
+        # 运动消耗已按 checkin_date 优先、record_time 其次归入日期
+        activity = await DailyActivityService.get_range(user_id, db, start_date, end_date)
+        intake_data = {day: row.calories_in for day, row in activity.items()}
+        exercise_data = {day: row.calories_burned for day, row in activity.items()}
         
         # 构建每日数据
         daily_data = []
@@ -369,8 +346,7 @@ class CalorieBalanceService:
         ).where(
             and_(
                 MealRecord.user_id == user_id,
-                func.date(MealRecord.record_time) >= start_date,
-                func.date(MealRecord.record_time) <= end_date
+                between_days(MealRecord.record_time, start_date, end_date)
             )
         ).group_by(MealRecord.meal_type)
         
@@ -387,6 +363,11 @@ class CalorieBalanceService:
         ).where(
             and_(
                 ExerciseRecord.user_id == user_id,
+                # 先用可走索引的范围条件缩小扫描，再按 checkin_date 优先的日期精确过滤
+                or_(
+                    between_days(ExerciseRecord.record_time, start_date, end_date),
+                    ExerciseRecord.checkin_date.between(start_date, end_date),
+                ),
                 func.coalesce(ExerciseRecord.checkin_date, func.date(ExerciseRecord.record_time)) >= start_date,
                 func.coalesce(ExerciseRecord.checkin_date, func.date(ExerciseRecord.record_time)) <= end_date
             )
@@ -3,7 +3,7 @@
 为仪表盘提供趋势可视化数据
 """
 
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Awaitable, Callable, Dict, List, Any, Optional, Tuple
 from datetime import datetime, date, timedelta
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, and_, extract
@@ -11,13 +11,12 @@ import json
 
 from models.database import (
     WeightRecord,
-    MealRecord,
-    ExerciseRecord,
-    WaterRecord,
     SleepRecord,
     HabitCompletion,
 )
 from config.logging_config import get_module_logger
+from services.daily_activity_service import DailyActivityService
+from utils.result_cache import result_cache
 
 logger = get_module_logger(__name__)
 
@@ -139,25 +138,11 @@ class ChartService:
             # 获取每日热量数据
             daily_calories = {}
 
-            # 查询每日总热量
-            result = await db.execute(
-                select(
-                    func.date(MealRecord.record_time).label("date"),
-                    func.sum(MealRecord.total_calories).label("total_calories"),
-                )
-                .where(
-                    and_(
-                        MealRecord.user_id == user_id,
-                        MealRecord.record_time >= start_date,
-                        MealRecord.record_time <= end_date + timedelta(days=1),
-                    )
-                )
-                .group_by(func.date(MealRecord.record_time))
-                .order_by(func.date(MealRecord.record_time).asc())
+            # 查询每日总热量（每日活动汇总，每天一行）
+            activity = await DailyActivityService.get_range(
+                user_id, db, start_date, end_date
             )
 
-            records = result.all()
-
             # 填充日期范围
             current_date = start_date
             while current_date <= end_date:
@@ -166,9 +151,8 @@ class ChartService:
                 current_date += timedelta(days=1)
 
             # 填充实际数据
-            for record in records:
-                date_str = record.date.isoformat()
-                daily_calories[date_str] = float(record.total_calories or 0)
+            for record_date, row in activity.items():
+                daily_calories[record_date.isoformat()] = float(row.calories_in or 0)
 
             # 准备图表数据
             dates = sorted(daily_calories.keys())
@@ -252,26 +236,11 @@ class ChartService:
             # 获取每日运动数据
             daily_exercise = {}
 
-            # 查询每日运动时长和消耗
-            result = await db.execute(
-                select(
-                    func.date(ExerciseRecord.record_time).label("date"),
-                    func.sum(ExerciseRecord.duration_minutes).label("total_duration"),
-                    func.sum(ExerciseRecord.calories_burned).label("total_calories"),
-                )
-                .where(
-                    and_(
-                        ExerciseRecord.user_id == user_id,
-                        ExerciseRecord.record_time >= start_date,
-                        ExerciseRecord.record_time <= end_date + timedelta(days=1),
-                    )
-                )
-                .group_by(func.date(ExerciseRecord.record_time))
-                .order_by(func.date(ExerciseRecord.record_time).asc())
+            # 查询每日运动时长和消耗（每日活动汇总，每天一行）
+            activity = await DailyActivityService.get_range(
+                user_id, db, start_date, end_date
             )
 
-            records = result.all()
-
             # 填充日期范围
             current_date = start_date
             while current_date <= end_date:
@@ -280,11 +249,10 @@ class ChartService:
                 current_date += timedelta(days=1)
 
             # 填充实际数据
-            for record in records:
-                date_str = record.date.isoformat()
-                daily_exercise[date_str] = {
-                    "duration": float(record.total_duration or 0),
-                    "calories": float(record.total_calories or 0),
+            for record_date, row in activity.items():
+                daily_exercise[record_date.isoformat()] = {
+                    "duration": float(row.exercise_minutes or 0),
+                    "calories": float(row.calories_burned or 0),
                 }
 
             # 准备图表数据
@@ -369,25 +337,11 @@ class ChartService:
             # 获取每日饮水数据
             daily_water = {}
 
-            # 查询每日饮水量
-            result = await db.execute(
-                select(
-                    func.date(WaterRecord.record_time).label("date"),
-                    func.sum(WaterRecord.amount_ml).label("total_water"),
-                )
-                .where(
-                    and_(
-                        WaterRecord.user_id == user_id,
-                        WaterRecord.record_time >= start_date,
-                        WaterRecord.record_time <= end_date + timedelta(days=1),
-                    )
-                )
-                .group_by(func.date(WaterRecord.record_time))
-                .order_by(func.date(WaterRecord.record_time).asc())
+            # 查询每日饮水量（每日活动汇总，每天一行）
+            activity = await DailyActivityService.get_range(
+                user_id, db, start_date, end_date
             )
 
-            records = result.all()
-
             # 填充日期范围
             current_date = start_date
             while current_date <= end_date:
@@ -396,9 +350,8 @@ class ChartService:
                 current_date += timedelta(days=1)
 
             # 填充实际数据
-            for record in records:
-                date_str = record.date.isoformat()
-                daily_water[date_str] = float(record.total_water or 0)
+            for record_date, row in activity.items():
+                daily_water[record_date.isoformat()] = float(row.water_ml or 0)
 
             # 准备图表数据
             dates = sorted(daily_water.keys())
@@ -895,46 +848,51 @@ class ChartService:
         except Exception:
             return 50.0
 
+    @staticmethod
+    def get_chart_builders() -> Dict[
+        str, Callable[[int, AsyncSession], Awaitable[Dict[str, Any]]]
+    ]:
+        """图表键 -> 构建函数（仪表盘按此并发构建各图表）"""
+        return {
+            "weight_trend": lambda user_id, db: ChartService.get_weight_trend_chart(
+                user_id, 30, db
+            ),
+            "calorie_trend": lambda user_id, db: ChartService.get_calorie_trend_chart(
+                user_id, 7, db
+            ),
+            "exercise_trend": lambda user_id, db: ChartService.get_exercise_trend_chart(
+                user_id, 14, db
+            ),
+            "water_trend": lambda user_id, db: ChartService.get_water_trend_chart(
+                user_id, 7, db
+            ),
+            "habit_completion": lambda user_id, db: ChartService.get_habit_completion_chart(
+                user_id, 30, db
+            ),
+            "achievement_progress": lambda user_id, db: ChartService.get_achievement_progress_chart(
+                user_id, db
+            ),
+            "weekly_summary": lambda user_id, db: ChartService.get_weekly_summary_chart(
+                user_id, db
+            ),
+        }
+
     @staticmethod
     async def get_all_charts(user_id: int, db: AsyncSession = None) -> Dict[str, Any]:
         """获取所有图表数据"""
         try:
             charts = {}
 
-            # 获取所有图表数据
-            weight_chart = await ChartService.get_weight_trend_chart(user_id, 30, db)
-            calorie_chart = await ChartService.get_calorie_trend_chart(user_id, 7, db)
-            exercise_chart = await ChartService.get_exercise_trend_chart(
-                user_id, 14, db
-            )
-            water_chart = await ChartService.get_water_trend_chart(user_id, 7, db)
-            habit_chart = await ChartService.get_habit_completion_chart(user_id, 30, db)
-            achievement_chart = await ChartService.get_achievement_progress_chart(
-                user_id, db
-            )
-            weekly_chart = await ChartService.get_weekly_summary_chart(user_id, db)
-
-            # 只添加成功的图表
-            if weight_chart.get("success"):
-                charts["weight_trend"] = weight_chart["data"]
-
-            if calorie_chart.get("success"):
-                charts["calorie_trend"] = calorie_chart["data"]
-
-            if exercise_chart.get("success"):
-                charts["exercise_trend"] = exercise_chart["data"]
-
-            if water_chart.get("success"):
-                charts["water_trend"] = water_chart["data"]
-
-            if habit_chart.get("success"):
-                charts["habit_completion"] = habit_chart["data"]
-
-            if achievement_chart.get("success"):
-                charts["achievement_progress"] = achievement_chart["data"]
-
-            if weekly_chart.get("success"):
-                charts["weekly_summary"] = weekly_chart["data"]
+            # 获取所有图表数据（按用户数据版本缓存），只添加成功的图表
+            for key, build in ChartService.get_chart_builders().items():
+                chart = await result_cache.get_or_compute(
+                    user_id,
+                    f"charts.{key}",
+                    lambda build=build: build(user_id, db),
+                    cacheable=lambda chart: bool(chart.get("success")),
+                )
+                if chart.get("success"):
+                    charts[key] = chart["data"]
 
             return {
                 "success": True,
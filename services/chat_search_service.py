@@ -0,0 +1,443 @@
+"""
+聊天记录全文检索
+
+原来的后台搜索用 content ILIKE '%关键词%'，每次都要扫描整张 chat_history。
+这里为消息内容维护一份全文索引：
+- 分词在 Python 中完成：连续的中日韩文字切成相邻二字组（单字保留原样），
+  英文/数字按单词小写，分词结果以空格分隔写入索引
+- SQLite 使用 FTS5（unicode61 分词器按空格切分已分好的词），bm25 排序；
+  PostgreSQL 使用 tsvector + GIN 索引，ts_rank 排序；其他数据库退回 ILIKE
+- 通过 ChatHistory 的 ORM 写入事件与消息在同一事务内同步（各处写入消息的代码都经过 ORM），
+  启动后在后台补建索引表并为尚未索引的消息补录
+
+查询的每个词转换为短语（中文为相邻二字组组成的短语，英文为前缀匹配），
+多个词之间为 AND。只有一个汉字的词无法用二字组匹配，退回 ILIKE。
+"""
+
+import re
+import weakref
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import Float, Integer, and_, event, inspect, literal, or_, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from models.database import ChatHistory, MessageRole
+from utils.performance import increment_counter
+from config.logging_config import get_module_logger
+
+logger = get_module_logger(__name__)
+
+BACKFILL_BATCH_SIZE = 5000
+SNIPPET_CHARS = 60
+HIGHLIGHT_MARK = "**"
+
+# 中日韩文字：假名、汉字（含扩展A、兼容汉字）、韩文音节
+_CJK = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af"
+TOKEN_RE = re.compile(f"[{_CJK}]+|[0-9A-Za-z\u00c0-\u024f]+")
+CJK_RE = re.compile(f"[{_CJK}]")
+
+
+def tokenize(text_value: Optional[str]) -> List[str]:
+    """将消息内容切分为索引词（中文二字组、英文小写单词）"""
+    tokens: List[str] = []
+    for run in TOKEN_RE.findall(text_value or ""):
+        if CJK_RE.match(run):
+            if len(run) == 1:
+                tokens.append(run)
+            else:
+                tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            tokens.append(run.lower())
+    return tokens
+
+
+@dataclass
+class QueryTerm:
+    """查询中的一个词"""
+
+    text: str
+    tokens: List[str]
+    prefix: bool  # 英文词按前缀匹配
+
+    @property
+    def indexable(self) -> bool:
+        # 单个汉字没有对应的二字组
+        return self.prefix or len(self.text) > 1
+
+
+def parse_query(query: str) -> List[QueryTerm]:
+    """把搜索关键词拆成若干个词（每个词转换为一个短语）"""
+    terms = []
+    for run in TOKEN_RE.findall(query or ""):
+        terms.append(
+            QueryTerm(text=run, tokens=tokenize(run), prefix=not CJK_RE.match(run))
+        )
+    return terms
+
+
+class SearchBackend(ABC):
+    """全文索引后端接口"""
+
+    @abstractmethod
+    def create_statements(self) -> List[str]:
+        """创建索引表的 DDL"""
+        pass
+
+    @abstractmethod
+    def upsert(self, connection, message_id: int, content: Optional[str]) -> None:
+        """写入（或覆盖）一条消息的索引"""
+        pass
+
+    def delete(self, connection, message_id: int) -> None:
+        """删除一条消息的索引"""
+        connection.execute(
+            text("DELETE FROM chat_search WHERE rowid = :id"), {"id": message_id}
+        )
+
+    @abstractmethod
+    def build_query(self, terms: List[QueryTerm]) -> str:
+        """把查询词转换为后端的查询语法"""
+        pass
+
+    @abstractmethod
+    def match(self, match_query: str):
+        """匹配的消息ID及得分（越小越相关）的子查询"""
+        pass
+
+    def max_indexed_id(self) -> str:
+        return "SELECT COALESCE(MAX(rowid), 0) FROM chat_search"
+
+    @abstractmethod
+    def insert_many(self) -> str:
+        """批量写入索引的语句"""
+        pass
+
+
+class SQLiteSearchBackend(SearchBackend):
+    """SQLite FTS5"""
+
+    def create_statements(self) -> List[str]:
+        return [
+            "CREATE VIRTUAL TABLE IF NOT EXISTS chat_search "
+            "USING fts5(terms, tokenize='unicode61 remove_diacritics 2')"
+        ]
+
+    def insert_many(self) -> str:
+        return "INSERT INTO chat_search (rowid, terms) VALUES (:id, :terms)"
+
+    def upsert(self, connection, message_id: int, content: Optional[str]) -> None:
+        self.delete(connection, message_id)
+        connection.execute(
+            text(self.insert_many()),
+            {"id": message_id, "terms": " ".join(tokenize(content))},
+        )
+
+    def build_query(self, terms: List[QueryTerm]) -> str:
+        phrases = []
+        for term in terms:
+            phrase = '"' + " ".join(term.tokens) + '"'
+            phrases.append(phrase + "*" if term.prefix else phrase)
+        return " AND ".join(phrases)
+
+    def match(self, match_query: str):
+        return (
+            text(
+                "SELECT rowid AS id, bm25(chat_search) AS score "
+                "FROM chat_search WHERE chat_search MATCH :match_query"
+            )
+            .bindparams(match_query=match_query)
+            .columns(id=Integer, score=Float)
+            .subquery("matched")
+        )
+
+
+class PostgresSearchBackend(SearchBackend):
+    """PostgreSQL tsvector + GIN"""
+
+    def create_statements(self) -> List[str]:
+        return [
+            "CREATE TABLE IF NOT EXISTS chat_search "
+            "(rowid BIGINT PRIMARY KEY, terms TSVECTOR NOT NULL)",
+            "CREATE INDEX IF NOT EXISTS idx_chat_search_terms "
+            "ON chat_search USING GIN (terms)",
+        ]
+
+    def insert_many(self) -> str:
+        return (
+            "INSERT INTO chat_search (rowid, terms) "
+            "VALUES (:id, to_tsvector('simple', :terms)) "
+            "ON CONFLICT (rowid) DO UPDATE SET terms = EXCLUDED.terms"
+        )
+
+    def upsert(self, connection, message_id: int, content: Optional[str]) -> None:
+        connection.execute(
+            text(self.insert_many()),
+            {"id": message_id, "terms": " ".join(tokenize(content))},
+        )
+
+    def build_query(self, terms: List[QueryTerm]) -> str:
+        phrases = []
+        for term in terms:
+            tokens = [f"'{token}'" for token in term.tokens]
+            if term.prefix:
+                tokens[-1] += ":*"
+            phrases.append("(" + " <-> ".join(tokens) + ")")
+        return " & ".join(phrases)
+
+    def match(self, match_query: str):
+        return (
+            text(
+                "SELECT rowid AS id, "
+                "-ts_rank(terms, to_tsquery('simple', :match_query)) AS score "
+                "FROM chat_search WHERE terms @@ to_tsquery('simple', :match_query)"
+            )
+            .bindparams(match_query=match_query)
+            .columns(id=Integer, score=Float)
+            .subquery("matched")
+        )
+
+
+BACKENDS = {
+    "sqlite": SQLiteSearchBackend(),
+    "postgresql": PostgresSearchBackend(),
+}
+
+# 索引表已就绪的数据库引擎（未就绪时写入事件不做任何事，启动补录时再索引）
+_ready_engines: "weakref.WeakSet" = weakref.WeakSet()
+
+
+def _sync_engine(db: AsyncSession):
+    return getattr(db.bind, "sync_engine", db.bind)
+
+
+def _backend(engine) -> Optional[SearchBackend]:
+    if engine is None or engine not in _ready_engines:
+        return None
+    return BACKENDS.get(engine.dialect.name)
+
+
+def _session_backend(db: AsyncSession) -> Optional[SearchBackend]:
+    return _backend(_sync_engine(db))
+
+
+# ============ 写入同步 ============
+
+
+@event.listens_for(ChatHistory, "after_insert")
+def _index_message(mapper, connection, target: ChatHistory) -> None:
+    backend = _backend(connection.engine)
+    if backend is not None:
+        backend.upsert(connection, target.id, target.content)
+
+
+@event.listens_for(ChatHistory, "after_update")
+def _reindex_message(mapper, connection, target: ChatHistory) -> None:
+    if inspect(target).attrs.content.history.has_changes():
+        _index_message(mapper, connection, target)
+
+
+@event.listens_for(ChatHistory, "after_delete")
+def _unindex_message(mapper, connection, target: ChatHistory) -> None:
+    backend = _backend(connection.engine)
+    if backend is not None:
+        backend.delete(connection, target.id)
+
+
+# ============ 高亮 ============
+
+
+def highlight(content: Optional[str], terms: List[QueryTerm]) -> str:
+    """截取第一个命中附近的片段，并用 ** 标出命中的词"""
+    content = content or ""
+    words = sorted({term.text for term in terms}, key=len, reverse=True)
+    if not words:
+        return content[:SNIPPET_CHARS * 2]
+    pattern = re.compile("|".join(re.escape(word) for word in words), re.IGNORECASE)
+
+    first = pattern.search(content)
+    start = max(0, first.start() - SNIPPET_CHARS) if first else 0
+    end = min(len(content), (first.end() if first else 0) + SNIPPET_CHARS)
+    snippet = pattern.sub(
+        lambda m: f"{HIGHLIGHT_MARK}{m.group(0)}{HIGHLIGHT_MARK}", content[start:end]
+    )
+    return ("..." if start > 0 else "") + snippet + ("..." if end < len(content) else "")
+
+
+def _encode_cursor(score: float, message_id: int) -> str:
+    return f"{score!r}:{message_id}"
+
+
+def _decode_cursor(cursor: str) -> Tuple[float, int]:
+    score, message_id = cursor.rsplit(":", 1)
+    return float(score), int(message_id)
+
+
+class ChatSearchService:
+    """聊天记录全文检索服务"""
+
+    @staticmethod
+    async def ensure_index(db: AsyncSession) -> int:
+        """
+        创建索引表并补录尚未索引的消息（启动后由一次性任务调用，补录完成前搜索结果可能不全）
+
+        Returns:
+            本次补录的消息数
+        """
+        engine = _sync_engine(db)
+        backend = BACKENDS.get(engine.dialect.name) if engine is not None else None
+        if backend is None:
+            logger.info("当前数据库不支持全文索引，聊天搜索使用 ILIKE")
+            return 0
+
+        for statement in backend.create_statements():
+            await db.execute(text(statement))
+        await db.commit()
+
+        # 先取已索引的最大ID再启用写入同步：尚未索引的消息ID都大于 last_id。
+        # 补录期间新写入的消息同时经过写入事件与补录，补录按批覆盖写入，重复索引无害
+        last_id = (await db.execute(text(backend.max_indexed_id()))).scalar() or 0
+        _ready_engines.add(engine)
+        return await ChatSearchService._index_after(db, backend, last_id)
+
+    @staticmethod
+    async def rebuild(db: AsyncSession) -> int:
+        """清空并重建整个索引（用于修复批量删除等绕过 ORM 的修改）"""
+        backend = _session_backend(db)
+        if backend is None:
+            return 0
+        await db.execute(text("DELETE FROM chat_search"))
+        return await ChatSearchService._index_after(db, backend, 0)
+
+    @staticmethod
+    async def _index_after(db: AsyncSession, backend: SearchBackend, last_id: int) -> int:
+        """按 ID 分批为 last_id 之后的消息建立索引"""
+        total = 0
+        while True:
+            result = await db.execute(
+                select(ChatHistory.id, ChatHistory.content)
+                .where(ChatHistory.id > last_id)
+                .order_by(ChatHistory.id)
+                .limit(BACKFILL_BATCH_SIZE)
+            )
+            rows = result.all()
+            if not rows:
+                break
+            await db.execute(
+                text("DELETE FROM chat_search WHERE rowid > :low AND rowid <= :high"),
+                {"low": last_id, "high": rows[-1][0]},
+            )
+            await db.execute(
+                text(backend.insert_many()),
+                [
+                    {"id": message_id, "terms": " ".join(tokenize(content))}
+                    for message_id, content in rows
+                ],
+            )
+            await db.commit()
+            total += len(rows)
+            last_id = rows[-1][0]
+
+        if total:
+            logger.info("聊天全文索引补录完成: %d 条", total)
+        return total
+
+    @staticmethod
+    def match_condition(db: AsyncSession, query: str):
+        """
+        “消息内容包含关键词”的过滤条件
+
+        可以用全文索引时为 ChatHistory.id IN (匹配的ID)，否则为 ILIKE。
+        """
+        terms = parse_query(query)
+        backend = _session_backend(db)
+        if backend is None or not terms or not all(t.indexable for t in terms):
+            increment_counter("chat_search.fallback")
+            return ChatHistory.content.ilike(f"%{query}%")
+
+        matched = backend.match(backend.build_query(terms))
+        return ChatHistory.id.in_(select(matched.c.id))
+
+    @staticmethod
+    async def search(
+        db: AsyncSession,
+        query: str,
+        *,
+        user_id: Optional[int] = None,
+        role: Optional[MessageRole] = None,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        按相关度排序搜索消息，返回带高亮片段的结果
+
+        Args:
+            role: 按角色筛选（默认排除系统消息）
+            cursor: 上一页最后一条结果的 cursor（按 (得分, ID) 做 keyset 分页）
+        """
+        terms = parse_query(query)
+        conditions = []
+        if user_id:
+            conditions.append(ChatHistory.user_id == user_id)
+        if role:
+            conditions.append(ChatHistory.role == role)
+        else:
+            conditions.append(ChatHistory.role != MessageRole.SYSTEM)
+        if start_time:
+            conditions.append(ChatHistory.created_at >= start_time)
+        if end_time:
+            conditions.append(ChatHistory.created_at <= end_time)
+
+        backend = _session_backend(db)
+        if backend is not None and terms and all(t.indexable for t in terms):
+            matched = backend.match(backend.build_query(terms))
+            stmt = select(ChatHistory, matched.c.score).join(
+                matched, matched.c.id == ChatHistory.id
+            )
+            if cursor:
+                last_score, last_id = _decode_cursor(cursor)
+                conditions.append(
+                    or_(
+                        matched.c.score > last_score,
+                        and_(matched.c.score == last_score, ChatHistory.id < last_id),
+                    )
+                )
+            stmt = stmt.order_by(matched.c.score, ChatHistory.id.desc())
+        else:
+            # 无法使用全文索引：ILIKE 扫描，按时间倒序（得分固定为 0）
+            increment_counter("chat_search.fallback")
+            conditions.append(ChatHistory.content.ilike(f"%{query}%"))
+            stmt = select(ChatHistory, literal(0.0))
+            if cursor:
+                conditions.append(ChatHistory.id < _decode_cursor(cursor)[1])
+            stmt = stmt.order_by(ChatHistory.id.desc())
+
+        result = await db.execute(
+            stmt.options(selectinload(ChatHistory.user))
+            .where(*conditions)
+            .limit(limit)
+        )
+
+        items = []
+        for msg, score in result.all():
+            content = msg.content or ""
+            items.append(
+                {
+                    "id": msg.id,
+                    "user_id": msg.user_id,
+                    "user_nickname": msg.user.nickname if msg.user else None,
+                    "role": msg.role.value,
+                    "msg_type": msg.msg_type.value,
+                    "content": content[:200] + ("..." if len(content) > 200 else ""),
+                    "created_at": msg.created_at,
+                    "highlight_content": highlight(content, terms),
+                    "score": score,
+                    "cursor": _encode_cursor(score, msg.id),
+                }
+            )
+        return items
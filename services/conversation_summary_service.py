@@ -11,6 +11,7 @@ import json
 import re
 
 from models.database import ChatHistory, MessageRole, UserProfile
+from services.user_profile_service import UserProfileService
 
 
 class ConversationSummaryService:
@@ -148,6 +149,7 @@ class ConversationSummaryService:
 
         profile.memory_summary = existing_summary + new_summary
         await db.commit()
+        UserProfileService.invalidate_shared_cache(user_id)
 
         return True
 
@@ -0,0 +1,441 @@
+"""
+每日活动汇总服务
+维护 daily_activity 汇总表：每个用户每天一行，记录五类健康记录的条数及热量/饮水/睡眠合计。
+记录写入/删除时实时增减（并同步更新 user_streaks 连续打卡表），连续打卡、热力图、仪表盘直接读取汇总行而不再扫描原始记录。
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from datetime import datetime, date
+from collections import defaultdict
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func, and_, delete, case, update
+
+from models.database import (
+    DailyActivity,
+    WeightRecord,
+    MealRecord,
+    ExerciseRecord,
+    WaterRecord,
+    SleepRecord,
+    MealType,
+)
+from utils.query_helpers import to_date, between_days
+from config.logging_config import get_module_logger
+
+logger = get_module_logger(__name__)
+
+# 计数列（任一大于0即视为当天有打卡）
+COUNT_COLUMNS = (
+    "weight_count",
+    "meal_count",
+    "exercise_count",
+    "water_count",
+    "sleep_count",
+)
+
+# 所有可累加列
+METRIC_COLUMNS = COUNT_COLUMNS + (
+    "breakfast_count",
+    "lunch_count",
+    "dinner_count",
+    "snack_count",
+    "calories_in",
+    "calories_burned",
+    "exercise_minutes",
+    "water_ml",
+    "sleep_minutes",
+)
+
+MEAL_TYPE_COLUMNS = {
+    MealType.BREAKFAST.value: "breakfast_count",
+    MealType.LUNCH.value: "lunch_count",
+    MealType.DINNER.value: "dinner_count",
+    MealType.SNACK.value: "snack_count",
+}
+
+
+def has_activity():
+    """当天存在任意健康记录的过滤条件"""
+    total = sum(getattr(DailyActivity, col) for col in COUNT_COLUMNS)
+    return total > 0
+
+
+def _record_date(value: Optional[datetime]) -> date:
+    return value.date() if value else date.today()
+
+
+class DailyActivityService:
+    """每日活动汇总服务"""
+
+    @staticmethod
+    def record_deltas(record: Any) -> Optional[Tuple[int, date, Dict[str, int]]]:
+        """
+        计算一条健康记录对汇总表的增量
+
+        Returns:
+            (user_id, 日期, {列名: 增量})，不支持的记录类型返回 None
+        """
+        if isinstance(record, WeightRecord):
+            return (
+                record.user_id,
+                _record_date(record.record_time),
+                {"weight_count": 1},
+            )
+
+        if isinstance(record, MealRecord):
+            deltas = {"meal_count": 1, "calories_in": record.total_calories or 0}
+            meal_type = getattr(record.meal_type, "value", record.meal_type)
+            if meal_type in MEAL_TYPE_COLUMNS:
+                deltas[MEAL_TYPE_COLUMNS[meal_type]] = 1
+            return record.user_id, _record_date(record.record_time), deltas
+
+        if isinstance(record, ExerciseRecord):
+            day = record.checkin_date or _record_date(record.record_time)
+            return (
+                record.user_id,
+                day,
+                {
+                    "exercise_count": 1,
+                    "calories_burned": record.calories_burned or 0,
+                    "exercise_minutes": record.duration_minutes or 0,
+                },
+            )
+
+        if isinstance(record, WaterRecord):
+            return (
+                record.user_id,
+                _record_date(record.record_time),
+                {"water_count": 1, "water_ml": record.amount_ml or 0},
+            )
+
+        if isinstance(record, SleepRecord):
+            return (
+                record.user_id,
+                _record_date(record.bed_time),
+                {"sleep_count": 1, "sleep_minutes": record.total_minutes or 0},
+            )
+
+        return None
+
+    @staticmethod
+    async def record_added(db: AsyncSession, record: Any) -> None:
+        """
+        记录写入后累加汇总（在同一事务内调用，随记录一起提交）
+        """
+        deltas = DailyActivityService.record_deltas(record)
+        if not deltas:
+            return
+        user_id, day, values = deltas
+        await DailyActivityService._increment(db, user_id, day, values)
+
+        # 同步维护连续打卡表（循环依赖，延迟导入）
+        from services.streak_service import StreakService
+
+        await StreakService.record_active_day(db, user_id, day)
+
+    @staticmethod
+    async def record_removed(db: AsyncSession, record: Any) -> None:
+        """记录删除（或被覆盖）前扣减汇总"""
+        deltas = DailyActivityService.record_deltas(record)
+        if not deltas:
+            return
+        user_id, day, values = deltas
+
+        await db.execute(
+            update(DailyActivity)
+            .where(
+                and_(
+                    DailyActivity.user_id == user_id,
+                    DailyActivity.activity_date == day,
+                )
+            )
+            .values(
+                {
+                    col: case(
+                        (getattr(DailyActivity, col) > amount,
+                         getattr(DailyActivity, col) - amount),
+                        else_=0,
+                    )
+                    for col, amount in values.items()
+                }
+            )
+        )
+
+        from services.streak_service import StreakService
+
+        await StreakService.record_inactive_day(db, user_id, day)
+
+    @staticmethod
+    async def _increment(
+        db: AsyncSession, user_id: int, day: date, values: Dict[str, int]
+    ) -> None:
+        """按 (user_id, 日期) 累加，行不存在时插入"""
+        dialect = db.bind.dialect.name if db.bind is not None else ""
+
+        if dialect in ("sqlite", "postgresql"):
+            if dialect == "sqlite":
+                from sqlalchemy.dialects.sqlite import insert
+            else:
+                from sqlalchemy.dialects.postgresql import insert
+
+            stmt = insert(DailyActivity).values(
+                user_id=user_id,
+                activity_date=day,
+                updated_at=datetime.utcnow(),
+                **{col: values.get(col, 0) for col in METRIC_COLUMNS},
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["user_id", "activity_date"],
+                set_={
+                    **{
+                        col: getattr(DailyActivity, col) + getattr(stmt.excluded, col)
+                        for col in values
+                    },
+                    "updated_at": stmt.excluded.updated_at,
+                },
+            )
+            await db.execute(stmt)
+            return
+
+        # 其他数据库：先查后写
+        result = await db.execute(
+            select(DailyActivity).where(
+                and_(
+                    DailyActivity.user_id == user_id,
+                    DailyActivity.activity_date == day,
+                )
+            )
+        )
+        row = result.scalar_one_or_none()
+        if row is None:
+            row = DailyActivity(
+                user_id=user_id,
+                activity_date=day,
+                **{col: 0 for col in METRIC_COLUMNS},
+            )
+            db.add(row)
+        for col, amount in values.items():
+            setattr(row, col, (getattr(row, col) or 0) + amount)
+
+    @staticmethod
+    async def get_range(
+        user_id: int, db: AsyncSession, start_date: date, end_date: date
+    ) -> Dict[date, DailyActivity]:
+        """获取用户在日期范围内的汇总行（按日期索引）"""
+        by_user = await DailyActivityService.get_range_for_users(
+            [user_id], db, start_date, end_date
+        )
+        return by_user.get(user_id, {})
+
+    @staticmethod
+    def _range_conditions(
+        user_ids: Optional[List[int]],
+        start_date: date,
+        end_date: date,
+        active_only: bool,
+    ) -> list:
+        conditions = [
+            DailyActivity.activity_date >= start_date,
+            DailyActivity.activity_date <= end_date,
+        ]
+        if user_ids is not None:
+            conditions.append(
+                DailyActivity.user_id == user_ids[0]
+                if len(user_ids) == 1
+                else DailyActivity.user_id.in_(user_ids)
+            )
+        if active_only:
+            conditions.append(has_activity())
+        return conditions
+
+    @staticmethod
+    async def get_active_dates_for_users(
+        user_ids: Optional[List[int]],
+        db: AsyncSession,
+        start_date: date,
+        end_date: date,
+    ) -> Dict[int, Set[date]]:
+        """批量获取多个用户有记录的日期（单次查询，只取 user_id/日期两列）"""
+        if user_ids is not None and not user_ids:
+            return {}
+
+        result = await db.execute(
+            select(DailyActivity.user_id, DailyActivity.activity_date).where(
+                and_(
+                    *DailyActivityService._range_conditions(
+                        user_ids, start_date, end_date, True
+                    )
+                )
+            )
+        )
+
+        dates: Dict[int, Set[date]] = defaultdict(set)
+        for uid, day in result:
+            dates[uid].add(to_date(day))
+        return dict(dates)
+
+    @staticmethod
+    async def get_range_for_users(
+        user_ids: Optional[List[int]],
+        db: AsyncSession,
+        start_date: date,
+        end_date: date,
+        active_only: bool = False,
+    ) -> Dict[int, Dict[date, DailyActivity]]:
+        """
+        批量获取多个用户在日期范围内的汇总行（单次查询）
+
+        Args:
+            user_ids: 用户ID列表，None 表示所有用户
+            active_only: 只返回有记录的天
+        """
+        if user_ids is not None and not user_ids:
+            return {}
+
+        conditions = DailyActivityService._range_conditions(
+            user_ids, start_date, end_date, active_only
+        )
+        result = await db.execute(select(DailyActivity).where(and_(*conditions)))
+
+        rows: Dict[int, Dict[date, DailyActivity]] = defaultdict(dict)
+        for row in result.scalars():
+            rows[row.user_id][to_date(row.activity_date)] = row
+        return dict(rows)
+
+    @staticmethod
+    async def get_day(
+        user_id: int, db: AsyncSession, day: Optional[date] = None
+    ) -> Optional[DailyActivity]:
+        """获取用户某一天的汇总行（默认今天）"""
+        day = day or date.today()
+        return (await DailyActivityService.get_range(user_id, db, day, day)).get(day)
+
+    @staticmethod
+    async def rebuild(
+        db: AsyncSession,
+        user_id: Optional[int] = None,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+    ) -> int:
+        """
+        从原始记录重建汇总（用于首次上线回填或数据修复）
+
+        Args:
+            user_id: 只重建某个用户（默认所有用户）
+            start_date/end_date: 只重建某个日期范围（默认全部）
+
+        Returns:
+            写入的汇总行数
+        """
+        totals: Dict[Tuple[int, date], Dict[str, int]] = defaultdict(
+            lambda: {col: 0 for col in METRIC_COLUMNS}
+        )
+
+        def scope(model, time_col):
+            conditions = []
+            if user_id is not None:
+                conditions.append(model.user_id == user_id)
+            if start_date and end_date:
+                conditions.append(between_days(time_col, start_date, end_date))
+            return conditions
+
+        async def collect(model, time_col, day_expr, columns, extra_group=None):
+            group_cols = [model.user_id, day_expr] + (
+                [extra_group] if extra_group is not None else []
+            )
+            result = await db.execute(
+                select(*group_cols, func.count(), *[func.sum(c) for c in columns.values()])
+                .where(*scope(model, time_col))
+                .group_by(*group_cols)
+            )
+            return result.all()
+
+        # 体重
+        for uid, day, count in await collect(
+            WeightRecord, WeightRecord.record_time,
+            func.date(WeightRecord.record_time), {},
+        ):
+            totals[(uid, to_date(day))]["weight_count"] += count
+
+        # 餐食（按餐次分组）
+        for uid, day, meal_type, count, calories in await collect(
+            MealRecord, MealRecord.record_time,
+            func.date(MealRecord.record_time),
+            {"calories_in": MealRecord.total_calories},
+            extra_group=MealRecord.meal_type,
+        ):
+            row = totals[(uid, to_date(day))]
+            row["meal_count"] += count
+            row["calories_in"] += calories or 0
+            meal_type = getattr(meal_type, "value", meal_type)
+            if meal_type in MEAL_TYPE_COLUMNS:
+                row[MEAL_TYPE_COLUMNS[meal_type]] += count
+
+        # 运动（快速打卡以 checkin_date 为准）
+        for uid, day, count, burned, minutes in await collect(
+            ExerciseRecord, ExerciseRecord.record_time,
+            func.coalesce(
+                ExerciseRecord.checkin_date, func.date(ExerciseRecord.record_time)
+            ),
+            {
+                "calories_burned": ExerciseRecord.calories_burned,
+                "exercise_minutes": ExerciseRecord.duration_minutes,
+            },
+        ):
+            row = totals[(uid, to_date(day))]
+            row["exercise_count"] += count
+            row["calories_burned"] += burned or 0
+            row["exercise_minutes"] += minutes or 0
+
+        # 饮水
+        for uid, day, count, amount in await collect(
+            WaterRecord, WaterRecord.record_time,
+            func.date(WaterRecord.record_time),
+            {"water_ml": WaterRecord.amount_ml},
+        ):
+            row = totals[(uid, to_date(day))]
+            row["water_count"] += count
+            row["water_ml"] += amount or 0
+
+        # 睡眠（以入睡时间所在日期为准）
+        for uid, day, count, minutes in await collect(
+            SleepRecord, SleepRecord.bed_time,
+            func.date(SleepRecord.bed_time),
+            {"sleep_minutes": SleepRecord.total_minutes},
+        ):
+            row = totals[(uid, to_date(day))]
+            row["sleep_count"] += count
+            row["sleep_minutes"] += minutes or 0
+
+        # 清除旧汇总后整体写入
+        conditions = []
+        if user_id is not None:
+            conditions.append(DailyActivity.user_id == user_id)
+        if start_date and end_date:
+            conditions.append(DailyActivity.activity_date >= start_date)
+            conditions.append(DailyActivity.activity_date <= end_date)
+        await db.execute(delete(DailyActivity).where(*conditions))
+
+        for (uid, day), values in totals.items():
+            if uid is None or day is None:
+                continue
+            db.add(DailyActivity(user_id=uid, activity_date=day, **values))
+
+        await db.commit()
+        logger.info("每日活动汇总重建完成 - 用户: %s, 行数: %s", user_id, len(totals))
+        return len(totals)
+
+    @staticmethod
+    async def backfill_if_empty(db: AsyncSession) -> int:
+        """汇总表为空时从原始记录回填（首次上线时自动执行）"""
+        result = await db.execute(select(func.count()).select_from(DailyActivity))
+        if result.scalar():
+            return 0
+        return await DailyActivityService.rebuild(db)
+
+    @staticmethod
+    def active_types(row: Optional[DailyActivity]) -> Iterable[str]:
+        """汇总行中有记录的计数列"""
+        if row is None:
+            return []
+        return [col for col in COUNT_COLUMNS if (getattr(row, col) or 0) > 0]
@@ -28,6 +28,7 @@ from services.calorie_balance_service import CalorieBalanceService
 from services.calorie_calculator import CalorieCalculator
 from services.ai_service import ai_service
 from config.logging_config import get_module_logger
+from utils.query_helpers import on_day
 from utils.exceptions import retry_on_error
 
 logger = get_module_logger(__name__)
@@ -169,7 +170,7 @@ class DailyReportService:
             select(MealRecord).where(
                 and_(
                     MealRecord.user_id == user_id,
-                    func.date(MealRecord.record_time) == report_date,
+                    on_day(MealRecord.record_time, report_date),
                 )
             )
         )
@@ -181,7 +182,7 @@ class DailyReportService:
             select(ExerciseRecord).where(
                 and_(
                     ExerciseRecord.user_id == user_id,
-                    func.date(ExerciseRecord.record_time) == report_date,
+                    on_day(ExerciseRecord.record_time, report_date),
                 )
             )
         )
@@ -198,7 +199,7 @@ class DailyReportService:
             select(WaterRecord).where(
                 and_(
                     WaterRecord.user_id == user_id,
-                    func.date(WaterRecord.record_time) == report_date,
+                    on_day(WaterRecord.record_time, report_date),
                 )
             )
         )
@@ -210,7 +211,7 @@ class DailyReportService:
             select(SleepRecord).where(
                 and_(
                     SleepRecord.user_id == user_id,
-                    func.date(SleepRecord.bed_time) == report_date,
+                    on_day(SleepRecord.bed_time, report_date),
                 )
             )
         )
@@ -347,7 +348,8 @@ class DailyReportService:
                 {"role": "user", "content": prompt},
             ]
 
-            response = await ai_service.chat(messages, max_tokens=500)
+            # 同一天数据未变化时重新生成日报直接复用点评
+            response = await ai_service.chat(messages, max_tokens=500, cache="exact")
 
             if response.error:
                 summary = self._generate_fallback_summary(data)
@@ -3,13 +3,16 @@
 提供用户关键指标的集中展示
 """
 
-from typing import Dict, List, Any, Optional
+from typing import Callable, Dict, List, Any, Optional, Tuple
 from datetime import datetime, date, timedelta
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 from sqlalchemy import select, func, and_
+import asyncio
 import json
+import time
 
 from models.database import (
+    AsyncSessionLocal,
     UserProfile,
     WeightRecord,
     MealRecord,
@@ -19,36 +22,61 @@ from models.database import (
     HabitCompletion,
 )
 from config.logging_config import get_module_logger
+from config.settings import fastapi_settings
 from services.achievement_service import AchievementService, PointsService
 from services.challenge_service import ChallengeService
 from services.chart_service import ChartService
+from services.daily_activity_service import DailyActivityService
+from utils.performance import get_monitor
+from utils.query_helpers import on_day, since_day
+from utils.result_cache import MISSING, result_cache
 
 logger = get_module_logger(__name__)
 
+# 健康统计子分区（各自独立并发执行）
+HEALTH_STAT_KEYS = ("weight", "nutrition", "exercise", "water", "sleep", "habits")
+
+# 记录模型 -> 每日活动汇总表计数列
+RECORD_COUNT_COLUMNS = {
+    WeightRecord: "weight_count",
+    MealRecord: "meal_count",
+    ExerciseRecord: "exercise_count",
+    WaterRecord: "water_count",
+    SleepRecord: "sleep_count",
+}
+
 
 class DashboardService:
     """仪表盘服务"""
 
     @staticmethod
     async def get_user_dashboard(user_id: int, db: AsyncSession) -> Dict[str, Any]:
-        """获取用户仪表盘数据"""
-        try:
-            # 获取基础数据
-            achievements = await AchievementService.get_user_achievements(user_id, db)
-            points = await PointsService.get_user_points(user_id, db)
-            challenges = await ChallengeService.get_user_challenges(user_id, db)
-
-            # 获取健康数据统计
-            health_stats = await DashboardService._get_health_stats(user_id, db)
+        """
+        获取用户仪表盘数据
 
-            # 获取趋势数据
-            trends = await DashboardService._get_trend_data(user_id, db)
+        各分区互不依赖，分别在连接池的独立会话上并发执行；单个分区超时或出错时
+        使用该分区的降级数据，返回部分结果而不是整体失败。各分区耗时见 meta。
+        """
+        started = time.perf_counter()
+        try:
+            sections = DashboardService._build_sections(user_id)
+            results, section_meta = await DashboardService._run_sections(
+                user_id, sections, db
+            )
 
-            # 获取图表数据
-            charts = await ChartService.get_all_charts(user_id, db)
+            achievements = results["achievements"]
+            points = results["points"]
+            challenges = results["challenges"]
+            health_stats = {
+                key: results[f"health_stats.{key}"] for key in HEALTH_STAT_KEYS
+            }
 
-            # 获取今日状态
-            today_status = await DashboardService._get_today_status(user_id, db)
+            # 只保留成功生成的图表
+            charts = {}
+            for key in ChartService.get_chart_builders():
+                chart = results[f"charts.{key}"]
+                if chart.get("success"):
+                    charts[key] = chart["data"]
 
             # 组合所有数据
             dashboard_data = {
@@ -66,12 +94,19 @@ class DashboardService:
                     if challenges.get("success")
                     else {},
                     "health_stats": health_stats,
-                    "trends": trends,
-                    "today_status": today_status,
+                    "trends": results["trends"],
+                    "today_status": results["today_status"],
                     "quick_stats": await DashboardService._get_quick_stats(
                         achievements, points, challenges, health_stats
                     ),
-                    "charts": charts.get("data", {}) if charts.get("success") else {},
+                    "charts": charts,
+                },
+                "meta": {
+                    "partial": any(
+                        meta["status"] != "ok" for meta in section_meta.values()
+                    ),
+                    "total_ms": round((time.perf_counter() - started) * 1000, 1),
+                    "sections": section_meta,
                 },
             }
 
@@ -98,53 +133,159 @@ class DashboardService:
             }
 
     @staticmethod
-    async def _get_health_stats(user_id: int, db: AsyncSession) -> Dict[str, Any]:
-        """获取健康数据统计"""
-        try:
-            today = date.today()
-            week_ago = today - timedelta(days=7)
-            month_ago = today - timedelta(days=30)
-
-            # 体重统计
-            weight_stats = await DashboardService._get_weight_stats(
-                user_id, db, today, week_ago
-            )
-
-            # 饮食统计
-            nutrition_stats = await DashboardService._get_nutrition_stats(
-                user_id, db, today, week_ago
-            )
-
-            # 运动统计
-            exercise_stats = await DashboardService._get_exercise_stats(
-                user_id, db, today, week_ago
+    def _build_sections(user_id: int) -> Dict[str, Tuple[Callable, Any, float]]:
+        """
+        构建仪表盘分区
+
+        Returns:
+            分区名 -> (构建函数(session), 降级数据, 超时秒数)
+        """
+        today = date.today()
+        week_ago = today - timedelta(days=7)
+        timeout = fastapi_settings.DASHBOARD_SECTION_TIMEOUT
+        failed = {"success": False}
+
+        sections = {
+            "achievements": (
+                lambda s: AchievementService.get_user_achievements(user_id, s),
+                failed,
+                timeout,
+            ),
+            "points": (
+                lambda s: PointsService.get_user_points(user_id, s),
+                failed,
+                timeout,
+            ),
+            "challenges": (
+                lambda s: ChallengeService.get_user_challenges(user_id, s),
+                failed,
+                timeout,
+            ),
+            "health_stats.weight": (
+                lambda s: DashboardService._get_weight_stats(
+                    user_id, s, today, week_ago
+                ),
+                {"current": None, "week_change": None, "trend": "unknown"},
+                timeout,
+            ),
+            "health_stats.nutrition": (
+                lambda s: DashboardService._get_nutrition_stats(
+                    user_id, s, today, week_ago
+                ),
+                {},
+                timeout,
+            ),
+            "health_stats.exercise": (
+                lambda s: DashboardService._get_exercise_stats(
+                    user_id, s, today, week_ago
+                ),
+                {},
+                timeout,
+            ),
+            "health_stats.water": (
+                lambda s: DashboardService._get_water_stats(user_id, s, today),
+                {},
+                timeout,
+            ),
+            "health_stats.sleep": (
+                lambda s: DashboardService._get_sleep_stats(
+                    user_id, s, today, week_ago
+                ),
+                {},
+                timeout,
+            ),
+            "health_stats.habits": (
+                lambda s: DashboardService._get_habit_stats(
+                    user_id, s, today, week_ago
+                ),
+                {},
+                timeout,
+            ),
+            "trends": (
+                lambda s: DashboardService._get_trend_data(user_id, s),
+                {},
+                timeout,
+            ),
+            "today_status": (
+                lambda s: DashboardService._get_today_status(user_id, s),
+                {"completion_rate": 0, "status": "unknown", "message": "数据获取失败"},
+                timeout,
+            ),
+        }
+
+        for key, build in ChartService.get_chart_builders().items():
+            sections[f"charts.{key}"] = (
+                lambda s, build=build: build(user_id, s),
+                failed,
+                fastapi_settings.DASHBOARD_CHART_TIMEOUT,
             )
 
-            # 饮水统计
-            water_stats = await DashboardService._get_water_stats(user_id, db, today)
-
-            # 睡眠统计
-            sleep_stats = await DashboardService._get_sleep_stats(
-                user_id, db, today, week_ago
-            )
+        return sections
 
-            # 习惯统计
-            habit_stats = await DashboardService._get_habit_stats(
-                user_id, db, today, week_ago
+    @staticmethod
+    async def _run_sections(
+        user_id: int,
+        sections: Dict[str, Tuple[Callable, Any, float]],
+        db: AsyncSession,
+    ) -> Tuple[Dict[str, Any], Dict[str, Dict[str, Any]]]:
+        """
+        并发执行各分区，每个分区使用独立的连接池会话
+
+        分区结果按用户数据版本缓存，命中时不访问数据库；降级数据不缓存。
+
+        Returns:
+            (分区名 -> 结果,
+             分区名 -> {"status": ok/timeout/error, "cached", "elapsed_ms"})
+        """
+        if db is not None and db.bind is not None:
+            session_factory = async_sessionmaker(
+                db.bind, class_=AsyncSession, expire_on_commit=False
             )
-
-            return {
-                "weight": weight_stats,
-                "nutrition": nutrition_stats,
-                "exercise": exercise_stats,
-                "water": water_stats,
-                "sleep": sleep_stats,
-                "habits": habit_stats,
+        else:
+            session_factory = AsyncSessionLocal
+
+        # 限制单次请求同时占用的连接数，避免耗尽连接池
+        semaphore = asyncio.Semaphore(fastapi_settings.DASHBOARD_MAX_CONCURRENCY)
+
+        async def run(name: str, build: Callable, fallback: Any, timeout: float):
+            version, cached = await result_cache.get(user_id, name)
+            if cached is not MISSING:
+                return name, cached, {"status": "ok", "cached": True, "elapsed_ms": 0.0}
+
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    async with session_factory() as session:
+                        value = await asyncio.wait_for(build(session), timeout)
+                    status = "ok"
+                except asyncio.TimeoutError:
+                    logger.warning("仪表盘分区超时: %s (%.1fs)", name, timeout)
+                    value, status = fallback, "timeout"
+                except Exception as e:
+                    logger.error(f"仪表盘分区失败: {name}: {e}")
+                    value, status = fallback, "error"
+                elapsed = time.perf_counter() - started
+
+            if status == "ok" and not (
+                isinstance(value, dict) and value.get("success") is False
+            ):
+                await result_cache.set(user_id, version, name, value)
+
+            get_monitor(f"dashboard.{name}").record_time(elapsed)
+            meta = {
+                "status": status,
+                "cached": False,
+                "elapsed_ms": round(elapsed * 1000, 1),
             }
+            return name, value, meta
 
-        except Exception as e:
-            logger.error(f"获取健康数据统计失败: {e}")
-            return {}
+        outcomes = await asyncio.gather(
+            *(run(name, *spec) for name, spec in sections.items())
+        )
+
+        results = {name: value for name, value, _ in outcomes}
+        section_meta = {name: meta for name, _, meta in outcomes}
+        return results, section_meta
 
     @staticmethod
     async def _get_weight_stats(
@@ -203,22 +344,15 @@ class DashboardService:
         """获取饮食统计"""
         try:
             # 获取今日热量
-            result = await db.execute(
-                select(func.sum(MealRecord.total_calories)).where(
-                    and_(
-                        MealRecord.user_id == user_id,
-                        func.date(MealRecord.record_time) == today,
-                    )
-                )
-            )
-            today_calories = result.scalar() or 0
+            today_activity = await DailyActivityService.get_day(user_id, db, today)
+            today_calories = today_activity.calories_in if today_activity else 0
 
             # 获取本周平均热量
             result = await db.execute(
                 select(func.avg(MealRecord.total_calories)).where(
                     and_(
                         MealRecord.user_id == user_id,
-                        MealRecord.record_time >= week_ago,
+                        since_day(MealRecord.record_time, week_ago),
                     )
                 )
             )
@@ -249,34 +383,20 @@ class DashboardService:
     ) -> Dict[str, Any]:
         """获取运动统计"""
         try:
-            # 获取今日运动
-            result = await db.execute(
-                select(
-                    func.sum(ExerciseRecord.duration_minutes),
-                    func.sum(ExerciseRecord.calories_burned),
-                ).where(
-                    and_(
-                        ExerciseRecord.user_id == user_id,
-                        func.date(ExerciseRecord.record_time) == today,
-                    )
-                )
+            # 获取本周（含今日）每日汇总
+            week_activity = await DailyActivityService.get_range(
+                user_id, db, week_ago, today
+            )
+            today_activity = week_activity.get(today)
+            today_duration = today_activity.exercise_minutes if today_activity else 0
+            today_calories_burned = (
+                today_activity.calories_burned if today_activity else 0
             )
-            today_exercise = result.first()
-            today_duration = today_exercise[0] or 0 if today_exercise else 0
-            today_calories_burned = today_exercise[1] or 0 if today_exercise else 0
 
             # 获取本周运动天数
-            result = await db.execute(
-                select(
-                    func.count(func.distinct(func.date(ExerciseRecord.record_time)))
-                ).where(
-                    and_(
-                        ExerciseRecord.user_id == user_id,
-                        ExerciseRecord.record_time >= week_ago,
-                    )
-                )
+            exercise_days_this_week = sum(
+                1 for row in week_activity.values() if row.exercise_count > 0
             )
-            exercise_days_this_week = result.scalar() or 0
 
             return {
                 "today_duration": today_duration,
@@ -302,15 +422,8 @@ class DashboardService:
         """获取饮水统计"""
         try:
             # 获取今日饮水量
-            result = await db.execute(
-                select(func.sum(WaterRecord.amount_ml)).where(
-                    and_(
-                        WaterRecord.user_id == user_id,
-                        func.date(WaterRecord.record_time) == today,
-                    )
-                )
-            )
-            today_water = result.scalar() or 0
+            today_activity = await DailyActivityService.get_day(user_id, db, today)
+            today_water = today_activity.water_ml if today_activity else 0
 
             # 目标饮水量（默认2000ml）
             target_water = 2000
@@ -347,7 +460,7 @@ class DashboardService:
                 .where(
                     and_(
                         SleepRecord.user_id == user_id,
-                        func.date(SleepRecord.bed_time) == yesterday,
+                        on_day(SleepRecord.bed_time, yesterday),
                     )
                 )
                 .order_by(SleepRecord.bed_time.desc())
@@ -362,7 +475,8 @@ class DashboardService:
             result = await db.execute(
                 select(func.avg(SleepRecord.total_minutes)).where(
                     and_(
-                        SleepRecord.user_id == user_id, SleepRecord.bed_time >= week_ago
+                        SleepRecord.user_id == user_id,
+                        since_day(SleepRecord.bed_time, week_ago),
                     )
                 )
             )
@@ -448,17 +562,12 @@ class DashboardService:
 
     @staticmethod
     async def _count_records_today(model, user_id: int, db: AsyncSession) -> int:
-        """统计今日记录数"""
+        """统计今日记录数（读取每日活动汇总）"""
         try:
-            today = date.today()
-            result = await db.execute(
-                select(func.count(model.id)).where(
-                    and_(
-                        model.user_id == user_id, func.date(model.record_time) == today
-                    )
-                )
-            )
-            return result.scalar() or 0
+            today_activity = await DailyActivityService.get_day(user_id, db)
+            if not today_activity:
+                return 0
+            return getattr(today_activity, RECORD_COUNT_COLUMNS[model]) or 0
         except Exception:
             return 0
 
@@ -466,14 +575,13 @@ class DashboardService:
     async def _count_records_this_week(
         model, user_id: int, db: AsyncSession, week_ago: date
     ) -> int:
-        """统计本周记录数"""
+        """统计本周记录数（读取每日活动汇总）"""
         try:
-            result = await db.execute(
-                select(func.count(model.id)).where(
-                    and_(model.user_id == user_id, model.record_time >= week_ago)
-                )
+            week_activity = await DailyActivityService.get_range(
+                user_id, db, week_ago, date.today()
             )
-            return result.scalar() or 0
+            column = RECORD_COUNT_COLUMNS[model]
+            return sum(getattr(row, column) or 0 for row in week_activity.values())
         except Exception:
             return 0
 
@@ -546,17 +654,12 @@ class DashboardService:
     async def _has_record_today(
         model, user_id: int, db: AsyncSession, today: date
     ) -> bool:
-        """检查今日是否有记录"""
+        """检查今日是否有记录（读取每日活动汇总）"""
         try:
-            result = await db.execute(
-                select(func.count(model.id)).where(
-                    and_(
-                        model.user_id == user_id, func.date(model.record_time) == today
-                    )
-                )
-            )
-            count = result.scalar() or 0
-            return count > 0
+            today_activity = await DailyActivityService.get_day(user_id, db, today)
+            if not today_activity:
+                return False
+            return (getattr(today_activity, RECORD_COUNT_COLUMNS[model]) or 0) > 0
         except Exception:
             return False
 
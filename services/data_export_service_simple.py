@@ -7,8 +7,6 @@ from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime, date, timedelta
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, and_, desc
-import pandas as pd
-import io
 import json
 
 from models.database import (
@@ -21,6 +19,7 @@ from models.database import (
     UserRecipe,
     Recipe,
 )
+from services.streaming_export_service import XlsxSheet, xlsx_chunks
 from config.logging_config import get_module_logger
 
 logger = get_module_logger(__name__)
@@ -486,39 +485,33 @@ class SimpleDataExportService:
         start_date: Optional[date],
         end_date: Optional[date],
     ) -> Tuple[bytes, str]:
-        """创建Excel文件"""
+        """创建Excel文件（openpyxl 只写模式，不经过 DataFrame）"""
         try:
-            output = io.BytesIO()
-
-            with pd.ExcelWriter(output, engine="openpyxl") as writer:
-                # 为每个数据类型创建工作表
-                for sheet_name, sheet_data in data_sheets.items():
-                    if sheet_data:
-                        df = pd.DataFrame(sheet_data)
-                        df.to_excel(writer, sheet_name=sheet_name, index=False)
-
-                        # 调整列宽
-                        worksheet = writer.sheets[sheet_name]
-                        for column in df:
-                            column_length = max(
-                                df[column].astype(str).map(len).max(), len(column)
-                            )
-                            col_idx = df.columns.get_loc(column)
-                            worksheet.column_dimensions[chr(65 + col_idx)].width = min(
-                                column_length + 2, 50
-                            )
-
-                # 添加汇总工作表
-                summary_data = {
-                    "数据类型": list(data_sheets.keys()),
-                    "记录数量": [len(records) for records in data_sheets.values()],
-                    "数据范围": f"{start_date.strftime('%Y-%m-%d') if start_date else '全部'} 至 {end_date.strftime('%Y-%m-%d') if end_date else '至今'}",
-                }
-                df_summary = pd.DataFrame(summary_data)
-                df_summary.to_excel(writer, sheet_name="数据汇总", index=False)
-
-            output.seek(0)
-            excel_data = output.getvalue()
+            sheets = [
+                XlsxSheet(
+                    title=sheet_name,
+                    header=list(sheet_data[0].keys()),
+                    rows=(list(record.values()) for record in sheet_data),
+                )
+                for sheet_name, sheet_data in data_sheets.items()
+                if sheet_data
+            ]
+
+            # 添加汇总工作表
+            start_text = start_date.strftime("%Y-%m-%d") if start_date else "全部"
+            end_text = end_date.strftime("%Y-%m-%d") if end_date else "至今"
+            data_range = f"{start_text} 至 {end_text}"
+            sheets.append(
+                XlsxSheet(
+                    title="数据汇总",
+                    header=["数据类型", "记录数量", "数据范围"],
+                    rows=[
+                        [sheet_name, len(records), data_range]
+                        for sheet_name, records in data_sheets.items()
+                    ],
+                )
+            )
+            excel_data = b"".join([chunk async for chunk in xlsx_chunks(sheets)])
 
             # 生成文件名
             date_range = ""
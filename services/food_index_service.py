@@ -0,0 +1,403 @@
+"""
+食物搜索索引
+
+食物库搜索原先使用 LIKE '%关键词%'，每次请求全表扫描 food_items / user_foods；
+热量估算对每个词都查一次库。这里把系统食物库加载到内存，建立：
+- 有序名称表：前缀匹配（二分查找）
+- 单字/二字倒排索引：子串匹配（求交集后校验）
+- 拼音首字母有序表：如 "mf" 匹配 "米饭"（需安装 pypinyin，未安装时跳过）
+
+排序：完全匹配 > 前缀 > 拼音首字母 > 子串，同档按名称长度、ID 排序。
+用户自定义食物按用户懒加载到小索引中，写入时同步更新。
+
+系统食物库在应用启动与 init_food_database 后加载，
+自定义食物在 /foods/custom 写入后调用 add_user_food。
+"""
+
+import bisect
+import heapq
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config.logging_config import get_module_logger
+from models.database import FoodItem, UserFood
+
+try:
+    from pypinyin import Style, lazy_pinyin
+
+    HAS_PYPINYIN = True
+except ImportError:
+    HAS_PYPINYIN = False
+
+logger = get_module_logger(__name__)
+
+# 匹配档位（越小越靠前）
+MATCH_EXACT = 0
+MATCH_PREFIX = 1
+MATCH_PINYIN = 2
+MATCH_SUBSTRING = 3
+
+# 热量估算时的分词：空白与常见中英文标点
+_SPLIT_PATTERN = re.compile(r"[\s,，、;；。+＋/|]+")
+
+# 连接词：单独成词时忽略；出现在词中间时（米饭和鸡蛋）仅当两侧都能解析为食物才拆分，
+# 避免拆坏 和牛、加州卷、配菜 这类以连接字开头的食物名
+_CONNECTORS = frozenset("和加配")
+_CONNECTOR_PATTERN = re.compile(r"(?<=.)[和加配](?=.)")
+
+
+def normalize(text: str) -> str:
+    return (text or "").strip().lower()
+
+
+def pinyin_initials(text: str) -> str:
+    """拼音首字母（如 米饭 -> mf），未安装 pypinyin 时返回空字符串"""
+    if not HAS_PYPINYIN or not text:
+        return ""
+    return "".join(lazy_pinyin(text, style=Style.FIRST_LETTER)).lower()
+
+
+@dataclass
+class FoodEntry:
+    """索引中的一条食物（系统食物或用户自定义食物）"""
+
+    id: int
+    name: str
+    calories_per_100g: Optional[float] = None
+    category: Optional[str] = None
+    common_portions: Optional[Dict[str, Any]] = None
+    aliases: List[str] = field(default_factory=list)
+    # 用户自定义食物：每份热量（千卡）
+    calories: Optional[int] = None
+
+    def default_portion(self) -> int:
+        """默认分量（克）：第一个常见分量，没有时按 100 克"""
+        if self.common_portions:
+            return list(self.common_portions.values())[0]
+        return 100
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "name": self.name,
+            "category": self.category,
+            "calories_per_100g": self.calories_per_100g,
+            "common_portions": self.common_portions,
+        }
+
+
+class _NameIndex:
+    """名称索引（前缀 / 子串 / 拼音首字母），构建后只读"""
+
+    def __init__(self, entries: Iterable[FoodEntry]):
+        self.foods: Dict[int, FoodEntry] = {}
+        # 每个可检索名称（正式名 + 别名）一个键，key_food[i] 为对应食物 ID
+        self.keys: List[str] = []
+        self.key_food: List[int] = []
+        initials: List[Tuple[str, int]] = []
+
+        for entry in entries:
+            self.foods[entry.id] = entry
+            for name in {normalize(entry.name), *map(normalize, entry.aliases)}:
+                if not name:
+                    continue
+                key_id = len(self.keys)
+                self.keys.append(name)
+                self.key_food.append(entry.id)
+                letters = pinyin_initials(name)
+                if letters:
+                    initials.append((letters, key_id))
+
+        # 同档内的排序：名称越短越靠前，其次按食物 ID
+        by_rank = sorted(
+            range(len(self.keys)),
+            key=lambda key_id: (len(self.keys[key_id]), self.key_food[key_id]),
+        )
+        self.rank = [0] * len(self.keys)
+        for rank, key_id in enumerate(by_rank):
+            self.rank[key_id] = rank
+
+        # 单字/二字 -> 键列表（按排序先后），子串匹配时顺序扫描最短的列表即可提前结束
+        self.grams: Dict[str, List[int]] = {}
+        for key_id in by_rank:
+            for gram in self._grams(self.keys[key_id]):
+                self.grams.setdefault(gram, []).append(key_id)
+
+        # 名称 -> 键（同名时保留排序靠前的）
+        self.exact: Dict[str, int] = {}
+        for key_id in by_rank:
+            self.exact.setdefault(self.keys[key_id], key_id)
+        self.max_key_length = max(map(len, self.keys), default=0)
+
+        order = sorted(range(len(self.keys)), key=self.keys.__getitem__)
+        self.sorted_keys = [self.keys[i] for i in order]
+        self.sorted_key_ids = order
+        initials.sort()
+        self.initials = [letters for letters, _ in initials]
+        self.initial_key_ids = [key_id for _, key_id in initials]
+
+    @staticmethod
+    def _grams(text: str) -> Set[str]:
+        grams = set(text)
+        grams.update(text[i : i + 2] for i in range(len(text) - 1))
+        return grams
+
+    def __len__(self) -> int:
+        return len(self.foods)
+
+    @staticmethod
+    def _prefix_range(sorted_list: List[str], prefix: str) -> range:
+        lo = bisect.bisect_left(sorted_list, prefix)
+        hi = bisect.bisect_left(sorted_list, prefix + "\uffff")
+        return range(lo, hi)
+
+    def search(self, query: str, limit: int) -> List[Tuple[int, FoodEntry]]:
+        """
+        返回 [(匹配档位, 食物)]，按档位、名称长度、ID 排序
+
+        按档位依次查找，凑够 limit 个食物后不再查找更低档位。
+        """
+        query = normalize(query)
+        if not query or limit <= 0:
+            return []
+
+        found: Dict[int, int] = {}
+        results: List[Tuple[int, FoodEntry]] = []
+
+        def collect(key_ids: Iterable[int], tier: int) -> bool:
+            """按顺序收集未出现过的食物，返回是否已凑够"""
+            for key_id in key_ids:
+                food_id = self.key_food[key_id]
+                if food_id not in found:
+                    found[food_id] = tier
+                    results.append((tier, self.foods[food_id]))
+                    if len(results) >= limit:
+                        return True
+            return False
+
+        def top(key_ids: Iterable[int]) -> List[int]:
+            return heapq.nsmallest(limit, key_ids, key=self.rank.__getitem__)
+
+        exact = self.exact.get(query)
+        if exact is not None and collect([exact], MATCH_EXACT):
+            return results
+
+        # 最稀有的单字/二字对应的键列表（已按排序先后排列），包含 query 的键都在其中
+        postings = [self.grams.get(gram) for gram in self._grams(query)]
+        rarest = min(postings, key=len) if all(postings) else []
+
+        prefix = self._prefix_range(self.sorted_keys, query)
+        if len(prefix) > limit * 16:
+            # 前缀命中很多时，按排序顺序扫描键列表比对整段范围取 top-k 更快
+            prefix_ids = (
+                k for k in rarest if k != exact and self.keys[k].startswith(query)
+            )
+        else:
+            prefix_ids = top(
+                k for k in (self.sorted_key_ids[pos] for pos in prefix) if k != exact
+            )
+        if collect(prefix_ids, MATCH_PREFIX):
+            return results
+
+        if query.isascii() and query.isalpha():
+            initial = self._prefix_range(self.initials, query)
+            if collect(top(self.initial_key_ids[pos] for pos in initial), MATCH_PINYIN):
+                return results
+
+        # 子串：按排序顺序扫描键列表，凑够即停
+        collect((k for k in rarest if query in self.keys[k]), MATCH_SUBSTRING)
+        return results
+
+    def contained_in(self, text: str) -> Optional[FoodEntry]:
+        """名称被 text 包含的最长食物（如 "一碗米饭" -> 米饭），逐个子串查完全匹配"""
+        text = normalize(text)
+        for length in range(min(len(text), self.max_key_length), 0, -1):
+            for start in range(len(text) - length + 1):
+                key_id = self.exact.get(text[start : start + length])
+                if key_id is not None:
+                    return self.foods[self.key_food[key_id]]
+        return None
+
+
+class FoodIndex:
+    """内存食物索引（系统食物 + 按用户懒加载的自定义食物）"""
+
+    def __init__(self, max_users: int = 1024):
+        self._system = _NameIndex([])
+        self._loaded = False
+        self._lock = threading.Lock()
+        self.max_users = max_users
+        # user_id -> 自定义食物索引，按访问顺序排列
+        self._user_indexes: "OrderedDict[int, _NameIndex]" = OrderedDict()
+        # 每次自定义食物写入递增；加载期间发生写入时不缓存旧结果
+        self._user_generations: Dict[int, int] = {}
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def __len__(self) -> int:
+        return len(self._system)
+
+    # ---- 加载与刷新 ----
+
+    def build(self, entries: Iterable[FoodEntry]) -> None:
+        """用给定食物重建系统索引（构建完成后整体替换，读取无需加锁）"""
+        index = _NameIndex(entries)
+        with self._lock:
+            self._system = index
+            self._loaded = True
+        logger.info("食物索引已加载: %d 种食物", len(index))
+
+    async def load(self, db: AsyncSession) -> None:
+        """从 food_items 加载系统食物库"""
+        result = await db.execute(
+            select(
+                FoodItem.id,
+                FoodItem.name,
+                FoodItem.calories_per_100g,
+                FoodItem.category,
+                FoodItem.common_portions,
+                FoodItem.aliases,
+            )
+        )
+        self.build(
+            FoodEntry(
+                id=row.id,
+                name=row.name or "",
+                calories_per_100g=row.calories_per_100g,
+                category=row.category.value if row.category else None,
+                common_portions=row.common_portions,
+                aliases=[a for a in (row.aliases or []) if isinstance(a, str)],
+            )
+            for row in result
+        )
+
+    async def ensure_loaded(self, db: AsyncSession) -> None:
+        if not self._loaded:
+            await self.load(db)
+
+    async def _user_index(self, user_id: int, db: AsyncSession) -> _NameIndex:
+        with self._lock:
+            index = self._user_indexes.get(user_id)
+            if index is not None:
+                self._user_indexes.move_to_end(user_id)
+                return index
+            generation = self._user_generations.get(user_id, 0)
+
+        result = await db.execute(
+            select(UserFood.id, UserFood.food_name, UserFood.calories).where(
+                UserFood.user_id == user_id
+            )
+        )
+        index = _NameIndex(
+            FoodEntry(id=row.id, name=row.food_name or "", calories=row.calories)
+            for row in result
+        )
+        with self._lock:
+            if self._user_generations.get(user_id, 0) != generation:
+                return index
+            self._user_indexes[user_id] = index
+            while len(self._user_indexes) > self.max_users:
+                self._user_indexes.popitem(last=False)
+        return index
+
+    def add_user_food(
+        self, user_id: int, food_id: int, name: str, calories: int
+    ) -> None:
+        """自定义食物写入后更新该用户的索引（未加载的用户下次使用时从库中加载）"""
+        with self._lock:
+            self._user_generations[user_id] = self._user_generations.get(user_id, 0) + 1
+            index = self._user_indexes.get(user_id)
+            if index is None:
+                return
+            entries = list(index.foods.values())
+            entries.append(FoodEntry(id=food_id, name=name, calories=calories))
+            self._user_indexes[user_id] = _NameIndex(entries)
+
+    def invalidate_user(self, user_id: int) -> None:
+        with self._lock:
+            self._user_generations[user_id] = self._user_generations.get(user_id, 0) + 1
+            self._user_indexes.pop(user_id, None)
+
+    # ---- 查询 ----
+
+    def search(self, keyword: str, limit: int = 10) -> List[FoodEntry]:
+        """搜索系统食物库"""
+        return [entry for _, entry in self._system.search(keyword, limit)]
+
+    async def search_user_foods(
+        self, user_id: int, keyword: str, db: AsyncSession, limit: int = 10
+    ) -> List[FoodEntry]:
+        """搜索用户自定义食物"""
+        index = await self._user_index(user_id, db)
+        return [entry for _, entry in index.search(keyword, limit)]
+
+    def resolve(self, token: str) -> Optional[FoodEntry]:
+        """
+        把一个词解析为食物
+
+        依次尝试：完全/前缀/拼音/子串匹配的最优结果，
+        以及名称被该词包含的最长食物（如 "一碗米饭"）。
+        """
+        matches = self._system.search(token, 1)
+        if matches and matches[0][0] == MATCH_EXACT:
+            return matches[0][1]
+        contained = self._system.contained_in(token)
+        if contained is not None:
+            return contained
+        return matches[0][1] if matches else None
+
+    def _tokens(self, content: str) -> List[str]:
+        """按标点切分描述，再按连接词拆开两侧都是食物的词"""
+        tokens = []
+        for token in _SPLIT_PATTERN.split(content or ""):
+            if token and token not in _CONNECTORS:
+                tokens.extend(self._split_connectors(token))
+        return tokens
+
+    def _split_connectors(self, token: str) -> List[str]:
+        """在第一个两侧都能解析为食物的连接词处拆分（右侧继续拆分）"""
+        if self._is_exact(token):
+            return [token]
+        for match in _CONNECTOR_PATTERN.finditer(token):
+            left, right = token[: match.start()], token[match.end() :]
+            if self.resolve(left) is not None and self.resolve(right) is not None:
+                return [left] + self._split_connectors(right)
+        return [token]
+
+    def _is_exact(self, token: str) -> bool:
+        matches = self._system.search(token, 1)
+        return bool(matches) and matches[0][0] == MATCH_EXACT
+
+    def estimate_calories(
+        self, content: str
+    ) -> Tuple[Optional[int], List[Dict[str, Any]]]:
+        """
+        一次遍历估算描述中所有食物的热量
+
+        Returns:
+            (总热量, 匹配到的食物列表)；没有匹配时总热量为 None
+        """
+        total = 0
+        found = []
+        for token in self._tokens(content):
+            food = self.resolve(token)
+            if food is None or food.calories_per_100g is None:
+                continue
+            portion = food.default_portion()
+            calories = int(food.calories_per_100g * portion / 100)
+            total += calories
+            found.append({"name": food.name, "portion": portion, "calories": calories})
+
+        return (total if found else None), found
+
+
+# 全局食物索引
+food_index = FoodIndex()
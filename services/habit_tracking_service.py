@@ -4,9 +4,9 @@
 """
 
 from typing import Dict, List, Any, Optional, Set, Tuple
-from datetime import datetime, date, timedelta
+from datetime import date, timedelta
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, and_, distinct, Date
+from sqlalchemy import select, distinct, Date
 from collections import defaultdict
 
 from models.database import (
@@ -17,6 +17,8 @@ from models.database import (
     SleepRecord,
     MealType,
 )
+from services.daily_activity_service import DailyActivityService
+from services.streak_service import StreakService
 
 
 class CheckinType:
@@ -32,6 +34,19 @@ class CheckinType:
     SLEEP = "sleep"  # 睡眠打卡
 
 
+# 打卡类型 -> 每日活动汇总表计数列
+CHECKIN_TYPE_COLUMNS = {
+    CheckinType.WEIGHT: "weight_count",
+    CheckinType.BREAKFAST: "breakfast_count",
+    CheckinType.LUNCH: "lunch_count",
+    CheckinType.DINNER: "dinner_count",
+    CheckinType.SNACK: "snack_count",
+    CheckinType.EXERCISE: "exercise_count",
+    CheckinType.WATER: "water_count",
+    CheckinType.SLEEP: "sleep_count",
+}
+
+
 class HabitTrackingService:
     """习惯打卡追踪服务"""
 
@@ -444,7 +459,7 @@ class HabitTrackingService:
     async def _get_all_checkin_dates(
         user_id: int, start_date: date, end_date: date, db: AsyncSession
     ) -> Dict[str, Set[date]]:
-        """获取所有维度的打卡日期"""
+        """获取所有维度的打卡日期（读取每日活动汇总，每天一行）"""
         checkin_dates = {
             CheckinType.WEIGHT: set(),
             CheckinType.BREAKFAST: set(),
@@ -456,123 +471,11 @@ class HabitTrackingService:
             CheckinType.SLEEP: set(),
         }
 
-        # 体重记录
-        weight_result = await db.execute(
-            select(func.date(WeightRecord.record_time).label("record_date"))
-            .where(
-                and_(
-                    WeightRecord.user_id == user_id,
-                    func.date(WeightRecord.record_time) >= start_date,
-                    func.date(WeightRecord.record_time) <= end_date,
-                )
-            )
-            .distinct()
-        )
-        checkin_dates[CheckinType.WEIGHT] = {
-            row.record_date
-            if isinstance(row.record_date, date)
-            else datetime.strptime(row.record_date, "%Y-%m-%d").date()
-            for row in weight_result
-        }
-
-        # 餐食记录（按类型分组）
-        meal_result = await db.execute(
-            select(
-                MealRecord.meal_type,
-                func.date(MealRecord.record_time).label("record_date"),
-            )
-            .where(
-                and_(
-                    MealRecord.user_id == user_id,
-                    func.date(MealRecord.record_time) >= start_date,
-                    func.date(MealRecord.record_time) <= end_date,
-                )
-            )
-            .distinct()
-        )
-        for row in meal_result:
-            record_date = (
-                row.record_date
-                if isinstance(row.record_date, date)
-                else datetime.strptime(row.record_date, "%Y-%m-%d").date()
-            )
-            if row.meal_type == MealType.BREAKFAST:
-                checkin_dates[CheckinType.BREAKFAST].add(record_date)
-            elif row.meal_type == MealType.LUNCH:
-                checkin_dates[CheckinType.LUNCH].add(record_date)
-            elif row.meal_type == MealType.DINNER:
-                checkin_dates[CheckinType.DINNER].add(record_date)
-            elif row.meal_type == MealType.SNACK:
-                checkin_dates[CheckinType.SNACK].add(record_date)
-
-        # 运动记录
-        exercise_result = await db.execute(
-            select(
-                func.coalesce(
-                    ExerciseRecord.checkin_date, func.date(ExerciseRecord.record_time)
-                ).label("record_date")
-            )
-            .where(
-                and_(
-                    ExerciseRecord.user_id == user_id,
-                    func.coalesce(
-                        ExerciseRecord.checkin_date,
-                        func.date(ExerciseRecord.record_time),
-                    )
-                    >= start_date,
-                    func.coalesce(
-                        ExerciseRecord.checkin_date,
-                        func.date(ExerciseRecord.record_time),
-                    )
-                    <= end_date,
-                )
-            )
-            .distinct()
-        )
-        checkin_dates[CheckinType.EXERCISE] = {
-            row.record_date
-            if isinstance(row.record_date, date)
-            else datetime.strptime(row.record_date, "%Y-%m-%d").date()
-            for row in exercise_result
-        }
-
-        # 饮水记录
-        water_result = await db.execute(
-            select(func.date(WaterRecord.record_time).label("record_date"))
-            .where(
-                and_(
-                    WaterRecord.user_id == user_id,
-                    func.date(WaterRecord.record_time) >= start_date,
-                    func.date(WaterRecord.record_time) <= end_date,
-                )
-            )
-            .distinct()
-        )
-        checkin_dates[CheckinType.WATER] = {
-            row.record_date
-            if isinstance(row.record_date, date)
-            else datetime.strptime(row.record_date, "%Y-%m-%d").date()
-            for row in water_result
-        }
-
-        # 睡眠记录
-        sleep_result = await db.execute(
-            select(func.date(SleepRecord.bed_time).label("record_date"))
-            .where(
-                and_(
-                    SleepRecord.user_id == user_id,
-                    func.date(SleepRecord.bed_time) >= start_date,
-                    func.date(SleepRecord.bed_time) <= end_date,
-                )
-            )
-            .distinct()
-        )
-        checkin_dates[CheckinType.SLEEP] = {
-            row.record_date
-            if isinstance(row.record_date, date)
-            else datetime.strptime(row.record_date, "%Y-%m-%d").date()
-            for row in sleep_result
-        }
+        rows = await DailyActivityService.get_range(user_id, db, start_date, end_date)
+        for record_date, row in rows.items():
+            for checkin_type, column in CHECKIN_TYPE_COLUMNS.items():
+                if (getattr(row, column) or 0) > 0:
+                    checkin_dates[checkin_type].add(record_date)
 
         return checkin_dates
 
@@ -582,45 +485,14 @@ class HabitTrackingService:
         计算连续打卡天数
 
         Args:
-            dates: 打卡日期列表（已排序）
+            dates: 打卡日期（列表或集合，无需排序）
 
         Returns:
             current: 当前连续天数
             max: 最大连续天数
         """
-        if not dates:
-            return {"current": 0, "max": 0}
-
-        if isinstance(dates, set):
-            dates = sorted(dates)
-
-        today = date.today()
-        yesterday = today - timedelta(days=1)
-
-        # 计算当前连续天数
-        current_streak = 0
-        if dates[-1] == today or dates[-1] == yesterday:
-            current_streak = 1
-            for i in range(len(dates) - 2, -1, -1):
-                if (dates[i + 1] - dates[i]).days == 1:
-                    current_streak += 1
-                else:
-                    break
-
-        # 计算最大连续天数
-        max_streak = 0
-        current_max = 1
-
-        for i in range(1, len(dates)):
-            if (dates[i] - dates[i - 1]).days == 1:
-                current_max += 1
-            else:
-                max_streak = max(max_streak, current_max)
-                current_max = 1
-
-        max_streak = max(max_streak, current_max)
-
-        return {"current": current_streak, "max": max_streak}
+        # 今天尚未打卡时从昨天开始计算当前连续天数
+        return StreakService.compute_streaks(dates, allow_yesterday=True)
 
     @staticmethod
     def _generate_streak_summary(streaks: Dict) -> List[str]:
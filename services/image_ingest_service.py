@@ -0,0 +1,246 @@
+"""
+餐食照片接收与预处理
+
+原实现在事件循环中一次性读入整个上传文件、同步写盘，再用 Pillow 全尺寸解码、
+LANCZOS 缩放和 JPEG 重新编码，并发上传时会卡住所有其他请求。这里拆成两步：
+1. 接收：分块读取上传内容，边计算 sha256 边用 aiofiles 异步写入临时文件，
+   完成后按内容哈希重命名；相同照片只保存一份
+2. 预处理：在有界进程池中解码/缩放/编码。JPEG 用 Image.draft() 在解码时直接按
+   1/2、1/4、1/8 缩小，大图只需解码一小部分像素。结果（base64 data URL）按内容
+   哈希缓存，重复上传的照片无需再处理；送给模型的内容相同，AI 结果也由 LLM
+   响应缓存直接复用
+"""
+
+import asyncio
+import base64
+import hashlib
+import io
+import multiprocessing
+import os
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Optional
+
+import aiofiles
+import aiofiles.os
+from fastapi import UploadFile
+
+from config.logging_config import get_module_logger
+from config.settings import fastapi_settings
+from utils.performance import get_monitor, increment_counter
+
+logger = get_module_logger(__name__)
+
+# 每次从上传流读取的字节数
+CHUNK_SIZE = 256 * 1024
+
+ALLOWED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp"}
+
+
+class ImageTooLargeError(ValueError):
+    """上传文件超过大小限制"""
+
+
+@dataclass
+class IngestedImage:
+    """已保存的上传照片"""
+
+    sha256: str
+    file_name: str
+    file_path: str
+    size: int
+    # 相同内容的照片之前已保存过
+    duplicate: bool = False
+
+    @property
+    def file_url(self) -> str:
+        return f"/uploads/{self.file_name}"
+
+
+def prepare_image(path: str, max_size: int, quality: int) -> str:
+    """
+    解码、缩放并重新编码为 JPEG，返回 base64 data URL（在进程池中运行）
+
+    JPEG 先用 draft() 让解码器按 2 的幂缩小到不小于目标尺寸，再用 LANCZOS
+    精确缩放到 max_size 以内。
+    """
+    from PIL import Image
+
+    with Image.open(path) as img:
+        if img.format == "JPEG":
+            img.draft("RGB", (max_size, max_size))
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+        if max(img.size) > max_size:
+            ratio = max_size / max(img.size)
+            new_size = (
+                max(1, int(img.size[0] * ratio)),
+                max(1, int(img.size[1] * ratio)),
+            )
+            img = img.resize(new_size, Image.Resampling.LANCZOS)
+
+        buffer = io.BytesIO()
+        img.save(buffer, format="JPEG", quality=quality, optimize=True)
+    encoded = base64.b64encode(buffer.getvalue()).decode("ascii")
+    return f"data:image/jpeg;base64,{encoded}"
+
+
+class ImageIngestService:
+    """照片接收（异步写盘 + 内容去重）与预处理（有界进程池）"""
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        max_pending: Optional[int] = None,
+        cache_size: Optional[int] = None,
+    ):
+        settings = fastapi_settings
+        self.workers = settings.IMAGE_PROCESS_WORKERS if workers is None else workers
+        self.max_pending = max_pending or settings.IMAGE_PROCESS_MAX_PENDING
+        self.cache_size = (
+            settings.IMAGE_DATA_URL_CACHE_SIZE if cache_size is None else cache_size
+        )
+        self._executor: Optional[Executor] = None
+        # 信号量绑定事件循环，循环变化（脚本/测试中多次 asyncio.run）时重建
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending: Optional[asyncio.Semaphore] = None
+        # 内容哈希 -> data URL，按访问顺序排列（最久未使用在前）
+        self._data_urls: "OrderedDict[str, str]" = OrderedDict()
+
+    # ============ 接收 ============
+
+    async def save_upload(
+        self,
+        upload: UploadFile,
+        upload_dir: Optional[str] = None,
+        max_bytes: Optional[int] = None,
+    ) -> IngestedImage:
+        """
+        分块把上传内容写入磁盘，按内容哈希命名
+
+        Raises:
+            ImageTooLargeError: 超过 max_bytes（默认 MAX_UPLOAD_SIZE）
+        """
+        upload_dir = upload_dir or fastapi_settings.UPLOAD_DIR
+        max_bytes = max_bytes or fastapi_settings.MAX_UPLOAD_SIZE
+        ext = os.path.splitext(upload.filename or "")[1].lower()
+        if ext not in ALLOWED_EXTENSIONS:
+            ext = ".jpg"
+
+        await aiofiles.os.makedirs(upload_dir, exist_ok=True)
+        tmp_path = os.path.join(upload_dir, f".{uuid.uuid4().hex}.part")
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            async with aiofiles.open(tmp_path, "wb") as f:
+                while True:
+                    chunk = await upload.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if size > max_bytes:
+                        raise ImageTooLargeError(
+                            f"文件大小不能超过 {max_bytes // (1024 * 1024)}MB"
+                        )
+                    digest.update(chunk)
+                    await f.write(chunk)
+
+            sha256 = digest.hexdigest()
+            file_name = f"{sha256[:32]}{ext}"
+            file_path = os.path.join(upload_dir, file_name)
+            duplicate = await aiofiles.os.path.exists(file_path)
+            if duplicate:
+                await aiofiles.os.remove(tmp_path)
+                increment_counter("image_ingest.duplicates")
+            else:
+                await aiofiles.os.replace(tmp_path, file_path)
+        except BaseException:
+            if await aiofiles.os.path.exists(tmp_path):
+                await aiofiles.os.remove(tmp_path)
+            raise
+
+        return IngestedImage(
+            sha256=sha256,
+            file_name=file_name,
+            file_path=file_path,
+            size=size,
+            duplicate=duplicate,
+        )
+
+    # ============ 预处理 ============
+
+    def _get_executor(self) -> Optional[Executor]:
+        if self.workers <= 0:
+            return None
+        if self._executor is None:
+            # spawn：应用进程里有数据库/向量库等线程，fork 可能复制到持有中的锁
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._pending = asyncio.Semaphore(self.max_pending)
+        return self._pending
+
+    async def to_data_url(
+        self,
+        image: IngestedImage,
+        max_size: Optional[int] = None,
+        quality: Optional[int] = None,
+    ) -> str:
+        """
+        生成送给视觉模型的压缩 JPEG data URL（同一内容只处理一次）
+
+        同时等待处理的照片数受 IMAGE_PROCESS_MAX_PENDING 限制，超出的请求在事件
+        循环上排队，不会在进程池里无限堆积。
+        """
+        max_size = max_size or fastapi_settings.IMAGE_MAX_DIMENSION
+        quality = quality or fastapi_settings.IMAGE_JPEG_QUALITY
+        cache_key = f"{image.sha256}:{max_size}:{quality}"
+        data_url = self._data_urls.get(cache_key)
+        if data_url is not None:
+            self._data_urls.move_to_end(cache_key)
+            increment_counter("image_ingest.cache_hits")
+            return data_url
+
+        loop = asyncio.get_running_loop()
+        async with self._get_semaphore():
+            start = loop.time()
+            data_url = await loop.run_in_executor(
+                self._get_executor(),
+                prepare_image,
+                image.file_path,
+                max_size,
+                quality,
+            )
+            get_monitor("image_ingest.prepare").record_time(loop.time() - start)
+
+        if self.cache_size > 0:
+            self._data_urls[cache_key] = data_url
+            while len(self._data_urls) > self.cache_size:
+                self._data_urls.popitem(last=False)
+        return data_url
+
+    def start(self) -> None:
+        """预先启动进程池（应用启动时调用，避免首个请求承担进程启动时间）"""
+        executor = self._get_executor()
+        if isinstance(executor, ProcessPoolExecutor):
+            for _ in range(self.workers):
+                executor.submit(int)
+
+    def shutdown(self) -> None:
+        """关闭进程池（应用关闭时调用）"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# 全局照片接收服务
+image_ingest = ImageIngestService()
@@ -19,6 +19,11 @@ from models.database import (
 )
 from models.points_history import PointsHistory, PointsType
 from services.achievement_service import AchievementService, PointsService
+from services.daily_activity_service import DailyActivityService
+from services.streak_service import StreakService
+from services.user_profile_service import UserProfileService
+from utils.query_helpers import between_days
+from utils.result_cache import invalidate_user
 from config.logging_config import get_module_logger
 
 logger = get_module_logger(__name__)
@@ -99,6 +104,9 @@ class AchievementIntegrationService:
         except Exception as e:
             logger.exception("处理体重记录成就时出错: %s", e)
 
+        # 记录/积分/成就已变化，使该用户的仪表盘、图表与共享画像缓存失效
+        await invalidate_user(user_id)
+        UserProfileService.invalidate_shared_cache(user_id)
         return results
 
     @staticmethod
@@ -175,6 +183,9 @@ class AchievementIntegrationService:
         except Exception as e:
             logger.exception("处理餐食记录成就时出错: %s", e)
 
+        # 记录/积分/成就已变化，使该用户的仪表盘、图表与共享画像缓存失效
+        await invalidate_user(user_id)
+        UserProfileService.invalidate_shared_cache(user_id)
         return results
 
     @staticmethod
@@ -248,6 +259,9 @@ class AchievementIntegrationService:
         except Exception as e:
             logger.exception("处理运动记录成就时出错: %s", e)
 
+        # 记录/积分/成就已变化，使该用户的仪表盘、图表与共享画像缓存失效
+        await invalidate_user(user_id)
+        UserProfileService.invalidate_shared_cache(user_id)
         return results
 
     @staticmethod
@@ -334,6 +348,9 @@ class AchievementIntegrationService:
         except Exception as e:
             logger.exception("处理饮水记录成就时出错: %s", e)
 
+        # 记录/积分/成就已变化，使该用户的仪表盘、图表与共享画像缓存失效
+        await invalidate_user(user_id)
+        UserProfileService.invalidate_shared_cache(user_id)
         return results
 
     @staticmethod
@@ -404,6 +421,9 @@ class AchievementIntegrationService:
         except Exception as e:
             logger.exception("处理睡眠记录成就时出错: %s", e)
 
+        # 记录/积分/成就已变化，使该用户的仪表盘、图表与共享画像缓存失效
+        await invalidate_user(user_id)
+        UserProfileService.invalidate_shared_cache(user_id)
         return results
 
     # ============ 辅助方法 ============
@@ -472,16 +492,8 @@ class AchievementIntegrationService:
     @staticmethod
     async def _is_water_target_met(user_id: int, db: AsyncSession) -> bool:
         """检查用户今日是否饮水达标（简化判断，默认1500ml）"""
-        today = date.today()
-        result = await db.execute(
-            select(func.sum(WaterRecord.amount)).where(
-                and_(
-                    WaterRecord.user_id == user_id,
-                    func.date(WaterRecord.record_time) == today,
-                )
-            )
-        )
-        total_amount = result.scalar() or 0
+        today_activity = await DailyActivityService.get_day(user_id, db)
+        total_amount = today_activity.water_ml if today_activity else 0
         # 默认目标 1500ml
         return total_amount >= 1500
 
@@ -531,32 +543,26 @@ class AchievementIntegrationService:
                     results["points_earned"] += goal_points["data"]["points_earned"]
 
     @staticmethod
-    async def _check_calorie_streak(user_id: int, db: AsyncSession, results: Dict):
-        """检查热量连续达标成就"""
-        # 获取最近7天的餐食记录
+    async def _get_daily_totals(
+        column: str, user_id: int, days: int, db: AsyncSession
+    ) -> Dict[date, int]:
+        """读取最近 N 天每日活动汇总中某列的值（单次查询）"""
         end_date = date.today()
+        rows = await DailyActivityService.get_range(
+            user_id, db, end_date - timedelta(days=days - 1), end_date
+        )
+        return {day: getattr(row, column) or 0 for day, row in rows.items()}
 
-        # 简化实现：假设每日热量目标为1800kcal
-        streak_days = 0
-
-        for i in range(7):
-            check_date = end_date - timedelta(days=i)
-            # 查询当天总热量
-            result = await db.execute(
-                select(func.sum(MealRecord.calories)).where(
-                    and_(
-                        MealRecord.user_id == user_id,
-                        func.date(MealRecord.record_time) == check_date,
-                    )
-                )
-            )
-            total_calories = result.scalar() or 0
-
-            # 假设在合理范围内（1500-2100）算达标
-            if 1500 <= total_calories <= 2100:
-                streak_days += 1
-            else:
-                break
+    @staticmethod
+    async def _check_calorie_streak(user_id: int, db: AsyncSession, results: Dict):
+        """检查热量连续达标成就"""
+        # 简化实现：假设每日热量目标为1800kcal，1500-2100 之间算达标
+        daily_calories = await AchievementIntegrationService._get_daily_totals(
+            "calories_in", user_id, 7, db
+        )
+        streak_days = StreakService.current_streak(
+            {day for day, total in daily_calories.items() if 1500 <= total <= 2100}
+        )
 
         if streak_days >= 7:
             new_achievements = await AchievementService.check_and_unlock(
@@ -567,25 +573,13 @@ class AchievementIntegrationService:
     @staticmethod
     async def _check_water_streak(user_id: int, db: AsyncSession, results: Dict):
         """检查饮水连续达标成就"""
-        end_date = date.today()
-        streak_days = 0
-
-        for i in range(30):  # 最多检查30天
-            check_date = end_date - timedelta(days=i)
-            result = await db.execute(
-                select(func.sum(WaterRecord.amount)).where(
-                    and_(
-                        WaterRecord.user_id == user_id,
-                        func.date(WaterRecord.record_time) == check_date,
-                    )
-                )
-            )
-            total_amount = result.scalar() or 0
-
-            if total_amount >= 1500:  # 1500ml达标
-                streak_days += 1
-            else:
-                break
+        # 最多检查30天，1500ml达标
+        daily_water = await AchievementIntegrationService._get_daily_totals(
+            "water_ml", user_id, 30, db
+        )
+        streak_days = StreakService.current_streak(
+            {day for day, total in daily_water.items() if total >= 1500}
+        )
 
         if streak_days >= 30:
             new_achievements = await AchievementService.check_and_unlock(
@@ -596,30 +590,13 @@ class AchievementIntegrationService:
     @staticmethod
     async def _check_sleep_streak(user_id: int, db: AsyncSession, results: Dict):
         """检查睡眠连续达标成就"""
-        end_date = date.today()
-        streak_days = 0
-
-        for i in range(14):  # 最多检查14天
-            check_date = end_date - timedelta(days=i)
-            result = await db.execute(
-                select(SleepRecord).where(
-                    and_(
-                        SleepRecord.user_id == user_id,
-                        func.date(SleepRecord.sleep_date) == check_date,
-                    )
-                )
-            )
-            sleep_record = result.scalar_one_or_none()
-
-            if sleep_record and sleep_record.duration:
-                # 睡眠时长在7-9小时算达标
-                hours = sleep_record.duration.total_seconds() / 3600
-                if 7 <= hours <= 9:
-                    streak_days += 1
-                else:
-                    break
-            else:
-                break
+        # 最多检查14天，睡眠时长在7-9小时算达标
+        daily_sleep = await AchievementIntegrationService._get_daily_totals(
+            "sleep_minutes", user_id, 14, db
+        )
+        streak_days = StreakService.current_streak(
+            {day for day, minutes in daily_sleep.items() if 7 * 60 <= minutes <= 9 * 60}
+        )
 
         if streak_days >= 14:
             new_achievements = await AchievementService.check_and_unlock(
@@ -735,116 +712,42 @@ class DailyCheckinService:
         except Exception as e:
             logger.exception("处理每日打卡时出错: %s", e)
 
+        # 记录/积分/成就已变化，使该用户的仪表盘、图表与共享画像缓存失效
+        await invalidate_user(user_id)
+        UserProfileService.invalidate_shared_cache(user_id)
         return results
 
     @staticmethod
     async def _calculate_streak(user_id: int, db: AsyncSession) -> int:
-        """计算连续打卡天数"""
-        today = date.today()
-        streak = 0
-
-        for i in range(365):  # 最多检查一年
-            check_date = today - timedelta(days=i)
-
-            # 检查当天是否有任何健康记录
-            has_record = await DailyCheckinService._has_any_record_on_date(
-                user_id, check_date, db
-            )
-
-            if has_record:
-                streak += 1
-            else:
-                break
-
-        return streak
-
-    @staticmethod
-    async def _has_any_record_on_date(
-        user_id: int, check_date: date, db: AsyncSession
-    ) -> bool:
-        """检查某天是否有任何健康记录"""
-        # 检查体重记录
-        result = await db.execute(
-            select(func.count()).where(
-                and_(
-                    WeightRecord.user_id == user_id,
-                    func.date(WeightRecord.record_time) == check_date,
-                )
-            )
-        )
-        if result.scalar() > 0:
-            return True
-
-        # 检查餐食记录
-        result = await db.execute(
-            select(func.count()).where(
-                and_(
-                    MealRecord.user_id == user_id,
-                    func.date(MealRecord.record_time) == check_date,
-                )
-            )
-        )
-        if result.scalar() > 0:
-            return True
-
-        # 检查运动记录
-        result = await db.execute(
-            select(func.count()).where(
-                and_(
-                    ExerciseRecord.user_id == user_id,
-                    func.date(ExerciseRecord.record_time) == check_date,
-                )
-            )
-        )
-        if result.scalar() > 0:
-            return True
-
-        # 检查饮水记录
-        result = await db.execute(
-            select(func.count()).where(
-                and_(
-                    WaterRecord.user_id == user_id,
-                    func.date(WaterRecord.record_time) == check_date,
-                )
-            )
-        )
-        if result.scalar() > 0:
-            return True
-
-        # 检查睡眠记录
-        result = await db.execute(
-            select(func.count()).where(
-                and_(
-                    SleepRecord.user_id == user_id,
-                    func.date(SleepRecord.sleep_date) == check_date,
-                )
-            )
-        )
-        if result.scalar() > 0:
-            return True
-
-        return False
+        """计算连续打卡天数（最多检查一年，单次查询）"""
+        return await StreakService.get_current_streak(user_id, db)
 
     @staticmethod
     async def _check_perfect_week(user_id: int, db: AsyncSession, results: Dict):
         """检查完美一周成就（7天内每天有至少3种类型的记录）"""
         end_date = date.today()
 
-        # 检查最近7天
+        # 一次取出最近13天的汇总，覆盖所有待检查的7天窗口
+        rows = await DailyActivityService.get_range(
+            user_id, db, end_date - timedelta(days=12), end_date
+        )
+        # 至少有3种类型算完美
+        perfect_dates = {
+            day
+            for day, row in rows.items()
+            if len(DailyActivityService.active_types(row)) >= 3
+        }
+
+        # 检查最近7个窗口
         for week_start in range(6, -1, -1):
             week_end = end_date - timedelta(days=week_start)
             week_begin = week_end - timedelta(days=6)
 
-            perfect_days = 0
-            for day_offset in range(7):
-                check_date = week_begin + timedelta(days=day_offset)
-
-                # 统计当天记录类型数量
-                record_types = await DailyCheckinService._count_record_types_on_date(
-                    user_id, check_date, db
-                )
-                if record_types >= 3:  # 至少有3种类型算完美
-                    perfect_days += 1
+            perfect_days = sum(
+                1
+                for day_offset in range(7)
+                if week_begin + timedelta(days=day_offset) in perfect_dates
+            )
 
             if perfect_days >= 7:  # 7天都完美
                 new_achievements = await AchievementService.check_and_unlock(
@@ -854,98 +757,26 @@ class DailyCheckinService:
                 break
 
     @staticmethod
-    async def _count_record_types_on_date(
-        user_id: int, check_date: date, db: AsyncSession
-    ) -> int:
-        """统计某天有多少种类型的健康记录"""
-        types = 0
-
-        # 体重
+    async def _check_early_bird(user_id: int, db: AsyncSession, results: Dict):
+        """检查早起鸟儿成就（连续7天早上8点前记录）"""
+        # 简化实现：一次取出最近7天的体重记录时间，检查每天是否有早上8点前的记录
+        end_date = date.today()
         result = await db.execute(
-            select(func.count()).where(
+            select(WeightRecord.record_time).where(
                 and_(
                     WeightRecord.user_id == user_id,
-                    func.date(WeightRecord.record_time) == check_date,
-                )
-            )
-        )
-        if result.scalar() > 0:
-            types += 1
-
-        # 餐食
-        result = await db.execute(
-            select(func.count()).where(
-                and_(
-                    MealRecord.user_id == user_id,
-                    func.date(MealRecord.record_time) == check_date,
-                )
-            )
-        )
-        if result.scalar() > 0:
-            types += 1
-
-        # 运动
-        result = await db.execute(
-            select(func.count()).where(
-                and_(
-                    ExerciseRecord.user_id == user_id,
-                    func.date(ExerciseRecord.record_time) == check_date,
-                )
-            )
-        )
-        if result.scalar() > 0:
-            types += 1
-
-        # 饮水
-        result = await db.execute(
-            select(func.count()).where(
-                and_(
-                    WaterRecord.user_id == user_id,
-                    func.date(WaterRecord.record_time) == check_date,
-                )
-            )
-        )
-        if result.scalar() > 0:
-            types += 1
-
-        # 睡眠
-        result = await db.execute(
-            select(func.count()).where(
-                and_(
-                    SleepRecord.user_id == user_id,
-                    func.date(SleepRecord.sleep_date) == check_date,
+                    between_days(
+                        WeightRecord.record_time,
+                        end_date - timedelta(days=6),
+                        end_date,
+                    ),
                 )
             )
         )
-        if result.scalar() > 0:
-            types += 1
-
-        return types
-
-    @staticmethod
-    async def _check_early_bird(user_id: int, db: AsyncSession, results: Dict):
-        """检查早起鸟儿成就（连续7天早上8点前记录）"""
-        # 简化实现：检查最近7天是否有早上的记录
-        end_date = date.today()
-        early_days = 0
-
-        for i in range(7):
-            check_date = end_date - timedelta(days=i)
-
-            # 检查当天是否有早上8点前的记录
-            result = await db.execute(
-                select(func.count()).where(
-                    and_(
-                        WeightRecord.user_id == user_id,
-                        func.date(WeightRecord.record_time) == check_date,
-                        func.time(WeightRecord.record_time) < "08:00:00",
-                    )
-                )
-            )
-            if result.scalar() > 0:
-                early_days += 1
-            else:
-                break
+        early_dates = {
+            record_time.date() for record_time in result.scalars() if record_time.hour < 8
+        }
+        early_days = StreakService.current_streak(early_dates, end_date)
 
         if early_days >= 7:
             new_achievements = await AchievementService.check_and_unlock(
@@ -0,0 +1,282 @@
+"""
+进程内异步任务调度器
+
+提醒、报告、通知检查等周期任务统一注册到这里，在应用自身的事件循环上运行
+（由 main.lifespan 启动和停止），不再各自维护 APScheduler / threading.Timer。
+
+每个任务支持：
+- interval: 固定运行间隔（秒）
+- jitter: 每次运行随机延后 0~jitter 秒，错开多实例部署时的数据库压力
+- max_instances: 同一任务的最大并发运行数，达到上限时跳过本次（防止重叠运行）
+- catch_up: 事件循环阻塞或任务跳过导致错过运行时，是否立即补跑一次（多次错过合并为一次）
+- timeout: 单次运行超时时间
+- once: 只运行一次（如启动时的数据回填，不阻塞应用启动）
+
+运行指标写入 utils.performance：
+- scheduler.<任务名>.duration / scheduler.<任务名>.lag（计划时间到实际开始的延迟）
+- 计数器 scheduler.<任务名>.runs / failures / skipped / missed
+"""
+
+import asyncio
+import random
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+from config.logging_config import get_module_logger
+from utils.performance import get_monitor, increment_counter
+
+logger = get_module_logger(__name__)
+
+
+@dataclass
+class ScheduledJob:
+    """已注册的周期任务"""
+
+    name: str
+    func: Callable[[], Awaitable[Any]]
+    interval: float
+    jitter: float = 0.0
+    max_instances: int = 1
+    catch_up: bool = True
+    timeout: Optional[float] = None
+    run_on_start: bool = False
+    once: bool = False
+
+    # 运行状态
+    running: Set[asyncio.Task] = field(default_factory=set)
+    runs: int = 0
+    failures: int = 0
+    skipped: int = 0
+    missed: int = 0
+    last_started_at: Optional[datetime] = None
+    last_duration: Optional[float] = None
+    last_lag: Optional[float] = None
+    last_error: Optional[str] = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "interval": self.interval,
+            "jitter": self.jitter,
+            "max_instances": self.max_instances,
+            "running": len(self.running),
+            "runs": self.runs,
+            "failures": self.failures,
+            "skipped": self.skipped,
+            "missed": self.missed,
+            "last_started_at": (
+                self.last_started_at.isoformat() if self.last_started_at else None
+            ),
+            "last_duration_ms": (
+                self.last_duration * 1000 if self.last_duration is not None else None
+            ),
+            "last_lag_ms": self.last_lag * 1000 if self.last_lag is not None else None,
+            "last_error": self.last_error,
+        }
+
+
+class JobScheduler:
+    """在应用事件循环上运行的周期任务调度器"""
+
+    def __init__(self, shutdown_timeout: float = 10.0):
+        """
+        Args:
+            shutdown_timeout: 停止时等待运行中任务结束的最长时间（秒），超时后取消
+        """
+        self.shutdown_timeout = shutdown_timeout
+        self._jobs: Dict[str, ScheduledJob] = {}
+        self._drivers: Dict[str, asyncio.Task] = {}
+        self._stopping: Optional[asyncio.Event] = None
+
+    @property
+    def running(self) -> bool:
+        return self._stopping is not None and not self._stopping.is_set()
+
+    def add_job(
+        self,
+        name: str,
+        func: Callable[[], Awaitable[Any]],
+        interval: float,
+        *,
+        jitter: float = 0.0,
+        max_instances: int = 1,
+        catch_up: bool = True,
+        timeout: Optional[float] = None,
+        run_on_start: bool = False,
+        once: bool = False,
+    ) -> ScheduledJob:
+        """
+        注册周期任务（同名任务会被替换）
+
+        Args:
+            name: 任务名
+            func: 无参数的异步函数
+            interval: 运行间隔（秒）
+            jitter: 每次运行随机延后的最大秒数
+            max_instances: 最大并发运行数
+            catch_up: 错过运行后是否补跑一次
+            timeout: 单次运行超时（秒），None 表示不限制
+            run_on_start: 启动后是否立即运行一次
+            once: 只运行一次（run_on_start 时启动后立即运行，否则 interval 秒后运行）
+        """
+        if interval <= 0:
+            raise ValueError("interval 必须大于 0")
+        if max_instances < 1:
+            raise ValueError("max_instances 至少为 1")
+
+        self.remove_job(name)
+        job = ScheduledJob(
+            name=name,
+            func=func,
+            interval=interval,
+            jitter=max(jitter, 0.0),
+            max_instances=max_instances,
+            catch_up=catch_up,
+            timeout=timeout,
+            run_on_start=run_on_start,
+            once=once,
+        )
+        self._jobs[name] = job
+        if self.running:
+            self._start_driver(job)
+        return job
+
+    def remove_job(self, name: str) -> bool:
+        """移除任务（不会中断正在运行的实例）"""
+        job = self._jobs.pop(name, None)
+        driver = self._drivers.pop(name, None)
+        if driver is not None:
+            driver.cancel()
+        return job is not None
+
+    def get_job(self, name: str) -> Optional[ScheduledJob]:
+        return self._jobs.get(name)
+
+    def start(self) -> None:
+        """启动调度（需在事件循环中调用，如 FastAPI lifespan）"""
+        if self.running:
+            logger.warning("任务调度器已在运行中")
+            return
+        self._stopping = asyncio.Event()
+        for job in self._jobs.values():
+            self._start_driver(job)
+        logger.info("任务调度器已启动: %s", ", ".join(self._jobs) or "无任务")
+
+    async def stop(self) -> None:
+        """停止调度，等待运行中的任务结束（超时后取消）"""
+        if not self.running:
+            return
+        self._stopping.set()
+
+        drivers = list(self._drivers.values())
+        self._drivers.clear()
+        for driver in drivers:
+            driver.cancel()
+        await asyncio.gather(*drivers, return_exceptions=True)
+
+        pending = [task for job in self._jobs.values() for task in job.running]
+        if pending:
+            done, not_done = await asyncio.wait(pending, timeout=self.shutdown_timeout)
+            for task in not_done:
+                task.cancel()
+            if not_done:
+                logger.warning("任务调度器停止时取消了 %d 个运行中的任务", len(not_done))
+                await asyncio.gather(*not_done, return_exceptions=True)
+        logger.info("任务调度器已停止")
+
+    async def run_now(self, name: str) -> None:
+        """立即运行一次任务并等待完成（用于手动触发），同样受并发上限约束"""
+        job = self._jobs[name]
+        task = self._dispatch(job, asyncio.get_running_loop().time())
+        if task is not None:
+            await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: job.stats() for name, job in self._jobs.items()}
+
+    # ---- 内部方法 ----
+
+    def _start_driver(self, job: ScheduledJob) -> None:
+        self._drivers[job.name] = asyncio.create_task(
+            self._drive(job), name=f"scheduler:{job.name}"
+        )
+
+    async def _drive(self, job: ScheduledJob) -> None:
+        """单个任务的调度循环"""
+        loop = asyncio.get_running_loop()
+        next_run = loop.time() + (0.0 if job.run_on_start else job.interval)
+
+        while True:
+            delay = random.uniform(0, job.jitter) if job.jitter else 0.0
+            wait = next_run + delay - loop.time()
+            if wait > 0:
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), wait)
+                    return
+                except asyncio.TimeoutError:
+                    pass
+            if self._stopping.is_set():
+                return
+
+            # 落后超过一个间隔说明错过了运行：合并为一次补跑，或直接跳到下一个时间点
+            now = loop.time()
+            missed = int((now - next_run) // job.interval)
+            scheduled = next_run
+            next_run += job.interval * (missed + 1)
+            if missed > 0:
+                job.missed += missed
+                increment_counter(f"scheduler.{job.name}.missed", missed)
+                logger.warning("任务 %s 错过了 %d 次运行", job.name, missed)
+                if not job.catch_up:
+                    continue
+                scheduled = now
+
+            self._dispatch(job, scheduled)
+            if job.once:
+                return
+
+    def _dispatch(self, job: ScheduledJob, scheduled: float) -> Optional[asyncio.Task]:
+        if len(job.running) >= job.max_instances:
+            job.skipped += 1
+            increment_counter(f"scheduler.{job.name}.skipped")
+            logger.warning(
+                "任务 %s 仍有 %d 个实例在运行，跳过本次", job.name, len(job.running)
+            )
+            return None
+        task = asyncio.create_task(self._execute(job, scheduled))
+        job.running.add(task)
+        task.add_done_callback(job.running.discard)
+        return task
+
+    async def _execute(self, job: ScheduledJob, scheduled: float) -> None:
+        loop = asyncio.get_running_loop()
+        job.last_lag = max(loop.time() - scheduled, 0.0)
+        get_monitor(f"scheduler.{job.name}.lag").record_time(job.last_lag)
+        job.last_started_at = datetime.now()
+        job.runs += 1
+        increment_counter(f"scheduler.{job.name}.runs")
+
+        monitor = get_monitor(f"scheduler.{job.name}.duration")
+        start = time.perf_counter()
+        try:
+            if job.timeout:
+                await asyncio.wait_for(job.func(), job.timeout)
+            else:
+                await job.func()
+            job.last_error = None
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            job.failures += 1
+            job.last_error = repr(e)
+            increment_counter(f"scheduler.{job.name}.failures")
+            monitor.record_error(repr(e))
+            logger.exception("任务 %s 运行失败: %s", job.name, e)
+        finally:
+            job.last_duration = time.perf_counter() - start
+            monitor.record_time(job.last_duration)
+
+
+# 全局调度器（应用内所有周期任务共用）
+job_scheduler = JobScheduler()
@@ -105,6 +105,15 @@ class BaseAgent(ABC):
             query=query,
         )
 
+    async def aget_context(self, query: Optional[str] = None, **kwargs) -> str:
+        """获取对话上下文（异步版本，确保用户画像已加载）"""
+        return await self.memory_manager.aget_context(
+            checkin_limit=kwargs.get("checkin_limit", 10),
+            conversation_limit=kwargs.get("conversation_limit", 10),
+            include_long_term=kwargs.get("include_long_term", True),
+            query=query,
+        )
+
     def search_memories(self, query: str, **kwargs) -> Dict[str, List[Dict[str, Any]]]:
         """
         搜索记忆
@@ -169,3 +178,11 @@ class BaseAgent(ABC):
             clear_short_term=kwargs.get("clear_short_term", True),
             clear_long_term=kwargs.get("clear_long_term", False),
         )
+
+    def estimated_bytes(self) -> int:
+        """估算常驻内存（主要是记忆管理器）"""
+        return self.memory_manager.estimated_bytes()
+
+    def close(self) -> None:
+        """释放资源（被会话注册表淘汰时调用）"""
+        self.memory_manager.close()
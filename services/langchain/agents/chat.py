@@ -207,7 +207,7 @@ async def get_memory_context(
         memory_manager = MemoryManager(user_id)
 
         # 获取组合上下文
-        context = memory_manager.get_context(
+        context = await memory_manager.aget_context(
             checkin_limit=kwargs.get("checkin_limit", 10),
             conversation_limit=kwargs.get("conversation_limit", 10),
             include_long_term=kwargs.get("include_long_term", True),
@@ -215,7 +215,7 @@ async def get_memory_context(
         )
 
         # 获取用户画像
-        user_profile = memory_manager.get_user_profile(
+        user_profile = await memory_manager.aget_user_profile(
             force_refresh=kwargs.get("force_refresh_profile", False)
         )
 
@@ -9,6 +9,7 @@ from datetime import datetime
 
 from .base import BaseAgent
 from .simple import SimpleWeightAgent
+from utils.session_registry import SessionRegistry
 
 
 class AgentFactory:
@@ -21,7 +22,8 @@ class AgentFactory:
         "SimpleWeightAgent": SimpleWeightAgent,
     }
 
-    _agent_cache: Dict[int, BaseAgent] = {}
+    # 有界注册表：LRU + 空闲淘汰 + 内存预算，淘汰时调用 BaseAgent.close()
+    _agent_cache: SessionRegistry[int, BaseAgent] = SessionRegistry("agents")
     _cache_lock: Optional[asyncio.Lock] = None
 
     @classmethod
@@ -34,13 +36,10 @@ class AgentFactory:
     @classmethod
     async def get_agent(cls, user_id: int, db=None) -> BaseAgent:
         async with cls._get_lock():
-            if user_id in cls._agent_cache:
-                return cls._agent_cache[user_id]
-
-        agent = cls._create_agent(user_id)
-
-        async with cls._get_lock():
-            cls._agent_cache[user_id] = agent
+            agent = cls._agent_cache.get(user_id)
+            if agent is None:
+                agent = cls._create_agent(user_id)
+                cls._agent_cache.put(user_id, agent)
 
         return agent
 
@@ -98,14 +97,8 @@ class AgentFactory:
     async def clear_cache(cls, user_id: Optional[int] = None) -> int:
         async with cls._get_lock():
             if user_id is None:
-                count = len(cls._agent_cache)
-                cls._agent_cache.clear()
-                return count
-            else:
-                if user_id in cls._agent_cache:
-                    del cls._agent_cache[user_id]
-                    return 1
-                return 0
+                return cls._agent_cache.clear()
+            return 1 if cls._agent_cache.pop(user_id) else 0
 
     @classmethod
     def get_available_agents(cls) -> Dict[str, Dict[str, Any]]:
@@ -61,13 +61,13 @@ class SimpleWeightAgent(BaseAgent):
             响应结果
         """
         # 1. 获取上下文
-        context = self.get_context(query=message, **kwargs)
+        context = await self.aget_context(query=message, **kwargs)
 
         # 2. 构建系统提示
         system_prompt = self.get_system_prompt()
 
         # 3. 获取用户画像
-        user_profile = self.memory_manager.get_user_profile()
+        user_profile = await self.memory_manager.aget_user_profile()
 
         # 4. 构建完整的提示
         full_prompt = f"""{system_prompt}
@@ -346,7 +346,7 @@ class SimpleWeightAgent(BaseAgent):
             return {"success": False, "message": "需要先记录体重数据才能提供建议"}
 
         # 获取用户画像
-        user_profile = self.memory_manager.get_user_profile()
+        user_profile = await self.memory_manager.aget_user_profile()
         height = None
 
         # 从用户画像中提取身高
@@ -0,0 +1,369 @@
+"""
+LangGraph 数据库检查点保存器
+
+教练对话图原先使用进程内 MemorySaver，且每次调用生成新的 thread_id，检查点只增不减，
+图状态（画像、打卡缓存、对话历史）也无法在轮次之间复用。这里改为：
+- 检查点写入数据库 graph_checkpoints 表（整份检查点序列化为一行），进程重启后可恢复
+- 每个用户一个稳定的滚动线程（coach_thread_id），下一轮从上一轮的最终状态继续
+- 每个线程只保留最近 GRAPH_CHECKPOINT_MAX_PER_THREAD 个检查点，且总大小不超过
+  GRAPH_CHECKPOINT_MAX_BYTES（始终保留最新一个）；超过 GRAPH_CHECKPOINT_TTL_HOURS
+  未更新的检查点读取时视为不存在，并由定时任务 purge_expired 清理（连同其中间写入）
+- 节点的中间写入（pending writes）只保存在进程内，仅用于同一步骤内的恢复；
+  线程写入新检查点后即已应用，随之释放
+
+只实现异步接口（图通过 ainvoke 调用）。
+
+指标（utils.performance 计数器）：graph_checkpoint.puts / pruned / purged / bytes
+"""
+
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+)
+from sqlalchemy import delete, desc, select
+
+from config.logging_config import get_module_logger
+from config.settings import fastapi_settings
+from models.database import AsyncSessionLocal, GraphCheckpoint
+from utils.performance import get_counters, increment_counter
+
+logger = get_module_logger(__name__)
+
+# (thread_id, checkpoint_ns, checkpoint_id) -> {(task_id, idx): (task_id, channel, typed)}
+WritesKey = Tuple[str, str, str]
+
+
+def coach_thread_id(user_id: int) -> str:
+    """用户的教练对话滚动线程ID"""
+    return f"coach_user_{user_id}"
+
+
+class DatabaseCheckpointSaver(BaseCheckpointSaver):
+    """基于数据库的有界检查点保存器"""
+
+    def __init__(
+        self,
+        session_factory=None,
+        ttl_hours: Optional[float] = None,
+        max_per_thread: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        serde=None,
+    ):
+        """
+        Args:
+            session_factory: 异步会话工厂，默认 AsyncSessionLocal
+            ttl_hours: 检查点有效期（小时），默认 GRAPH_CHECKPOINT_TTL_HOURS
+            max_per_thread: 每线程保留的检查点数，默认 GRAPH_CHECKPOINT_MAX_PER_THREAD
+            max_bytes: 每线程检查点总大小上限，默认 GRAPH_CHECKPOINT_MAX_BYTES
+            serde: 序列化器，默认使用 LangGraph 的 JsonPlusSerializer
+        """
+        super().__init__(serde=serde)
+        self.session_factory = session_factory or AsyncSessionLocal
+        self.ttl = timedelta(
+            hours=ttl_hours or fastapi_settings.GRAPH_CHECKPOINT_TTL_HOURS
+        )
+        self.max_per_thread = max(
+            max_per_thread or fastapi_settings.GRAPH_CHECKPOINT_MAX_PER_THREAD, 1
+        )
+        self.max_bytes = max_bytes or fastapi_settings.GRAPH_CHECKPOINT_MAX_BYTES
+        self._writes: Dict[WritesKey, Dict[Tuple[str, int], Tuple[str, str, Any]]] = {}
+
+    # ---- 读取 ----
+
+    def _cutoff(self) -> datetime:
+        return datetime.utcnow() - self.ttl
+
+    def _to_tuple(self, row: GraphCheckpoint) -> CheckpointTuple:
+        key = (row.thread_id, row.checkpoint_ns, row.checkpoint_id)
+        writes = self._writes.get(key, {})
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": row.thread_id,
+                    "checkpoint_ns": row.checkpoint_ns,
+                    "checkpoint_id": row.checkpoint_id,
+                }
+            },
+            checkpoint=self.serde.loads_typed((row.checkpoint_type, row.checkpoint)),
+            metadata=self.serde.loads_typed(
+                (row.metadata_type, row.checkpoint_metadata)
+            ),
+            parent_config=(
+                {
+                    "configurable": {
+                        "thread_id": row.thread_id,
+                        "checkpoint_ns": row.checkpoint_ns,
+                        "checkpoint_id": row.parent_checkpoint_id,
+                    }
+                }
+                if row.parent_checkpoint_id
+                else None
+            ),
+            pending_writes=[
+                (task_id, channel, self.serde.loads_typed(value))
+                for task_id, channel, value in writes.values()
+            ],
+        )
+
+    async def aget_tuple(self, config: Dict[str, Any]) -> Optional[CheckpointTuple]:
+        """获取指定检查点；未指定 checkpoint_id 时返回线程最新的未过期检查点"""
+        configurable = config["configurable"]
+        checkpoint_id = configurable.get("checkpoint_id")
+        stmt = select(GraphCheckpoint).where(
+            GraphCheckpoint.thread_id == configurable["thread_id"],
+            GraphCheckpoint.checkpoint_ns == configurable.get("checkpoint_ns", ""),
+            GraphCheckpoint.created_at >= self._cutoff(),
+        )
+        if checkpoint_id:
+            stmt = stmt.where(GraphCheckpoint.checkpoint_id == checkpoint_id)
+        else:
+            stmt = stmt.order_by(desc(GraphCheckpoint.checkpoint_id)).limit(1)
+
+        async with self.session_factory() as db:
+            row = (await db.execute(stmt)).scalars().first()
+        return self._to_tuple(row) if row is not None else None
+
+    async def alist(
+        self,
+        config: Optional[Dict[str, Any]],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[Dict[str, Any]] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        """按时间倒序列出未过期的检查点"""
+        stmt = (
+            select(GraphCheckpoint)
+            .where(GraphCheckpoint.created_at >= self._cutoff())
+            .order_by(desc(GraphCheckpoint.checkpoint_id))
+        )
+        if config is not None:
+            configurable = config["configurable"]
+            stmt = stmt.where(GraphCheckpoint.thread_id == configurable["thread_id"])
+            if "checkpoint_ns" in configurable:
+                stmt = stmt.where(
+                    GraphCheckpoint.checkpoint_ns == configurable["checkpoint_ns"]
+                )
+            if configurable.get("checkpoint_id"):
+                stmt = stmt.where(
+                    GraphCheckpoint.checkpoint_id == configurable["checkpoint_id"]
+                )
+        if before is not None and before["configurable"].get("checkpoint_id"):
+            stmt = stmt.where(
+                GraphCheckpoint.checkpoint_id < before["configurable"]["checkpoint_id"]
+            )
+
+        async with self.session_factory() as db:
+            rows = (await db.execute(stmt)).scalars().all()
+
+        count = 0
+        for row in rows:
+            item = self._to_tuple(row)
+            if filter and any(item.metadata.get(k) != v for k, v in filter.items()):
+                continue
+            yield item
+            count += 1
+            if limit is not None and count >= limit:
+                break
+
+    # ---- 写入 ----
+
+    async def aput(
+        self,
+        config: Dict[str, Any],
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> Dict[str, Any]:
+        """保存检查点，并按数量与大小上限淘汰该线程较旧的检查点"""
+        configurable = config["configurable"]
+        thread_id = configurable["thread_id"]
+        checkpoint_ns = configurable.get("checkpoint_ns", "")
+        checkpoint_type, checkpoint_blob = self.serde.dumps_typed(checkpoint)
+        metadata_type, metadata_blob = self.serde.dumps_typed(metadata)
+        size = len(checkpoint_blob) + len(metadata_blob)
+
+        async with self.session_factory() as db:
+            await db.execute(
+                delete(GraphCheckpoint).where(
+                    GraphCheckpoint.thread_id == thread_id,
+                    GraphCheckpoint.checkpoint_ns == checkpoint_ns,
+                    GraphCheckpoint.checkpoint_id == checkpoint["id"],
+                )
+            )
+            db.add(
+                GraphCheckpoint(
+                    thread_id=thread_id,
+                    checkpoint_ns=checkpoint_ns,
+                    checkpoint_id=checkpoint["id"],
+                    parent_checkpoint_id=configurable.get("checkpoint_id"),
+                    checkpoint_type=checkpoint_type,
+                    checkpoint=checkpoint_blob,
+                    metadata_type=metadata_type,
+                    checkpoint_metadata=metadata_blob,
+                    size_bytes=size,
+                )
+            )
+            await db.flush()
+            pruned = await self._prune(db, thread_id, checkpoint_ns)
+            await db.commit()
+
+        # 之前检查点的中间写入已应用到新检查点中，不再需要
+        self._drop_writes(thread_id, checkpoint_ns, keep=checkpoint["id"])
+        increment_counter("graph_checkpoint.puts")
+        increment_counter("graph_checkpoint.bytes", size)
+        if pruned:
+            increment_counter("graph_checkpoint.pruned", len(pruned))
+
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def _drop_writes(
+        self,
+        thread_id: str,
+        checkpoint_ns: Optional[str] = None,
+        keep: Optional[str] = None,
+    ) -> None:
+        for key in [
+            key
+            for key in self._writes
+            if key[0] == thread_id
+            and checkpoint_ns in (None, key[1])
+            and key[2] != keep
+        ]:
+            del self._writes[key]
+
+    async def _prune(self, db, thread_id: str, checkpoint_ns: str) -> List[str]:
+        """淘汰超出数量或大小上限的旧检查点，返回被删除的 checkpoint_id"""
+        rows = (
+            await db.execute(
+                select(
+                    GraphCheckpoint.id,
+                    GraphCheckpoint.checkpoint_id,
+                    GraphCheckpoint.size_bytes,
+                )
+                .where(
+                    GraphCheckpoint.thread_id == thread_id,
+                    GraphCheckpoint.checkpoint_ns == checkpoint_ns,
+                )
+                .order_by(desc(GraphCheckpoint.checkpoint_id))
+            )
+        ).all()
+
+        total = 0
+        stale_ids, stale_checkpoints = [], []
+        for index, (row_id, checkpoint_id, size) in enumerate(rows):
+            total += size
+            # 最新的检查点总是保留；一旦开始淘汰，更旧的也一并淘汰
+            if index > 0 and (
+                stale_ids or index >= self.max_per_thread or total > self.max_bytes
+            ):
+                stale_ids.append(row_id)
+                stale_checkpoints.append(checkpoint_id)
+
+        if stale_ids:
+            await db.execute(
+                delete(GraphCheckpoint).where(GraphCheckpoint.id.in_(stale_ids))
+            )
+        return stale_checkpoints
+
+    async def aput_writes(
+        self,
+        config: Dict[str, Any],
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        """保存节点的中间写入（进程内）"""
+        configurable = config["configurable"]
+        key = (
+            configurable["thread_id"],
+            configurable.get("checkpoint_ns", ""),
+            configurable["checkpoint_id"],
+        )
+        stored = self._writes.setdefault(key, {})
+        for index, (channel, value) in enumerate(writes):
+            inner_key = (task_id, WRITES_IDX_MAP.get(channel, index))
+            if inner_key[1] >= 0 and inner_key in stored:
+                continue
+            stored[inner_key] = (task_id, channel, self.serde.dumps_typed(value))
+
+    # ---- 清理 ----
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        """删除线程的全部检查点"""
+        async with self.session_factory() as db:
+            await db.execute(
+                delete(GraphCheckpoint).where(GraphCheckpoint.thread_id == thread_id)
+            )
+            await db.commit()
+        self._drop_writes(thread_id)
+
+    async def purge_expired(self) -> int:
+        """删除过期的检查点及其中间写入，返回删除条数"""
+        async with self.session_factory() as db:
+            rows = (
+                await db.execute(
+                    select(
+                        GraphCheckpoint.id,
+                        GraphCheckpoint.thread_id,
+                        GraphCheckpoint.checkpoint_ns,
+                        GraphCheckpoint.checkpoint_id,
+                    ).where(GraphCheckpoint.created_at < self._cutoff())
+                )
+            ).all()
+            if rows:
+                await db.execute(
+                    delete(GraphCheckpoint).where(
+                        GraphCheckpoint.id.in_([row[0] for row in rows])
+                    )
+                )
+                await db.commit()
+
+        for _, thread_id, checkpoint_ns, checkpoint_id in rows:
+            self._writes.pop((thread_id, checkpoint_ns, checkpoint_id), None)
+
+        purged = len(rows)
+        if purged:
+            increment_counter("graph_checkpoint.purged", purged)
+            logger.info("已清理过期图检查点: %d 条", purged)
+        return purged
+
+    def stats(self) -> Dict[str, Any]:
+        counters = get_counters()
+        puts = counters.get("graph_checkpoint.puts", 0)
+        return {
+            "puts": puts,
+            "pruned": counters.get("graph_checkpoint.pruned", 0),
+            "purged": counters.get("graph_checkpoint.purged", 0),
+            "avg_bytes": (
+                round(counters.get("graph_checkpoint.bytes", 0) / puts) if puts else None
+            ),
+            "pending_write_sets": len(self._writes),
+            "ttl_hours": self.ttl.total_seconds() / 3600,
+            "max_per_thread": self.max_per_thread,
+            "max_bytes": self.max_bytes,
+        }
+
+
+_checkpointer: Optional[DatabaseCheckpointSaver] = None
+
+
+def get_checkpointer() -> DatabaseCheckpointSaver:
+    """全局检查点保存器（所有图实例共用）"""
+    global _checkpointer
+    if _checkpointer is None:
+        _checkpointer = DatabaseCheckpointSaver()
+    return _checkpointer
@@ -15,6 +15,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from .graph import invoke_graph, get_graph_performance_summary, reset_graph_cache
 from .monitor import performance_monitor
 from config.logging_config import get_module_logger
+from utils.session_registry import SessionRegistry
 
 logger = get_module_logger(__name__)
 
@@ -26,7 +27,10 @@ class GraphFactory:
     保持相同的API接口以支持无缝迁移
     """
 
-    _instance_cache: Dict[int, Dict[str, Any]] = {}
+    # 有界注册表：LRU + 空闲淘汰
+    _instance_cache: SessionRegistry[int, Dict[str, Any]] = SessionRegistry(
+        "graph_agents"
+    )
     _cache_lock: Optional[asyncio.Lock] = None
 
     @classmethod
@@ -111,6 +115,10 @@ class GraphFactory:
         """
         logger.info("GraphFactory.get_agent调用: user_id=%s", user_id)
 
+        cached = cls._instance_cache.get(user_id)
+        if cached is not None:
+            return cached
+
         # 创建聊天函数（忽略传入的db，节点会自己创建会话）
         async def chat_func(message: str, **kwargs):
             return await cls._chat_wrapper(user_id, message, **kwargs)
@@ -120,12 +128,15 @@ class GraphFactory:
             agent_name="体重教练(LangGraph)", user_id=user_id, chat_func=chat_func
         )
 
-        return {
+        instance = {
             "name": "体重教练(LangGraph)",
             "user_id": user_id,
             "agent": agent_wrapper,
             "type": "graph",
         }
+        cls._instance_cache.put(user_id, instance)
+
+        return instance
 
     @classmethod
     async def create_or_update_agent_config(
@@ -177,14 +188,12 @@ class GraphFactory:
         """
         async with cls._get_lock():
             if user_id is None:
-                count = len(cls._instance_cache)
-                cls._instance_cache.clear()
+                count = cls._instance_cache.clear()
                 await reset_graph_cache()
                 logger.info("清除所有缓存: 数量=%d", count)
                 return count
             else:
-                if user_id in cls._instance_cache:
-                    del cls._instance_cache[user_id]
+                if cls._instance_cache.pop(user_id):
                     await reset_graph_cache(f"user_{user_id}")
                     logger.info("清除用户缓存: user_id=%s", user_id)
                     return 1
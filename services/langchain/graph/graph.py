@@ -1,16 +1,20 @@
 """
 LangGraph Graph构建
 定义对话流程图、边、条件流转和持久化检查点
-简化版本：使用内存检查点，避免复杂的导入问题
+检查点保存在数据库中，每个用户一个滚动线程，画像/打卡缓存/对话历史在轮次之间复用
 """
 
-from typing import Dict, Any, Optional, Literal
+from functools import lru_cache
+from typing import AsyncIterator, Dict, Any, Optional, Literal
 import asyncio
+import inspect
 import time
+import weakref
 
 from langgraph.graph import StateGraph, END
 from .state import CoachState
 from .nodes import (
+    COACH_TOKEN_EVENT,
     load_profile_node,
     refresh_checkins_node,
     coach_node,
@@ -18,6 +22,7 @@ from .nodes import (
     finalize_node,
 )
 from .monitor import performance_monitor, get_performance_summary
+from .checkpointer import coach_thread_id
 from config.logging_config import get_module_logger
 
 logger = get_module_logger(__name__)
@@ -26,13 +31,15 @@ logger = get_module_logger(__name__)
 def create_coach_graph(
     use_checkpoint: bool = True,
     graph_id: str = "coach_graph",
+    checkpointer=None,
 ) -> StateGraph:
     """
     创建教练对话图（简化版本）
 
     Args:
-        use_checkpoint: 是否使用检查点（内存检查点）
+        use_checkpoint: 是否使用检查点（默认数据库检查点）
         graph_id: 图ID，用于监控
+        checkpointer: 自定义检查点保存器，默认使用全局数据库检查点保存器
 
     Returns:
         配置好的StateGraph
@@ -97,16 +104,12 @@ def create_coach_graph(
 
         # 5. 编译图
         if use_checkpoint:
-            try:
-                from langgraph.checkpoint.memory import MemorySaver
-
-                checkpointer = MemorySaver()
-                workflow = workflow.compile(checkpointer=checkpointer)
-                logger.info("已配置内存检查点保存器")
-            except ImportError as e:
-                logger.warning("无法导入MemorySaver，不使用检查点: %s", e)
-                workflow = workflow.compile()
-                logger.info("使用无检查点模式")
+            if checkpointer is None:
+                from .checkpointer import get_checkpointer
+
+                checkpointer = get_checkpointer()
+            workflow = workflow.compile(checkpointer=checkpointer)
+            logger.info("已配置检查点保存器: %s", type(checkpointer).__name__)
         else:
             workflow = workflow.compile()
             logger.info("使用无检查点模式")
@@ -131,10 +134,61 @@ def create_coach_graph(
         raise
 
 
+# 流式执行时转发进度事件的节点
+GRAPH_NODES = ("load_profile", "refresh_checkins", "coach", "tools", "finalize")
+
 # 全局图实例缓存
 _graph_cache: Dict[str, StateGraph] = {}
 _graph_cache_lock = asyncio.Lock()
 
+# 同一线程的调用串行执行（避免并发轮次基于同一检查点互相覆盖对话历史）
+_thread_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = (
+    weakref.WeakValueDictionary()
+)
+
+
+def _thread_lock(thread_id: str) -> asyncio.Lock:
+    lock = _thread_locks.get(thread_id)
+    if lock is None:
+        lock = asyncio.Lock()
+        _thread_locks[thread_id] = lock
+    return lock
+
+
+@lru_cache(maxsize=None)
+def _invoke_options(graph_type: type) -> Dict[str, Any]:
+    """
+    图调用参数：只在运行结束时写入一次检查点（LangGraph 0.6+ 的 durability 参数），
+    单轮对话中途失败时从头重跑即可，不需要逐步持久化
+    """
+    if "durability" in inspect.signature(graph_type.ainvoke).parameters:
+        return {"durability": "exit"}
+    return {}
+
+
+def build_turn_input(user_id: int, user_message: str) -> Dict[str, Any]:
+    """
+    构建单轮对话的图输入
+
+    只重置本轮相关的字段；画像、打卡缓存（checkins / checkins_last_refresh /
+    needs_refresh）和对话历史沿用线程检查点中的上一轮状态，新线程时由节点按默认值处理。
+    """
+    return {
+        "user_id": user_id,
+        "user_message": user_message,
+        "assistant_response": "",
+        "current_tools": [],
+        "tool_calls": [],
+        "error": None,
+        "metrics": {},
+        "structured_response": {
+            "type": "text",
+            "content": "",
+            "actions": [],
+        },
+        "intermediate_steps": [],
+    }
+
 
 async def get_graph(
     graph_id: str = "coach_graph",
@@ -167,6 +221,46 @@ async def get_graph(
         return graph
 
 
+def _build_result(
+    user_id: int, thread_id: str, final_state: Dict[str, Any]
+) -> Dict[str, Any]:
+    """从图的最终状态提取调用结果"""
+    return {
+        "success": True,
+        "user_id": user_id,
+        "thread_id": thread_id,
+        "assistant_response": final_state.get("assistant_response", ""),
+        "structured_response": final_state.get("structured_response", {}),
+        "intermediate_steps": final_state.get("intermediate_steps", []),
+        "tool_calls": final_state.get("tool_calls", []),
+        "error": final_state.get("error"),
+        "profile_loaded": bool(final_state.get("profile")),
+        "checkins_loaded": len(final_state.get("checkins", [])),
+        "conversation_history_length": len(
+            final_state.get("conversation_history", [])
+        ),
+    }
+
+
+def _failure_result(
+    user_id: int, thread_id: Optional[str], e: Exception
+) -> Dict[str, Any]:
+    """图执行失败时返回的兜底结果"""
+    return {
+        "success": False,
+        "user_id": user_id,
+        "thread_id": thread_id,
+        "assistant_response": "抱歉，我在处理您的请求时遇到了一些困难。请稍后再试或联系技术支持。",
+        "structured_response": {
+            "type": "text",
+            "content": "抱歉，我在处理您的请求时遇到了一些困难。请稍后再试或联系技术支持。",
+            "actions": [],
+        },
+        "error": str(e),
+        "timestamp": time.time(),
+    }
+
+
 async def invoke_graph(
     user_id: int,
     user_message: str,
@@ -183,7 +277,7 @@ async def invoke_graph(
         user_message: 用户消息
         db: 数据库会话（已废弃，保留参数以保持兼容）
         graph_id: 图ID
-        thread_id: 线程ID（用于检查点）
+        thread_id: 线程ID（用于检查点），默认为用户的滚动线程
         config: 额外配置
 
     Returns:
@@ -201,31 +295,12 @@ async def invoke_graph(
         # 1. 获取图实例
         graph = await get_graph(graph_id, use_checkpoint=True)
 
-        # 2. 准备初始状态
-        initial_state: CoachState = {
-            "user_id": user_id,
-            "user_message": user_message,
-            "assistant_response": "",
-            "profile": {},
-            "checkins": [],
-            "checkins_last_refresh": None,
-            "conversation_history": [],
-            "current_tools": [],
-            "tool_calls": [],
-            "needs_refresh": True,
-            "error": None,
-            "metrics": {},
-            "structured_response": {
-                "type": "text",
-                "content": "",
-                "actions": [],
-            },
-            "intermediate_steps": [],
-        }
+        # 2. 准备本轮输入（其余状态沿用线程检查点）
+        turn_input = build_turn_input(user_id, user_message)
 
         # 3. 准备配置
         if thread_id is None:
-            thread_id = f"user_{user_id}_{int(time.time())}"
+            thread_id = coach_thread_id(user_id)
 
         graph_config = {
             "configurable": {
@@ -240,27 +315,15 @@ async def invoke_graph(
         logger.info("开始图执行: user_id=%s, thread_id=%s", user_id, thread_id)
 
         # 注意：这里需要确保节点函数能够从config中获取db参数
-        final_state = await graph.ainvoke(
-            initial_state,
-            config=graph_config,
-        )
+        async with _thread_lock(thread_id):
+            final_state = await graph.ainvoke(
+                turn_input,
+                config=graph_config,
+                **_invoke_options(type(graph)),
+            )
 
         # 5. 提取结果
-        result = {
-            "success": True,
-            "user_id": user_id,
-            "thread_id": thread_id,
-            "assistant_response": final_state.get("assistant_response", ""),
-            "structured_response": final_state.get("structured_response", {}),
-            "intermediate_steps": final_state.get("intermediate_steps", []),
-            "tool_calls": final_state.get("tool_calls", []),
-            "error": final_state.get("error"),
-            "profile_loaded": bool(final_state.get("profile")),
-            "checkins_loaded": len(final_state.get("checkins", [])),
-            "conversation_history_length": len(
-                final_state.get("conversation_history", [])
-            ),
-        }
+        result = _build_result(user_id, thread_id, final_state)
 
         # 6. 记录性能指标
         duration_ms = (time.time() - start_time) * 1000
@@ -293,19 +356,99 @@ async def invoke_graph(
             error=str(e),
         )
 
-        return {
-            "success": False,
-            "user_id": user_id,
-            "thread_id": thread_id,
-            "assistant_response": "抱歉，我在处理您的请求时遇到了一些困难。请稍后再试或联系技术支持。",
-            "structured_response": {
-                "type": "text",
-                "content": "抱歉，我在处理您的请求时遇到了一些困难。请稍后再试或联系技术支持。",
-                "actions": [],
-            },
-            "error": str(e),
-            "timestamp": time.time(),
-        }
+        return _failure_result(user_id, thread_id, e)
+
+
+async def stream_graph(
+    user_id: int,
+    user_message: str,
+    graph_id: str = "coach_graph",
+    thread_id: Optional[str] = None,
+    config: Optional[Dict[str, Any]] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    流式调用图处理用户消息（astream_events 驱动，边执行边产出事件）
+
+    产出的事件（type 字段区分）：
+    - {"type": "node", "node": 节点名, "status": "start" | "end"}：节点进度
+    - {"type": "token", "content": 文本}：教练节点模型回复的一段输出
+    - {"type": "final", ...}：与 invoke_graph 返回值相同的最终结果，始终是最后一个事件
+
+    参数同 invoke_graph
+    """
+    start_time = time.time()
+    if thread_id is None:
+        thread_id = coach_thread_id(user_id)
+    graph_config = {"configurable": {"thread_id": thread_id, "stream_tokens": True}}
+    if config:
+        graph_config["configurable"].update(config)
+
+    logger.info("流式调用图: user_id=%s, thread_id=%s", user_id, thread_id)
+    final_state = None
+    try:
+        graph = await get_graph(graph_id, use_checkpoint=True)
+        async with _thread_lock(thread_id):
+            async for event in graph.astream_events(
+                build_turn_input(user_id, user_message),
+                config=graph_config,
+                version="v2",
+                **_invoke_options(type(graph)),
+            ):
+                kind = event["event"]
+                if kind == "on_custom_event":
+                    if event["name"] == COACH_TOKEN_EVENT:
+                        yield {"type": "token", "content": event["data"]["content"]}
+                elif kind in ("on_chain_start", "on_chain_end"):
+                    if not event.get("parent_ids"):
+                        # 图本身的运行（根事件），结束时输出最终状态
+                        if kind == "on_chain_end":
+                            final_state = event["data"].get("output")
+                    elif (
+                        event["name"] in GRAPH_NODES
+                        and event.get("metadata", {}).get("langgraph_node")
+                        == event["name"]
+                    ):
+                        yield {
+                            "type": "node",
+                            "node": event["name"],
+                            "status": "start" if kind == "on_chain_start" else "end",
+                        }
+
+        if not isinstance(final_state, dict):
+            raise RuntimeError("图执行未返回最终状态")
+        result = _build_result(user_id, thread_id, final_state)
+
+        duration_ms = (time.time() - start_time) * 1000
+        performance_monitor.record_graph_invocation(
+            graph_id,
+            duration_ms,
+            user_id=user_id,
+            thread_id=thread_id,
+            success=True,
+            streaming=True,
+        )
+        logger.info(
+            "流式图调用完成: user_id=%s, thread_id=%s, 耗时=%.2fms",
+            user_id,
+            thread_id,
+            duration_ms,
+        )
+    except Exception as e:
+        logger.exception(
+            "流式图调用失败: user_id=%s, thread_id=%s, 错误=%s", user_id, thread_id, e
+        )
+        performance_monitor.record_graph_invocation(
+            graph_id,
+            (time.time() - start_time) * 1000,
+            user_id=user_id,
+            thread_id=thread_id,
+            success=False,
+            error=str(e),
+            streaming=True,
+        )
+        result = _failure_result(user_id, thread_id, e)
+
+    yield {"type": "final", **result}
 
 
 async def get_graph_performance_summary(
@@ -354,6 +497,8 @@ __all__ = [
     "create_coach_graph",
     "get_graph",
     "invoke_graph",
+    "stream_graph",
+    "build_turn_input",
     "get_graph_performance_summary",
     "reset_graph_cache",
 ]
@@ -4,6 +4,8 @@ LangGraph Nodes实现
 """
 
 import asyncio
+import hashlib
+import json
 from typing import Dict, Any, List, Optional
 from datetime import datetime, timedelta
 import time
@@ -14,22 +16,37 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from .state import CoachState, CoachGraphState
 from .monitor import monitor_node, performance_monitor
 from config.logging_config import get_module_logger
+from utils.result_cache import MISSING, result_cache
 
 logger = get_module_logger(__name__)
 
+# 教练节点 AI 调用的截止时间（秒，包含排队与重试）
+COACH_AI_TIMEOUT = 45.0
+
+# stream_graph 在 configurable 中设置 stream_tokens=True 时，教练节点改为流式调用模型，
+# 每段输出作为自定义事件 COACH_TOKEN_EVENT 发出（astream_events 中为 on_custom_event）
+COACH_TOKEN_EVENT = "coach_token"
+
+# 工具执行的截止时间（秒），超时的工具被取消，不影响其他工具的结果
+TOOL_TIMEOUT = 5.0
+TOOL_TIMEOUTS = {"search_long_term_memory": 8.0}
+
+# 结果只取决于输入的工具，按 (用户, 工具, 输入摘要) 记忆化；
+# 缓存随用户数据版本号失效（打卡写入时 invalidate_user）
+PURE_TOOLS = {"analyze_weight_trends", "calculate_bmi", "get_checkin_history"}
+
 # 导入数据库模型
 try:
     from models.database import (
-        UserProfile,
         WeightRecord,
         MealRecord,
         ExerciseRecord,
         WaterRecord,
         SleepRecord,
-        User,
         ChatHistory,
         AsyncSessionLocal,
     )
+    from services.user_profile_service import UserProfileService
 
     HAS_DB_MODELS = True
 except ImportError as e:
@@ -58,83 +75,28 @@ async def load_profile_node(
 
     logger.info("加载用户画像: user_id=%s", user_id)
 
-    # 创建新的数据库会话（避免序列化问题）
     try:
-        async with AsyncSessionLocal() as db:
-            # 1. 加载用户基本信息
-            user_stmt = select(User).where(User.id == user_id)
-            user_result = await db.execute(user_stmt)
-            user = user_result.scalar_one_or_none()
-
-            if not user:
-                logger.warning("用户不存在: user_id=%s", user_id)
-                state["error"] = f"用户 {user_id} 不存在"
-                return state
+        # 共享画像缓存（与 UserProfileService / MemoryManager 共用，画像写入时失效），
+        # 未命中时在连接池的独立会话上加载（避免序列化问题）
+        profile = await UserProfileService.get_profile_snapshot(user_id)
 
-            # 2. 加载用户画像
-            profile_stmt = select(UserProfile).where(UserProfile.user_id == user_id)
-            profile_result = await db.execute(profile_stmt)
-            profile_record = profile_result.scalar_one_or_none()
-
-            # 3. 构建profile字典
-            profile = {}
-            if profile_record:
-                # 将SQLAlchemy对象转换为字典
-                profile = {
-                    "nickname": user.nickname or "用户",
-                    "gender": profile_record.gender,
-                    "age": profile_record.age,
-                    "height": profile_record.height,
-                    "bmr": profile_record.bmr,
-                    "diet_preferences": profile_record.diet_preferences,
-                    "exercise_habits": profile_record.exercise_habits,
-                    "weight_history": profile_record.weight_history,
-                    "body_signals": profile_record.body_signals,
-                    "motivation_type": profile_record.motivation_type.value
-                    if profile_record.motivation_type
-                    else None,
-                    "weak_points": profile_record.weak_points,
-                    "memory_summary": profile_record.memory_summary,
-                    "decision_mode": profile_record.decision_mode,
-                    "points": profile_record.points,
-                    "communication_style": profile_record.communication_style,
-                    "updated_at": profile_record.updated_at.isoformat()
-                    if profile_record.updated_at
-                    else None,
-                }
-            else:
-                profile = {
-                    "nickname": user.nickname or "用户",
-                    "gender": None,
-                    "age": None,
-                    "height": None,
-                    "bmr": None,
-                    "diet_preferences": None,
-                    "exercise_habits": None,
-                    "weight_history": None,
-                    "body_signals": None,
-                    "motivation_type": None,
-                    "weak_points": None,
-                    "memory_summary": None,
-                    "decision_mode": "balanced",
-                    "points": 0,
-                    "communication_style": None,
-                }
+        if profile is None:
+            logger.warning("用户不存在: user_id=%s", user_id)
+            state["error"] = f"用户 {user_id} 不存在"
+            return state
 
-            # 4. 更新state
-            state["profile"] = profile
+        # 更新state
+        state["profile"] = profile
 
-            # 5. 记录性能指标
-            duration_ms = (time.time() - start_time) * 1000
-            performance_monitor.record_node_execution(
-                "coach_graph", "load_profile_node", duration_ms, True, user_id=user_id
-            )
+        # 记录性能指标
+        duration_ms = (time.time() - start_time) * 1000
+        performance_monitor.record_node_execution(
+            "coach_graph", "load_profile_node", duration_ms, True, user_id=user_id
+        )
 
-            logger.info(
-                "用户画像加载完成: user_id=%s, 耗时=%.2fms", user_id, duration_ms
-            )
+        logger.info("用户画像加载完成: user_id=%s, 耗时=%.2fms", user_id, duration_ms)
 
-            return state
+        return state
 
     except Exception as e:
         logger.exception("加载用户画像失败: user_id=%s, 错误=%s", user_id, e)
@@ -204,6 +166,9 @@ async def refresh_checkins_node(
                 )
 
                 state["needs_refresh"] = False
+                performance_monitor.record_cache_hit(
+                    "coach_graph", "checkins", user_id=user_id
+                )
 
                 duration_ms = (time.time() - start_time) * 1000
                 performance_monitor.record_node_execution(
@@ -219,6 +184,9 @@ async def refresh_checkins_node(
 
             # 需要刷新，从数据库加载数据
             logger.info("从数据库加载打卡数据: user_id=%s", user_id)
+            performance_monitor.record_cache_miss(
+                "coach_graph", "checkins", user_id=user_id
+            )
 
             # 计算时间范围：最近7天
             cutoff_time = datetime.now() - timedelta(days=7)
@@ -495,7 +463,7 @@ async def coach_node(
 
         # 6. 调用AI服务
         # 注意：这里需要导入ai_service，暂时使用模拟响应
-        ai_response = await _call_ai_service(messages)
+        ai_response = await _call_ai_service(messages, user_id)
 
         # 7. 分析是否需要工具调用
         tool_calls_needed = _analyze_tool_needs(intent, ai_response)
@@ -608,80 +576,32 @@ async def tools_node(
             "get_checkin_history": get_checkin_history_tool,
         }
 
-        # 执行工具调用
-        tool_results = []
+        # 并发执行工具调用（工具之间互不依赖，各自有截止时间）
+        planned = []
         for tool_name in tool_calls:
             if tool_name in tool_map:
-                logger.info("调用工具: user_id=%s, tool=%s", user_id, tool_name)
-
-                tool_start_time = time.time()
-
-                try:
-                    # 准备工具参数
-                    tool_params = _prepare_tool_params(tool_name, state)
-
-                    # 调用工具
-                    tool_result = await tool_map[tool_name](**tool_params)
-
-                    tool_duration_ms = (time.time() - tool_start_time) * 1000
-
-                    # 记录工具调用
-                    tool_call_record = {
-                        "tool": tool_name,
-                        "params": tool_params,
-                        "result": tool_result,
-                        "duration_ms": tool_duration_ms,
-                        "timestamp": datetime.now().isoformat(),
-                    }
-                    tool_calls_history.append(tool_call_record)
-                    tool_results.append(tool_result)
-
-                    # 记录工具指标
-                    performance_monitor.record_tool_call(
-                        "coach_graph",
-                        tool_name,
-                        tool_duration_ms,
-                        True,
-                        user_id=user_id,
-                    )
-
-                    logger.info(
-                        "工具调用成功: user_id=%s, tool=%s, 耗时=%.2fms",
-                        user_id,
-                        tool_name,
-                        tool_duration_ms,
-                    )
-
-                except Exception as tool_error:
-                    tool_duration_ms = (time.time() - tool_start_time) * 1000
-                    logger.error(
-                        "工具调用失败: user_id=%s, tool=%s, 错误=%s",
-                        user_id,
-                        tool_name,
-                        tool_error,
-                    )
-
-                    tool_call_record = {
-                        "tool": tool_name,
-                        "params": tool_params,
-                        "error": str(tool_error),
-                        "duration_ms": tool_duration_ms,
-                        "timestamp": datetime.now().isoformat(),
-                    }
-                    tool_calls_history.append(tool_call_record)
-
-                    # 记录失败指标
-                    performance_monitor.record_tool_call(
-                        "coach_graph",
-                        tool_name,
-                        tool_duration_ms,
-                        False,
-                        user_id=user_id,
-                        error=str(tool_error),
-                    )
+                planned.append(tool_name)
             else:
                 logger.warning("未知工具: user_id=%s, tool=%s", user_id, tool_name)
 
+        tool_records = await asyncio.gather(
+            *(
+                _execute_tool(
+                    tool_name,
+                    tool_map[tool_name],
+                    _prepare_tool_params(tool_name, state),
+                    user_id,
+                )
+                for tool_name in planned
+            )
+        )
+
+        tool_results = []
+        for tool_call_record in tool_records:
+            tool_calls_history.append(tool_call_record)
+            if "result" in tool_call_record:
+                tool_results.append(tool_call_record["result"])
+
         # 更新state
         state["tool_calls"] = tool_calls_history
 
@@ -997,24 +917,48 @@ def _build_system_prompt(profile: Dict, checkins: List[Dict], intent: str) -> st
     return full_prompt
 
 
-async def _call_ai_service(messages: List[Dict]) -> str:
-    """调用AI服务（简化实现，实际应使用现有ai_service）"""
+async def _call_ai_service(
+    messages: List[Dict], user_id: Optional[int] = None
+) -> str:
+    """调用AI服务（经共享 LLM 传输层，按用户限制并发，超过截止时间即放弃）"""
     try:
-        # 尝试导入现有ai_service
         from services.ai_service import ai_service
-
-        response = await ai_service.chat(messages, max_tokens=500)
-        if hasattr(response, "content"):
-            return response.content
-        elif isinstance(response, dict) and "content" in response:
-            return response["content"]
-        else:
-            return str(response)
+        from services.llm_transport import llm_context
     except ImportError:
         # 如果ai_service不可用，返回模拟响应
         logger.warning("ai_service不可用，使用模拟响应")
         return "我收到您的消息了。基于您的健康数据，我建议您继续保持规律的生活习惯，均衡饮食，适量运动。如果您有具体问题，可以告诉我更多细节。"
 
+    if _tokens_requested():
+        return await _stream_ai_service(messages, user_id)
+
+    with llm_context(user_id=user_id, timeout=COACH_AI_TIMEOUT):
+        response = await ai_service.chat(messages, max_tokens=500)
+    if response.error:
+        logger.warning("教练节点AI调用失败: user_id=%s, 错误=%s", user_id, response.error)
+    return response.content
+
+
+def _tokens_requested() -> bool:
+    """当前图调用是否要求逐段输出模型回复"""
+    from langchain_core.runnables.config import ensure_config
+
+    return bool(ensure_config().get("configurable", {}).get("stream_tokens"))
+
+
+async def _stream_ai_service(messages: List[Dict], user_id: Optional[int] = None) -> str:
+    """流式调用AI服务，逐段发出 COACH_TOKEN_EVENT，返回完整回复"""
+    from langchain_core.callbacks.manager import adispatch_custom_event
+    from services.ai_service import ai_service
+    from services.llm_transport import llm_context
+
+    parts: List[str] = []
+    with llm_context(user_id=user_id, timeout=COACH_AI_TIMEOUT):
+        async for chunk in ai_service.stream_chat(messages, max_tokens=500):
+            parts.append(chunk)
+            await adispatch_custom_event(COACH_TOKEN_EVENT, {"content": chunk})
+    return "".join(parts)
+
 
 def _analyze_tool_needs(intent: str, ai_response: str) -> List[str]:
     """分析是否需要工具调用"""
@@ -1067,6 +1011,98 @@ def _extract_actions(ai_response: str) -> List[Dict]:
     return actions
 
 
+def _tool_input_digest(tool_params: Dict) -> str:
+    """工具输入摘要（记忆化缓存键）"""
+    payload = json.dumps(tool_params, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+async def _execute_tool(
+    tool_name: str, tool_func, tool_params: Dict, user_id: Optional[int]
+) -> Dict[str, Any]:
+    """
+    执行单个工具并返回调用记录
+
+    纯函数工具先查记忆化缓存；实际执行超过截止时间即取消，记为失败。
+    """
+    tool_start_time = time.time()
+    timeout = TOOL_TIMEOUTS.get(tool_name, TOOL_TIMEOUT)
+    record = {"tool": tool_name, "params": tool_params}
+
+    section = version = None
+    if tool_name in PURE_TOOLS and user_id is not None:
+        section = f"graph_tool:{tool_name}:{_tool_input_digest(tool_params)}"
+        version, cached = await result_cache.get(user_id, section)
+        if cached is not MISSING:
+            performance_monitor.record_cache_hit(
+                "coach_graph", "tool_results", user_id=user_id, tool=tool_name
+            )
+            logger.info("工具结果命中缓存: user_id=%s, tool=%s", user_id, tool_name)
+            record.update(
+                {
+                    "result": cached,
+                    "cached": True,
+                    "duration_ms": (time.time() - tool_start_time) * 1000,
+                    "timestamp": datetime.now().isoformat(),
+                }
+            )
+            return record
+        performance_monitor.record_cache_miss(
+            "coach_graph", "tool_results", user_id=user_id, tool=tool_name
+        )
+
+    logger.info("调用工具: user_id=%s, tool=%s", user_id, tool_name)
+    try:
+        tool_result = await asyncio.wait_for(tool_func(**tool_params), timeout)
+    except Exception as tool_error:
+        if isinstance(tool_error, asyncio.TimeoutError):
+            tool_error = TimeoutError(f"工具执行超时（{timeout:g}秒）")
+        tool_duration_ms = (time.time() - tool_start_time) * 1000
+        logger.error(
+            "工具调用失败: user_id=%s, tool=%s, 错误=%s", user_id, tool_name, tool_error
+        )
+        record.update(
+            {
+                "error": str(tool_error),
+                "duration_ms": tool_duration_ms,
+                "timestamp": datetime.now().isoformat(),
+            }
+        )
+        performance_monitor.record_tool_call(
+            "coach_graph",
+            tool_name,
+            tool_duration_ms,
+            False,
+            user_id=user_id,
+            error=str(tool_error),
+        )
+        return record
+
+    tool_duration_ms = (time.time() - tool_start_time) * 1000
+    if section is not None and isinstance(tool_result, dict) and tool_result.get(
+        "success"
+    ):
+        await result_cache.set(user_id, version, section, tool_result)
+
+    record.update(
+        {
+            "result": tool_result,
+            "duration_ms": tool_duration_ms,
+            "timestamp": datetime.now().isoformat(),
+        }
+    )
+    performance_monitor.record_tool_call(
+        "coach_graph", tool_name, tool_duration_ms, True, user_id=user_id
+    )
+    logger.info(
+        "工具调用成功: user_id=%s, tool=%s, 耗时=%.2fms",
+        user_id,
+        tool_name,
+        tool_duration_ms,
+    )
+    return record
+
+
 def _prepare_tool_params(tool_name: str, state: Dict) -> Dict:
     """准备工具参数"""
     base_params = {
@@ -264,7 +264,10 @@ async def search_long_term_memory_tool(
             from services.vectorstore.chroma_store import get_user_vector_store
 
             vector_store = get_user_vector_store(user_id)
-            vector_results = vector_store.similarity_search(query, k=limit)
+            # 向量检索是同步调用，放到线程中执行，避免阻塞并发执行的其他工具
+            vector_results = await asyncio.to_thread(
+                vector_store.similarity_search, query, k=limit
+            )
 
             for result in vector_results:
                 results.append(
@@ -21,12 +21,18 @@ try:
     from sqlalchemy import select, desc
     from sqlalchemy.ext.asyncio import AsyncSession
     from models.database import AsyncSessionLocal, MealRecord, ExerciseRecord
+    from services.user_profile_service import UserProfileService
 
     HAS_ASYNC_DB = True
 except ImportError:
     HAS_ASYNC_DB = False
 
 
+# 内存估算：管理器自身与向量存储句柄的固定开销、每条短期记忆消息的字典开销
+MEMORY_MANAGER_BASE_BYTES = 256 * 1024
+MESSAGE_OVERHEAD_BYTES = 400
+
+
 class MemoryManager:
     """
     记忆管理器
@@ -54,8 +60,8 @@ class MemoryManager:
             conversation_capacity=200,  # 200条对话记录
         )
 
-        # 从数据库加载最近的打卡记录到短期记忆（后台异步加载，不阻塞事件循环）
-        self._start_background_checkins_load()
+        # 从数据库加载最近的打卡记录并预取用户画像（后台异步加载，不阻塞事件循环）
+        self._start_background_load()
 
         # 记录短期记忆状态（初始为空，后台加载后会更新）
         self.logger.info(
@@ -66,35 +72,37 @@ class MemoryManager:
         self.long_term_memory = EnhancedVectorStoreRetrieverMemory(user_id=user_id)
         self.logger.info("长期记忆初始化完成")
 
-    def _start_background_checkins_load(self):
-        """启动后台异步加载打卡记录"""
+    def _start_background_load(self):
+        """启动后台异步加载打卡记录与用户画像"""
+        import asyncio
+
         try:
-            import asyncio
-
-            # 检查是否在事件循环中
-            loop = asyncio.get_event_loop()
-            # 创建后台任务，不等待完成
-            task = asyncio.create_task(self._load_recent_checkins_async())
-            # 可选：存储任务引用以防止垃圾回收
-            self._load_task = task
+            asyncio.get_running_loop()
         except RuntimeError:
-            # 没有事件循环，同步执行（回退）
-            self.logger.warning("没有事件循环，同步加载打卡记录")
-            self._load_recent_checkins_sync()
+            # 没有事件循环（脚本/测试环境）：跳过预加载，画像在首次异步读取时加载
+            self.logger.warning("没有事件循环，跳过打卡记录与用户画像预加载")
+            return
 
-    async def _load_recent_checkins_async(self):
-        """异步加载打卡记录（优先使用异步数据库查询，失败时回退到同步版本）"""
-        try:
-            if HAS_ASYNC_DB:
-                await self._load_recent_checkins_from_db_async()
-            else:
-                import asyncio
+        # 创建后台任务，不等待完成；保存引用以防止被垃圾回收
+        self._load_task = asyncio.create_task(self._load_background_async())
 
-                await asyncio.to_thread(self._load_recent_checkins_sync)
+    async def _load_background_async(self):
+        """异步加载打卡记录到短期记忆，并预取用户画像到共享缓存"""
+        if not HAS_ASYNC_DB:
+            self.logger.warning("数据库模块不可用，跳过打卡记录与用户画像加载")
+            return
+
+        try:
+            await self._load_recent_checkins_from_db_async()
             self.logger.info("后台打卡记录加载完成")
         except Exception as e:
             self.logger.error(f"后台加载打卡记录失败: {e}")
 
+        try:
+            await UserProfileService.get_profile_snapshot(self.user_id)
+        except Exception as e:
+            self.logger.error(f"后台预取用户画像失败: {e}")
+
     async def _load_recent_checkins_from_db_async(self):
         """使用SQLAlchemy异步查询加载打卡记录"""
         try:
@@ -169,119 +177,6 @@ class MemoryManager:
             # 抛出异常，让上层决定是否回退
             raise
 
-    def _load_recent_checkins_sync(self):
-        """从数据库加载最近的打卡记录到短期记忆（同步版本，在后台线程中运行）"""
-        try:
-            import sqlite3
-            import json
-            from datetime import datetime, timedelta
-            from config.settings import fastapi_settings
-            import re
-
-            # 从DATABASE_URL提取SQLite文件路径
-            # 支持格式：sqlite+aiosqlite:///./weight_management.db
-            # 或 sqlite:///./weight_management.db
-            db_url = fastapi_settings.DATABASE_URL
-            match = re.search(r"sqlite(?:\+aiosqlite)?:///\./([\w\.]+)", db_url)
-            if match:
-                db_file = match.group(1)
-            else:
-                # 默认回退
-                db_file = "weight_management.db"
-
-            # 直接使用SQLite连接
-            conn = sqlite3.connect(db_file)
-            cursor = conn.cursor()
-
-            # 计算24小时前的时间
-            cutoff_time = (datetime.now() - timedelta(hours=24)).strftime(
-                "%Y-%m-%d %H:%M:%S"
-            )
-
-            # 查询最近24小时的餐食记录
-            cursor.execute(
-                """
-                SELECT meal_type, food_items, total_calories, record_time 
-                FROM meal_records 
-                WHERE user_id = ? AND record_time >= ?
-                ORDER BY record_time DESC 
-                LIMIT 10
-            """,
-                (self.user_id, cutoff_time),
-            )
-
-            meal_records = cursor.fetchall()
-
-            for record in meal_records:
-                meal_type, food_items_json, total_calories, record_time = record
-
-                # 解析食物项目
-                try:
-                    food_items = json.loads(food_items_json) if food_items_json else []
-                    food_names = [item.get("name", "未知") for item in food_items]
-                    content = f"【{meal_type}打卡】吃了：{', '.join(food_names)}，总热量：{total_calories}千卡"
-
-                    from .typed_buffer import HumanMessage
-
-                    self.short_term_memory.add_message(
-                        message=HumanMessage(content=content),
-                        memory_type=MemoryType.CHECKIN,
-                    )
-                except Exception as e:
-                    print(f"解析餐食记录失败: {e}")
-
-            # 查询最近24小时的运动记录
-            cursor.execute(
-                """
-                SELECT exercise_type, duration_minutes, calories_burned, intensity, record_time 
-                FROM exercise_records 
-                WHERE user_id = ? AND record_time >= ?
-                ORDER BY record_time DESC 
-                LIMIT 10
-            """,
-                (self.user_id, cutoff_time),
-            )
-
-            exercise_records = cursor.fetchall()
-
-            for record in exercise_records:
-                (
-                    exercise_type,
-                    duration_minutes,
-                    calories_burned,
-                    intensity,
-                    record_time,
-                ) = record
-
-                # 构建运动记录内容
-                intensity_name = {
-                    "low": "低强度",
-                    "medium": "中等强度",
-                    "high": "高强度",
-                }.get(intensity, intensity)
-                content = f"【运动打卡】{exercise_type} {duration_minutes}分钟（{intensity_name}），消耗{calories_burned}卡路里"
-
-                from .typed_buffer import HumanMessage
-
-                self.short_term_memory.add_message(
-                    message=HumanMessage(content=content),
-                    memory_type=MemoryType.CHECKIN,
-                )
-
-            conn.close()
-            self.logger.info(
-                f"从数据库加载了 {len(meal_records)} 条餐食记录和 {len(exercise_records)} 条运动记录到短期记忆"
-            )
-
-        except Exception as e:
-            self.logger.error(f"加载打卡记录到短期记忆失败: {e}")
-            # 不抛出异常，继续使用空记忆
-
-        # 缓存用户画像
-        self.user_profile_cache: Optional[Dict[str, Any]] = None
-        self.profile_cache_time: Optional[datetime] = None
-        self.profile_cache_ttl = timedelta(minutes=30)  # 30分钟缓存
-
     @monitor_critical_path("memory_manager.add_message")
     async def add_message(
         self,
@@ -456,9 +351,28 @@ class MemoryManager:
 
         return "\n".join(context_parts)
 
+    async def aget_context(
+        self,
+        checkin_limit: int = 10,
+        conversation_limit: int = 10,
+        include_long_term: bool = True,
+        query: Optional[str] = None,
+    ) -> str:
+        """获取组合上下文（异步版本：先确保用户画像已加载到共享缓存）"""
+        await self.aget_user_profile()
+        return self.get_context(
+            checkin_limit=checkin_limit,
+            conversation_limit=conversation_limit,
+            include_long_term=include_long_term,
+            query=query,
+        )
+
     def get_user_profile(self, force_refresh: bool = False) -> Dict[str, Any]:
         """
-        获取用户画像
+        获取用户画像（非阻塞）
+
+        只读取共享画像缓存；未命中时在后台加载，本次返回“加载中”占位。
+        异步代码中应使用 aget_user_profile 以确保拿到画像。
 
         Args:
             force_refresh: 是否强制刷新缓存
@@ -466,73 +380,82 @@ class MemoryManager:
         Returns:
             用户画像字典
         """
-        # 检查缓存
-        if not force_refresh and self.user_profile_cache and self.profile_cache_time:
-            if datetime.now() - self.profile_cache_time < self.profile_cache_ttl:
-                return self.user_profile_cache.copy()
+        if not HAS_ASYNC_DB:
+            return {"状态": "获取用户画像失败: 数据库模块不可用"}
+
+        snapshot = (
+            None
+            if force_refresh
+            else UserProfileService.peek_profile_snapshot(self.user_id)
+        )
+        if snapshot is not None:
+            return self._format_user_profile(snapshot)
+
+        import asyncio
 
-        # 从数据库获取用户画像（同步版本）
         try:
-            import sqlite3
-            from config.settings import fastapi_settings
-            import re
-
-            # 从DATABASE_URL提取SQLite文件路径
-            db_url = fastapi_settings.DATABASE_URL
-            match = re.search(r"sqlite(?:\+aiosqlite)?:///\./([\w\.]+)", db_url)
-            if match:
-                db_file = match.group(1)
-            else:
-                db_file = "weight_management.db"
-
-            conn = sqlite3.connect(db_file)
-            cursor = conn.cursor()
-
-            # 查询用户画像
-            cursor.execute(
-                """
-                SELECT nickname, age, gender, height, bmr, diet_preferences, exercise_habits
-                FROM user_profiles 
-                WHERE user_id = ?
-                """,
-                (self.user_id,),
-            )
+            asyncio.get_running_loop()
+        except RuntimeError:
+            # 没有事件循环时无法后台加载，调用方应改用 aget_user_profile
+            return {"状态": "用户画像未加载"}
 
-            profile = cursor.fetchone()
-            conn.close()
-
-            if profile:
-                (
-                    nickname,
-                    age,
-                    gender,
-                    height,
-                    bmr,
-                    diet_preferences,
-                    exercise_habits,
-                ) = profile
-                user_profile = {
-                    "昵称": nickname or "未设置",
-                    "年龄": age or "未设置",
-                    "性别": gender or "未设置",
-                    "身高": f"{height}厘米" if height else "未设置",
-                    "基础代谢率": f"{bmr}千卡/天" if bmr else "未设置",
-                    "饮食偏好": str(diet_preferences) if diet_preferences else "无",
-                    "运动习惯": str(exercise_habits) if exercise_habits else "无",
-                }
-            else:
-                user_profile = {"状态": "未设置用户画像"}
+        self._profile_task = asyncio.create_task(
+            self.aget_user_profile(force_refresh)
+        )
+        return {"状态": "用户画像加载中"}
 
-        except Exception as e:
-            # 数据库查询失败
-            self.logger.error(f"获取用户画像失败: {e}")
-            user_profile = {"状态": f"获取用户画像失败: {str(e)}"}
+    async def aget_user_profile(self, force_refresh: bool = False) -> Dict[str, Any]:
+        """
+        获取用户画像（异步，走共享画像缓存与连接池）
 
-        # 更新缓存
-        self.user_profile_cache = user_profile
-        self.profile_cache_time = datetime.now()
+        Args:
+            force_refresh: 是否强制刷新缓存
 
-        return user_profile.copy()
+        Returns:
+            用户画像字典
+        """
+        if not HAS_ASYNC_DB:
+            return {"状态": "获取用户画像失败: 数据库模块不可用"}
+
+        try:
+            snapshot = await UserProfileService.get_profile_snapshot(
+                self.user_id, force_refresh=force_refresh
+            )
+        except Exception as e:
+            self.logger.error(f"获取用户画像失败: {e}")
+            return {"状态": f"获取用户画像失败: {str(e)}"}
+
+        return self._format_user_profile(snapshot)
+
+    @staticmethod
+    def _format_user_profile(snapshot: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """将画像快照转换为上下文中展示的字段"""
+        if not snapshot or not any(
+            snapshot.get(key)
+            for key in (
+                "age",
+                "gender",
+                "height",
+                "bmr",
+                "diet_preferences",
+                "exercise_habits",
+            )
+        ):
+            return {"状态": "未设置用户画像"}
+
+        height = snapshot.get("height")
+        bmr = snapshot.get("bmr")
+        diet_preferences = snapshot.get("diet_preferences")
+        exercise_habits = snapshot.get("exercise_habits")
+        return {
+            "昵称": snapshot.get("nickname") or "未设置",
+            "年龄": snapshot.get("age") or "未设置",
+            "性别": snapshot.get("gender") or "未设置",
+            "身高": f"{height}厘米" if height else "未设置",
+            "基础代谢率": f"{bmr}千卡/天" if bmr else "未设置",
+            "饮食偏好": str(diet_preferences) if diet_preferences else "无",
+            "运动习惯": str(exercise_habits) if exercise_habits else "无",
+        }
 
     def search_memories(
         self,
@@ -746,14 +669,43 @@ class MemoryManager:
         user_profile = self.get_user_profile()
         stats["profile"] = {
             "has_profile": bool(user_profile and len(user_profile) > 1),
-            "cached": self.user_profile_cache is not None,
-            "cache_age": (datetime.now() - self.profile_cache_time).total_seconds()
-            if self.profile_cache_time
-            else None,
+            "cached": HAS_ASYNC_DB
+            and UserProfileService.peek_profile_snapshot(self.user_id) is not None,
         }
 
         return stats
 
+    def estimated_bytes(self) -> int:
+        """
+        估算常驻内存
+
+        短期记忆按消息内容的 UTF-8 字节数加每条字典开销估算，另加向量存储句柄的固定开销。
+        """
+        messages = (
+            self.short_term_memory.checkin_messages
+            + self.short_term_memory.conversation_messages
+        )
+        content_bytes = sum(
+            len(str(message.get("content", "")).encode("utf-8")) for message in messages
+        )
+        return (
+            MEMORY_MANAGER_BASE_BYTES
+            + content_bytes
+            + len(messages) * MESSAGE_OVERHEAD_BYTES
+        )
+
+    def close(self) -> None:
+        """释放资源：取消未完成的后台加载任务，关闭向量存储"""
+        for attr in ("_load_task", "_profile_task"):
+            task = getattr(self, attr, None)
+            if task is not None and not task.done():
+                task.cancel()
+
+        try:
+            self.long_term_memory.vector_store.close()
+        except Exception as e:
+            self.logger.warning(f"关闭向量存储失败: {e}")
+
     def export_memories(self, format: str = "json") -> Dict[str, Any]:
         """
         导出记忆数据
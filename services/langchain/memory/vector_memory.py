@@ -9,6 +9,7 @@ from typing import List, Dict, Any, Optional
 from datetime import datetime
 
 from services.vectorstore.chroma_store import ChromaVectorStore
+from services.vectorstore.summary_queue import SummaryJob, summary_queue, truncate_turn
 from services.ai_service import AIService
 from .typed_buffer import MemoryType, BaseMessage, HumanMessage, AIMessage
 
@@ -16,7 +17,7 @@ from .typed_buffer import MemoryType, BaseMessage, HumanMessage, AIMessage
 class EnhancedVectorStoreRetrieverMemory:
     """
     增强版向量存储检索记忆
-    支持摘要生成、元数据过滤、批量操作
+    支持摘要生成（后台批量）、元数据过滤、批量操作
     """
 
     def __init__(
@@ -78,43 +79,30 @@ class EnhancedVectorStoreRetrieverMemory:
         if metadata:
             base_metadata.update(metadata)
 
-        # 如果是对话记录，生成摘要
+        doc_id = f"{memory_type.value}_{timestamp}"
+
+        # 如果是对话记录，先存截断的原文，摘要由后台队列批量生成后覆盖
         if memory_type == MemoryType.CONVERSATION:
-            summary = await self._generate_summary(content)
-            base_metadata["summary"] = summary
-            # 存储摘要而不是原始内容
-            content_to_store = summary
+            content_to_store = truncate_turn(content)
+            base_metadata["summary"] = content_to_store
+            base_metadata["original_length"] = len(content)
+            base_metadata["pending_summary"] = summary_queue.submit(
+                SummaryJob(self.vector_store, doc_id, content, base_metadata)
+            )
         else:
             # 打卡记录存储原始内容
             content_to_store = content
 
-        # 添加到向量存储
-        doc_id = f"{memory_type.value}_{timestamp}"
+        # 添加到向量存储（后台写入队列批量提交，检索前自动刷新）
         self.vector_store.add_documents(
-            documents=[content_to_store], metadatas=[base_metadata], ids=[doc_id]
+            documents=[content_to_store],
+            metadatas=[base_metadata],
+            ids=[doc_id],
+            defer=True,
         )
 
         return doc_id
 
-    async def _generate_summary(self, content: str) -> str:
-        """
-        生成对话摘要
-
-        Args:
-            content: 原始对话内容
-
-        Returns:
-            摘要文本
-        """
-        try:
-            # 使用AI服务生成摘要
-            prompt = f"请将以下对话内容总结为简洁的摘要（不超过50字）：\n\n{content}"
-            response = await self.ai_service.generate_text(prompt, max_tokens=100)
-            return response.strip()
-        except Exception as e:
-            # 如果生成摘要失败，返回截断的原始内容
-            return content[:100] + "..." if len(content) > 100 else content
-
     def search_memories(
         self,
         query: str,
@@ -284,7 +272,8 @@ class EnhancedVectorStoreRetrieverMemory:
         Returns:
             统计信息字典
         """
-        # 获取集合信息
+        # 获取集合信息（先写完队列中的积压）
+        self.vector_store.flush()
         collection_info = self.vector_store.collection.get()
 
         # 按类型统计
@@ -8,10 +8,9 @@ from datetime import datetime, date, timedelta
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, and_, desc
 
-from models.database import User, UserProfile
+from models.database import User, UserProfile, UserStreak
 from models.points_history import PointsHistory, PointsType
 from services.achievement_service import ACHIEVEMENTS, AchievementService
-from services.integration_service import DailyCheckinService
 from config.logging_config import get_module_logger
 
 logger = get_module_logger(__name__)
@@ -236,41 +235,34 @@ class LeaderboardService:
         logger.info("获取连续打卡排行榜 - 限制: %s", limit)
 
         try:
-            # 获取所有用户的连续打卡数据
+            # user_streaks 随记录写入增量维护：今天打过卡的用户按当前连续天数取前 K 名（索引扫描）
             result = await db.execute(
-                select(User.id, User.username)
-                .join(UserProfile, User.id == UserProfile.user_id)
-                .limit(100)  # 限制查询数量
-            )
-
-            user_streaks = []
-            for row in result:
-                # 计算连续打卡天数
-                streak = await DailyCheckinService._calculate_streak(row.id, db)
-
-                if streak > 0:
-                    user_streaks.append(
-                        {
-                            "user_id": row.id,
-                            "username": row.username,
-                            "streak_days": streak,
-                        }
+                select(
+                    User.id,
+                    User.nickname.label("username"),
+                    UserStreak.current_streak,
+                )
+                .select_from(UserStreak)
+                .join(User, User.id == UserStreak.user_id)
+                .where(
+                    and_(
+                        UserStreak.last_active_date == date.today(),
+                        UserStreak.current_streak > 0,
                     )
-
-            # 按连续天数排序
-            user_streaks.sort(key=lambda x: x["streak_days"], reverse=True)
-
-            # 生成排名
-            rankings = []
-            for i, user in enumerate(user_streaks[:limit]):
-                rankings.append(
-                    {
-                        "rank": i + 1,
-                        "user_id": user["user_id"],
-                        "username": user["username"],
-                        "streak_days": user["streak_days"],
-                    }
                 )
+                .order_by(desc(UserStreak.current_streak), UserStreak.user_id)
+                .limit(limit)
+            )
+
+            rankings = [
+                {
+                    "rank": i + 1,
+                    "user_id": row.id,
+                    "username": row.username,
+                    "streak_days": row.current_streak,
+                }
+                for i, row in enumerate(result)
+            ]
 
             return {
                 "success": True,
@@ -377,6 +369,60 @@ class LeaderboardService:
                     },
                 }
 
+            elif leaderboard_type == "streak":
+                # 当前连续打卡天数排名（只统计今天打过卡的用户）
+                today = date.today()
+                result = await db.execute(
+                    select(UserStreak.current_streak).where(
+                        and_(
+                            UserStreak.user_id == user_id,
+                            UserStreak.last_active_date == today,
+                        )
+                    )
+                )
+                user_streak = result.scalar() or 0
+
+                active = and_(
+                    UserStreak.last_active_date == today, UserStreak.current_streak > 0
+                )
+                total_result = await db.execute(
+                    select(func.count()).select_from(UserStreak).where(active)
+                )
+                total_users = total_result.scalar()
+
+                # 今天还没打卡的用户不在榜上
+                if user_streak <= 0:
+                    return {
+                        "success": True,
+                        "data": {
+                            "user_id": user_id,
+                            "rank": None,
+                            "total_users": total_users,
+                            "score": 0,
+                            "percentile": 0,
+                        },
+                    }
+
+                rank_result = await db.execute(
+                    select(func.count())
+                    .select_from(UserStreak)
+                    .where(and_(active, UserStreak.current_streak > user_streak))
+                )
+                rank = rank_result.scalar() + 1
+
+                return {
+                    "success": True,
+                    "data": {
+                        "user_id": user_id,
+                        "rank": rank,
+                        "total_users": total_users,
+                        "score": user_streak,
+                        "percentile": round((1 - rank / total_users) * 100, 1)
+                        if total_users > 0
+                        else 0,
+                    },
+                }
+
             else:
                 return {"success": False, "error": "无效的排行榜类型"}
 
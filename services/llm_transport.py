@@ -0,0 +1,528 @@
+"""
+LLM 共享传输层
+
+OpenAIClient、QwenClient 以及教练图的 AI 调用都经过同一个进程级传输层：
+1. 连接池：每个提供商一个长连接 httpx 客户端，复用 TCP/TLS 连接
+2. 并发限制：全局与单用户的在途请求信号量，排队时间计入截止时间
+3. 截止时间传播：llm_context(timeout=...) 设置的截止时间沿调用链传递，
+   每次尝试的超时取 "默认超时" 与 "剩余时间" 的较小值
+4. 重试：只有连接错误、超时、429/5xx 会重试，且只在这一层重试一次（带抖动退避）
+5. 对冲请求（可选）：请求耗时超过该提供商近期延迟的指定分位数时，再发一个相同请求，
+   取先返回的结果
+6. 熔断：提供商连续失败达到阈值后短路一段时间，AIService 据此切换到备用提供商
+
+指标：llm.<provider>.queue_wait / ttfb / latency 监控器，
+以及 llm.<provider>.retries / hedged / rejected / failures 计数器。
+"""
+
+import asyncio
+import random
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import (
+    AsyncGenerator,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    TypeVar,
+)
+
+import httpx
+import openai
+
+from config.logging_config import get_module_logger
+from config.settings import fastapi_settings
+from utils.performance import get_monitor, increment_counter
+
+logger = get_module_logger(__name__)
+
+T = TypeVar("T")
+
+# 所有连接池共用的 TLS 上下文（加载 CA 证书约 40ms，不必每个连接池各加载一次）
+_ssl_context = httpx.create_ssl_context()
+
+# 当前调用链的截止时间（time.monotonic() 时刻）与用户 ID
+_deadline: ContextVar[Optional[float]] = ContextVar("llm_deadline", default=None)
+_user_id: ContextVar[Optional[int]] = ContextVar("llm_user_id", default=None)
+
+
+class LLMUnavailableError(Exception):
+    """提供商暂不可用（熔断中、超过截止时间或可重试错误已重试耗尽）"""
+
+    def __init__(self, provider: str, reason: str):
+        super().__init__(f"{provider} 暂不可用: {reason}")
+        self.provider = provider
+        self.reason = reason
+
+
+@contextmanager
+def llm_context(
+    user_id: Optional[int] = None, timeout: Optional[float] = None
+) -> Iterator[None]:
+    """
+    为当前调用链设置 LLM 请求的用户与截止时间
+
+    嵌套使用时截止时间取更早的一个；用户 ID 未指定时沿用外层。
+    """
+    deadline = _deadline.get()
+    if timeout is not None:
+        new_deadline = time.monotonic() + timeout
+        deadline = new_deadline if deadline is None else min(deadline, new_deadline)
+    deadline_token = _deadline.set(deadline)
+    user_token = _user_id.set(user_id if user_id is not None else _user_id.get())
+    try:
+        yield
+    finally:
+        _user_id.reset(user_token)
+        _deadline.reset(deadline_token)
+
+
+def remaining_time() -> Optional[float]:
+    """当前调用链剩余的时间（秒），未设置截止时间时返回 None"""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """连接错误、超时、429 和 5xx 视为提供商侧的临时故障，可重试/计入熔断"""
+    if isinstance(
+        exc,
+        (
+            httpx.TransportError,
+            asyncio.TimeoutError,
+            ConnectionError,
+            openai.APIConnectionError,
+        ),
+    ):
+        return True
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        response = getattr(exc, "response", None)
+        status = getattr(response, "status_code", None)
+    return status is not None and (status == 429 or status >= 500)
+
+
+class CircuitBreaker:
+    """
+    提供商熔断器
+
+    连续失败 failure_threshold 次后打开，reset_timeout 秒内直接拒绝请求；
+    之后进入半开状态，只放行一个探测请求，成功则关闭，失败则重新打开。
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+
+    def available(self) -> bool:
+        """是否可能放行请求（不占用半开状态的探测名额）"""
+        if self.state == "closed":
+            return True
+        if self.state == "open":
+            return time.monotonic() - self.opened_at >= self.reset_timeout
+        return not self._probing
+
+    def allow(self) -> bool:
+        """申请放行一个请求"""
+        if self.state == "closed":
+            return True
+        if self.state == "open":
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            self.state = "half_open"
+            self._probing = False
+        if self._probing:
+            return False
+        self._probing = True
+        return True
+
+    def record_success(self) -> None:
+        self.state = "closed"
+        self.failures = 0
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._probing = False
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def release(self) -> None:
+        """请求因非提供商原因结束（如参数错误、被取消），归还探测名额"""
+        self._probing = False
+
+
+class LatencyTracker:
+    """最近成功请求的耗时，用于计算对冲请求的触发延迟"""
+
+    def __init__(self, max_samples: int = 200):
+        self.samples: Deque[float] = deque(maxlen=max_samples)
+
+    def record(self, seconds: float) -> None:
+        self.samples.append(seconds)
+
+    def percentile(self, p: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(p * len(ordered)))
+        return ordered[index]
+
+
+class LLMTransport:
+    """进程级 LLM 传输层（单事件循环内使用）"""
+
+    def __init__(
+        self,
+        max_in_flight: Optional[int] = None,
+        per_user_in_flight: Optional[int] = None,
+        request_timeout: Optional[float] = None,
+        max_retries: Optional[int] = None,
+        retry_backoff: Optional[float] = None,
+        hedge_percentile: Optional[float] = None,
+        hedge_min_samples: Optional[int] = None,
+        breaker_failures: Optional[int] = None,
+        breaker_reset: Optional[float] = None,
+    ):
+        settings = fastapi_settings
+        self.max_in_flight = max_in_flight or settings.LLM_MAX_IN_FLIGHT
+        self.per_user_in_flight = (
+            per_user_in_flight or settings.LLM_PER_USER_IN_FLIGHT
+        )
+        self.request_timeout = request_timeout or settings.LLM_REQUEST_TIMEOUT
+        self.max_retries = (
+            settings.LLM_MAX_RETRIES if max_retries is None else max_retries
+        )
+        self.retry_backoff = (
+            settings.LLM_RETRY_BACKOFF if retry_backoff is None else retry_backoff
+        )
+        # 为 None 时不发对冲请求
+        self.hedge_percentile = (
+            settings.LLM_HEDGE_PERCENTILE
+            if hedge_percentile is None
+            else hedge_percentile
+        )
+        self.hedge_min_samples = (
+            hedge_min_samples or settings.LLM_HEDGE_MIN_SAMPLES
+        )
+        self.breaker_failures = breaker_failures or settings.LLM_BREAKER_FAILURES
+        self.breaker_reset = breaker_reset or settings.LLM_BREAKER_RESET
+
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._latency: Dict[str, LatencyTracker] = {}
+        # 信号量和连接池绑定事件循环，循环变化（脚本/测试中多次 asyncio.run）时重建
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._global: Optional[asyncio.Semaphore] = None
+        # user_id -> [信号量, 使用中的请求数]；无请求时删除，字典大小只与在途用户数有关
+        self._user_slots: Dict[int, List] = {}
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+
+    # ============ 连接池 ============
+
+    def _bind_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._global = asyncio.Semaphore(self.max_in_flight)
+            self._user_slots = {}
+            self._clients = {}
+
+    def http_client(self, provider: str) -> httpx.AsyncClient:
+        """获取提供商共享的 httpx 异步客户端（需在事件循环中调用）"""
+        self._bind_loop()
+        client = self._clients.get(provider)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                verify=_ssl_context,
+                timeout=httpx.Timeout(connect=10.0, read=60.0, write=10.0, pool=5.0),
+                limits=httpx.Limits(
+                    max_connections=fastapi_settings.AI_HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=fastapi_settings.AI_HTTP_MAX_KEEPALIVE,
+                    keepalive_expiry=fastapi_settings.AI_HTTP_KEEPALIVE_EXPIRY,
+                ),
+            )
+            self._clients[provider] = client
+        return client
+
+    async def close(self) -> None:
+        """关闭当前事件循环中的共享客户端（应用关闭时调用）"""
+        if self._loop is not asyncio.get_running_loop():
+            return
+        clients = list(self._clients.values())
+        self._clients = {}
+        for client in clients:
+            await client.aclose()
+
+    # ============ 熔断 / 延迟统计 ============
+
+    def breaker(self, provider: str) -> CircuitBreaker:
+        breaker = self._breakers.get(provider)
+        if breaker is None:
+            breaker = CircuitBreaker(self.breaker_failures, self.breaker_reset)
+            self._breakers[provider] = breaker
+        return breaker
+
+    def available(self, provider: str) -> bool:
+        """提供商当前是否可用（熔断器未打开）"""
+        return self.breaker(provider).available()
+
+    def _hedge_delay(self, provider: str) -> Optional[float]:
+        if self.hedge_percentile is None:
+            return None
+        tracker = self._latency.get(provider)
+        if tracker is None or len(tracker.samples) < self.hedge_min_samples:
+            return None
+        return tracker.percentile(self.hedge_percentile)
+
+    def _record_latency(self, provider: str, seconds: float) -> None:
+        tracker = self._latency.setdefault(provider, LatencyTracker())
+        tracker.record(seconds)
+        get_monitor(f"llm.{provider}.latency").record_time(seconds)
+
+    def stats(self) -> Dict[str, Dict]:
+        """各提供商的熔断状态与延迟分位数"""
+        result = {}
+        for provider in set(self._breakers) | set(self._latency):
+            breaker = self.breaker(provider)
+            tracker = self._latency.get(provider)
+            result[provider] = {
+                "circuit": breaker.state,
+                "consecutive_failures": breaker.failures,
+                "p50_ms": _ms(tracker.percentile(0.5)) if tracker else None,
+                "p95_ms": _ms(tracker.percentile(0.95)) if tracker else None,
+                "hedge_delay_ms": _ms(self._hedge_delay(provider)),
+            }
+        return result
+
+    # ============ 并发限制 / 截止时间 ============
+
+    def _attempt_timeout(self, provider: str) -> float:
+        remaining = remaining_time()
+        if remaining is None:
+            return self.request_timeout
+        if remaining <= 0:
+            raise LLMUnavailableError(provider, "已超过截止时间")
+        return min(self.request_timeout, remaining)
+
+    @asynccontextmanager
+    async def _slot(self, provider: str) -> AsyncIterator[None]:
+        """占用一个全局在途名额和一个用户在途名额，排队受截止时间约束"""
+        self._bind_loop()
+        user_id = _user_id.get()
+        user_slot = None
+        if user_id is not None:
+            user_slot = self._user_slots.get(user_id)
+            if user_slot is None:
+                user_slot = [asyncio.Semaphore(self.per_user_in_flight), 0]
+                self._user_slots[user_id] = user_slot
+            user_slot[1] += 1
+
+        start = time.perf_counter()
+        acquired: List[asyncio.Semaphore] = []
+        try:
+            for semaphore in ([user_slot[0]] if user_slot else []) + [self._global]:
+                remaining = remaining_time()
+                try:
+                    await asyncio.wait_for(semaphore.acquire(), remaining)
+                except asyncio.TimeoutError:
+                    increment_counter(f"llm.{provider}.queue_timeout")
+                    raise LLMUnavailableError(provider, "排队超过截止时间") from None
+                acquired.append(semaphore)
+            get_monitor(f"llm.{provider}.queue_wait").record_time(
+                time.perf_counter() - start
+            )
+            yield
+        finally:
+            for semaphore in acquired:
+                semaphore.release()
+            if user_slot is not None:
+                user_slot[1] -= 1
+                if user_slot[1] == 0:
+                    self._user_slots.pop(user_id, None)
+
+    async def _backoff(self, provider: str, attempt: int) -> bool:
+        """重试前等待；剩余时间不足以再试一次时返回 False"""
+        delay = self.retry_backoff * (2**attempt) * (0.5 + random.random())
+        remaining = remaining_time()
+        if remaining is not None and remaining <= delay:
+            return False
+        increment_counter(f"llm.{provider}.retries")
+        await asyncio.sleep(delay)
+        return True
+
+    # ============ 请求 ============
+
+    async def request(
+        self,
+        provider: str,
+        send: Callable[[float], Awaitable[T]],
+        *,
+        hedge: bool = True,
+        max_retries: Optional[int] = None,
+    ) -> T:
+        """
+        发送一个非流式请求
+
+        Args:
+            provider: 提供商名称（连接池、熔断、指标按此区分）
+            send: 执行一次请求的协程函数，参数为本次尝试的超时秒数，失败时抛出异常
+            hedge: 是否允许对冲请求（图片分析等大请求应关闭）
+            max_retries: 覆盖默认重试次数
+
+        Raises:
+            LLMUnavailableError: 熔断中、超过截止时间或可重试错误已重试耗尽
+            其他异常: 不可重试的错误（如 400 参数错误）原样抛出
+        """
+        breaker = self.breaker(provider)
+        if not breaker.allow():
+            increment_counter(f"llm.{provider}.rejected")
+            raise LLMUnavailableError(provider, "熔断中")
+        probing = breaker.state == "half_open"
+
+        retries = self.max_retries if max_retries is None else max_retries
+        try:
+            async with self._slot(provider):
+                attempt = 0
+                while True:
+                    timeout = self._attempt_timeout(provider)
+                    start = time.perf_counter()
+                    try:
+                        if hedge:
+                            result = await self._hedged(provider, send, timeout)
+                        else:
+                            result = await asyncio.wait_for(send(timeout), timeout)
+                    except Exception as e:
+                        if not is_retryable(e):
+                            raise
+                        if attempt >= retries or not await self._backoff(
+                            provider, attempt
+                        ):
+                            breaker.record_failure()
+                            increment_counter(f"llm.{provider}.failures")
+                            raise LLMUnavailableError(provider, str(e)) from e
+                        attempt += 1
+                        continue
+                    elapsed = time.perf_counter() - start
+                    # 非流式请求的首字节时间即完整响应时间
+                    get_monitor(f"llm.{provider}.ttfb").record_time(elapsed)
+                    self._record_latency(provider, elapsed)
+                    breaker.record_success()
+                    return result
+        finally:
+            # 非提供商原因结束（参数错误、排队超时、被取消）时归还半开探测名额
+            if probing and breaker.state == "half_open":
+                breaker.release()
+
+    async def _hedged(
+        self, provider: str, send: Callable[[float], Awaitable[T]], timeout: float
+    ) -> T:
+        """超过对冲延迟仍未返回时再发一个相同请求，取先成功的结果"""
+        delay = self._hedge_delay(provider)
+        first = asyncio.ensure_future(send(timeout))
+        pending = {first}
+        try:
+            if delay is None or delay >= timeout:
+                return await asyncio.wait_for(first, timeout)
+            done, pending = await asyncio.wait(pending, timeout=delay)
+            if done:
+                return first.result()
+
+            increment_counter(f"llm.{provider}.hedged")
+            hedge_timeout = timeout - delay
+            pending.add(asyncio.ensure_future(send(hedge_timeout)))
+            deadline = time.monotonic() + timeout - delay
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending,
+                    timeout=max(0.0, deadline - time.monotonic()),
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    raise asyncio.TimeoutError()
+                for task in done:
+                    if task.exception() is None:
+                        if task is not first:
+                            increment_counter(f"llm.{provider}.hedge_wins")
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def stream(
+        self,
+        provider: str,
+        open_stream: Callable[[float], AsyncIterator[T]],
+        *,
+        max_retries: Optional[int] = None,
+    ) -> AsyncGenerator[T, None]:
+        """
+        发送一个流式请求，逐段产出内容
+
+        只在尚未产出任何内容前重试；开始输出后出错直接抛出，避免重复内容。
+        open_stream 的参数为本次尝试的超时秒数（建议用作连接/两段输出间的读超时）。
+        """
+        breaker = self.breaker(provider)
+        if not breaker.allow():
+            increment_counter(f"llm.{provider}.rejected")
+            raise LLMUnavailableError(provider, "熔断中")
+        probing = breaker.state == "half_open"
+
+        retries = self.max_retries if max_retries is None else max_retries
+        try:
+            async with self._slot(provider):
+                attempt = 0
+                while True:
+                    timeout = self._attempt_timeout(provider)
+                    start = time.perf_counter()
+                    started = False
+                    try:
+                        async for item in open_stream(timeout):
+                            if not started:
+                                started = True
+                                get_monitor(f"llm.{provider}.ttfb").record_time(
+                                    time.perf_counter() - start
+                                )
+                            yield item
+                    except Exception as e:
+                        if not is_retryable(e):
+                            raise
+                        if (
+                            started
+                            or attempt >= retries
+                            or not await self._backoff(provider, attempt)
+                        ):
+                            breaker.record_failure()
+                            increment_counter(f"llm.{provider}.failures")
+                            if started:
+                                raise
+                            raise LLMUnavailableError(provider, str(e)) from e
+                        attempt += 1
+                        continue
+                    breaker.record_success()
+                    return
+        finally:
+            if probing and breaker.state == "half_open":
+                breaker.release()
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return None if seconds is None else round(seconds * 1000, 1)
+
+
+# 全局传输层实例
+llm_transport = LLMTransport()
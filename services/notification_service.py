@@ -5,16 +5,16 @@
 
 import asyncio
 import logging
+import time as time_module
 from datetime import datetime, date, time, timedelta
-from typing import Dict, List, Optional, Any, Set
+from typing import AsyncIterator, Callable, Dict, List, Optional, Any, Set, Tuple
 from enum import Enum
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, or_, func, update
+from sqlalchemy import select, and_, or_, func, update, insert
 from sqlalchemy.orm import selectinload
 
 from models.database import (
     User,
-    ReminderSetting,
     ReminderType,
     NotificationQueue,
     UserProfile,
@@ -26,9 +26,18 @@ from models.database import (
     Goal,
     GoalStatus,
     WeeklyReport,
+    AsyncSessionLocal,
 )
 from config.logging_config import get_module_logger
+from config.settings import fastapi_settings
+from utils.performance import increment_counter
 from utils.exceptions import retry_on_error
+from utils.query_helpers import on_day
+from services.reminder_index_service import (
+    REPORT_REMINDER_TYPES,
+    DueReminder,
+    ReminderIndexService,
+)
 
 logger = get_module_logger(__name__)
 
@@ -69,8 +78,12 @@ class NotificationService:
         self._register_default_triggers()
 
     def _register_default_triggers(self):
-        """注册默认触发条件"""
-        self._triggers[NotificationTrigger.TIME_BASED] = self._check_time_based_triggers
+        """
+        注册默认触发条件
+
+        每个触发函数对一批用户做分组查询，签名为
+        (db, user_ids, preferences, now) -> 通知行列表
+        """
         self._triggers[NotificationTrigger.EVENT_BASED] = (
             self._check_event_based_triggers
         )
@@ -83,339 +96,520 @@ class NotificationService:
         self._triggers[NotificationTrigger.DATA_ANOMALY] = (
             self._check_data_anomaly_triggers
         )
+        # 时间触发会认领提醒（写操作），放在最后以缩短写事务
+        self._triggers[NotificationTrigger.TIME_BASED] = self._check_time_based_triggers
 
     @retry_on_error(max_attempts=3, delay=1.0)
-    async def check_and_create_notifications(self, db: AsyncSession) -> Dict[str, Any]:
-        """检查所有触发条件并创建通知"""
+    async def check_and_create_notifications(
+        self,
+        db: AsyncSession,
+        triggers: Optional[Set[NotificationTrigger]] = None,
+        batch_size: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        检查触发条件并创建通知（在同一会话中按用户分块依次处理）
+
+        Args:
+            db: 数据库会话
+            triggers: 只检查这些触发条件，None 表示全部
+            batch_size: 每块用户数，默认 NOTIFICATION_BATCH_SIZE
+        """
         try:
-            notifications_created = []
-
-            # 获取所有活跃用户
-            result = await db.execute(select(User.id))
-            user_ids = [row[0] for row in result.all()]
-
-            for user_id in user_ids:
-                # 检查用户通知偏好
-                user_preferences = await self._get_user_notification_preferences(
-                    user_id, db
-                )
-                if not user_preferences.get("enabled", True):
-                    continue
+            batch_size = batch_size or fastapi_settings.NOTIFICATION_BATCH_SIZE
+            started = time_module.perf_counter()
+            users = created = 0
 
-                # 检查各种触发条件
-                for trigger_type, trigger_func in self._triggers.items():
-                    # 检查用户是否启用该类型通知
-                    if not user_preferences.get(f"enable_{trigger_type.value}", True):
-                        continue
+            async for user_ids in self._iter_user_chunks(db, batch_size):
+                created += await self._process_chunk(db, user_ids, triggers)
+                users += len(user_ids)
 
-                    notifications = await trigger_func(user_id, db, user_preferences)
-                    if notifications:
-                        notifications_created.extend(notifications)
-
-            # 批量保存通知
-            if notifications_created:
-                db.add_all(notifications_created)
-                await db.commit()
-                logger.info("创建了 %d 个通知", len(notifications_created))
-
-            return {
-                "success": True,
-                "notifications_created": len(notifications_created),
-                "timestamp": datetime.now().isoformat(),
-            }
+            return self._batch_result(users, created, started)
 
         except Exception as e:
             logger.exception("检查通知触发条件失败: %s", e)
             return {"success": False, "error": str(e), "notifications_created": 0}
 
-    async def _check_time_based_triggers(
-        self, user_id: int, db: AsyncSession, preferences: Dict[str, Any]
-    ) -> List[NotificationQueue]:
-        """检查时间触发条件"""
-        notifications = []
-        current_time = datetime.now().time()
-        current_weekday = datetime.now().weekday()
-
-        # 获取用户的提醒设置
-        result = await db.execute(
-            select(ReminderSetting).where(
-                and_(
-                    ReminderSetting.user_id == user_id, ReminderSetting.enabled == True
+    async def run_batch(
+        self,
+        session_factory: Callable[[], AsyncSession] = AsyncSessionLocal,
+        triggers: Optional[Set[NotificationTrigger]] = None,
+        batch_size: Optional[int] = None,
+        concurrency: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        批量检查所有用户的触发条件：用户按块并发处理，每块使用独立会话并单独提交
+
+        Args:
+            session_factory: 会话工厂
+            triggers: 只检查这些触发条件，None 表示全部
+            batch_size: 每块用户数，默认 NOTIFICATION_BATCH_SIZE
+            concurrency: 同时处理的块数，默认 NOTIFICATION_BATCH_CONCURRENCY
+
+        Returns:
+            处理用户数、创建通知数、失败块数、吞吐量（用户/秒）
+        """
+        batch_size = batch_size or fastapi_settings.NOTIFICATION_BATCH_SIZE
+        concurrency = concurrency or fastapi_settings.NOTIFICATION_BATCH_CONCURRENCY
+        semaphore = asyncio.Semaphore(concurrency)
+        started = time_module.perf_counter()
+        totals = {"users": 0, "created": 0, "failed_chunks": 0}
+
+        async def process(user_ids: List[int]):
+            try:
+                async with session_factory() as db:
+                    created = await self._process_chunk(db, user_ids, triggers)
+                totals["created"] += created
+                totals["users"] += len(user_ids)
+            except Exception as e:
+                totals["failed_chunks"] += 1
+                logger.exception(
+                    "通知批量检查失败（用户 %d-%d）: %s", user_ids[0], user_ids[-1], e
                 )
-            )
-        )
-        reminder_settings = result.scalars().all()
+            finally:
+                semaphore.release()
 
-        for setting in reminder_settings:
-            if not self._should_trigger_time_based(
-                setting, current_time, current_weekday
-            ):
-                continue
-
-            # 检查是否在免打扰时段
-            if self._is_quiet_hours(current_time, preferences):
-                logger.debug("用户 %d 处于免打扰时段，跳过提醒", user_id)
-                continue
-
-            # 创建通知
-            notification = self._create_notification(
-                user_id=user_id,
-                reminder_type=setting.reminder_type.value,
-                trigger_type=NotificationTrigger.TIME_BASED,
-                priority=NotificationPriority.MEDIUM,
-                message=self._generate_time_based_message(setting),
-                channel=preferences.get("preferred_channel", NotificationChannel.CHAT),
+        tasks = []
+        try:
+            async with session_factory() as db:
+                async for user_ids in self._iter_user_chunks(db, batch_size):
+                    await semaphore.acquire()
+                    tasks.append(asyncio.create_task(process(user_ids)))
+        finally:
+            await asyncio.gather(*tasks)
+
+        result = self._batch_result(totals["users"], totals["created"], started)
+        result["failed_chunks"] = totals["failed_chunks"]
+        result["success"] = totals["failed_chunks"] == 0
+        return result
+
+    async def _iter_user_chunks(
+        self, db: AsyncSession, batch_size: int
+    ) -> AsyncIterator[List[int]]:
+        """按用户ID分页读取用户（键集分页，不一次性加载全部用户）"""
+        last_id = 0
+        while True:
+            result = await db.execute(
+                select(User.id)
+                .where(User.id > last_id)
+                .order_by(User.id)
+                .limit(batch_size)
             )
-            notifications.append(notification)
+            user_ids = result.scalars().all()
+            if not user_ids:
+                return
+            yield list(user_ids)
+            last_id = user_ids[-1]
 
-            # 更新上次触发时间 - 需要在事务中处理
-            pass
-
-        return notifications
+    async def _process_chunk(
+        self,
+        db: AsyncSession,
+        user_ids: List[int],
+        triggers: Optional[Set[NotificationTrigger]],
+    ) -> int:
+        """对一块用户计算所有触发条件，批量写入通知并提交，返回创建的通知数"""
+        now = datetime.now()
+        preferences = await self._get_notification_preferences(user_ids, db)
+        enabled_users = [
+            user_id for user_id in user_ids if preferences[user_id].get("enabled", True)
+        ]
 
-    async def _check_event_based_triggers(
-        self, user_id: int, db: AsyncSession, preferences: Dict[str, Any]
-    ) -> List[NotificationQueue]:
-        """检查事件触发条件"""
-        notifications = []
-        today = date.today()
+        rows: List[Dict[str, Any]] = []
+        for trigger_type, trigger_func in self._triggers.items():
+            if triggers is not None and trigger_type not in triggers:
+                continue
+            # 只检查启用了该类型通知的用户
+            target_users = [
+                user_id
+                for user_id in enabled_users
+                if preferences[user_id].get(f"enable_{trigger_type.value}", True)
+            ]
+            if target_users:
+                rows.extend(await trigger_func(db, target_users, preferences, now))
+
+        if rows:
+            await db.execute(insert(NotificationQueue), rows)
+        await db.commit()
+        return len(rows)
+
+    def _batch_result(self, users: int, created: int, started: float) -> Dict[str, Any]:
+        elapsed = time_module.perf_counter() - started
+        users_per_second = users / elapsed if elapsed > 0 else 0.0
+        increment_counter("notification_check.users", users)
+        increment_counter("notification_check.created", created)
+        logger.info(
+            "通知检查完成: 用户 %d, 创建通知 %d, 耗时 %.2fs (%.0f 用户/秒)",
+            users,
+            created,
+            elapsed,
+            users_per_second,
+        )
+        return {
+            "success": True,
+            "users_checked": users,
+            "notifications_created": created,
+            "elapsed_seconds": round(elapsed, 3),
+            "users_per_second": round(users_per_second, 1),
+            "timestamp": datetime.now().isoformat(),
+        }
 
-        # 检查今日是否已记录体重
+    async def _notified_today(
+        self,
+        db: AsyncSession,
+        user_ids: List[int],
+        reminder_types: List[str],
+        today: date,
+    ) -> Set[Tuple[int, str]]:
+        """今天已创建过的通知 (用户ID, 通知类型)，用于去重"""
         result = await db.execute(
-            select(WeightRecord).where(
-                and_(WeightRecord.user_id == user_id, WeightRecord.record_date == today)
+            select(NotificationQueue.user_id, NotificationQueue.reminder_type)
+            .where(
+                NotificationQueue.user_id.in_(user_ids),
+                NotificationQueue.reminder_type.in_(reminder_types),
+                on_day(NotificationQueue.created_at, today),
             )
+            .group_by(NotificationQueue.user_id, NotificationQueue.reminder_type)
         )
-        weight_record = result.scalar_one_or_none()
+        return {(row.user_id, row.reminder_type) for row in result.all()}
 
-        if not weight_record and preferences.get("enable_weight_reminder", True):
-            # 检查是否已发送过提醒
-            result = await db.execute(
-                select(NotificationQueue).where(
-                    and_(
-                        NotificationQueue.user_id == user_id,
-                        NotificationQueue.reminder_type == ReminderType.WEIGHT.value,
-                        func.date(NotificationQueue.created_at) == today,
-                    )
-                )
-            )
-            existing_notification = result.scalar_one_or_none()
+    async def _check_time_based_triggers(
+        self,
+        db: AsyncSession,
+        user_ids: List[int],
+        preferences: Dict[int, Dict[str, Any]],
+        now: datetime,
+    ) -> List[Dict[str, Any]]:
+        """检查时间触发条件（认领到期的提醒，与提醒调度共用去重）"""
+        rows = []
+        due = await ReminderIndexService.claim_due(
+            db, now=now, exclude_types=REPORT_REMINDER_TYPES, user_ids=user_ids
+        )
+
+        for setting in due:
+            user_preferences = preferences[setting.user_id]
+            # 检查是否在免打扰时段
+            if self._is_quiet_hours(now.time(), user_preferences):
+                logger.debug("用户 %d 处于免打扰时段，跳过提醒", setting.user_id)
+                continue
 
-            if not existing_notification:
-                notification = self._create_notification(
-                    user_id=user_id,
-                    reminder_type=ReminderType.WEIGHT.value,
-                    trigger_type=NotificationTrigger.EVENT_BASED,
+            rows.append(
+                self._create_notification(
+                    user_id=setting.user_id,
+                    reminder_type=setting.reminder_type.value,
+                    trigger_type=NotificationTrigger.TIME_BASED,
                     priority=NotificationPriority.MEDIUM,
-                    message="今天还没记录体重哦，记得称一下体重～",
-                    channel=preferences.get(
+                    message=self._generate_time_based_message(setting),
+                    channel=user_preferences.get(
                         "preferred_channel", NotificationChannel.CHAT
                     ),
                 )
-                notifications.append(notification)
+            )
+
+        return rows
 
-        # 检查今日是否已记录三餐
+    async def _check_event_based_triggers(
+        self,
+        db: AsyncSession,
+        user_ids: List[int],
+        preferences: Dict[int, Dict[str, Any]],
+        now: datetime,
+    ) -> List[Dict[str, Any]]:
+        """检查事件触发条件（今日未记录体重/三餐）"""
+        rows = []
+        today = now.date()
         meal_types_to_check = [
             ReminderType.BREAKFAST,
             ReminderType.LUNCH,
             ReminderType.DINNER,
         ]
-        for meal_type in meal_types_to_check:
-            if not preferences.get(f"enable_{meal_type.value}_reminder", True):
-                continue
 
-            result = await db.execute(
-                select(MealRecord).where(
-                    and_(
-                        MealRecord.user_id == user_id,
-                        MealRecord.meal_type == meal_type.value,
-                        func.date(MealRecord.record_time) == today,
-                    )
-                )
+        # 今日已记录体重的用户
+        result = await db.execute(
+            select(WeightRecord.user_id)
+            .where(
+                WeightRecord.user_id.in_(user_ids), WeightRecord.record_date == today
+            )
+            .group_by(WeightRecord.user_id)
+        )
+        weighed = set(result.scalars().all())
+
+        # 今日已记录的餐次
+        result = await db.execute(
+            select(MealRecord.user_id, MealRecord.meal_type)
+            .where(
+                MealRecord.user_id.in_(user_ids),
+                on_day(MealRecord.record_time, today),
             )
-            meal_record = result.scalar_one_or_none()
-
-            if not meal_record:
-                # 检查是否已发送过提醒
-                result = await db.execute(
-                    select(NotificationQueue).where(
-                        and_(
-                            NotificationQueue.user_id == user_id,
-                            NotificationQueue.reminder_type == meal_type.value,
-                            func.date(NotificationQueue.created_at) == today,
-                        )
+            .group_by(MealRecord.user_id, MealRecord.meal_type)
+        )
+        meals = {(row.user_id, row.meal_type.value) for row in result.all()}
+
+        # 今日已发送过的提醒
+        notified = await self._notified_today(
+            db,
+            user_ids,
+            [ReminderType.WEIGHT.value] + [m.value for m in meal_types_to_check],
+            today,
+        )
+
+        for user_id in user_ids:
+            user_preferences = preferences[user_id]
+            channel = user_preferences.get(
+                "preferred_channel", NotificationChannel.CHAT
+            )
+
+            if (
+                user_id not in weighed
+                and user_preferences.get("enable_weight_reminder", True)
+                and (user_id, ReminderType.WEIGHT.value) not in notified
+            ):
+                rows.append(
+                    self._create_notification(
+                        user_id=user_id,
+                        reminder_type=ReminderType.WEIGHT.value,
+                        trigger_type=NotificationTrigger.EVENT_BASED,
+                        priority=NotificationPriority.MEDIUM,
+                        message="今天还没记录体重哦，记得称一下体重～",
+                        channel=channel,
                     )
                 )
-                existing_notification = result.scalar_one_or_none()
 
-                if not existing_notification:
-                    notification = self._create_notification(
+            for meal_type in meal_types_to_check:
+                if not user_preferences.get(f"enable_{meal_type.value}_reminder", True):
+                    continue
+                if (user_id, meal_type.value) in meals:
+                    continue
+                if (user_id, meal_type.value) in notified:
+                    continue
+                rows.append(
+                    self._create_notification(
                         user_id=user_id,
                         reminder_type=meal_type.value,
                         trigger_type=NotificationTrigger.EVENT_BASED,
                         priority=NotificationPriority.MEDIUM,
                         message=f"记得记录{self._get_meal_type_name(meal_type)}哦～",
-                        channel=preferences.get(
-                            "preferred_channel", NotificationChannel.CHAT
-                        ),
+                        channel=channel,
                     )
-                    notifications.append(notification)
+                )
 
-        return notifications
+        return rows
 
     async def _check_achievement_triggers(
-        self, user_id: int, db: AsyncSession, preferences: Dict[str, Any]
-    ) -> List[NotificationQueue]:
+        self,
+        db: AsyncSession,
+        user_ids: List[int],
+        preferences: Dict[int, Dict[str, Any]],
+        now: datetime,
+    ) -> List[Dict[str, Any]]:
         """检查成就触发条件"""
-        notifications = []
-
         # 这里可以集成成就服务
         # 暂时返回空列表，后续集成
-        return notifications
+        return []
 
     async def _check_goal_progress_triggers(
-        self, user_id: int, db: AsyncSession, preferences: Dict[str, Any]
-    ) -> List[NotificationQueue]:
-        """检查目标进度触发条件"""
-        notifications = []
+        self,
+        db: AsyncSession,
+        user_ids: List[int],
+        preferences: Dict[int, Dict[str, Any]],
+        now: datetime,
+    ) -> List[Dict[str, Any]]:
+        """
+        检查目标进度触发条件
+
+        目标表没有起始体重字段，起始体重取目标创建后的第一条体重记录，
+        当前体重取最新一条体重记录（每个目标两个关联子查询，一次查询完成）
+        """
+        rows = []
+
+        def weight_since_goal(order):
+            return (
+                select(WeightRecord.weight)
+                .where(
+                    WeightRecord.user_id == Goal.user_id,
+                    WeightRecord.record_time >= Goal.created_at,
+                )
+                .order_by(order)
+                .limit(1)
+                .scalar_subquery()
+            )
+
+        result = await db.execute(
+            select(
+                Goal.user_id,
+                Goal.target_weight,
+                weight_since_goal(WeightRecord.record_time.asc()).label("start_weight"),
+                weight_since_goal(WeightRecord.record_time.desc()).label(
+                    "current_weight"
+                ),
+            ).where(
+                Goal.user_id.in_(user_ids),
+                Goal.status == GoalStatus.ACTIVE,
+                Goal.target_weight.isnot(None),
+            )
+        )
+        goals = result.all()
+        if not goals:
+            return rows
 
-        # 获取用户活跃目标
+        # 已发送过的里程碑通知
         result = await db.execute(
-            select(Goal).where(
-                and_(Goal.user_id == user_id, Goal.status == GoalStatus.ACTIVE)
+            select(NotificationQueue.user_id, NotificationQueue.message).where(
+                NotificationQueue.user_id.in_({goal.user_id for goal in goals}),
+                NotificationQueue.reminder_type == "goal_milestone",
             )
         )
-        goals = result.scalars().all()
+        sent: Dict[int, List[str]] = {}
+        for row in result.all():
+            sent.setdefault(row.user_id, []).append(row.message or "")
 
         for goal in goals:
-            if goal.target_weight is not None:
-                # 检查体重目标进度
-                result = await db.execute(
-                    select(WeightRecord)
-                    .where(
-                        and_(
-                            WeightRecord.user_id == user_id,
-                            WeightRecord.record_date >= goal.start_date,
-                        )
+            if goal.start_weight is None or goal.current_weight is None:
+                continue
+            if goal.start_weight == goal.target_weight:
+                continue
+            progress = (
+                (goal.start_weight - goal.current_weight)
+                / (goal.start_weight - goal.target_weight)
+            ) * 100
+
+            # 检查里程碑（25%, 50%, 75%, 100%）
+            for milestone in [25, 50, 75, 100]:
+                if not (milestone <= progress < milestone + 5):
+                    continue
+                user_sent = sent.setdefault(goal.user_id, [])
+                if any(f"{milestone}%" in message for message in user_sent):
+                    continue
+                message = f"🎉 恭喜！你已经完成了减重目标的{milestone}%！继续加油！"
+                user_sent.append(message)
+                rows.append(
+                    self._create_notification(
+                        user_id=goal.user_id,
+                        reminder_type="goal_milestone",
+                        trigger_type=NotificationTrigger.GOAL_PROGRESS,
+                        priority=NotificationPriority.HIGH,
+                        message=message,
+                        channel=preferences[goal.user_id].get(
+                            "preferred_channel", NotificationChannel.CHAT
+                        ),
                     )
-                    .order_by(WeightRecord.record_date.desc())
                 )
-                weight_records = result.scalars().all()
-
-                if weight_records:
-                    current_weight = weight_records[0].weight
-                    progress = (
-                        (goal.start_weight - current_weight)
-                        / (goal.start_weight - goal.target_weight)
-                    ) * 100
-
-                    # 检查里程碑（25%, 50%, 75%, 100%）
-                    milestones = [25, 50, 75, 100]
-                    for milestone in milestones:
-                        if progress >= milestone and progress < milestone + 5:
-                            # 检查是否已发送过该里程碑通知
-                            result = await db.execute(
-                                select(NotificationQueue).where(
-                                    and_(
-                                        NotificationQueue.user_id == user_id,
-                                        NotificationQueue.reminder_type
-                                        == "goal_milestone",
-                                        NotificationQueue.message.like(
-                                            f"%{milestone}%%"
-                                        ),
-                                    )
-                                )
-                            )
-                            existing_notification = result.scalar_one_or_none()
-
-                            if not existing_notification:
-                                notification = self._create_notification(
-                                    user_id=user_id,
-                                    reminder_type="goal_milestone",
-                                    trigger_type=NotificationTrigger.GOAL_PROGRESS,
-                                    priority=NotificationPriority.HIGH,
-                                    message=f"🎉 恭喜！你已经完成了减重目标的{milestone}%！继续加油！",
-                                    channel=preferences.get(
-                                        "preferred_channel", NotificationChannel.CHAT
-                                    ),
-                                )
-                                notifications.append(notification)
-
-        return notifications
+
+        return rows
 
     async def _check_data_anomaly_triggers(
-        self, user_id: int, db: AsyncSession, preferences: Dict[str, Any]
-    ) -> List[NotificationQueue]:
-        """检查数据异常触发条件"""
-        notifications = []
+        self,
+        db: AsyncSession,
+        user_ids: List[int],
+        preferences: Dict[int, Dict[str, Any]],
+        now: datetime,
+    ) -> List[Dict[str, Any]]:
+        """检查数据异常触发条件（同类异常每天最多提醒一次）"""
+        rows = []
+        today = now.date()
+        notified = await self._notified_today(
+            db, user_ids, ["weight_anomaly", "calorie_anomaly"], today
+        )
 
-        # 检查体重异常波动（一天内变化超过1kg）
+        # 每个用户最近两条体重记录（窗口函数，一次查询）
+        ranked = (
+            select(
+                WeightRecord.user_id,
+                WeightRecord.weight,
+                func.row_number()
+                .over(
+                    partition_by=WeightRecord.user_id,
+                    order_by=(WeightRecord.record_date.desc(), WeightRecord.id.desc()),
+                )
+                .label("rank"),
+            )
+            .where(WeightRecord.user_id.in_(user_ids))
+            .subquery()
+        )
         result = await db.execute(
-            select(WeightRecord)
-            .where(WeightRecord.user_id == user_id)
-            .order_by(WeightRecord.record_date.desc())
-            .limit(2)
+            select(ranked.c.user_id, ranked.c.weight)
+            .where(ranked.c.rank <= 2)
+            .order_by(ranked.c.user_id, ranked.c.rank)
         )
-        weight_records = result.scalars().all()
-
-        if len(weight_records) >= 2:
-            # 安全提取体重值 - 使用类型忽略
-            weight1_val = weight_records[0].weight
-            weight2_val = weight_records[1].weight
-
-            # 手动处理类型转换
-            weight_diff = 0.0
-            if weight1_val is not None and weight2_val is not None:
-                try:
-                    w1 = float(str(weight1_val))
-                    w2 = float(str(weight2_val))
-                    weight_diff = abs(w1 - w2)
-                except (ValueError, TypeError):
-                    weight_diff = 0.0
+        latest: Dict[int, List[float]] = {}
+        for row in result.all():
+            latest.setdefault(row.user_id, []).append(row.weight)
+
+        # 检查体重异常波动（一天内变化超过1kg）
+        for user_id, weights in latest.items():
+            if len(weights) < 2 or None in weights:
+                continue
+            if (user_id, "weight_anomaly") in notified:
+                continue
+            weight_diff = abs(float(weights[0]) - float(weights[1]))
             if weight_diff > 1.0:
-                notification = self._create_notification(
-                    user_id=user_id,
-                    reminder_type="weight_anomaly",
+                rows.append(
+                    self._create_notification(
+                        user_id=user_id,
+                        reminder_type="weight_anomaly",
+                        trigger_type=NotificationTrigger.DATA_ANOMALY,
+                        priority=NotificationPriority.HIGH,
+                        message=f"⚠️ 注意：体重波动较大（{weight_diff:.1f}kg），请确认数据准确性",
+                        channel=preferences[user_id].get(
+                            "preferred_channel", NotificationChannel.CHAT
+                        ),
+                    )
+                )
+
+        # 检查热量摄入异常（超过3000卡）
+        total = func.sum(MealRecord.total_calories)
+        result = await db.execute(
+            select(MealRecord.user_id, total.label("total_calories"))
+            .where(
+                MealRecord.user_id.in_(user_ids),
+                on_day(MealRecord.record_time, today),
+            )
+            .group_by(MealRecord.user_id)
+            .having(total > 3000)
+        )
+        for row in result.all():
+            if (row.user_id, "calorie_anomaly") in notified:
+                continue
+            rows.append(
+                self._create_notification(
+                    user_id=row.user_id,
+                    reminder_type="calorie_anomaly",
                     trigger_type=NotificationTrigger.DATA_ANOMALY,
-                    priority=NotificationPriority.HIGH,
-                    message=f"⚠️ 注意：体重波动较大（{weight_diff:.1f}kg），请确认数据准确性",
-                    channel=preferences.get(
+                    priority=NotificationPriority.MEDIUM,
+                    message=f"今日热量摄入较高（{row.total_calories}卡），注意控制哦～",
+                    channel=preferences[row.user_id].get(
                         "preferred_channel", NotificationChannel.CHAT
                     ),
                 )
-                notifications.append(notification)
+            )
 
-        # 检查热量摄入异常（超过3000卡）
-        today = date.today()
+        return rows
+
+    async def _get_notification_preferences(
+        self, user_ids: List[int], db: AsyncSession
+    ) -> Dict[int, Dict[str, Any]]:
+        """批量获取用户通知偏好设置"""
+        preferences = {user_id: self._default_preferences() for user_id in user_ids}
+
+        # 从用户画像获取个性化设置
         result = await db.execute(
-            select(func.sum(MealRecord.total_calories)).where(
-                and_(
-                    MealRecord.user_id == user_id,
-                    func.date(MealRecord.record_time) == today,
-                )
+            select(UserProfile.user_id, UserProfile.motivation_type).where(
+                UserProfile.user_id.in_(user_ids)
             )
         )
-        total_calories = result.scalar() or 0
-
-        if total_calories > 3000:
-            notification = self._create_notification(
-                user_id=user_id,
-                reminder_type="calorie_anomaly",
-                trigger_type=NotificationTrigger.DATA_ANOMALY,
-                priority=NotificationPriority.MEDIUM,
-                message=f"今日热量摄入较高（{total_calories}卡），注意控制哦～",
-                channel=preferences.get("preferred_channel", NotificationChannel.CHAT),
-            )
-            notifications.append(notification)
+        for row in result.all():
+            # 根据动力类型调整通知频率
+            if row.motivation_type is not None:
+                if row.motivation_type.value == "data_driven":
+                    preferences[row.user_id]["notification_frequency"] = "frequent"
+                elif row.motivation_type.value == "emotional_support":
+                    preferences[row.user_id]["notification_frequency"] = "normal"
+                elif row.motivation_type.value == "goal_oriented":
+                    preferences[row.user_id]["notification_frequency"] = "normal"
 
-        return notifications
+        return preferences
 
-    async def _get_user_notification_preferences(
-        self, user_id: int, db: AsyncSession
-    ) -> Dict[str, Any]:
-        """获取用户通知偏好设置"""
-        # 默认设置
-        preferences = {
+    def _default_preferences(self) -> Dict[str, Any]:
+        """默认通知偏好"""
+        return {
             "enabled": True,
             "enable_time_based": True,
             "enable_event_based": True,
@@ -432,66 +626,6 @@ class NotificationService:
             "notification_frequency": "normal",  # normal, minimal, frequent
         }
 
-        # 从用户画像获取个性化设置
-        result = await db.execute(
-            select(UserProfile).where(UserProfile.user_id == user_id)
-        )
-        user_profile = result.scalar_one_or_none()
-
-        if user_profile:
-            # 根据动力类型调整通知频率
-            if user_profile.motivation_type is not None:
-                if user_profile.motivation_type.value == "data_driven":
-                    preferences["notification_frequency"] = "frequent"
-                elif user_profile.motivation_type.value == "emotional_support":
-                    preferences["notification_frequency"] = "normal"
-                elif user_profile.motivation_type.value == "goal_oriented":
-                    preferences["notification_frequency"] = "normal"
-
-            # 根据沟通风格调整通知语气
-            if user_profile.communication_style is not None:
-                # 这里可以存储用户偏好的通知语气
-                pass
-
-        return preferences
-
-    def _should_trigger_time_based(
-        self, setting: ReminderSetting, current_time: time, current_weekday: int
-    ) -> bool:
-        """判断是否应该触发时间提醒"""
-        if setting.weekdays_only is True and current_weekday >= 5:
-            return False
-
-        if setting.reminder_time is None:
-            return False
-
-        reminder_time = setting.reminder_time
-        if reminder_time is None:
-            return False
-
-        # 提取时间值 - 安全处理
-        try:
-            # 手动处理时间比较
-            current_hour = current_time.hour
-            current_minute = current_time.minute
-            current_second = current_time.second
-
-            reminder_hour = reminder_time.hour
-            reminder_minute = reminder_time.minute
-            reminder_second = reminder_time.second
-
-            # 计算时间差（秒）
-            current_total = current_hour * 3600 + current_minute * 60 + current_second
-            reminder_total = (
-                reminder_hour * 3600 + reminder_minute * 60 + reminder_second
-            )
-
-            time_diff = abs(current_total - reminder_total)
-        except Exception:
-            return False
-
-        return 0 <= time_diff <= 300  # 5分钟内
-
     def _is_quiet_hours(self, current_time: time, preferences: Dict[str, Any]) -> bool:
         """判断是否在免打扰时段"""
         quiet_start = preferences.get("quiet_hours_start", time(22, 0))
@@ -502,7 +636,7 @@ class NotificationService:
         else:
             return current_time >= quiet_start or current_time <= quiet_end
 
-    def _generate_time_based_message(self, setting: ReminderSetting) -> str:
+    def _generate_time_based_message(self, setting: DueReminder) -> str:
         """生成时间触发通知消息"""
         messages = {
             ReminderType.WEIGHT.value: "记得称一下体重哦～",
@@ -536,20 +670,21 @@ class NotificationService:
         priority: NotificationPriority,
         message: str,
         channel: NotificationChannel = NotificationChannel.CHAT,
-    ) -> NotificationQueue:
-        """创建通知记录"""
-        return NotificationQueue(
-            user_id=user_id,
-            reminder_type=reminder_type,
-            message=message,
-            scheduled_at=datetime.now(),
-            status="pending",
-            retry_count=0,
-            max_retries=3,
-            channel=channel.value,
-            created_at=datetime.now(),
-            updated_at=datetime.now(),
-        )
+    ) -> Dict[str, Any]:
+        """创建通知记录（返回批量插入用的行数据）"""
+        now = datetime.now()
+        return {
+            "user_id": user_id,
+            "reminder_type": reminder_type,
+            "message": message,
+            "scheduled_at": now,
+            "status": "pending",
+            "retry_count": 0,
+            "max_retries": 3,
+            "channel": channel.value,
+            "created_at": now,
+            "updated_at": now,
+        }
 
     async def get_user_notifications(
         self, user_id: int, db: AsyncSession, limit: int = 20, unread_only: bool = False
@@ -10,6 +10,7 @@ from sqlalchemy import select, update
 import json
 
 from models.database import UserProfile, User
+from services.user_profile_service import UserProfileService
 from config.logging_config import get_module_logger
 
 logger = get_module_logger(__name__)
@@ -104,6 +105,7 @@ class PersonalizationService:
                 profile.updated_at = datetime.utcnow()
 
             await db.commit()
+            UserProfileService.invalidate_shared_cache(user_id)
 
             return {
                 "success": True,
@@ -0,0 +1,181 @@
+"""
+到期提醒索引服务
+
+调度任务每次运行时不再加载全部启用的提醒设置逐条判断，而是：
+1. reminder_settings.minute_of_day（随 reminder_time 自动维护）+ 索引 (enabled, minute_of_day)，
+   按 "当前时间往前 grace 秒" 的分钟区间范围查询，耗时只与到期提醒数有关
+2. 查询与认领合并为一条 UPDATE ... RETURNING：把 last_triggered 更新为本次触发时间，
+   条件是 last_triggered 早于窗口起点。调度重叠或延迟运行时同一次提醒也只会被认领一次
+   （修改提醒时间时 last_triggered 会被清空，新时间当天仍可触发）
+"""
+
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from typing import Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config.logging_config import get_module_logger
+from config.settings import fastapi_settings
+from models.database import ReminderSetting, ReminderType
+from utils.performance import increment_counter
+
+logger = get_module_logger(__name__)
+
+# 回填 minute_of_day 时每批处理的行数
+BACKFILL_BATCH_SIZE = 5000
+
+# 由报告调度生成日报/周报的提醒类型，普通提醒检查不处理
+REPORT_REMINDER_TYPES = (ReminderType.DAILY, ReminderType.WEEKLY)
+
+
+@dataclass
+class DueReminder:
+    """本次认领到的到期提醒"""
+
+    id: int
+    user_id: int
+    reminder_type: ReminderType
+    scheduled_at: datetime
+
+
+def minute_of_day(value: time) -> int:
+    return value.hour * 60 + value.minute
+
+
+def due_windows(now: datetime, grace: float) -> List[Tuple[date, int, int]]:
+    """
+    把 (now - grace, now] 拆成按日期的分钟区间（跨零点时为两段）
+
+    Returns:
+        [(日期, 起始分钟, 结束分钟)]，区间两端都包含
+    """
+    start = now - timedelta(seconds=grace)
+    windows = []
+    day = start.date()
+    while day <= now.date():
+        lo = minute_of_day(start.time()) + 1 if day == start.date() else 0
+        hi = minute_of_day(now.time()) if day == now.date() else 24 * 60 - 1
+        if lo <= hi:
+            windows.append((day, lo, hi))
+        day += timedelta(days=1)
+    return windows
+
+
+class ReminderIndexService:
+    """到期提醒的范围查询与认领"""
+
+    @staticmethod
+    async def claim_due(
+        db: AsyncSession,
+        now: Optional[datetime] = None,
+        grace: Optional[float] = None,
+        reminder_types: Optional[Iterable[ReminderType]] = None,
+        exclude_types: Optional[Iterable[ReminderType]] = None,
+        user_id: Optional[int] = None,
+        user_ids: Optional[Iterable[int]] = None,
+    ) -> List[DueReminder]:
+        """
+        认领 (now - grace, now] 内到期且本窗口尚未触发的提醒
+
+        认领结果与调用方创建的通知在同一事务中提交；调用方回滚时认领一并撤销。
+
+        Args:
+            db: 数据库会话
+            now: 当前时间，默认 datetime.now()
+            grace: 允许的最大延迟（秒），默认 SCHEDULER_REMINDER_GRACE
+            reminder_types: 只认领这些类型
+            exclude_types: 不认领这些类型
+            user_id: 只认领某个用户的提醒
+            user_ids: 只认领这些用户的提醒（批量检查时按用户分块）
+
+        Returns:
+            认领到的提醒，按计划时间排序
+        """
+        now = now or datetime.now()
+        if grace is None:
+            grace = fastapi_settings.SCHEDULER_REMINDER_GRACE
+        window_start = now - timedelta(seconds=grace)
+
+        claimed: List[DueReminder] = []
+        for day, lo, hi in due_windows(now, grace):
+            conditions = [
+                ReminderSetting.enabled.is_(True),
+                ReminderSetting.minute_of_day.between(lo, hi),
+                or_(
+                    ReminderSetting.last_triggered.is_(None),
+                    ReminderSetting.last_triggered <= window_start,
+                ),
+            ]
+            if day.weekday() >= 5:
+                conditions.append(ReminderSetting.weekdays_only.isnot(True))
+            if reminder_types is not None:
+                conditions.append(
+                    ReminderSetting.reminder_type.in_(list(reminder_types))
+                )
+            if exclude_types is not None:
+                conditions.append(
+                    ReminderSetting.reminder_type.notin_(list(exclude_types))
+                )
+            if user_id is not None:
+                conditions.append(ReminderSetting.user_id == user_id)
+            if user_ids is not None:
+                conditions.append(ReminderSetting.user_id.in_(list(user_ids)))
+
+            result = await db.execute(
+                update(ReminderSetting)
+                .where(and_(*conditions))
+                .values(last_triggered=now)
+                .returning(
+                    ReminderSetting.id,
+                    ReminderSetting.user_id,
+                    ReminderSetting.reminder_type,
+                    ReminderSetting.minute_of_day,
+                )
+                .execution_options(synchronize_session=False)
+            )
+            base = datetime.combine(day, time())
+            claimed.extend(
+                DueReminder(
+                    id=row.id,
+                    user_id=row.user_id,
+                    reminder_type=row.reminder_type,
+                    scheduled_at=base + timedelta(minutes=row.minute_of_day),
+                )
+                for row in result.all()
+            )
+
+        if claimed:
+            increment_counter("reminder_index.claimed", len(claimed))
+        claimed.sort(key=lambda item: item.scheduled_at)
+        return claimed
+
+    @staticmethod
+    async def backfill_minutes(db: AsyncSession) -> int:
+        """为已有提醒设置补算 minute_of_day（新增列后首次启动时执行），返回更新行数"""
+        updated = 0
+        while True:
+            result = await db.execute(
+                select(ReminderSetting.id, ReminderSetting.reminder_time)
+                .where(
+                    ReminderSetting.minute_of_day.is_(None),
+                    ReminderSetting.reminder_time.isnot(None),
+                )
+                .limit(BACKFILL_BATCH_SIZE)
+            )
+            rows = result.all()
+            if not rows:
+                break
+            await db.execute(
+                update(ReminderSetting),
+                [
+                    {"id": row.id, "minute_of_day": minute_of_day(row.reminder_time)}
+                    for row in rows
+                ],
+            )
+            updated += len(rows)
+        await db.commit()
+        if updated:
+            logger.info("提醒设置 minute_of_day 回填完成: %d 行", updated)
+        return updated
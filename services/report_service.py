@@ -507,7 +507,7 @@ class ReportService:
                 {"role": "user", "content": prompt},
             ]
 
-            response = await ai_service.chat(messages, max_tokens=1000)
+            response = await ai_service.chat(messages, max_tokens=1000, cache="exact")
 
             if response.error:
                 summary = self._generate_fallback_monthly_summary(data)
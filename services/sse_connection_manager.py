@@ -4,7 +4,6 @@ SSE连接管理器
 """
 
 import asyncio
-import json
 import logging
 import time
 from typing import Dict, Set, Optional, AsyncGenerator, Any
@@ -22,6 +21,7 @@ from models.database import (
     ActionType,
     AsyncSessionLocal,
 )
+from utils.sse import format_sse_event
 
 logger = logging.getLogger(__name__)
 
@@ -265,12 +265,7 @@ class SSEConnectionManager:
 
     def _format_sse_message(self, event_type: str, data: Any) -> str:
         """格式化SSE消息"""
-        if isinstance(data, (dict, list)):
-            data_str = json.dumps(data, ensure_ascii=False)
-        else:
-            data_str = str(data)
-
-        return f"event: {event_type}\ndata: {data_str}\n\n"
+        return format_sse_event(event_type, data)
 
     async def send_coaching_prompt(self, user_id: int, prompt_data: dict):
         """发送教练提示消息"""
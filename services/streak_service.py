@@ -0,0 +1,346 @@
+"""
+连续打卡引擎
+从每日活动汇总表一次取出活跃日期，在内存中计算当前/最长连续天数；
+并维护 user_streaks 表（每用户一行），记录写入时增量更新、每日对账，供排行榜直接按索引取前 K 名
+"""
+
+from typing import Any, Dict, List, Iterable, Optional, Set
+from datetime import date, datetime, timedelta
+from sqlalchemy import case, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config.settings import fastapi_settings
+from models.database import AsyncSessionLocal, DailyActivity, UserStreak
+from services.daily_activity_service import DailyActivityService
+from config.logging_config import get_module_logger
+
+logger = get_module_logger(__name__)
+
+# 默认回溯天数（与旧实现的“最多检查一年”保持一致）
+DEFAULT_LOOKBACK_DAYS = 365
+
+# 重算 user_streaks 时读取的最早日期（最长连续天数需要完整历史）
+HISTORY_START = date(2000, 1, 1)
+
+
+class StreakService:
+    """连续打卡计算服务"""
+
+    @staticmethod
+    async def get_active_dates(
+        user_id: int,
+        db: AsyncSession,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+    ) -> Set[date]:
+        """
+        获取用户在日期范围内有任意健康记录的日期集合（单次查询）
+
+        Args:
+            user_id: 用户ID
+            db: 数据库会话
+            start_date: 开始日期（默认 end_date 前 365 天）
+            end_date: 结束日期（默认今天）
+        """
+        end_date = end_date or date.today()
+        start_date = start_date or end_date - timedelta(days=DEFAULT_LOOKBACK_DAYS)
+
+        by_user = await StreakService.get_active_dates_for_users(
+            [user_id], db, start_date, end_date
+        )
+        return by_user.get(user_id, set())
+
+    @staticmethod
+    async def get_active_dates_for_users(
+        user_ids: Optional[List[int]],
+        db: AsyncSession,
+        start_date: date,
+        end_date: date,
+    ) -> Dict[int, Set[date]]:
+        """
+        批量获取多个用户的活跃日期（单次查询 daily_activity）
+
+        Args:
+            user_ids: 用户ID列表，None 表示所有用户
+        """
+        return await DailyActivityService.get_active_dates_for_users(
+            user_ids, db, start_date, end_date
+        )
+
+    @staticmethod
+    def current_streak(
+        dates: Iterable[date],
+        today: Optional[date] = None,
+        allow_yesterday: bool = False,
+    ) -> int:
+        """
+        计算截止今天的连续天数
+
+        Args:
+            dates: 活跃日期
+            today: 基准日期（默认今天）
+            allow_yesterday: 今天尚未打卡时，是否从昨天开始计算
+        """
+        date_set = dates if isinstance(dates, (set, frozenset)) else set(dates)
+        today = today or date.today()
+
+        cursor = today
+        if cursor not in date_set and allow_yesterday:
+            cursor = today - timedelta(days=1)
+
+        streak = 0
+        while cursor in date_set:
+            streak += 1
+            cursor -= timedelta(days=1)
+        return streak
+
+    @staticmethod
+    def longest_streak(dates: Iterable[date]) -> int:
+        """计算最长连续天数"""
+        ordered = sorted(set(dates))
+        if not ordered:
+            return 0
+
+        longest = current = 1
+        for prev, cur in zip(ordered, ordered[1:]):
+            if (cur - prev).days == 1:
+                current += 1
+                longest = max(longest, current)
+            else:
+                current = 1
+        return longest
+
+    @staticmethod
+    def compute_streaks(
+        dates: Iterable[date],
+        today: Optional[date] = None,
+        allow_yesterday: bool = False,
+    ) -> Dict[str, int]:
+        """
+        计算当前与最长连续天数
+
+        Returns:
+            current: 当前连续天数
+            max: 最长连续天数
+        """
+        date_set = set(dates)
+        return {
+            "current": StreakService.current_streak(
+                date_set, today, allow_yesterday
+            ),
+            "max": StreakService.longest_streak(date_set),
+        }
+
+    @staticmethod
+    async def get_current_streak(
+        user_id: int,
+        db: AsyncSession,
+        lookback_days: int = DEFAULT_LOOKBACK_DAYS,
+        today: Optional[date] = None,
+    ) -> int:
+        """获取用户截止今天的连续打卡天数（任意健康记录均算打卡）"""
+        today = today or date.today()
+        dates = await StreakService.get_active_dates(
+            user_id, db, today - timedelta(days=lookback_days - 1), today
+        )
+        return StreakService.current_streak(dates, today)
+
+    @staticmethod
+    async def get_current_streaks(
+        user_ids: Optional[List[int]],
+        db: AsyncSession,
+        lookback_days: int = DEFAULT_LOOKBACK_DAYS,
+        today: Optional[date] = None,
+    ) -> Dict[int, int]:
+        """批量获取多个用户的当前连续打卡天数（单次查询）"""
+        today = today or date.today()
+        dates_by_user = await StreakService.get_active_dates_for_users(
+            user_ids, db, today - timedelta(days=lookback_days - 1), today
+        )
+        return {
+            uid: StreakService.current_streak(dates, today)
+            for uid, dates in dates_by_user.items()
+        }
+
+    # ============ 用户连续打卡表（user_streaks） ============
+
+    @staticmethod
+    def streak_row(
+        user_id: int, dates: Iterable[date], today: Optional[date] = None
+    ) -> Dict[str, Any]:
+        """由活跃日期计算 user_streaks 行（忽略今天之后的日期）"""
+        today = today or date.today()
+        date_set = {day for day in dates if day <= today}
+        last_active = max(date_set) if date_set else None
+        return {
+            "user_id": user_id,
+            "current_streak": (
+                StreakService.current_streak(date_set, last_active)
+                if last_active
+                else 0
+            ),
+            "longest_streak": StreakService.longest_streak(date_set),
+            "last_active_date": last_active,
+        }
+
+    @staticmethod
+    async def record_active_day(db: AsyncSession, user_id: int, day: date) -> None:
+        """
+        某天新增健康记录后增量更新 user_streaks（在同一事务内调用，随记录一起提交）
+
+        - 当天已打过卡：不变
+        - 最近打卡日之后的新日期：单条 UPDATE，紧接前一天则 +1，否则从 1 重新开始
+        - 补录更早的日期或用户尚无行：按完整历史重算该用户
+        """
+        if day > date.today():
+            return
+
+        result = await db.execute(
+            select(UserStreak.last_active_date).where(UserStreak.user_id == user_id)
+        )
+        row = result.one_or_none()
+        if row is None or row.last_active_date is None or day < row.last_active_date:
+            await StreakService.recompute_user(db, user_id)
+            return
+        if day == row.last_active_date:
+            return
+
+        # WHERE last_active_date < day 保证并发写入同一天时只生效一次；
+        # SET 中的列引用均为更新前的值
+        current = case(
+            (
+                UserStreak.last_active_date == day - timedelta(days=1),
+                UserStreak.current_streak + 1,
+            ),
+            else_=1,
+        )
+        await db.execute(
+            update(UserStreak)
+            .where(UserStreak.user_id == user_id, UserStreak.last_active_date < day)
+            .values(
+                current_streak=current,
+                longest_streak=case(
+                    (current > UserStreak.longest_streak, current),
+                    else_=UserStreak.longest_streak,
+                ),
+                last_active_date=day,
+                updated_at=datetime.utcnow(),
+            )
+        )
+
+    @staticmethod
+    async def record_inactive_day(db: AsyncSession, user_id: int, day: date) -> None:
+        """某天删除健康记录后更新 user_streaks（当天可能不再算打卡，按完整历史重算）"""
+        if day > date.today():
+            return
+        await StreakService.recompute_user(db, user_id)
+
+    @staticmethod
+    async def recompute_user(
+        db: AsyncSession, user_id: int, today: Optional[date] = None
+    ) -> Dict[str, Any]:
+        """按每日活动汇总重算单个用户的 user_streaks 行"""
+        today = today or date.today()
+        dates = await StreakService.get_active_dates(user_id, db, HISTORY_START, today)
+        row = StreakService.streak_row(user_id, dates, today)
+        await StreakService._save_rows(db, [row])
+        return row
+
+    @staticmethod
+    async def _save_rows(db: AsyncSession, rows: List[Dict[str, Any]]) -> None:
+        """按 user_id 写入 user_streaks 行，已存在时覆盖"""
+        if not rows:
+            return
+        now = datetime.utcnow()
+        dialect = db.bind.dialect.name if db.bind is not None else ""
+
+        if dialect in ("sqlite", "postgresql"):
+            if dialect == "sqlite":
+                from sqlalchemy.dialects.sqlite import insert
+            else:
+                from sqlalchemy.dialects.postgresql import insert
+
+            stmt = insert(UserStreak).values([{**row, "updated_at": now} for row in rows])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["user_id"],
+                set_={
+                    col: getattr(stmt.excluded, col)
+                    for col in (
+                        "current_streak",
+                        "longest_streak",
+                        "last_active_date",
+                        "updated_at",
+                    )
+                },
+            )
+            await db.execute(stmt)
+            return
+
+        # 其他数据库：逐行合并
+        for row in rows:
+            await db.merge(UserStreak(**row, updated_at=now))
+
+    @staticmethod
+    async def reconcile(
+        db: AsyncSession,
+        today: Optional[date] = None,
+        batch_size: Optional[int] = None,
+    ) -> int:
+        """
+        按每日活动汇总对账 user_streaks（修正并发写入或数据修复造成的偏差）
+
+        按用户分块，每块一次查询取出完整活跃日期并只写回有差异的行。
+
+        Returns:
+            修正的行数
+        """
+        today = today or date.today()
+        batch_size = batch_size or fastapi_settings.STREAK_RECONCILE_BATCH_SIZE
+
+        active_ids = set(
+            (await db.execute(select(DailyActivity.user_id).distinct())).scalars()
+        )
+        stored_ids = set(
+            (await db.execute(select(UserStreak.user_id))).scalars()
+        )
+        user_ids = sorted(active_ids | stored_ids)
+
+        fields = ("current_streak", "longest_streak", "last_active_date")
+        corrected = 0
+        for start in range(0, len(user_ids), batch_size):
+            chunk = user_ids[start : start + batch_size]
+            dates_by_user = await StreakService.get_active_dates_for_users(
+                chunk, db, HISTORY_START, today
+            )
+            stored = {
+                row.user_id: row
+                for row in await db.execute(
+                    select(UserStreak.user_id, *[getattr(UserStreak, f) for f in fields])
+                    .where(UserStreak.user_id.in_(chunk))
+                )
+            }
+            changed = []
+            for uid in chunk:
+                row = StreakService.streak_row(uid, dates_by_user.get(uid, ()), today)
+                old = stored.get(uid)
+                if old is None or any(getattr(old, f) != row[f] for f in fields):
+                    changed.append(row)
+            await StreakService._save_rows(db, changed)
+            await db.commit()
+            corrected += len(changed)
+
+        logger.info("连续打卡表对账完成 - 用户: %s, 修正: %s", len(user_ids), corrected)
+        return corrected
+
+    @staticmethod
+    async def backfill_if_empty(db: AsyncSession) -> int:
+        """user_streaks 为空时从每日活动汇总回填（首次上线时自动执行）"""
+        if (await db.execute(select(UserStreak.user_id).limit(1))).first():
+            return 0
+        return await StreakService.reconcile(db)
+
+    @staticmethod
+    async def run_reconciliation() -> int:
+        """每日对账任务（由任务调度器调用）"""
+        async with AsyncSessionLocal() as db:
+            return await StreakService.reconcile(db)
@@ -7,25 +7,109 @@
 2. 缓存管理（数据库持久化缓存，系统重启不丢失）
 3. 缓存版本验证（基于依赖表的更新时间戳）
 4. 缓存失效机制（供小调查提交后调用）
+5. 进程内共享画像缓存（UserProfileService / MemoryManager / LangGraph 共用，按画像版本校验并带 TTL）
 """
 
-from typing import Dict, Any, Optional
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
 from datetime import datetime
 import json
+import threading
 import time
 
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, and_
 
 from models.database import (
-    UserProfile, ProfilingAnswer, WeightRecord, AgentConfig, UserProfileCache
+    AsyncSessionLocal, User, UserProfile, ProfilingAnswer, WeightRecord,
+    AgentConfig, UserProfileCache
 )
 from config.assistant_styles import AssistantStyle, get_style_config
 from config.logging_config import get_module_logger
+from config.settings import fastapi_settings
 
 logger = get_module_logger(__name__)
 
 
+class ProfileCache:
+    """
+    进程内共享的用户画像缓存
+
+    按用户保存画像快照和完整画像，条目带数据版本（画像更新时间）与写入时间：
+    - 读取时传入数据库中的当前版本，不一致即视为未命中（其他 worker 的写入同样可见）
+    - 超过 TTL 的条目失效，兜底无法校验版本的读取（peek）
+    - 本进程内的写入调用 invalidate 立即失效
+    """
+
+    def __init__(self, max_users: int = 1024, ttl: Optional[float] = None):
+        self.max_users = max_users
+        self.ttl = ttl
+        # user_id -> {类型: (值, 版本, 写入时间)}
+        self._entries: "OrderedDict[int, Dict[str, Tuple[Dict[str, Any], Any, float]]]" = OrderedDict()
+        # 每次失效递增；加载开始前记录，写回时不一致说明期间发生过写入，丢弃旧结果
+        self._generations: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def generation(self, user_id: int) -> int:
+        with self._lock:
+            return self._generations.get(user_id, 0)
+
+    def get(
+        self, user_id: int, kind: str, version: Any = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        读取条目
+
+        Args:
+            version: 当前数据版本；为 None 时不校验版本（只受 TTL 约束）
+        """
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or kind not in entry:
+                return None
+            value, cached_version, stored_at = entry[kind]
+            if self.ttl and time.monotonic() - stored_at > self.ttl:
+                del entry[kind]
+                return None
+            if version is not None and cached_version != version:
+                return None
+            self._entries.move_to_end(user_id)
+            return dict(value)
+
+    def set(
+        self,
+        user_id: int,
+        kind: str,
+        value: Dict[str, Any],
+        generation: int,
+        version: Any = None,
+    ) -> None:
+        with self._lock:
+            if self._generations.get(user_id, 0) != generation:
+                return
+            self._entries.setdefault(user_id, {})[kind] = (
+                dict(value),
+                version,
+                time.monotonic(),
+            )
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            self._entries.pop(user_id, None)
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._generations.clear()
+
+
+profile_cache = ProfileCache(ttl=fastapi_settings.PROFILE_CACHE_TTL)
+
+
 class UserProfileService:
     """用户画像服务（带持久化缓存）"""
     
@@ -41,27 +125,155 @@ class UserProfileService:
         Returns:
             结构化的用户画像数据字典
         """
-        # 1. 检查缓存
-        cache_data = await UserProfileService._get_cached_profile(user_id, db)
-        
-        # 2. 计算当前数据版本（所有依赖表的最大更新时间）
+        generation = profile_cache.generation(user_id)
+
+        # 1. 计算当前数据版本（所有依赖表的最大更新时间）
         current_version = await UserProfileService._calculate_data_version(user_id, db)
-        
-        # 3. 如果缓存有效且版本匹配，直接返回缓存
-        if cache_data and cache_data.get("data_version") == current_version.isoformat():
+        version_key = current_version.isoformat()
+
+        # 2. 进程内共享缓存版本一致时无需读取持久化缓存
+        cached = profile_cache.get(user_id, "complete", version_key)
+        if cached is not None:
+            return cached
+
+        # 3. 如果持久化缓存有效且版本匹配，直接返回缓存
+        cache_data = await UserProfileService._get_cached_profile(user_id, db)
+        if cache_data and cache_data.get("data_version") == version_key:
             logger.debug("用户 %s 的画像缓存命中", user_id)
+            profile_cache.set(
+                user_id, "complete", cache_data["cached_data"], generation, version_key
+            )
             return cache_data["cached_data"]
-        
+
         # 4. 缓存无效或过期，重新计算并更新缓存
         logger.info("用户 %s 的画像缓存未命中或过期，重新计算", user_id)
         profile_data = await UserProfileService._calculate_profile_data(user_id, db)
-        
+
         # 5. 保存到缓存
         await UserProfileService._save_profile_cache(
             user_id, db, profile_data, current_version
         )
-        
+        profile_cache.set(user_id, "complete", profile_data, generation, version_key)
+
         return profile_data
+
+    @staticmethod
+    async def get_profile_snapshot(
+        user_id: int, db: Optional[AsyncSession] = None, force_refresh: bool = False
+    ) -> Optional[Dict[str, Any]]:
+        """
+        获取用户画像快照（user_profiles 字段 + 昵称，纯数据字典）
+
+        供 MemoryManager 与 LangGraph load_profile_node 使用，走共享缓存；
+        未传入会话时使用连接池中的异步会话。
+
+        Returns:
+            画像快照；用户不存在时返回 None
+        """
+        if db is None:
+            async with AsyncSessionLocal() as session:
+                return await UserProfileService._get_profile_snapshot(
+                    user_id, session, force_refresh
+                )
+        return await UserProfileService._get_profile_snapshot(
+            user_id, db, force_refresh
+        )
+
+    @staticmethod
+    async def _get_profile_snapshot(
+        user_id: int, db: AsyncSession, force_refresh: bool
+    ) -> Optional[Dict[str, Any]]:
+        """先读取画像版本（单行两列），版本与共享缓存一致时直接返回缓存"""
+        generation = profile_cache.generation(user_id)
+        version = await UserProfileService._snapshot_version(user_id, db)
+        if version is None:
+            return None
+
+        if not force_refresh:
+            cached = profile_cache.get(user_id, "snapshot", version)
+            if cached is not None:
+                return cached
+
+        snapshot = await UserProfileService._load_profile_snapshot(user_id, db)
+        if snapshot is not None:
+            profile_cache.set(user_id, "snapshot", snapshot, generation, version)
+        return snapshot
+
+    @staticmethod
+    async def _snapshot_version(user_id: int, db: AsyncSession) -> Optional[str]:
+        """画像快照的数据版本：昵称 + 画像更新时间（积分/成就/摘要等写入都会刷新）；用户不存在时返回 None"""
+        result = await db.execute(
+            select(User.nickname, UserProfile.updated_at)
+            .outerjoin(UserProfile, UserProfile.user_id == User.id)
+            .where(User.id == user_id)
+        )
+        row = result.first()
+        if row is None:
+            return None
+        nickname, updated_at = row
+        return f"{nickname or ''}|{updated_at.isoformat() if updated_at else ''}"
+
+    @staticmethod
+    def peek_profile_snapshot(user_id: int) -> Optional[Dict[str, Any]]:
+        """仅读取共享缓存中的画像快照（不访问数据库、不校验版本，只受 TTL 约束；可在同步代码中调用）"""
+        return profile_cache.get(user_id, "snapshot")
+
+    @staticmethod
+    async def _load_profile_snapshot(
+        user_id: int, db: AsyncSession
+    ) -> Optional[Dict[str, Any]]:
+        """从数据库加载画像快照（单次查询）"""
+        result = await db.execute(
+            select(User.nickname, UserProfile)
+            .outerjoin(UserProfile, UserProfile.user_id == User.id)
+            .where(User.id == user_id)
+        )
+        row = result.first()
+        if row is None:
+            return None
+
+        nickname, profile = row
+        if profile is None:
+            return {
+                "nickname": nickname or "用户",
+                "gender": None,
+                "age": None,
+                "height": None,
+                "bmr": None,
+                "diet_preferences": None,
+                "exercise_habits": None,
+                "weight_history": None,
+                "body_signals": None,
+                "motivation_type": None,
+                "weak_points": None,
+                "memory_summary": None,
+                "decision_mode": "balanced",
+                "points": 0,
+                "communication_style": None,
+            }
+
+        return {
+            "nickname": nickname or "用户",
+            "gender": profile.gender,
+            "age": profile.age,
+            "height": profile.height,
+            "bmr": profile.bmr,
+            "diet_preferences": profile.diet_preferences,
+            "exercise_habits": profile.exercise_habits,
+            "weight_history": profile.weight_history,
+            "body_signals": profile.body_signals,
+            "motivation_type": profile.motivation_type.value
+            if profile.motivation_type
+            else None,
+            "weak_points": profile.weak_points,
+            "memory_summary": profile.memory_summary,
+            "decision_mode": profile.decision_mode,
+            "points": profile.points,
+            "communication_style": profile.communication_style,
+            "updated_at": profile.updated_at.isoformat()
+            if profile.updated_at
+            else None,
+        }
     
     @staticmethod
     async def _get_cached_profile(user_id: int, db: AsyncSession) -> Optional[Dict[str, Any]]:
@@ -251,6 +463,7 @@ class UserProfileService:
     @staticmethod
     async def invalidate_cache(user_id: int, db: AsyncSession) -> None:
         """使指定用户的缓存失效（供小调查提交后调用）"""
+        profile_cache.invalidate(user_id)
         try:
             result = await db.execute(
                 select(UserProfileCache).where(UserProfileCache.user_id == user_id)
@@ -265,7 +478,12 @@ class UserProfileService:
         except Exception as e:
             logger.warning("清理用户画像缓存失败: %s", e)
             await db.rollback()
-    
+
+    @staticmethod
+    def invalidate_shared_cache(user_id: int) -> None:
+        """仅使进程内共享画像缓存失效（积分/体重/成就等变化；读取时也会按版本校验）"""
+        profile_cache.invalidate(user_id)
+
     @staticmethod
     async def format_system_prompt(profile_data: Dict[str, Any], conversation_context: str = "") -> str:
         """
@@ -9,19 +9,51 @@ ChromaDB 向量存储实现
 - 支持相似性搜索
 - 支持元数据过滤
 - 自动持久化到磁盘
+- 同一持久化目录在进程内共用一个客户端，集合句柄按需获取
+- 对话记忆写入可经后台写入队列批量提交（见 write_queue）
 """
 
 from typing import List, Dict, Optional, Any
+import asyncio
 import os
 import json
+import threading
 from datetime import datetime
 
 import chromadb
 from chromadb.config import Settings
 
+from config.settings import fastapi_settings
+from utils.session_registry import SessionRegistry
+from .write_queue import write_queue
+
 # 默认配置
 DEFAULT_PERSIST_DIR = "./data/vector_db"
 
+# 单个向量存储实例（集合句柄，客户端共享）的估算常驻内存，数据本身在磁盘上
+VECTOR_STORE_ESTIMATED_BYTES = 64 * 1024
+
+# 持久化目录（绝对路径）-> 共享客户端
+_clients: Dict[str, Any] = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(persist_dir: str = DEFAULT_PERSIST_DIR):
+    """
+    获取持久化目录对应的共享 ChromaDB 客户端
+
+    每个用户一个客户端时，打开的文件句柄和后台资源随用户数线性增长；
+    进程内同一目录只创建一次客户端，各用户只持有自己的集合句柄。
+    """
+    path = os.path.abspath(persist_dir)
+    with _clients_lock:
+        client = _clients.get(path)
+        if client is None:
+            os.makedirs(path, exist_ok=True)
+            client = chromadb.PersistentClient(path=path)
+            _clients[path] = client
+        return client
+
 
 class ChromaVectorStore:
     """
@@ -69,28 +101,52 @@ class ChromaVectorStore:
         else:
             self._embedding_function = embedding_function
 
-        # 确保目录存在
-        os.makedirs(persist_dir, exist_ok=True)
+        self._client = None
+        self._collection = None
+        # 写入队列中标识本集合的键
+        self._queue_key = (os.path.abspath(persist_dir), collection_name)
 
-        # 初始化 ChromaDB 客户端（使用持久化存储）
-        self._client = chromadb.PersistentClient(path=persist_dir)
+    def _open(self):
+        """获取共享客户端并获取或创建集合"""
+        self._client = get_client(self.persist_dir)
 
         # 获取或创建集合
         self._collection = self._client.get_or_create_collection(
-            name=collection_name,
-            metadata={"description": f"Vector store for {collection_name}"},
+            name=self.collection_name,
+            metadata={"description": f"Vector store for {self.collection_name}"},
         )
 
     @property
     def collection(self):
-        """获取集合"""
+        """获取集合（首次使用或关闭后再次使用时打开）"""
+        if self._collection is None:
+            self._open()
         return self._collection
 
+    def flush(self, timeout: float = 10.0) -> bool:
+        """等待本集合在写入队列中的积压写完"""
+        return write_queue.flush(self._queue_key, timeout=timeout)
+
+    def _flush_for_read(self) -> None:
+        """
+        读取前尽量写完本集合的积压，以读到刚写入的数据
+
+        在事件循环线程上调用时不等待（只唤醒后台写入线程），其他线程（如 to_thread）
+        最多等待 VECTOR_WRITE_READ_FLUSH_TIMEOUT 秒；超时后读取已写入的数据。
+        """
+        try:
+            asyncio.get_running_loop()
+            timeout = 0.0
+        except RuntimeError:
+            timeout = fastapi_settings.VECTOR_WRITE_READ_FLUSH_TIMEOUT
+        self.flush(timeout=timeout)
+
     def add_documents(
         self,
         documents: List[str],
         metadatas: Optional[List[Dict]] = None,
         ids: Optional[List[str]] = None,
+        defer: bool = False,
     ) -> List[str]:
         """
         添加文档到向量库
@@ -99,6 +155,7 @@ class ChromaVectorStore:
             documents: 文档内容列表
             metadatas: 元数据列表（可选）
             ids: 文档ID列表（可选，自动生成）
+            defer: 是否交给后台写入队列批量提交（队列积压已满时仍同步写入）
 
         Returns:
             生成的文档ID列表
@@ -116,11 +173,29 @@ class ChromaVectorStore:
         if metadatas is None:
             metadatas = [{}] * len(documents)
 
+        if defer and write_queue.submit(
+            self._queue_key, self.collection, documents, metadatas, ids
+        ):
+            return ids
+
         # 添加到集合
-        self._collection.add(documents=documents, metadatas=metadatas, ids=ids)
+        self.collection.add(documents=documents, metadatas=metadatas, ids=ids)
 
         return ids
 
+    def upsert_documents(
+        self, documents: List[str], metadatas: List[Dict], ids: List[str]
+    ) -> None:
+        """
+        写入或覆盖文档（如用生成的摘要替换先行写入的原文）
+
+        先撤下写入队列中同 ID 的待写旧版本，避免之后写入的旧版本覆盖本次结果。
+        """
+        if not documents:
+            return
+        write_queue.discard(self._queue_key, ids)
+        self.collection.upsert(documents=documents, metadatas=metadatas, ids=ids)
+
     def similarity_search(
         self, query: str, k: int = 5, filter_metadata: Optional[Dict] = None
     ) -> List[Dict[str, Any]]:
@@ -180,7 +255,8 @@ class ChromaVectorStore:
                 elif len(conditions) > 1:
                     where_clause = {"$and": conditions}
 
-        results = self._collection.query(
+        self._flush_for_read()
+        results = self.collection.query(
             query_texts=[query], n_results=k, where=where_clause
         )
 
@@ -230,7 +306,8 @@ class ChromaVectorStore:
             是否删除成功
         """
         try:
-            self._collection.delete(ids=[doc_id])
+            write_queue.discard(self._queue_key, [doc_id])
+            self.collection.delete(ids=[doc_id])
             return True
         except Exception:
             return False
@@ -270,7 +347,8 @@ class ChromaVectorStore:
         Returns:
             文档列表
         """
-        results = self._collection.get(limit=limit)
+        self._flush_for_read()
+        results = self.collection.get(limit=limit)
 
         documents = []
         if results.get("documents"):
@@ -292,11 +370,15 @@ class ChromaVectorStore:
         Returns:
             文档数量
         """
-        return self._collection.count()
+        self._flush_for_read()
+        return self.collection.count()
 
     def clear(self):
         """清空集合"""
         try:
+            write_queue.discard(self._queue_key)
+            if self._client is None:
+                self._open()
             self._client.delete_collection(self.collection_name)
             self._collection = self._client.get_or_create_collection(
                 name=self.collection_name,
@@ -306,8 +388,14 @@ class ChromaVectorStore:
             print(f"Failed to clear collection: {e}")
 
     def close(self):
-        """关闭连接"""
-        pass
+        """
+        关闭连接：释放集合引用
+
+        写入队列持有集合句柄，积压由后台线程照常写完，这里不等待；
+        客户端由同一持久化目录的所有存储共享，这里不关闭客户端。
+        """
+        self._collection = None
+        self._client = None
 
 
 # 向量存储管理器（支持多用户）
@@ -320,7 +408,10 @@ class VectorStoreManager:
     集合命名规则：user_{user_id}
     """
 
-    _instances: Dict[int, ChromaVectorStore] = {}
+    # 有界注册表：LRU + 空闲淘汰，淘汰时调用 ChromaVectorStore.close()
+    _instances: SessionRegistry[int, ChromaVectorStore] = SessionRegistry(
+        "vector_stores", sizeof=lambda store: VECTOR_STORE_ESTIMATED_BYTES
+    )
 
     @classmethod
     def get_store(
@@ -336,25 +427,21 @@ class VectorStoreManager:
         Returns:
             ChromaVectorStore 实例
         """
-        if user_id not in cls._instances:
-            collection_name = f"user_{user_id}"
-            cls._instances[user_id] = ChromaVectorStore(
-                collection_name=collection_name, persist_dir=persist_dir
-            )
-        return cls._instances[user_id]
+        return cls._instances.get_or_create(
+            user_id,
+            lambda: ChromaVectorStore(
+                collection_name=f"user_{user_id}", persist_dir=persist_dir
+            ),
+        )
 
     @classmethod
     def close_store(cls, user_id: int):
         """关闭用户的向量存储"""
-        if user_id in cls._instances:
-            cls._instances[user_id].close()
-            del cls._instances[user_id]
+        cls._instances.pop(user_id)
 
     @classmethod
     def close_all(cls):
         """关闭所有向量存储"""
-        for store in cls._instances.values():
-            store.close()
         cls._instances.clear()
 
 
@@ -387,7 +474,7 @@ async def add_user_memory(
         **(metadata or {}),
     }
 
-    ids = store.add_documents(documents=[content], metadatas=[meta])
+    ids = store.add_documents(documents=[content], metadatas=[meta], defer=True)
 
     return ids[0]
 
@@ -1,100 +1,147 @@
 """
 本地嵌入服务
 
-使用简单的文本哈希 + 平均词向量作为降级方案
+使用 n-gram 特征哈希向量作为降级方案
 或使用 OpenAI 兼容的嵌入 API
 """
 
-from typing import List, Any, Optional, Union
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, Union
 import numpy as np
 import hashlib
 import json
+import re
+import zlib
+
+# 中文按字切分后取单字 + 相邻二字；英文/数字按词切分
+_TOKEN_PATTERN = re.compile(r"[\u4e00-\u9fff]+|[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    切分文本为特征词
+
+    中文没有空格分词，split() 会把整句当作一个词；这里对中文连续片段取
+    单字和二字 n-gram，英文与数字按词切分。
+    """
+    tokens = []
+    for segment in _TOKEN_PATTERN.findall(text.lower()):
+        if segment[0].isascii():
+            tokens.append(segment)
+            continue
+        tokens.extend(segment)
+        tokens.extend(segment[i : i + 2] for i in range(len(segment) - 1))
+    return tokens
+
+
+class _BucketVocab(dict):
+    """
+    特征词 -> 桶下标的记忆表
+
+    未命中时计算 crc32：跨进程稳定，内置 hash() 每次启动随机化会让持久化的向量失效。
+    """
+
+    def __init__(self, dimension: int, maxsize: int):
+        super().__init__()
+        self.dimension = dimension
+        self.maxsize = maxsize
+
+    def __missing__(self, token: str) -> int:
+        if len(self) >= self.maxsize:
+            self.clear()
+        bucket = self[token] = zlib.crc32(token.encode("utf-8")) % self.dimension
+        return bucket
 
 
 class SimpleEmbedding:
-    """简单文本嵌入（基于词频哈希）"""
+    """
+    简单文本嵌入（基于 n-gram 特征哈希）
+
+    整批文本一次性哈希到桶下标，用 NumPy 累加为 float32 矩阵并按行归一化。
+    embed/embed_batch 与 OpenAIEmbedding 一样返回列表；需要 NumPy 数组时
+    （如相似度计算）使用 embed_array/embed_batch_array，省去转换开销。
+    """
 
-    def __init__(self, dimension: int = 384):
+    def __init__(
+        self, dimension: int = 384, cache_size: int = 1000, vocab_size: int = 50000
+    ):
         self.dimension = dimension
-        self._vocab = {}
-        self._cache = {}
-        self._cache_maxsize = 1000
-        self._cache_keys = []  # LRU 顺序
-
-    def _text_to_vector(self, text: str) -> np.ndarray:
-        """将文本转换为向量"""
-        words = text.lower().split()
-        vector = np.zeros(self.dimension)
-        for i, word in enumerate(words):
-            # 使用Python内置hash()替代MD5，性能更高
-            hash_val = hash(word) & 0xFFFFFFFF  # 32位无符号整数
-            vector[hash_val % self.dimension] += 1.0 / (i + 1)
-        norm = np.linalg.norm(vector)
-        if norm > 0:
-            vector = vector / norm
-        return vector
+        # 特征词 -> 桶下标（有上限，超出后清空重建）
+        self._vocab = _BucketVocab(dimension, vocab_size)
+        # 文本 -> 只读向量，按访问顺序排列（最久未使用在前）
+        self._cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._cache_maxsize = cache_size
+
+    def _texts_to_matrix(self, texts: List[str]) -> np.ndarray:
+        """将一批文本转换为 (len(texts), dimension) 的 float32 矩阵"""
+        tokens: List[str] = []
+        counts = np.empty(len(texts), dtype=np.int64)
+        for row, text in enumerate(texts):
+            text_tokens = tokenize(text)
+            counts[row] = len(text_tokens)
+            tokens.extend(text_tokens)
+
+        buckets = np.fromiter(
+            map(self._vocab.__getitem__, tokens), dtype=np.int64, count=len(tokens)
+        )
+        rows = np.repeat(np.arange(len(texts), dtype=np.int64), counts)
+        size = len(texts) * self.dimension
+        matrix = (
+            np.bincount(rows * self.dimension + buckets, minlength=size)
+            .astype(np.float32)
+            .reshape(len(texts), self.dimension)
+        )
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        np.divide(matrix, norms, out=matrix, where=norms > 0)
+        return matrix
+
+    def _cache_put(self, text: str, vector: np.ndarray) -> None:
+        vector.setflags(write=False)
+        self._cache[text] = vector
+        if len(self._cache) > self._cache_maxsize:
+            self._cache.popitem(last=False)
 
     def embed(self, text: str) -> List[float]:
-        """获取单个文本的嵌入向量（带LRU缓存）"""
-        # 检查缓存
-        if text in self._cache:
-            # 更新LRU顺序
-            self._cache_keys.remove(text)
-            self._cache_keys.append(text)
-            return self._cache[text]
-
-        # 计算嵌入向量
-        vector = self._text_to_vector(text).tolist()
-
-        # 添加到缓存
-        if len(self._cache) >= self._cache_maxsize:
-            # 移除最久未使用的
-            oldest = self._cache_keys.pop(0)
-            del self._cache[oldest]
+        """获取单个文本的嵌入向量"""
+        return self.embed_array(text).tolist()
 
-        self._cache[text] = vector
-        self._cache_keys.append(text)
+    def embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """批量获取嵌入向量"""
+        return self.embed_batch_array(texts).tolist()
+
+    def embed_array(self, text: str) -> np.ndarray:
+        """获取单个文本的嵌入向量（float32，带 LRU 缓存，返回的向量只读）"""
+        vector = self._cache.get(text)
+        if vector is not None:
+            self._cache.move_to_end(text)
+            return vector
 
+        vector = self._texts_to_matrix([text])[0]
+        self._cache_put(text, vector)
         return vector
 
-    def embed_batch(self, texts: List[str]) -> List[List[float]]:
-        """批量获取嵌入向量（批量缓存优化）"""
-        results = []
-        to_compute = []
-        to_compute_indices = []
+    def embed_batch_array(self, texts: List[str]) -> np.ndarray:
+        """批量获取嵌入向量，返回 (len(texts), dimension) 的 float32 矩阵"""
+        result = np.empty((len(texts), self.dimension), dtype=np.float32)
+        missing: Dict[str, List[int]] = {}
 
-        # 先检查缓存
         for i, text in enumerate(texts):
-            if text in self._cache:
-                # 更新LRU顺序
-                self._cache_keys.remove(text)
-                self._cache_keys.append(text)
-                results.append(self._cache[text])
+            vector = self._cache.get(text)
+            if vector is not None:
+                self._cache.move_to_end(text)
+                result[i] = vector
             else:
-                results.append(None)  # 占位符
-                to_compute.append(text)
-                to_compute_indices.append(i)
-
-        # 计算缺失的嵌入向量
-        if to_compute:
-            computed_vectors = []
-            for text in to_compute:
-                vector = self._text_to_vector(text).tolist()
-                computed_vectors.append(vector)
-
-                # 添加到缓存
-                if len(self._cache) >= self._cache_maxsize:
-                    oldest = self._cache_keys.pop(0)
-                    del self._cache[oldest]
-
-                self._cache[text] = vector
-                self._cache_keys.append(text)
-
-            # 填充结果
-            for i, idx in enumerate(to_compute_indices):
-                results[idx] = computed_vectors[i]
-
-        return results
+                missing.setdefault(text, []).append(i)
+
+        # 缺失的文本（批内去重）一次性计算
+        if missing:
+            to_compute = list(missing)
+            matrix = self._texts_to_matrix(to_compute)
+            for text, vector in zip(to_compute, matrix):
+                result[missing[text]] = vector
+                self._cache_put(text, vector.copy())
+
+        return result
 
 
 class OpenAIEmbedding:
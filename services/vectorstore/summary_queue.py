@@ -0,0 +1,306 @@
+"""
+对话记忆摘要队列
+
+长期记忆原来在写入每条对话时同步调用一次 LLM 生成摘要，聊天请求因此多等一次完整的
+模型往返。这里改为：
+- 写入时先存截断的原文（元数据 pending_summary=True），立即返回
+- 后台任务攒批，把多条对话编号后放进同一个提示词，一次调用生成多条摘要，
+  解析后用 upsert 覆盖原先写入的文档（摘要缺失或调用失败时保留截断原文）
+- 排队条数有上限，队列满时不再排队（只保留截断原文），不会拖慢聊天请求
+
+指标：
+- 耗时 memory_summary.lag（入队到摘要写入）、memory_summary.llm
+- 计数器 memory_summary.batches / summaries / fallbacks / shed / tokens
+"""
+
+import asyncio
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from config.logging_config import get_module_logger
+from config.settings import fastapi_settings
+from utils.performance import get_counters, get_monitor, increment_counter
+
+logger = get_module_logger(__name__)
+
+# 每条摘要预留的输出 token 数
+TOKENS_PER_SUMMARY = 100
+
+SUMMARY_LINE_RE = re.compile(r"^\s*\[?(\d+)\]?\s*[.、:：)）\]]\s*(.+?)\s*$")
+
+
+@dataclass
+class SummaryJob:
+    """一条待生成摘要的对话"""
+
+    vector_store: Any  # ChromaVectorStore
+    doc_id: str
+    content: str
+    metadata: Dict[str, Any]
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+def truncate_turn(content: str, limit: Optional[int] = None) -> str:
+    """截断对话原文（摘要生成前先行写入的内容）"""
+    limit = limit or fastapi_settings.MEMORY_SUMMARY_RAW_CHARS
+    return content[:limit] + "..." if len(content) > limit else content
+
+
+def build_prompt(contents: List[str]) -> str:
+    """把多条对话编号后放进同一个提示词"""
+    limit = fastapi_settings.MEMORY_SUMMARY_INPUT_CHARS
+    numbered = "\n".join(
+        f"[{i}] {content[:limit]}".replace("\n", " ")
+        for i, content in enumerate(contents, 1)
+    )
+    return (
+        f"请将以下 {len(contents)} 条对话内容分别总结为简洁的摘要（每条不超过50字）。\n"
+        f"按编号逐行输出，格式为“编号. 摘要”，共 {len(contents)} 行，不要输出其他内容。\n\n"
+        f"{numbered}"
+    )
+
+
+def parse_summaries(text: str, count: int) -> List[Optional[str]]:
+    """按编号解析模型输出，缺失的条目为 None"""
+    summaries: List[Optional[str]] = [None] * count
+    for line in (text or "").splitlines():
+        match = SUMMARY_LINE_RE.match(line)
+        if not match:
+            continue
+        index = int(match.group(1)) - 1
+        if 0 <= index < count and summaries[index] is None:
+            summaries[index] = match.group(2)
+    return summaries
+
+
+class SummaryQueue:
+    """后台批量生成对话摘要的有界队列"""
+
+    def __init__(
+        self,
+        batch_size: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+        max_pending: Optional[int] = None,
+        ai_service: Any = None,
+    ):
+        """
+        Args:
+            batch_size: 单次 LLM 调用的最大对话条数，默认 MEMORY_SUMMARY_BATCH_SIZE
+            flush_interval: 最长攒批时间（秒），默认 MEMORY_SUMMARY_FLUSH_INTERVAL
+            max_pending: 最多排队条数，默认 MEMORY_SUMMARY_MAX_PENDING
+            ai_service: 生成摘要的 AI 服务，默认全局 ai_service
+        """
+        self.batch_size = batch_size or fastapi_settings.MEMORY_SUMMARY_BATCH_SIZE
+        self.flush_interval = (
+            flush_interval
+            if flush_interval is not None
+            else fastapi_settings.MEMORY_SUMMARY_FLUSH_INTERVAL
+        )
+        self.max_pending = max_pending or fastapi_settings.MEMORY_SUMMARY_MAX_PENDING
+        self._ai_service = ai_service
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # 唤醒攒批中的后台任务（有新对话入队或请求 flush）
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flush_requested: Optional[asyncio.Event] = None
+        self._closed = False
+        # 最近一批中最早入队的对话从入队到写入摘要的耗时（秒）
+        self._last_lag: Optional[float] = None
+
+    @property
+    def ai_service(self):
+        if self._ai_service is None:
+            from services.ai_service import ai_service
+
+            self._ai_service = ai_service
+        return self._ai_service
+
+    # ---- 写入 ----
+
+    def submit(self, job: SummaryJob) -> bool:
+        """
+        提交待总结的对话（不等待）
+
+        Returns:
+            是否已入队；队列已满或已关闭时返回 False，该对话只保留截断原文
+        """
+        if self._closed:
+            increment_counter("memory_summary.shed")
+            return False
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            increment_counter("memory_summary.shed")
+            return False
+        self._wakeup.set()
+        return True
+
+    async def flush(self) -> None:
+        """让后台任务不再等待攒批，立即处理所有排队的对话并等待完成"""
+        if self._queue is None:
+            return
+        if self._worker is None or self._worker.done():
+            self._ensure_worker()
+        self._flush_requested.set()
+        self._wakeup.set()
+        try:
+            await self._queue.join()
+        finally:
+            self._flush_requested.clear()
+
+    async def close(self, timeout: float = 30.0) -> None:
+        """处理完积压后停止后台任务；之后提交的对话只保留截断原文"""
+        self._closed = True
+        try:
+            await asyncio.wait_for(self.flush(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("摘要队列关闭超时，剩余 %d 条保留截断原文", self.pending)
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def stats(self) -> Dict[str, Any]:
+        counters = get_counters()
+        summaries = counters.get("memory_summary.summaries", 0)
+        tokens = counters.get("memory_summary.tokens", 0)
+        return {
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "batch_size": self.batch_size,
+            "batches": counters.get("memory_summary.batches", 0),
+            "summaries": summaries,
+            "fallbacks": counters.get("memory_summary.fallbacks", 0),
+            "shed": counters.get("memory_summary.shed", 0),
+            "tokens_per_summary": round(tokens / summaries, 1) if summaries else None,
+            "last_lag_ms": (
+                round(self._last_lag * 1000) if self._last_lag is not None else None
+            ),
+        }
+
+    # ---- 后台任务 ----
+
+    def _ensure_worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # 首次使用，或换了事件循环（如测试中多次 asyncio.run）
+            self._loop = loop
+            self._queue = asyncio.Queue(maxsize=self.max_pending)
+            self._wakeup = asyncio.Event()
+            self._flush_requested = asyncio.Event()
+            self._worker = None
+        if self._worker is None or self._worker.done():
+            self._worker = loop.create_task(self._run(), name="memory-summary-queue")
+
+    def _take_nowait(self, limit: int) -> List[SummaryJob]:
+        batch = []
+        while len(batch) < limit and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.flush_interval
+            while True:
+                batch.extend(self._take_nowait(self.batch_size - len(batch)))
+                remaining = deadline - loop.time()
+                if (
+                    len(batch) >= self.batch_size
+                    or remaining <= 0
+                    or self._flush_requested.is_set()
+                ):
+                    break
+                # 等待新对话入队、flush 请求或攒批超时
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+
+            try:
+                await self._process(batch)
+            except Exception as e:
+                logger.error("对话摘要批次处理失败: %s", e)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _summarize(self, contents: List[str]) -> Tuple[List[Optional[str]], int]:
+        """一次 LLM 调用生成多条摘要，返回 (摘要列表, 输出 token 数)"""
+        started = time.monotonic()
+        try:
+            response = await self.ai_service.chat(
+                [{"role": "user", "content": build_prompt(contents)}],
+                max_tokens=TOKENS_PER_SUMMARY * len(contents),
+            )
+        except Exception as e:
+            logger.warning("对话摘要生成失败: %s", e)
+            return [None] * len(contents), 0
+        finally:
+            get_monitor("memory_summary.llm").record_time(time.monotonic() - started)
+
+        if response.error:
+            logger.warning("对话摘要生成失败: %s", response.error)
+            return [None] * len(contents), 0
+        usage = response.usage or {}
+        return parse_summaries(response.content, len(contents)), usage.get(
+            "completion_tokens", 0
+        )
+
+    async def _process(self, batch: List[SummaryJob]) -> None:
+        """生成一批摘要并覆盖写入向量存储"""
+        if not batch:
+            return
+        summaries, tokens = await self._summarize([job.content for job in batch])
+        increment_counter("memory_summary.batches")
+        increment_counter("memory_summary.tokens", tokens)
+
+        # 按向量存储分组 upsert
+        groups: "OrderedDict[int, Tuple[Any, List[str], List[Dict], List[str]]]" = (
+            OrderedDict()
+        )
+        for job, summary in zip(batch, summaries):
+            if summary:
+                increment_counter("memory_summary.summaries")
+            else:
+                increment_counter("memory_summary.fallbacks")
+                summary = truncate_turn(job.content)
+            metadata = {**job.metadata, "summary": summary, "pending_summary": False}
+
+            store, documents, metadatas, ids = groups.setdefault(
+                id(job.vector_store), (job.vector_store, [], [], [])
+            )
+            documents.append(summary)
+            metadatas.append(metadata)
+            ids.append(job.doc_id)
+
+        for store, documents, metadatas, ids in groups.values():
+            try:
+                await asyncio.to_thread(store.upsert_documents, documents, metadatas, ids)
+            except Exception as e:
+                logger.error("对话摘要写入向量存储失败: %s", e)
+
+        now = time.monotonic()
+        lag = get_monitor("memory_summary.lag")
+        for job in batch:
+            lag.record_time(now - job.enqueued_at)
+        self._last_lag = now - min(job.enqueued_at for job in batch)
+
+
+# 全局摘要队列（进程内所有用户的长期记忆共用）
+summary_queue = SummaryQueue()
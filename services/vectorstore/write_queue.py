@@ -0,0 +1,329 @@
+"""
+向量存储后台写入队列
+
+对话记忆每条消息都会写一次向量库，逐条 collection.add 会在请求路径上
+同步完成嵌入计算和 SQLite 提交。写入队列把这些写入转到后台线程：
+- 按集合合并待写文档，达到批大小或刷新间隔后批量 collection.add
+- 积压有上限，队列满时由调用方同步写入（不丢数据，只是退化为原行为）
+- 读取前调用 flush(key) 保证读到自己刚写入的数据（事件循环上只唤醒不等待）
+- 覆盖写入/删除前调用 discard(key, ids) 撤下尚未写入的旧版本，无需等待
+- 关闭时（应用 lifespan / 进程退出）刷新所有积压
+"""
+
+import atexit
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional
+
+from config.logging_config import get_module_logger
+from config.settings import fastapi_settings
+from utils.performance import increment_counter
+
+logger = get_module_logger(__name__)
+
+
+class _PendingBatch:
+    """单个集合的待写文档（同一批次内按 ID 去重，保留先写入的）"""
+
+    __slots__ = ("collection", "documents", "metadatas", "ids", "_seen")
+
+    def __init__(self, collection: Any):
+        self.collection = collection
+        self.documents: List[str] = []
+        self.metadatas: List[Dict] = []
+        self.ids: List[str] = []
+        self._seen = set()
+
+    def extend(self, documents: List[str], metadatas: List[Dict], ids: List[str]) -> int:
+        added = 0
+        for doc, meta, doc_id in zip(documents, metadatas, ids):
+            if doc_id in self._seen:
+                continue
+            self._seen.add(doc_id)
+            self.documents.append(doc)
+            self.metadatas.append(meta)
+            self.ids.append(doc_id)
+            added += 1
+        return added
+
+    def remove(self, ids: List[str]) -> int:
+        drop = self._seen.intersection(ids)
+        if not drop:
+            return 0
+        kept = [
+            (doc, meta, doc_id)
+            for doc, meta, doc_id in zip(self.documents, self.metadatas, self.ids)
+            if doc_id not in drop
+        ]
+        self.documents = [doc for doc, _, _ in kept]
+        self.metadatas = [meta for _, meta, _ in kept]
+        self.ids = [doc_id for _, _, doc_id in kept]
+        self._seen -= drop
+        return len(drop)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+class VectorWriteQueue:
+    """按集合合并写入的后台批量写入队列"""
+
+    def __init__(
+        self,
+        batch_size: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+        max_backlog: Optional[int] = None,
+    ):
+        """
+        Args:
+            batch_size: 单次 collection.add 的最大文档数，默认 VECTOR_WRITE_BATCH_SIZE
+            flush_interval: 最长攒批时间（秒），默认 VECTOR_WRITE_FLUSH_INTERVAL
+            max_backlog: 最大积压文档数，默认 VECTOR_WRITE_MAX_BACKLOG
+        """
+        self.batch_size = batch_size or fastapi_settings.VECTOR_WRITE_BATCH_SIZE
+        self.flush_interval = (
+            flush_interval
+            if flush_interval is not None
+            else fastapi_settings.VECTOR_WRITE_FLUSH_INTERVAL
+        )
+        self.max_backlog = max_backlog or fastapi_settings.VECTOR_WRITE_MAX_BACKLOG
+
+        # key -> 待写批次，按首次写入顺序排列
+        self._pending: "OrderedDict[Hashable, _PendingBatch]" = OrderedDict()
+        # key -> 后台线程正在写入的批次数
+        self._inflight: Dict[Hashable, int] = {}
+        self._backlog = 0
+        self._flush_requested = False
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+        self._cond = threading.Condition()
+
+    # ---- 写入 ----
+
+    def submit(
+        self,
+        key: Hashable,
+        collection: Any,
+        documents: List[str],
+        metadatas: List[Dict],
+        ids: List[str],
+    ) -> bool:
+        """
+        提交待写文档
+
+        Args:
+            key: 集合标识（持久化目录 + 集合名）
+            collection: Chroma 集合句柄
+
+        Returns:
+            是否已入队；队列已关闭或积压已满时返回 False，由调用方同步写入
+        """
+        with self._cond:
+            if self._closed or self._backlog + len(ids) > self.max_backlog:
+                increment_counter("vector_write.sync_fallbacks")
+                return False
+
+            batch = self._pending.get(key)
+            if batch is None:
+                batch = self._pending[key] = _PendingBatch(collection)
+            self._backlog += batch.extend(documents, metadatas, ids)
+            self._ensure_worker()
+            if self._backlog >= self.batch_size:
+                self._cond.notify_all()
+        return True
+
+    def flush(self, key: Optional[Hashable] = None, timeout: float = 10.0) -> bool:
+        """
+        等待积压写入完成
+
+        Args:
+            key: 只等待指定集合；None 表示全部
+            timeout: 最长等待时间（秒）
+
+        Returns:
+            是否在超时前写完
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            if not self._has_work(key):
+                return True
+            if self._thread is None or not self._thread.is_alive():
+                # 后台线程不可用（如已关闭），在当前线程写入
+                batches = self._drain(key)
+                self._cond.release()
+                try:
+                    self._write_all(batches)
+                finally:
+                    self._cond.acquire()
+                    self._finish(batches)
+                return True
+
+            self._flush_requested = True
+            self._cond.notify_all()
+            while self._has_work(key):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    if timeout > 0:
+                        logger.warning("向量写入队列刷新超时: key=%s", key)
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def discard(self, key: Hashable, ids: Optional[List[str]] = None) -> int:
+        """
+        撤下尚未开始写入的文档（后台线程正在写入的批次不受影响）
+
+        Args:
+            key: 集合标识
+            ids: 要撤下的文档ID；None 表示该集合的全部待写文档
+
+        Returns:
+            撤下的文档数
+        """
+        with self._cond:
+            batch = self._pending.get(key)
+            if batch is None:
+                return 0
+            if ids is None:
+                removed = len(batch)
+                del self._pending[key]
+            else:
+                removed = batch.remove(ids)
+                if not len(batch):
+                    del self._pending[key]
+            self._backlog -= removed
+            self._cond.notify_all()
+            return removed
+
+    def close(self, timeout: float = 10.0) -> None:
+        """刷新所有积压并停止后台线程；之后的写入由调用方同步完成"""
+        with self._cond:
+            if self._closed:
+                return
+        self.flush(timeout=timeout)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        # 关闭期间仍在入队的少量写入
+        self.flush(timeout=timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "backlog": self._backlog,
+                "pending_collections": len(self._pending),
+                "inflight_batches": sum(self._inflight.values()),
+                "max_backlog": self.max_backlog,
+                "closed": self._closed,
+            }
+
+    # ---- 后台线程 ----
+
+    def _ensure_worker(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(
+                target=self._run, name="vector-write-queue", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                deadline = time.monotonic() + self.flush_interval
+                while (
+                    not self._closed
+                    and not self._flush_requested
+                    and self._backlog < self.batch_size
+                ):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+
+                if self._closed and not self._pending:
+                    return
+                self._flush_requested = False
+                batches = self._drain(None)
+
+            try:
+                self._write_all(batches)
+            finally:
+                with self._cond:
+                    self._finish(batches)
+
+    # ---- 内部方法（_drain/_finish/_has_work 调用方需持有锁） ----
+
+    def _has_work(self, key: Optional[Hashable]) -> bool:
+        if key is None:
+            return bool(self._pending) or any(self._inflight.values())
+        return key in self._pending or self._inflight.get(key, 0) > 0
+
+    def _drain(self, key: Optional[Hashable]) -> List[tuple]:
+        if key is None:
+            keys = list(self._pending)
+        else:
+            keys = [key] if key in self._pending else []
+        batches = []
+        for k in keys:
+            batch = self._pending.pop(k)
+            self._backlog -= len(batch)
+            self._inflight[k] = self._inflight.get(k, 0) + 1
+            batches.append((k, batch))
+        return batches
+
+    def _finish(self, batches: List[tuple]) -> None:
+        for key, _ in batches:
+            count = self._inflight.get(key, 0) - 1
+            if count > 0:
+                self._inflight[key] = count
+            else:
+                self._inflight.pop(key, None)
+        self._cond.notify_all()
+
+    def _write_all(self, batches: List[tuple]) -> None:
+        for key, batch in batches:
+            for start in range(0, len(batch), self.batch_size):
+                end = start + self.batch_size
+                self._write_chunk(
+                    key,
+                    batch.collection,
+                    batch.documents[start:end],
+                    batch.metadatas[start:end],
+                    batch.ids[start:end],
+                )
+
+    def _write_chunk(
+        self,
+        key: Hashable,
+        collection: Any,
+        documents: List[str],
+        metadatas: List[Dict],
+        ids: List[str],
+    ) -> None:
+        try:
+            collection.add(documents=documents, metadatas=metadatas, ids=ids)
+            increment_counter("vector_write.batches")
+            increment_counter("vector_write.documents", len(ids))
+            return
+        except Exception as e:
+            logger.warning("向量批量写入失败，改为逐条写入: %s, %s", key, e)
+
+        # 批量失败时逐条重试，避免单条坏数据拖累整批
+        for doc, meta, doc_id in zip(documents, metadatas, ids):
+            try:
+                collection.add(documents=[doc], metadatas=[meta], ids=[doc_id])
+                increment_counter("vector_write.documents")
+            except Exception as e:
+                increment_counter("vector_write.dropped")
+                logger.error("向量写入失败，已丢弃: %s[%s], %s", key, doc_id, e)
+
+
+# 全局写入队列（进程内所有向量存储共用）
+write_queue = VectorWriteQueue()
+
+# 非 FastAPI 进程（脚本、测试）退出时同样刷新积压
+atexit.register(write_queue.close)
@@ -192,7 +192,7 @@ class WeeklyReportService:
                 {"role": "user", "content": prompt},
             ]
 
-            response = await ai_service.chat(messages, max_tokens=800)
+            response = await ai_service.chat(messages, max_tokens=800, cache="exact")
 
             if response.error:
                 summary = self._generate_fallback_summary(data)
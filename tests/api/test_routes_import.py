@@ -0,0 +1,16 @@
+"""路由包导入冒烟测试：任何一个路由模块导入失败都会拖垮整个 API"""
+
+import importlib
+
+import api.routes
+
+
+def test_all_routers_import():
+    for name in api.routes.__all__:
+        module = importlib.import_module(f"api.routes.{name}")
+        assert module.router.routes, name
+
+
+def test_coach_stream_route_registered():
+    paths = {route.path for route in api.routes.chat.router.routes}
+    assert "/send-langchain/stream" in paths
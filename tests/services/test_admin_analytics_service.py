@@ -0,0 +1,116 @@
+"""管理后台统计服务测试"""
+
+import asyncio
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from models.database import (
+    AdminDailyStats,
+    Base,
+    ChatHistory,
+    MealRecord,
+    MessageRole,
+    User,
+    WeightRecord,
+)
+from services.admin_analytics_service import AdminAnalyticsService
+
+TABLES = [
+    User.__table__,
+    ChatHistory.__table__,
+    WeightRecord.__table__,
+    MealRecord.__table__,
+    AdminDailyStats.__table__,
+]
+
+
+def _at(day: date, hour: int = 12) -> datetime:
+    return datetime.combine(day, datetime.min.time()) + timedelta(hours=hour)
+
+
+def test_daily_counters_seal_finished_days():
+    """已结束的日期写入计数表后只读计数行，今天每次从原始记录统计"""
+    today = min(date.today(), datetime.utcnow().date())
+    yesterday = today - timedelta(days=1)
+    start = today - timedelta(days=3)
+
+    async def run():
+        engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all, tables=TABLES)
+        session_factory = async_sessionmaker(engine, expire_on_commit=False)
+
+        raw_queries = []
+
+        @event.listens_for(engine.sync_engine, "before_cursor_execute")
+        def count_raw(conn, cursor, statement, parameters, context, executemany):
+            if "FROM chat_history" in statement:
+                raw_queries.append(statement)
+
+        async with session_factory() as db:
+            db.add_all(
+                [
+                    User(id=1, openid="u1", created_at=_at(yesterday)),
+                    User(id=2, openid="u2", created_at=_at(today)),
+                ]
+            )
+            for user_id, role, day in (
+                (1, MessageRole.USER, yesterday),
+                (1, MessageRole.ASSISTANT, yesterday),
+                (2, MessageRole.USER, yesterday),
+                (1, MessageRole.SYSTEM, yesterday),
+                (2, MessageRole.USER, today),
+            ):
+                db.add(
+                    ChatHistory(
+                        user_id=user_id, role=role, content="hi", created_at=_at(day)
+                    )
+                )
+            db.add(WeightRecord(user_id=1, weight=70, created_at=_at(yesterday)))
+            db.add(MealRecord(user_id=2, total_calories=500, created_at=_at(today)))
+            await db.commit()
+
+            first = await AdminAnalyticsService.get_daily_counters(db, start, today)
+            sealed = (await db.execute(select(AdminDailyStats.stat_date))).scalars().all()
+
+            # 已结束日期的新记录不再影响计数，今天的新记录立即可见
+            for day, hour in ((yesterday, 20), (today, 1)):
+                db.add(
+                    ChatHistory(
+                        user_id=1,
+                        role=MessageRole.USER,
+                        content="later",
+                        created_at=_at(day, hour),
+                    )
+                )
+            await db.commit()
+            raw_queries.clear()
+            second = await AdminAnalyticsService.get_daily_counters(db, start, today)
+        await engine.dispose()
+        return first, sealed, second, raw_queries
+
+    first, sealed, second, raw_queries = asyncio.run(run())
+
+    assert list(first) == [start + timedelta(days=i) for i in range(4)]
+    assert first[yesterday] == {
+        "new_users": 1,
+        "user_messages": 2,
+        "assistant_messages": 1,
+        "system_messages": 1,
+        "chat_users": 2,
+        "weight_records": 1,
+        "meal_records": 0,
+    }
+    assert first[today]["new_users"] == 1
+    assert first[today]["meal_records"] == 1
+    assert first[start]["user_messages"] == 0
+
+    assert sorted(sealed) == [start + timedelta(days=i) for i in range(3)]
+
+    assert second[yesterday] == first[yesterday]
+    assert second[today]["user_messages"] == 2
+    assert second[today]["chat_users"] == 2
+    # 第二次只统计今天：聊天表只查询一次
+    assert len(raw_queries) == 1
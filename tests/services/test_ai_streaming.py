@@ -0,0 +1,88 @@
+"""AI 流式输出测试（本地模拟 SSE 大模型服务）"""
+
+import asyncio
+import json
+import time
+
+from services.ai_service import QwenClient
+
+TOKENS = ["你", "好", "，", "我是", "小助"]
+TOKEN_DELAY = 0.1
+
+
+async def _fake_llm_server(connections: list):
+    """OpenAI 兼容的 SSE 服务：每隔 TOKEN_DELAY 秒输出一个 token（chunked + keep-alive）"""
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        connections.append(writer)
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in head.decode().split("\r\n"):
+                    if line.lower().startswith("content-length:"):
+                        length = int(line.split(":", 1)[1])
+                body = json.loads(await reader.readexactly(length))
+                assert body["stream"] is True
+
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\n"
+                    b"Content-Type: text/event-stream\r\n"
+                    b"Transfer-Encoding: chunked\r\n\r\n"
+                )
+                events = [
+                    {"choices": [{"delta": {"content": token}}]} for token in TOKENS
+                ]
+                for event in events:
+                    await asyncio.sleep(TOKEN_DELAY)
+                    _write_chunk(writer, f"data: {json.dumps(event)}\n\n".encode())
+                    await writer.drain()
+                _write_chunk(writer, b"data: [DONE]\n\n")
+                writer.write(b"0\r\n\r\n")
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, "127.0.0.1", 0)
+
+
+def _write_chunk(writer: asyncio.StreamWriter, data: bytes) -> None:
+    writer.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+
+
+def test_qwen_stream_ttft_and_pooled_connection():
+    """首 token 时间远小于完整生成时间；连续请求复用同一连接"""
+
+    async def run():
+        connections = []
+        server = await _fake_llm_server(connections)
+        port = server.sockets[0].getsockname()[1]
+        client = QwenClient(
+            api_key="test", api_base=f"http://127.0.0.1:{port}/compatible-mode/v1"
+        )
+        messages = [{"role": "user", "content": "你好"}]
+
+        results = []
+        for _ in range(2):
+            start = time.perf_counter()
+            ttft = None
+            chunks = []
+            async for chunk in client.stream_chat_completion(messages):
+                if ttft is None:
+                    ttft = time.perf_counter() - start
+                chunks.append(chunk)
+            results.append((ttft, time.perf_counter() - start, chunks))
+
+        server.close()
+        await server.wait_closed()
+        return results, len(connections)
+
+    results, connection_count = asyncio.run(run())
+
+    for ttft, total, chunks in results:
+        assert chunks == TOKENS
+        assert ttft < TOKEN_DELAY * 2.5
+        assert total >= TOKEN_DELAY * len(TOKENS)
+    assert connection_count == 1
@@ -0,0 +1,72 @@
+"""令牌索引与已验证令牌缓存测试"""
+
+import asyncio
+import time
+
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from models.database import AuthToken, Base, User
+from services.auth_token_service import (
+    AuthTokenService,
+    PrincipalCache,
+    principal_cache,
+)
+
+
+def test_principal_cache_bounds_and_expiry():
+    """超出容量淘汰最久未用的条目；过期条目不返回；可按用户失效"""
+    cache = PrincipalCache(max_entries=2, ttl=60)
+    cache.set("a", 1, "legacy")
+    cache.set("b", 2, "legacy")
+    cache.get("a")
+    cache.set("c", 1, "jwt")
+    assert cache.get("b") is None
+    assert cache.get("a") == (1, "legacy")
+    assert cache.invalidate_user(1) == 2
+    assert len(cache) == 0
+
+    # JWT 缓存时间不超过剩余有效期
+    cache.set("d", 3, "jwt", ttl=0.01)
+    time.sleep(0.02)
+    assert cache.get("d") is None
+    cache.set("e", 4, "jwt", ttl=-1)
+    assert cache.get("e") is None
+
+
+def test_resolve_user_id_by_index():
+    """回填后按令牌定位到对应用户（而非第一个用户）；新登录令牌写入索引"""
+
+    async def run():
+        engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+        async with engine.begin() as conn:
+            await conn.run_sync(
+                Base.metadata.create_all,
+                tables=[User.__table__, AuthToken.__table__],
+            )
+        principal_cache.clear()
+        async with AsyncSession(engine) as db:
+            db.add_all(User(id=i, openid=f"openid_{i}") for i in range(1, 4))
+            await db.commit()
+
+            assert await AuthTokenService.backfill_if_empty(db) == 3
+            assert await AuthTokenService.backfill_if_empty(db) == 0
+
+            token = AuthTokenService.generate_token(2)
+            first = await AuthTokenService.resolve_user_id(db, token)
+            cached = await AuthTokenService.resolve_user_id(db, token)
+            invalid = await AuthTokenService.resolve_user_id(db, "0" * 32)
+
+            db.add(User(id=9, openid="openid_9"))
+            await db.commit()
+            new_token = AuthTokenService.generate_token(9)
+            await AuthTokenService.register_token(db, 9, new_token)
+            await AuthTokenService.register_token(db, 9, new_token)
+            registered = await AuthTokenService.resolve_user_id(db, new_token)
+
+            await AuthTokenService.revoke_user(db, 9)
+            revoked = await AuthTokenService.resolve_user_id(db, new_token)
+        await engine.dispose()
+        principal_cache.clear()
+        return first, cached, invalid, registered, revoked
+
+    assert asyncio.run(run()) == (2, 2, None, 9, None)
@@ -0,0 +1,137 @@
+"""聊天记录全文检索测试"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from models.database import Base, ChatHistory, MessageRole, User
+from services.chat_search_service import (
+    BACKENDS,
+    ChatSearchService,
+    highlight,
+    parse_query,
+    tokenize,
+)
+
+
+def test_tokenize_cjk_bigrams_and_words():
+    assert tokenize("今天体重70kg, Walking!") == ["今天", "天体", "体重", "70kg", "walking"]
+    assert tokenize("饿") == ["饿"]
+    terms = parse_query("体重 Walk")
+    assert [(t.tokens, t.prefix, t.indexable) for t in terms] == [
+        (["体重"], False, True),
+        (["walk"], True, True),
+    ]
+    assert not parse_query("饿")[0].indexable
+    assert highlight("早上称体重，体重下降了", parse_query("体重")) == (
+        "早上称**体重**，**体重**下降了"
+    )
+
+
+def test_index_sync_ranking_and_keyset_pages():
+    """启动补录 + ORM 写入同步；结果按相关度排序并可按 cursor 翻页"""
+
+    async def run():
+        engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+        async with engine.begin() as conn:
+            await conn.run_sync(
+                Base.metadata.create_all, tables=[User.__table__, ChatHistory.__table__]
+            )
+        session_factory = async_sessionmaker(engine, expire_on_commit=False)
+        start = datetime(2026, 1, 1)
+
+        def message(i, content, role=MessageRole.USER):
+            return ChatHistory(
+                id=i, user_id=1, role=role, content=content,
+                created_at=start + timedelta(minutes=i),
+            )
+
+        async with session_factory() as db:
+            db.add(User(id=1, openid="openid_1", nickname="小明"))
+            # 建索引前已有的消息
+            db.add_all([
+                message(1, "今天体重下降了"),
+                message(2, "体重体重体重，一直在关注体重"),
+                message(3, "午饭吃了沙拉"),
+            ])
+            await db.commit()
+
+            backfilled = await ChatSearchService.ensure_index(db)
+
+            # 建索引后的写入、修改、删除
+            db.add_all([
+                message(4, "晚上散步 Walking 半小时，体重没变"),
+                message(5, "体重是系统消息", MessageRole.SYSTEM),
+            ])
+            await db.commit()
+            edited = await db.get(ChatHistory, 3)
+            edited.content = "午饭后称了体重"
+            await db.commit()
+            await db.delete(await db.get(ChatHistory, 1))
+            await db.commit()
+
+            ranked = await ChatSearchService.search(db, "体重", limit=10)
+            first_page = await ChatSearchService.search(db, "体重", limit=2)
+            second_page = await ChatSearchService.search(
+                db, "体重", limit=2, cursor=first_page[-1]["cursor"]
+            )
+            english = await ChatSearchService.search(db, "walk")
+            fallback = await ChatSearchService.search(db, "饭")
+
+            listed = (
+                await db.execute(
+                    select(ChatHistory.id).where(
+                        ChatSearchService.match_condition(db, "沙拉")
+                    )
+                )
+            ).scalars().all()
+        await engine.dispose()
+        return backfilled, ranked, first_page, second_page, english, fallback, listed
+
+    backfilled, ranked, first_page, second_page, english, fallback, listed = (
+        asyncio.run(run())
+    )
+
+    assert backfilled == 3
+    ids = [item["id"] for item in ranked]
+    assert sorted(ids) == [2, 3, 4]
+    assert ids[0] == 2  # 命中次数最多
+    assert [item["id"] for item in first_page + second_page] == ids
+    assert ranked[0]["highlight_content"].count("**体重**") == 4
+    assert [item["id"] for item in english] == [4]
+    assert "**Walk**ing" in english[0]["highlight_content"]
+    assert [item["id"] for item in fallback] == [3]
+    assert listed == []
+
+
+def test_backfill_overlapping_write_sync_is_idempotent():
+    """后台补录与写入同步重叠时，同一条消息被重复索引不会出错，也不会重复命中"""
+
+    async def run():
+        engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+        async with engine.begin() as conn:
+            await conn.run_sync(
+                Base.metadata.create_all, tables=[User.__table__, ChatHistory.__table__]
+            )
+        session_factory = async_sessionmaker(engine, expire_on_commit=False)
+
+        async with session_factory() as db:
+            db.add(User(id=1, openid="openid_1", nickname="小明"))
+            db.add(ChatHistory(id=1, user_id=1, role=MessageRole.USER, content="体重"))
+            await db.commit()
+            await ChatSearchService.ensure_index(db)
+
+            # 写入事件已索引的消息再次被补录覆盖
+            db.add(ChatHistory(id=2, user_id=1, role=MessageRole.USER, content="称体重"))
+            await db.commit()
+            reindexed = await ChatSearchService._index_after(db, BACKENDS["sqlite"], 0)
+            found = await ChatSearchService.search(db, "体重", limit=10)
+        await engine.dispose()
+        return reindexed, found
+
+    reindexed, found = asyncio.run(run())
+
+    assert reindexed == 2
+    assert sorted(item["id"] for item in found) == [1, 2]
@@ -0,0 +1,99 @@
+"""每日活动汇总测试"""
+
+import asyncio
+from datetime import date, datetime, timedelta
+
+import pytest
+
+pytest.importorskip("aiosqlite")
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from models.database import (
+    Base,
+    DailyActivity,
+    WeightRecord,
+    MealRecord,
+    ExerciseRecord,
+    WaterRecord,
+    SleepRecord,
+    MealType,
+    UserStreak,
+)
+from services.daily_activity_service import DailyActivityService
+
+TABLES = [
+    WeightRecord.__table__,
+    MealRecord.__table__,
+    ExerciseRecord.__table__,
+    WaterRecord.__table__,
+    SleepRecord.__table__,
+    DailyActivity.__table__,
+    UserStreak.__table__,
+]
+
+
+async def _snapshot(session):
+    result = await session.execute(
+        select(DailyActivity).order_by(DailyActivity.activity_date)
+    )
+    return [
+        (
+            row.activity_date,
+            row.meal_count,
+            row.lunch_count,
+            row.calories_in,
+            row.water_count,
+            row.water_ml,
+        )
+        for row in result.scalars()
+    ]
+
+
+def test_incremental_matches_rebuild():
+    """实时增减的汇总与从原始记录重建的结果一致"""
+
+    async def run():
+        engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all, tables=TABLES)
+        session = AsyncSession(engine, expire_on_commit=False)
+
+        today = datetime.combine(date.today(), datetime.min.time())
+        records = [
+            MealRecord(
+                user_id=1,
+                meal_type=MealType.LUNCH,
+                record_time=today + timedelta(hours=12),
+                total_calories=650,
+            ),
+            WaterRecord(user_id=1, amount_ml=300, record_time=today),
+            WaterRecord(user_id=1, amount_ml=500, record_time=today),
+            WaterRecord(user_id=1, amount_ml=250, record_time=today - timedelta(days=1)),
+        ]
+        for record in records:
+            session.add(record)
+            await DailyActivityService.record_added(session, record)
+        await session.commit()
+
+        # 删除一条饮水记录
+        await DailyActivityService.record_removed(session, records[2])
+        await session.delete(records[2])
+        await session.commit()
+
+        incremental = await _snapshot(session)
+        await DailyActivityService.rebuild(session)
+        rebuilt = await _snapshot(session)
+
+        await session.close()
+        await engine.dispose()
+        return incremental, rebuilt
+
+    incremental, rebuilt = asyncio.run(run())
+    today = date.today()
+    assert incremental == [
+        (today - timedelta(days=1), 0, 0, 0, 1, 250),
+        (today, 1, 1, 650, 1, 300),
+    ]
+    assert incremental == rebuilt
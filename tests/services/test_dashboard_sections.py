@@ -0,0 +1,71 @@
+"""仪表盘分区并发执行测试：并发、超时降级、出错降级"""
+
+import asyncio
+import time
+
+import pytest
+
+pytest.importorskip("aiosqlite")
+
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from services.dashboard_service import DashboardService
+
+
+def test_slow_section_falls_back_without_blocking_others():
+    """超时与出错的分区返回降级数据，其余分区结果不受影响；降级数据不缓存"""
+    calls = {"fast": 0, "slow": 0}
+
+    async def fast(session):
+        calls["fast"] += 1
+        await asyncio.sleep(0.1)
+        return {"success": True, "value": 1}
+
+    async def other(session):
+        await asyncio.sleep(0.1)
+        return {"success": True, "value": 2}
+
+    async def slow(session):
+        calls["slow"] += 1
+        await asyncio.sleep(5)
+        return {"success": True, "value": 3}
+
+    async def broken(session):
+        raise RuntimeError("boom")
+
+    sections = {
+        "fast": (fast, {"success": False}, 1.0),
+        "other": (other, {"success": False}, 1.0),
+        "slow": (slow, {"fallback": True}, 0.2),
+        "broken": (broken, {"fallback": True}, 1.0),
+    }
+
+    async def run():
+        engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+        session = AsyncSession(engine)
+        try:
+            started = time.perf_counter()
+            first = await DashboardService._run_sections(9003, sections, session)
+            elapsed = time.perf_counter() - started
+            second = await DashboardService._run_sections(9003, sections, session)
+        finally:
+            await session.close()
+            await engine.dispose()
+        return first, elapsed, second
+
+    (results, meta), elapsed, (_, second_meta) = asyncio.run(run())
+
+    # 并发执行：总耗时约等于最慢分区的超时时间，而不是各分区耗时之和
+    assert elapsed < 0.5
+    assert results["fast"] == {"success": True, "value": 1}
+    assert results["other"] == {"success": True, "value": 2}
+    assert results["slow"] == {"fallback": True}
+    assert results["broken"] == {"fallback": True}
+    assert meta["slow"]["status"] == "timeout"
+    assert meta["broken"]["status"] == "error"
+    assert meta["fast"]["status"] == "ok" and not meta["fast"]["cached"]
+
+    # 成功结果命中缓存；超时的分区下次重新执行
+    assert second_meta["fast"]["cached"] and second_meta["other"]["cached"]
+    assert not second_meta["slow"]["cached"]
+    assert calls == {"fast": 1, "slow": 2}
@@ -0,0 +1,50 @@
+"""本地嵌入服务测试"""
+
+import numpy as np
+
+from services.vectorstore.embedding import SimpleEmbedding, tokenize
+
+
+def test_tokenize_chinese_ngrams():
+    """中文按单字 + 二字切分，英文按词切分"""
+    assert tokenize("今天跑步 5km") == ["今", "天", "跑", "步", "今天", "天跑", "跑步", "5km"]
+
+
+def test_batch_matches_single_and_is_normalized():
+    embedding = SimpleEmbedding(dimension=64)
+    texts = ["我今天吃了米饭", "晚上跑步三公里", "我今天吃了米饭", ""]
+
+    matrix = embedding.embed_batch_array(texts)
+    assert matrix.dtype == np.float32
+    assert matrix.shape == (4, 64)
+    np.testing.assert_allclose(
+        matrix[0], SimpleEmbedding(dimension=64).embed_array(texts[0])
+    )
+    np.testing.assert_allclose(np.linalg.norm(matrix[:3], axis=1), 1.0, rtol=1e-5)
+    assert not matrix[3].any()
+
+    # 共享字词的文本更相似
+    similar = embedding.embed_array("今天吃了米饭")
+    assert matrix[0] @ similar > matrix[1] @ similar
+
+
+def test_lru_cache_eviction():
+    embedding = SimpleEmbedding(dimension=16, cache_size=2)
+    first = embedding.embed_array("a")
+    embedding.embed_array("b")
+    assert embedding.embed_array("a") is first  # a 变为最近使用
+    embedding.embed_array("c")
+
+    assert list(embedding._cache) == ["a", "c"]
+    assert not first.flags.writeable
+
+
+def test_public_api_returns_lists():
+    """embed/embed_batch 与 OpenAIEmbedding 一致返回 List[float]，可直接 JSON 序列化"""
+    embedding = SimpleEmbedding(dimension=8)
+    vector = embedding.embed("米饭")
+    batch = embedding.embed_batch(["米饭", "面条"])
+
+    assert isinstance(vector, list) and all(type(x) is float for x in vector)
+    assert isinstance(batch, list) and isinstance(batch[0], list)
+    assert batch[0] == vector
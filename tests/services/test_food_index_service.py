@@ -0,0 +1,66 @@
+"""食物搜索索引测试"""
+
+from services.food_index_service import FoodEntry, FoodIndex
+
+
+def _index():
+    index = FoodIndex()
+    index.build(
+        [
+            FoodEntry(
+                id=1, name="米饭", calories_per_100g=116, common_portions={"一碗": 150}
+            ),
+            FoodEntry(id=2, name="炒米饭", calories_per_100g=180),
+            FoodEntry(id=3, name="米饭团", calories_per_100g=170),
+            FoodEntry(
+                id=4, name="鸡蛋", calories_per_100g=144, common_portions={"一个": 50}
+            ),
+            FoodEntry(id=5, name="番茄炒蛋", calories_per_100g=86, aliases=["西红柿炒鸡蛋"]),
+        ]
+    )
+    return index
+
+
+def test_search_ranking_and_aliases():
+    """完全匹配 > 前缀 > 子串；别名可检索到正式名"""
+    index = _index()
+    assert [f.id for f in index.search("米饭")] == [1, 3, 2]
+    assert [f.id for f in index.search("西红柿")] == [5]
+    assert [f.id for f in index.search("蛋")] == [4, 5]
+    assert index.search("牛排") == []
+    assert len(index.search("米", limit=2)) == 2
+
+
+def test_estimate_calories_resolves_all_tokens():
+    """一次解析所有词：包含食物名的词（一碗米饭）也能匹配；多条命中不再报错"""
+    index = _index()
+    total, found = index.estimate_calories("一碗米饭，鸡蛋 和 可乐")
+    assert [f["name"] for f in found] == ["米饭", "鸡蛋"]
+    assert total == 174 + 72
+
+    assert index.estimate_calories("牛排") == (None, [])
+
+
+def test_connectors_do_not_split_food_names():
+    """连接字开头的食物名（和牛、加州卷、配菜）保持完整；词中的连接词只在两侧都是食物时拆分"""
+    index = FoodIndex()
+    index.build(
+        [
+            FoodEntry(id=1, name="米饭", calories_per_100g=116),
+            FoodEntry(id=2, name="鸡蛋", calories_per_100g=144),
+            FoodEntry(id=3, name="和牛", calories_per_100g=250),
+            FoodEntry(id=4, name="加州卷", calories_per_100g=150),
+            FoodEntry(id=5, name="配菜", calories_per_100g=40),
+            FoodEntry(id=6, name="菜", calories_per_100g=20),
+        ]
+    )
+
+    def names(content):
+        return [f["name"] for f in index.estimate_calories(content)[1]]
+
+    assert names("和牛") == ["和牛"]
+    assert names("加州卷") == ["加州卷"]
+    assert names("配菜") == ["配菜"]
+    assert names("和牛 和 配菜") == ["和牛", "配菜"]
+    assert names("米饭和鸡蛋") == ["米饭", "鸡蛋"]
+    assert names("加州卷加和牛") == ["加州卷", "和牛"]
@@ -0,0 +1,135 @@
+"""LangGraph 数据库检查点保存器测试"""
+
+import asyncio
+from datetime import datetime, timedelta
+from typing import List, TypedDict
+
+from langgraph.graph import END, StateGraph
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from models.database import Base, GraphCheckpoint
+from services.langchain.graph.checkpointer import (
+    DatabaseCheckpointSaver,
+    coach_thread_id,
+)
+
+
+class _State(TypedDict, total=False):
+    message: str
+    history: List[str]
+    loads: int
+
+
+async def _load(state: _State) -> _State:
+    # 模拟打卡缓存：线程状态中已有数据时不再加载
+    if state.get("history"):
+        return {}
+    return {"loads": state.get("loads", 0) + 1}
+
+
+async def _reply(state: _State) -> _State:
+    return {"history": [*state.get("history", []), state["message"]]}
+
+
+def _build_graph(saver):
+    workflow = StateGraph(_State)
+    workflow.add_node("load", _load)
+    workflow.add_node("reply", _reply)
+    workflow.set_entry_point("load")
+    workflow.add_edge("load", "reply")
+    workflow.add_edge("reply", END)
+    return workflow.compile(checkpointer=saver)
+
+
+async def _setup():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all, tables=[GraphCheckpoint.__table__])
+    return engine, async_sessionmaker(engine, expire_on_commit=False)
+
+
+async def _row_count(session_factory, thread_id):
+    async with session_factory() as db:
+        return await db.scalar(
+            select(func.count())
+            .select_from(GraphCheckpoint)
+            .where(GraphCheckpoint.thread_id == thread_id)
+        )
+
+
+def test_stable_thread_reuses_state_and_stays_bounded():
+    """同一线程的多轮调用沿用上一轮状态；每线程检查点数量有上限"""
+
+    async def run():
+        engine, session_factory = await _setup()
+        saver = DatabaseCheckpointSaver(session_factory, max_per_thread=2)
+        graph = _build_graph(saver)
+        config = {"configurable": {"thread_id": coach_thread_id(1)}}
+
+        for message in ["早上好", "午饭吃什么", "晚上散步"]:
+            final = await graph.ainvoke({"message": message}, config=config)
+        other = await graph.ainvoke(
+            {"message": "你好"}, config={"configurable": {"thread_id": "other"}}
+        )
+
+        rows = await _row_count(session_factory, coach_thread_id(1))
+        latest = await saver.aget_tuple(config)
+        listed = [item async for item in saver.alist(config)]
+        await engine.dispose()
+        return final, other, rows, latest, listed, saver
+
+    final, other, rows, latest, listed, saver = asyncio.run(run())
+
+    assert final["history"] == ["早上好", "午饭吃什么", "晚上散步"]
+    assert final["loads"] == 1
+    assert other["history"] == ["你好"]
+    assert rows == 2
+    assert latest.checkpoint["channel_values"]["history"][-1] == "晚上散步"
+    assert len(listed) == 2
+    assert not saver._writes
+
+
+def test_size_cap_and_ttl():
+    """超过大小上限时只保留最新检查点；过期线程视为不存在并被清理"""
+
+    async def run():
+        engine, session_factory = await _setup()
+        saver = DatabaseCheckpointSaver(session_factory, max_per_thread=10, max_bytes=1)
+        graph = _build_graph(saver)
+        config = {"configurable": {"thread_id": "t"}}
+        await graph.ainvoke({"message": "一"}, config=config)
+        await graph.ainvoke({"message": "二"}, config=config)
+        capped = await _row_count(session_factory, "t")
+
+        async with session_factory() as db:
+            await db.execute(
+                update(GraphCheckpoint).values(
+                    created_at=datetime.utcnow() - timedelta(days=30)
+                )
+            )
+            await db.commit()
+        expired = await saver.aget_tuple(config)
+        # 中断的步骤留下的中间写入随过期检查点一起清理
+        async with session_factory() as db:
+            checkpoint_id = await db.scalar(select(GraphCheckpoint.checkpoint_id))
+        await saver.aput_writes(
+            {"configurable": {"thread_id": "t", "checkpoint_id": checkpoint_id}},
+            [("message", "中断")],
+            task_id="task",
+        )
+        pending = len(saver._writes)
+        purged = await saver.purge_expired()
+        leftover = len(saver._writes)
+        fresh = await graph.ainvoke({"message": "三"}, config=config)
+        await engine.dispose()
+        return capped, expired, pending, purged, leftover, fresh
+
+    capped, expired, pending, purged, leftover, fresh = asyncio.run(run())
+
+    assert capped == 1
+    assert expired is None
+    assert pending == 1
+    assert purged == 1
+    assert leftover == 0
+    assert fresh["history"] == ["三"]
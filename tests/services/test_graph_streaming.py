@@ -0,0 +1,77 @@
+"""教练对话图流式执行测试：逐段输出、节点进度、最终结果"""
+
+import asyncio
+
+from langgraph.checkpoint.memory import MemorySaver
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from models.database import Base, ChatHistory, MessageRole
+from services.ai_service import ai_service
+from services.langchain.graph import graph as graph_module
+from services.langchain.graph import nodes
+
+
+async def _load_profile(state):
+    return {"profile": {"height": 170}}
+
+
+async def _refresh_checkins(state):
+    return {"checkins": [], "needs_refresh": False}
+
+
+def test_stream_graph_yields_tokens_before_final(monkeypatch):
+    chunks = ["今天", "多喝水，", "早点休息。"]
+
+    async def stream_chat(messages, **kwargs):
+        for chunk in chunks:
+            await asyncio.sleep(0.01)
+            yield chunk
+
+    async def get_graph(graph_id="coach_graph", use_checkpoint=True):
+        return graph_module.create_coach_graph(checkpointer=MemorySaver())
+
+    monkeypatch.setattr(graph_module, "load_profile_node", _load_profile)
+    monkeypatch.setattr(graph_module, "refresh_checkins_node", _refresh_checkins)
+    monkeypatch.setattr(graph_module, "get_graph", get_graph)
+    monkeypatch.setattr(ai_service, "stream_chat", stream_chat)
+    monkeypatch.setattr(nodes, "_analyze_tool_needs", lambda intent, response: [])
+
+    async def run():
+        # 最终化节点保存对话记录，使用内存数据库代替真实数据库
+        engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        session_factory = async_sessionmaker(engine, expire_on_commit=False)
+        monkeypatch.setattr(nodes, "AsyncSessionLocal", session_factory)
+
+        events = [event async for event in graph_module.stream_graph(9024, "早上好")]
+        async with session_factory() as db:
+            saved = (
+                await db.execute(select(ChatHistory.role).order_by(ChatHistory.id))
+            ).scalars().all()
+        await engine.dispose()
+        return events, saved
+
+    events, saved = asyncio.run(run())
+
+    tokens = [event["content"] for event in events if event["type"] == "token"]
+    progress = [
+        (event["node"], event["status"]) for event in events if event["type"] == "node"
+    ]
+    final = events[-1]
+
+    assert tokens == chunks
+    assert ("coach", "start") in progress and ("coach", "end") in progress
+    assert progress.index(("load_profile", "start")) < progress.index(("coach", "start"))
+    # token 事件位于教练节点开始与结束之间，且都早于最终结果
+    coach_start = events.index({"type": "node", "node": "coach", "status": "start"})
+    coach_end = events.index({"type": "node", "node": "coach", "status": "end"})
+    first_token = next(i for i, e in enumerate(events) if e["type"] == "token")
+    assert coach_start < first_token < coach_end
+
+    assert final["type"] == "final"
+    assert final["success"] is True
+    assert final["assistant_response"].startswith("".join(chunks))
+    assert sum(event["type"] == "final" for event in events) == 1
+    assert saved == [MessageRole.USER, MessageRole.ASSISTANT]
@@ -0,0 +1,77 @@
+"""教练对话图工具节点测试：并发执行、单工具超时、纯函数工具记忆化"""
+
+import asyncio
+import time
+
+from services.langchain.graph import nodes, tools
+from services.langchain.graph.monitor import performance_monitor
+
+
+def _state(user_id, current_tools):
+    return {
+        "user_id": user_id,
+        "user_message": "最近体重怎么样",
+        "assistant_response": "好的",
+        "profile": {"height": 170},
+        "checkins": [
+            {"type": "weight", "timestamp": "2026-10-01T08:00:00", "data": {"weight": 70}}
+        ],
+        "current_tools": current_tools,
+        "tool_calls": [],
+        "intermediate_steps": [],
+    }
+
+
+def test_tools_run_concurrently_with_deadlines_and_memoization(monkeypatch):
+    calls = {"trends": 0, "history": 0}
+    cancelled = []
+
+    async def trends(user_id, checkins, profile=None):
+        calls["trends"] += 1
+        await asyncio.sleep(0.2)
+        return {"success": True, "trend": "down"}
+
+    async def history(user_id, checkins):
+        calls["history"] += 1
+        await asyncio.sleep(0.2)
+        return {"success": True, "checkins": checkins}
+
+    async def memory(user_id, query, checkins=None):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(query)
+            raise
+        return {"success": True}
+
+    monkeypatch.setattr(tools, "analyze_weight_trends_tool", trends)
+    monkeypatch.setattr(tools, "get_checkin_history_tool", history)
+    monkeypatch.setattr(tools, "search_long_term_memory_tool", memory)
+    monkeypatch.setattr(nodes, "TOOL_TIMEOUTS", {"search_long_term_memory": 0.3})
+
+    planned = ["analyze_weight_trends", "get_checkin_history", "search_long_term_memory"]
+
+    async def run():
+        started = time.perf_counter()
+        first = await nodes.tools_node(_state(9023, planned))
+        elapsed = time.perf_counter() - started
+        second = await nodes.tools_node(_state(9023, planned[:2]))
+        return first, elapsed, second
+
+    first, elapsed, second = asyncio.run(run())
+
+    # 三个工具并发：总耗时约等于最慢的截止时间，而不是各自耗时之和
+    assert elapsed < 0.6
+    records = {record["tool"]: record for record in first["tool_calls"]}
+    assert records["analyze_weight_trends"]["result"]["trend"] == "down"
+    assert "超时" in records["search_long_term_memory"]["error"]
+    assert cancelled == ["最近体重怎么样"]
+    assert "用户近期打卡记录" in first["assistant_response"]
+
+    # 相同输入的纯函数工具第二次直接命中缓存
+    assert calls == {"trends": 1, "history": 1}
+    assert all(record.get("cached") for record in second["tool_calls"])
+
+    summary = performance_monitor.get_summary("coach_graph")
+    assert summary["tools"]["search_long_term_memory"]["error_count"] >= 1
+    assert summary["caches"]["tool_results"]["hit_count"] >= 2
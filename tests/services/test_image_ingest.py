@@ -0,0 +1,76 @@
+"""餐食照片接收与预处理测试"""
+
+import asyncio
+import base64
+import io
+
+import pytest
+from fastapi import UploadFile
+from PIL import Image
+
+from services.image_ingest_service import ImageIngestService, ImageTooLargeError
+
+
+def _jpeg(size=(2000, 1500), color=(200, 120, 40)) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", size, color).save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def _upload(data: bytes, filename="meal.JPG") -> UploadFile:
+    return UploadFile(file=io.BytesIO(data), filename=filename)
+
+
+def test_save_upload_dedupes_by_content(tmp_path):
+    """按内容哈希命名；重复上传只保留一份；超限时不留临时文件"""
+    service = ImageIngestService(workers=0)
+    photo = _jpeg()
+
+    async def run():
+        first = await service.save_upload(_upload(photo), str(tmp_path))
+        second = await service.save_upload(
+            _upload(photo, "again.exe"), str(tmp_path)
+        )
+        other = await service.save_upload(
+            _upload(_jpeg(color=(0, 0, 0))), str(tmp_path)
+        )
+        with pytest.raises(ImageTooLargeError):
+            await service.save_upload(
+                _upload(photo), str(tmp_path), max_bytes=len(photo) - 1
+            )
+        return first, second, other
+
+    first, second, other = asyncio.run(run())
+    assert (first.duplicate, second.duplicate) == (False, True)
+    assert first.file_name == f"{first.sha256[:32]}.jpg"
+    # 扩展名不在白名单时按 .jpg 保存，因此与首次上传是同一个文件
+    assert second.file_path == first.file_path
+    assert first.size == len(photo)
+    assert other.sha256 != first.sha256
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted(
+        [first.file_name, other.file_name]
+    )
+
+
+def test_to_data_url_downscales_and_caches(tmp_path):
+    """缩放到最大边以内并转为 JPEG；相同内容命中缓存"""
+    service = ImageIngestService(workers=0, cache_size=4)
+    rgba = io.BytesIO()
+    Image.new("RGBA", (600, 300), (10, 20, 30, 128)).save(rgba, format="PNG")
+
+    async def run():
+        photo = await service.save_upload(_upload(_jpeg()), str(tmp_path))
+        png = await service.save_upload(
+            _upload(rgba.getvalue(), "meal.png"), str(tmp_path)
+        )
+        first = await service.to_data_url(photo, 512, 80)
+        again = await service.to_data_url(photo, 512, 80)
+        return first, again, await service.to_data_url(png, 512, 80)
+
+    first, again, png_url = asyncio.run(run())
+    assert again is first
+    for data_url, expected in ((first, (512, 384)), (png_url, (512, 256))):
+        prefix, encoded = data_url.split(",", 1)
+        assert prefix == "data:image/jpeg;base64"
+        img = Image.open(io.BytesIO(base64.b64decode(encoded)))
+        assert (img.format, img.mode, img.size) == ("JPEG", "RGB", expected)
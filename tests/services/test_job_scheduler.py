@@ -0,0 +1,86 @@
+"""统一任务调度器测试"""
+
+import asyncio
+import time
+
+from services.job_scheduler import JobScheduler
+
+
+def test_jobs_run_on_app_loop_without_overlap():
+    """任务在调用方事件循环上周期运行；上一次未结束时跳过，不重叠"""
+
+    async def run():
+        scheduler = JobScheduler()
+        loop = asyncio.get_running_loop()
+        loops, active, peak = [], [0], [0]
+
+        async def fast():
+            loops.append(asyncio.get_running_loop())
+
+        async def slow():
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+            await asyncio.sleep(0.12)
+            active[0] -= 1
+
+        scheduler.add_job("fast", fast, 0.02, run_on_start=True)
+        scheduler.add_job("slow", slow, 0.03, run_on_start=True)
+        scheduler.start()
+        await asyncio.sleep(0.3)
+        await scheduler.stop()
+        return loop, loops, peak[0], scheduler.stats()
+
+    loop, loops, peak, stats = asyncio.run(run())
+    assert len(loops) >= 5 and all(l is loop for l in loops)
+    assert peak == 1
+    assert stats["slow"]["skipped"] > 0
+    assert stats["fast"]["failures"] == 0 and stats["fast"]["last_lag_ms"] is not None
+
+
+def test_missed_runs_are_coalesced_and_failures_counted():
+    """事件循环阻塞错过多次运行时只补跑一次；任务异常计入失败而不终止调度"""
+
+    async def run():
+        scheduler = JobScheduler()
+        calls = []
+
+        async def flaky():
+            calls.append(time.monotonic())
+            if len(calls) == 1:
+                raise ValueError("boom")
+
+        scheduler.add_job("flaky", flaky, 0.05)
+        scheduler.start()
+        await asyncio.sleep(0.07)
+        time.sleep(0.3)  # 阻塞事件循环，错过约 5 次运行
+        await asyncio.sleep(0.02)
+        stats = scheduler.stats()["flaky"]
+        await scheduler.stop()
+        return calls, stats
+
+    calls, stats = asyncio.run(run())
+    assert len(calls) == 2
+    assert stats["missed"] >= 4
+    assert stats["failures"] == 1 and stats["runs"] == 2
+
+
+def test_once_job_runs_a_single_time():
+    """一次性任务启动后只运行一次"""
+
+    async def run():
+        scheduler = JobScheduler()
+        calls = []
+
+        async def backfill():
+            calls.append(time.monotonic())
+
+        scheduler.add_job("backfill", backfill, 0.02, run_on_start=True, once=True)
+        scheduler.start()
+        await asyncio.sleep(0.1)
+        stats = scheduler.stats()["backfill"]
+        await scheduler.stop()
+        return calls, stats
+
+    calls, stats = asyncio.run(run())
+    assert len(calls) == 1
+    assert stats["runs"] == 1 and stats["missed"] == 0
@@ -0,0 +1,109 @@
+"""LLM 响应缓存测试"""
+
+import asyncio
+
+import services.ai_service as ai_module
+from services.ai_service import AIResponse, AIService, BaseAIClient, LLMResponseCache
+
+
+class _CountingClient(BaseAIClient):
+    default_model = "fake-model"
+
+    def __init__(self):
+        self.calls = 0
+
+    async def chat_completion(self, messages, **kwargs):
+        self.calls += 1
+        return AIResponse(
+            content=f"回复{self.calls}",
+            model=self.default_model,
+            usage={"total_tokens": 1000},
+        )
+
+    async def vision_analysis(self, image_url, prompt, model=None):
+        raise NotImplementedError
+
+
+def _service(monkeypatch, cache):
+    monkeypatch.setattr(ai_module, "llm_cache", cache)
+    service = AIService(provider="qwen")
+    client = _CountingClient()
+    service._clients = {"qwen": client}
+    return service, client
+
+
+def _messages(question):
+    return [
+        {"role": "system", "content": "你是体重管理教练"},
+        {"role": "user", "content": question},
+    ]
+
+
+def test_exact_and_semantic_hits(monkeypatch, tmp_path):
+    """空白差异精确命中；近似匹配只在开启时生效；参数不同不命中；refresh 重新生成"""
+    cache = LLMResponseCache(
+        path=str(tmp_path / "cache.json"), similarity_threshold=0.8
+    )
+    service, client = _service(monkeypatch, cache)
+
+    async def run():
+        first = await service.chat(_messages("今天 吃什么 好？"), cache="exact")
+        same = await service.chat(_messages("今天  吃什么  好？ "), cache="exact")
+        other_params = await service.chat(
+            _messages("今天 吃什么 好？"), cache="exact", max_tokens=10
+        )
+        reworded = _messages("今天吃什么好呢？")
+        exact_only = await service.chat(reworded, cache="exact")
+        cache.clear()
+        await service.chat(_messages("今天吃什么好？"), cache="exact")
+        semantic = await service.chat(reworded, cache="semantic")
+        refreshed = await service.chat(reworded, cache="refresh")
+        uncached = await service.chat(reworded)
+        return first, same, other_params, exact_only, semantic, refreshed, uncached
+
+    first, same, other_params, exact_only, semantic, refreshed, uncached = (
+        asyncio.run(run())
+    )
+    assert (first.content, first.cached) == ("回复1", False)
+    assert (same.content, same.cached) == ("回复1", True)
+    assert other_params.content == "回复2"
+    assert exact_only.content == "回复3"
+    assert (semantic.content, semantic.cached) == ("回复4", True)
+    assert (refreshed.content, refreshed.cached) == ("回复5", False)
+    assert uncached.content == "回复6"
+    assert client.calls == 6
+
+    stats = cache.stats()
+    assert stats["hits"] == 2 and stats["semantic_hits"] == 1
+    assert stats["tokens_saved"] == 2000
+
+
+def test_ttl_eviction_and_persistence(monkeypatch, tmp_path):
+    """过期与超出上限的条目被淘汰；写盘后新实例加载即可命中"""
+    path = str(tmp_path / "cache.json")
+    cache = LLMResponseCache(max_entries=2, path=path)
+    service, client = _service(monkeypatch, cache)
+
+    async def run():
+        await service.chat(_messages("问题一"), cache="exact")
+        await service.chat(_messages("问题二"), cache="exact")
+        await service.chat(_messages("问题三"), cache="exact")
+        await service.chat(_messages("短期"), cache="exact", cache_ttl=0.01)
+        await asyncio.sleep(0.02)
+        expired = await service.chat(_messages("短期"), cache="exact")
+        written = await cache.flush()
+
+        restarted = LLMResponseCache(max_entries=2, path=path)
+        monkeypatch.setattr(ai_module, "llm_cache", restarted)
+        loaded = restarted.load()
+        hit = await service.chat(_messages("短期"), cache="exact")
+        evicted = await service.chat(_messages("问题一"), cache="exact")
+        return expired, written, loaded, hit, evicted
+
+    expired, written, loaded, hit, evicted = asyncio.run(run())
+    assert expired.cached is False
+    assert written is True
+    assert loaded == 2
+    assert hit.cached is True and hit.content == expired.content
+    assert evicted.cached is False
+    assert client.calls == 6
@@ -0,0 +1,176 @@
+"""LLM 共享传输层测试（模拟提供商请求，不访问网络）"""
+
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from config.settings import fastapi_settings
+from services.ai_service import AIResponse, AIService, BaseAIClient
+from services.llm_transport import LLMTransport, LLMUnavailableError, llm_context
+
+
+def _transport(**kwargs) -> LLMTransport:
+    options = dict(
+        max_in_flight=8,
+        per_user_in_flight=2,
+        request_timeout=5.0,
+        max_retries=1,
+        retry_backoff=0.01,
+        hedge_percentile=None,
+        breaker_failures=2,
+        breaker_reset=0.1,
+    )
+    options.update(kwargs)
+    return LLMTransport(**options)
+
+
+def _status_error(status: int) -> httpx.HTTPStatusError:
+    request = httpx.Request("POST", "http://llm.test/chat/completions")
+    response = httpx.Response(status, request=request)
+    return httpx.HTTPStatusError(str(status), request=request, response=response)
+
+
+def test_retry_once_then_circuit_opens_and_recovers():
+    """5xx 只重试一次；参数错误不重试也不计入熔断；连续失败后熔断，冷却后探测恢复"""
+
+    async def run():
+        transport = _transport()
+        calls = []
+
+        def sender(*errors):
+            queue = list(errors)
+
+            async def send(timeout):
+                calls.append(timeout)
+                if queue:
+                    raise queue.pop(0)
+                return "ok"
+
+            return send
+
+        results = [await transport.request("qwen", sender(_status_error(503)))]
+        with pytest.raises(httpx.HTTPStatusError):
+            await transport.request("qwen", sender(_status_error(400)))
+        results.append(transport.breaker("qwen").failures)
+
+        for _ in range(2):
+            with pytest.raises(LLMUnavailableError):
+                await transport.request(
+                    "qwen", sender(_status_error(502), _status_error(502))
+                )
+        calls.clear()
+        with pytest.raises(LLMUnavailableError, match="熔断"):
+            await transport.request("qwen", sender())
+        results.append((len(calls), transport.available("qwen")))
+
+        await asyncio.sleep(0.12)
+        results.append(await transport.request("qwen", sender()))
+        results.append(transport.breaker("qwen").state)
+        return results
+
+    assert asyncio.run(run()) == ["ok", 0, (0, False), "ok", "closed"]
+
+
+def test_per_user_limit_and_deadline():
+    """同一用户的在途请求数受限；截止时间包含排队时间"""
+
+    async def run():
+        transport = _transport(per_user_in_flight=2)
+        in_flight = {"now": 0, "peak": 0}
+
+        async def send(timeout):
+            in_flight["now"] += 1
+            in_flight["peak"] = max(in_flight["peak"], in_flight["now"])
+            await asyncio.sleep(0.05)
+            in_flight["now"] -= 1
+            return timeout
+
+        async def call(user_id):
+            with llm_context(user_id=user_id):
+                return await transport.request("qwen", send)
+
+        await asyncio.gather(*(call(1) for _ in range(6)))
+        same_user_peak = in_flight["peak"]
+        in_flight["peak"] = 0
+        await asyncio.gather(*(call(user_id) for user_id in range(6)))
+        all_users_peak = in_flight["peak"]
+
+        start = time.perf_counter()
+        with llm_context(user_id=1, timeout=0.08):
+            results = await asyncio.gather(
+                *(transport.request("qwen", send) for _ in range(4)),
+                return_exceptions=True,
+            )
+        elapsed = time.perf_counter() - start
+        return same_user_peak, all_users_peak, results, elapsed
+
+    same_user_peak, all_users_peak, results, elapsed = asyncio.run(run())
+    assert same_user_peak == 2
+    assert all_users_peak == 6
+    # 前两个请求拿到的单次超时不超过剩余时间，后两个排队到截止时间后放弃
+    assert all(isinstance(r, float) and r <= 0.08 for r in results[:2])
+    assert all(isinstance(r, LLMUnavailableError) for r in results[2:])
+    assert elapsed < 0.2
+
+
+def test_hedged_request_wins_over_slow_attempt():
+    """耗时超过历史延迟分位数时发出对冲请求，取先返回的结果"""
+
+    async def run():
+        transport = _transport(hedge_percentile=0.9, hedge_min_samples=5)
+        attempts = []
+
+        async def send(timeout):
+            attempts.append(timeout)
+            # 第 6 次（达到样本数后的第一个请求）卡住
+            await asyncio.sleep(1.0 if len(attempts) == 6 else 0.01)
+            return len(attempts)
+
+        for _ in range(5):
+            await transport.request("qwen", send)
+        start = time.perf_counter()
+        result = await transport.request("qwen", send)
+        return result, time.perf_counter() - start, len(attempts)
+
+    result, elapsed, attempts = asyncio.run(run())
+    assert result == 7
+    assert attempts == 7
+    assert elapsed < 0.2
+
+
+class _FakeClient(BaseAIClient):
+    def __init__(self, name, unavailable):
+        self.name = name
+        self.unavailable = unavailable
+        self.calls = []
+
+    async def chat_completion(self, messages, **kwargs):
+        self.calls.append(kwargs)
+        return AIResponse(
+            content="" if self.unavailable else self.name,
+            model=self.name,
+            error="不可用" if self.unavailable else None,
+            unavailable=self.unavailable,
+        )
+
+    async def vision_analysis(self, image_url, prompt, model=None):
+        raise NotImplementedError
+
+
+def test_ai_service_falls_back_to_other_provider(monkeypatch):
+    """主提供商不可用时切换到已配置的备用提供商，并改用其默认模型"""
+    monkeypatch.setattr(fastapi_settings, "OPENAI_API_KEY", "test")
+    service = AIService(provider="qwen")
+    qwen = _FakeClient("qwen", unavailable=True)
+    openai_client = _FakeClient("openai", unavailable=False)
+    service._clients = {"qwen": qwen, "openai": openai_client}
+
+    response = asyncio.run(
+        service.chat([{"role": "user", "content": "你好"}], model="qwen-plus")
+    )
+
+    assert response.content == "openai"
+    assert qwen.calls == [{"model": "qwen-plus"}]
+    assert openai_client.calls == [{}]
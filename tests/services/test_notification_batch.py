@@ -0,0 +1,124 @@
+"""通知触发条件批量检查测试"""
+
+import asyncio
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from models.database import (
+    Base,
+    Goal,
+    GoalStatus,
+    MealRecord,
+    MealType,
+    NotificationQueue,
+    User,
+    UserProfile,
+    WeightRecord,
+)
+from services.notification_service import NotificationService, NotificationTrigger
+
+TABLES = [
+    User.__table__,
+    UserProfile.__table__,
+    WeightRecord.__table__,
+    MealRecord.__table__,
+    Goal.__table__,
+    NotificationQueue.__table__,
+]
+
+
+def test_run_batch_creates_each_notification_once():
+    """分块并发检查：事件/目标/异常通知按用户正确生成，重复运行不重复创建"""
+
+    async def run():
+        engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all, tables=TABLES)
+        session_factory = async_sessionmaker(engine, expire_on_commit=False)
+
+        now = datetime.now()
+        today = date.today()
+        goal_created = now - timedelta(days=30)
+        async with session_factory() as db:
+            db.add_all(User(id=i, openid=f"openid_{i}") for i in range(1, 6))
+            # 用户1：今天已称重、已记录三餐且热量超标
+            db.add(
+                WeightRecord(user_id=1, weight=70, record_date=today, record_time=now)
+            )
+            db.add_all(
+                MealRecord(
+                    user_id=1, meal_type=meal, record_time=now, total_calories=1200
+                )
+                for meal in (MealType.BREAKFAST, MealType.LUNCH, MealType.DINNER)
+            )
+            # 用户2：减重目标完成 50%，最近两次体重相差 1.5kg
+            db.add(
+                Goal(
+                    user_id=2,
+                    target_weight=70,
+                    status=GoalStatus.ACTIVE,
+                    created_at=goal_created,
+                )
+            )
+            db.add(
+                WeightRecord(
+                    user_id=2,
+                    weight=80,
+                    record_date=(goal_created + timedelta(days=1)).date(),
+                    record_time=goal_created + timedelta(days=1),
+                )
+            )
+            db.add(
+                WeightRecord(
+                    user_id=2,
+                    weight=76.5,
+                    record_date=today - timedelta(days=1),
+                    record_time=now - timedelta(days=1),
+                )
+            )
+            db.add(
+                WeightRecord(
+                    user_id=2,
+                    weight=75,
+                    record_date=today,
+                    record_time=now,
+                )
+            )
+            await db.commit()
+
+        service = NotificationService()
+        triggers = set(NotificationTrigger) - {NotificationTrigger.TIME_BASED}
+        first = await service.run_batch(
+            session_factory, triggers=triggers, batch_size=2, concurrency=2
+        )
+        second = await service.run_batch(
+            session_factory, triggers=triggers, batch_size=2, concurrency=2
+        )
+
+        async with session_factory() as db:
+            result = await db.execute(
+                select(NotificationQueue.user_id, NotificationQueue.reminder_type)
+            )
+            rows = sorted(result.all())
+        await engine.dispose()
+        return first, second, rows
+
+    first, second, rows = asyncio.run(run())
+    assert first["users_checked"] == 5 and first["success"]
+    assert second["notifications_created"] == 0
+    by_user = {}
+    for user_id, reminder_type in rows:
+        by_user.setdefault(user_id, set()).add(reminder_type)
+    assert by_user[1] == {"calorie_anomaly"}
+    # 用户2：今天已称重，未记录三餐；起始80 当前75 目标70 → 完成 50%
+    assert by_user[2] == {
+        "breakfast",
+        "lunch",
+        "dinner",
+        "weight_anomaly",
+        "goal_milestone",
+    }
+    assert by_user[3] == {"weight", "breakfast", "lunch", "dinner"}
+    assert first["notifications_created"] == len(rows)
@@ -0,0 +1,104 @@
+"""到期提醒索引测试"""
+
+import asyncio
+from datetime import datetime, time
+
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from models.database import Base, ReminderSetting, ReminderType, User
+from services.reminder_index_service import ReminderIndexService, due_windows
+
+# 2026-10-16 是周五，10-17 是周六
+FRIDAY = datetime(2026, 10, 16, 8, 5)
+
+
+def _setting(setting_id, reminder_type, reminder_time, **kwargs):
+    return ReminderSetting(
+        id=setting_id,
+        user_id=setting_id,
+        reminder_type=reminder_type,
+        reminder_time=reminder_time,
+        **kwargs,
+    )
+
+
+def _run(scenario):
+    async def run():
+        engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+        async with engine.begin() as conn:
+            await conn.run_sync(
+                Base.metadata.create_all,
+                tables=[User.__table__, ReminderSetting.__table__],
+            )
+        async with AsyncSession(engine, expire_on_commit=False) as db:
+            result = await scenario(db)
+        await engine.dispose()
+        return result
+
+    return asyncio.run(run())
+
+
+def test_due_windows_split_at_midnight():
+    assert due_windows(FRIDAY, 900) == [(FRIDAY.date(), 8 * 60 - 9, 8 * 60 + 5)]
+    windows = due_windows(datetime(2026, 10, 17, 0, 5), 900)
+    assert [(d.day, lo, hi) for d, lo, hi in windows] == [(16, 1431, 1439), (17, 0, 5)]
+
+
+def test_claim_fires_once_per_window():
+    """重叠/延迟的检查只认领一次；改时间后重新可触发；周末跳过仅工作日提醒"""
+
+    async def scenario(db):
+        db.add_all(
+            [
+                _setting(1, ReminderType.WEIGHT, time(8, 0)),
+                _setting(2, ReminderType.LUNCH, time(12, 0)),
+                _setting(3, ReminderType.BREAKFAST, time(8, 2), weekdays_only=True),
+                _setting(4, ReminderType.DAILY, time(8, 1)),
+            ]
+        )
+        await db.commit()
+
+        first = await ReminderIndexService.claim_due(
+            db, now=FRIDAY, grace=900, exclude_types=[ReminderType.DAILY]
+        )
+        overlapping = await ReminderIndexService.claim_due(
+            db, now=FRIDAY.replace(minute=9), grace=900
+        )
+        saturday = await ReminderIndexService.claim_due(
+            db, now=datetime(2026, 10, 17, 8, 5), grace=900
+        )
+
+        setting = await db.get(ReminderSetting, 2)
+        setting.reminder_time = time(8, 20)
+        await db.commit()
+        rearmed = await ReminderIndexService.claim_due(
+            db, now=datetime(2026, 10, 17, 8, 21), grace=900
+        )
+        return (
+            [r.id for r in first],
+            [r.id for r in overlapping],
+            [r.id for r in saturday],
+            [(r.id, r.scheduled_at) for r in rearmed],
+        )
+
+    first, overlapping, saturday, rearmed = _run(scenario)
+    assert first == [1, 3]
+    assert overlapping == [4]
+    assert saturday == [1, 4]
+    assert rearmed == [(2, datetime(2026, 10, 17, 8, 20))]
+
+
+def test_backfill_minutes():
+    async def scenario(db):
+        db.add(_setting(1, ReminderType.SLEEP, time(22, 30)))
+        await db.commit()
+        await db.execute(update(ReminderSetting).values(minute_of_day=None))
+        await db.commit()
+        updated = await ReminderIndexService.backfill_minutes(db)
+        due = await ReminderIndexService.claim_due(
+            db, now=datetime(2026, 10, 16, 22, 31), grace=300
+        )
+        return updated, [r.id for r in due]
+
+    assert _run(scenario) == (1, [1])
@@ -0,0 +1,170 @@
+"""连续打卡表（user_streaks）增量维护、对账与排行榜测试"""
+
+import asyncio
+from datetime import date, datetime, timedelta
+
+import pytest
+
+pytest.importorskip("aiosqlite")
+
+from sqlalchemy import event, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from models.database import (
+    Base,
+    DailyActivity,
+    User,
+    UserStreak,
+    WaterRecord,
+    WeightRecord,
+)
+from services.daily_activity_service import DailyActivityService
+from services.leaderboard_service import LeaderboardService
+from services.streak_service import StreakService
+
+TABLES = [
+    User.__table__,
+    WeightRecord.__table__,
+    WaterRecord.__table__,
+    DailyActivity.__table__,
+    UserStreak.__table__,
+]
+
+
+async def _setup():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all, tables=TABLES)
+    session = AsyncSession(engine, expire_on_commit=False)
+    session.add_all(
+        [User(id=i, openid=f"openid_{i}", nickname=f"用户{i}") for i in (1, 2, 3)]
+    )
+    await session.commit()
+    return engine, session
+
+
+async def _add(session, user_id, days_ago):
+    """与记录路由一致：写入记录的同时维护每日活动汇总（及连续打卡表）"""
+    at = datetime.combine(date.today() - timedelta(days=days_ago), datetime.min.time())
+    record = WaterRecord(user_id=user_id, amount_ml=250, record_time=at)
+    session.add(record)
+    await DailyActivityService.record_added(session, record)
+    await session.commit()
+    return record
+
+
+async def _streaks(session):
+    result = await session.execute(select(UserStreak))
+    return {
+        row.user_id: (row.current_streak, row.longest_streak, row.last_active_date)
+        for row in result.scalars()
+    }
+
+
+def _count_queries(engine):
+    counter = {"queries": 0}
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _on_execute(conn, cursor, statement, parameters, context, executemany):
+        counter["queries"] += 1
+
+    return counter
+
+
+def test_incremental_updates_match_history():
+    """新日期顺延、同日重复、补录与删除后，表中数值与按历史重算一致"""
+    today = date.today()
+
+    async def run():
+        engine, session = await _setup()
+        try:
+            for days_ago in (2, 1, 0, 0):
+                await _add(session, 1, days_ago)
+            yesterday = await _add(session, 1, 1)
+            for days_ago in (25, 24, 23, 22, 21, 0):
+                await _add(session, 2, days_ago)
+            await _add(session, 3, 1)
+            before = await _streaks(session)
+
+            # 补录昨天：user 2 的连续天数由 1 变为 2
+            await _add(session, 2, 1)
+            # 删除 user 1 昨天的两条记录之一：当天仍有记录，不变
+            await DailyActivityService.record_removed(session, yesterday)
+            await session.delete(yesterday)
+            await session.commit()
+            after = await _streaks(session)
+            return before, after
+        finally:
+            await session.close()
+            await engine.dispose()
+
+    before, after = asyncio.run(run())
+
+    assert before[1] == (3, 3, today)
+    assert before[2] == (1, 5, today)
+    assert before[3] == (1, 1, today - timedelta(days=1))
+    assert after[2] == (2, 5, today)
+    assert after[1] == (3, 3, today)
+
+
+def test_leaderboard_is_single_query_and_reconcile_fixes_drift():
+    """排行榜只需一次查询；对账修正偏差行"""
+
+    async def run():
+        engine, session = await _setup()
+        try:
+            for days_ago in (2, 1, 0):
+                await _add(session, 1, days_ago)
+            await _add(session, 2, 0)
+            await _add(session, 3, 1)
+
+            counter = _count_queries(engine)
+            board = await LeaderboardService.get_streak_leaderboard(session, limit=10)
+            board_queries = counter["queries"]
+            rank = await LeaderboardService.get_user_rank(2, session, "streak")
+            # user 3 只在昨天打过卡，今天不在榜上
+            unranked = await LeaderboardService.get_user_rank(3, session, "streak")
+
+            # 模拟漂移：直接改写一行，对账后恢复
+            await session.execute(
+                update(UserStreak)
+                .where(UserStreak.user_id == 1)
+                .values(current_streak=99, longest_streak=99)
+            )
+            await session.commit()
+            corrected = await StreakService.reconcile(session)
+            again = await StreakService.reconcile(session)
+            return (
+                board,
+                board_queries,
+                rank,
+                unranked,
+                corrected,
+                again,
+                await _streaks(session),
+            )
+        finally:
+            await session.close()
+            await engine.dispose()
+
+    board, board_queries, rank, unranked, corrected, again, streaks = asyncio.run(run())
+
+    assert board["success"]
+    assert [(r["user_id"], r["streak_days"]) for r in board["data"]["rankings"]] == [
+        (1, 3),
+        (2, 1),
+    ]
+    assert board["data"]["rankings"][0]["username"] == "用户1"
+    assert board_queries == 1
+
+    assert rank["data"]["rank"] == 2
+    assert rank["data"]["total_users"] == 2
+    assert unranked["success"]
+    assert unranked["data"]["rank"] is None
+    assert unranked["data"]["score"] == 0
+    assert unranked["data"]["percentile"] == 0
+    assert unranked["data"]["total_users"] == 2
+
+    assert corrected == 1
+    assert again == 0
+    assert streaks[1][:2] == (3, 3)
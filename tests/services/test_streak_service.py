@@ -0,0 +1,152 @@
+"""连续打卡引擎测试与基准（查询次数 / 延迟）"""
+
+import asyncio
+import time
+from datetime import date, datetime, timedelta
+
+import pytest
+
+pytest.importorskip("aiosqlite")
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from models.database import (
+    Base,
+    DailyActivity,
+    WeightRecord,
+    MealRecord,
+    ExerciseRecord,
+    WaterRecord,
+    SleepRecord,
+    MealType,
+    UserStreak,
+)
+from services.daily_activity_service import DailyActivityService
+from services.streak_service import StreakService
+
+RECORD_TABLES = [
+    WeightRecord.__table__,
+    MealRecord.__table__,
+    ExerciseRecord.__table__,
+    WaterRecord.__table__,
+    SleepRecord.__table__,
+    DailyActivity.__table__,
+    UserStreak.__table__,
+]
+
+
+async def _make_session(history_days: int, user_id: int = 1, today: date = None):
+    """创建内存数据库，并为用户写入连续 history_days 天的记录（每天轮换一种记录类型）"""
+    today = today or date.today()
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all, tables=RECORD_TABLES)
+
+    session = AsyncSession(engine, expire_on_commit=False)
+    for i in range(history_days):
+        day = today - timedelta(days=i)
+        at = datetime.combine(day, datetime.min.time()) + timedelta(hours=9)
+        kind = i % 5
+        if kind == 0:
+            record = WeightRecord(user_id=user_id, weight=70, record_time=at)
+        elif kind == 1:
+            record = MealRecord(
+                user_id=user_id,
+                meal_type=MealType.LUNCH,
+                record_time=at,
+                total_calories=600,
+            )
+        elif kind == 2:
+            record = ExerciseRecord(user_id=user_id, record_time=at)
+        elif kind == 3:
+            record = WaterRecord(user_id=user_id, amount_ml=300, record_time=at)
+        else:
+            record = SleepRecord(
+                user_id=user_id,
+                bed_time=at + timedelta(hours=14),
+                total_minutes=480,
+            )
+        # 与记录路由一致：写入记录的同时维护每日活动汇总
+        session.add(record)
+        await DailyActivityService.record_added(session, record)
+    await session.commit()
+    return engine, session
+
+
+def _count_queries(engine):
+    """统计引擎上执行的 SQL 语句数"""
+    counter = {"queries": 0}
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _on_execute(conn, cursor, statement, parameters, context, executemany):
+        counter["queries"] += 1
+
+    return counter
+
+
+def test_compute_streaks():
+    """当前/最长连续天数计算"""
+    today = date(2024, 3, 10)
+    dates = {today - timedelta(days=i) for i in range(3)}
+    dates |= {today - timedelta(days=i) for i in range(10, 15)}
+
+    result = StreakService.compute_streaks(dates, today=today)
+    assert result == {"current": 3, "max": 5}
+
+    # 今天未打卡：默认中断，allow_yesterday 时从昨天起算
+    yesterday_only = {today - timedelta(days=i) for i in range(1, 4)}
+    assert StreakService.current_streak(yesterday_only, today) == 0
+    assert StreakService.current_streak(yesterday_only, today, True) == 3
+    assert StreakService.compute_streaks([], today=today) == {"current": 0, "max": 0}
+
+
+@pytest.mark.parametrize("history_days", [30, 365, 1000])
+def test_streak_benchmark(history_days):
+    """任意历史长度下都只发出一次查询，且延迟有界"""
+
+    async def run():
+        engine, session = await _make_session(history_days)
+        counter = _count_queries(engine)
+        try:
+            start = time.perf_counter()
+            streak = await StreakService.get_current_streak(1, session)
+            elapsed = time.perf_counter() - start
+        finally:
+            await session.close()
+            await engine.dispose()
+        return streak, counter["queries"], elapsed
+
+    streak, queries, elapsed = asyncio.run(run())
+
+    # 默认回溯一年
+    assert streak == min(history_days, 365)
+    assert queries == 1
+    assert elapsed < 1.0
+
+
+def test_batched_streaks_single_query():
+    """排行榜批量计算：多个用户同样只需一次查询"""
+
+    async def run():
+        engine, session = await _make_session(10, user_id=1)
+        for i in range(4):
+            at = datetime.combine(
+                date.today() - timedelta(days=i), datetime.min.time()
+            )
+            record = WaterRecord(user_id=2, amount_ml=200, record_time=at)
+            session.add(record)
+            await DailyActivityService.record_added(session, record)
+        await session.commit()
+
+        counter = _count_queries(engine)
+        try:
+            streaks = await StreakService.get_current_streaks([1, 2, 3], session)
+        finally:
+            await session.close()
+            await engine.dispose()
+        return streaks, counter["queries"]
+
+    streaks, queries = asyncio.run(run())
+    assert streaks == {1: 10, 2: 4}
+    assert queries == 1
@@ -0,0 +1,147 @@
+"""流式导出测试"""
+
+import asyncio
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from models.database import Base, ChatHistory, MessageRole, User
+from services.streaming_export_service import (
+    XlsxSheet,
+    csv_chunks,
+    iter_rows,
+    json_array_chunks,
+    ndjson_chunks,
+    xlsx_chunks,
+)
+
+
+async def _session_factory():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(
+            Base.metadata.create_all, tables=[User.__table__, ChatHistory.__table__]
+        )
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+
+    start = datetime(2026, 1, 1)
+    async with session_factory() as db:
+        db.add(User(id=1, openid="openid_1", nickname="小明"))
+        db.add_all(
+            ChatHistory(
+                id=i,
+                user_id=1,
+                role=MessageRole.SYSTEM if i % 5 == 0 else MessageRole.USER,
+                content=f"消息{i}\n第二行,\x01含逗号",
+                meta_data={"n": i},
+                created_at=start + timedelta(minutes=i),
+            )
+            for i in range(1, 24)
+        )
+        await db.commit()
+    return session_factory
+
+
+def _stmt():
+    return (
+        select(
+            ChatHistory.id,
+            User.nickname,
+            ChatHistory.role,
+            ChatHistory.content,
+            ChatHistory.meta_data,
+            ChatHistory.created_at,
+        )
+        .outerjoin(User, User.id == ChatHistory.user_id)
+        .where(ChatHistory.role != MessageRole.SYSTEM)
+    )
+
+
+async def _collect(chunks):
+    return b"".join([chunk async for chunk in chunks])
+
+
+def test_keyset_pages_feed_text_formats():
+    """按 ID 倒序分页读取（含 limit）；JSON Lines / JSON 数组 / CSV 内容完整"""
+
+    async def run():
+        session_factory = await _session_factory()
+
+        def rows(stmt=None, **kwargs):
+            return iter_rows(
+                _stmt() if stmt is None else stmt,
+                ChatHistory.id,
+                page_size=4,
+                session_factory=session_factory,
+                **kwargs,
+            )
+
+        ids = [row.id async for row in rows()]
+        limited = [row.id async for row in rows(limit=6)]
+        ascending = [row.id async for row in rows(descending=False, limit=3)]
+
+        def record(row):
+            return {"id": row.id, "role": row.role, "created_at": row.created_at}
+
+        jsonl = await _collect(ndjson_chunks(record(row) async for row in rows()))
+        array = await _collect(json_array_chunks(record(row) async for row in rows()))
+        none = rows(_stmt().where(ChatHistory.id > 100))
+        empty = await _collect(json_array_chunks(record(row) async for row in none))
+        text = await _collect(
+            csv_chunks(["ID", "内容"], ([row.id, row.content] async for row in rows()))
+        )
+        return ids, limited, ascending, jsonl, array, empty, text
+
+    ids, limited, ascending, jsonl, array, empty, text = asyncio.run(run())
+    expected = [i for i in range(23, 0, -1) if i % 5]
+    assert ids == expected
+    assert limited == expected[:6]
+    assert ascending == [1, 2, 3]
+
+    lines = [json.loads(line) for line in jsonl.decode("utf-8").splitlines()]
+    assert [line["id"] for line in lines] == expected
+    assert lines[0] == {"id": 23, "role": "user", "created_at": "2026-01-01T00:23:00"}
+    assert json.loads(array) == lines
+    assert json.loads(empty) == []
+
+    parsed = list(csv.reader(io.StringIO(text.decode("utf-8"))))
+    assert parsed[0] == ["ID", "内容"]
+    assert parsed[1] == ["23", "消息23\n第二行,\x01含逗号"]
+    assert len(parsed) == len(expected) + 1
+
+
+def test_xlsx_write_only_workbook():
+    """XLSX：每个工作表写表头和全部行，字典转 JSON、去掉非法控制字符"""
+    openpyxl = pytest.importorskip("openpyxl")
+
+    async def run():
+        session_factory = await _session_factory()
+        rows = iter_rows(_stmt(), ChatHistory.id, session_factory=session_factory)
+        sheets = [
+            XlsxSheet(
+                "聊天记录",
+                ["ID", "昵称", "角色", "内容", "元数据", "时间"],
+                (list(row) async for row in rows),
+            ),
+            XlsxSheet("汇总", ["类型", "数量"], [["聊天", 19]]),
+        ]
+        return await _collect(xlsx_chunks(sheets, chunk_bytes=1024))
+
+    workbook = openpyxl.load_workbook(io.BytesIO(asyncio.run(run())))
+    assert workbook.sheetnames == ["聊天记录", "汇总"]
+    chat = list(workbook["聊天记录"].values)
+    assert len(chat) == 20
+    assert chat[1] == (
+        23,
+        "小明",
+        "user",
+        "消息23\n第二行,含逗号",
+        '{"n": 23}',
+        datetime(2026, 1, 1, 0, 23),
+    )
+    assert list(workbook["汇总"].values) == [("类型", "数量"), ("聊天", 19)]
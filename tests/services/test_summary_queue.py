@@ -0,0 +1,104 @@
+"""对话记忆摘要队列测试"""
+
+import asyncio
+
+from services.ai_service import AIResponse
+from services.vectorstore.summary_queue import (
+    SummaryJob,
+    SummaryQueue,
+    parse_summaries,
+    truncate_turn,
+)
+from utils.performance import get_counters
+
+
+class _AIService:
+    def __init__(self, reply):
+        self.reply = reply
+        self.calls = []
+
+    async def chat(self, messages, **kwargs):
+        self.calls.append((messages, kwargs))
+        return AIResponse(
+            content=self.reply, model="fake", usage={"completion_tokens": 60}
+        )
+
+
+class _Store:
+    def __init__(self):
+        self.upserts = []
+
+    def upsert_documents(self, documents, metadatas, ids):
+        self.upserts.append((list(documents), list(metadatas), list(ids)))
+
+
+def _job(store, i, content=None):
+    return SummaryJob(store, f"conversation_{i}", content or f"第{i}条对话", {"n": i})
+
+
+def test_parse_summaries_by_number():
+    text = "1. 询问午饭热量\n[2] 体重下降\n无关内容\n3：睡眠不足\n2. 重复编号忽略"
+    assert parse_summaries(text, 4) == ["询问午饭热量", "体重下降", "睡眠不足", None]
+    assert truncate_turn("体重" * 5, limit=4) == "体重体重..."
+
+
+def test_batches_turns_into_one_call_with_fallback():
+    """多条对话一次 LLM 调用；缺失的摘要保留截断原文"""
+    ai = _AIService("1. 摘要一\n2. 摘要二")
+    store = _Store()
+    queue = SummaryQueue(batch_size=8, flush_interval=60, max_pending=10, ai_service=ai)
+    before = get_counters()
+
+    async def run():
+        for i in range(1, 4):
+            assert queue.submit(_job(store, i))
+        await queue.close()
+        return queue.submit(_job(store, 9))
+
+    submitted_after_close = asyncio.run(run())
+    after = get_counters()
+
+    assert len(ai.calls) == 1
+    messages, kwargs = ai.calls[0]
+    assert "[3] 第3条对话" in messages[0]["content"]
+    assert kwargs["max_tokens"] == 300
+
+    documents, metadatas, ids = store.upserts[0]
+    assert ids == ["conversation_1", "conversation_2", "conversation_3"]
+    assert documents == ["摘要一", "摘要二", "第3条对话"]
+    assert all(m["pending_summary"] is False for m in metadatas)
+    assert metadatas[0]["n"] == 1 and metadatas[0]["summary"] == "摘要一"
+
+    assert not submitted_after_close
+
+    def delta(name):
+        return after.get(name, 0) - before.get(name, 0)
+
+    assert delta("memory_summary.batches") == 1
+    assert delta("memory_summary.summaries") == 2
+    assert delta("memory_summary.fallbacks") == 1
+    assert delta("memory_summary.tokens") == 60
+
+
+def test_sheds_when_full():
+    """队列满时不阻塞，直接放弃排队"""
+    ai = _AIService("")
+    store = _Store()
+    queue = SummaryQueue(batch_size=2, flush_interval=60, max_pending=2, ai_service=ai)
+
+    async def run():
+        accepted = [queue.submit(_job(store, i)) for i in range(4)]
+        pending = queue.pending
+        await queue.flush()
+        stats = queue.stats()
+        await queue.close()
+        return accepted, pending, stats
+
+    accepted, pending, stats = asyncio.run(run())
+
+    assert accepted == [True, True, False, False]
+    assert pending == 2
+    assert len(ai.calls) == 1
+    assert stats["pending"] == 0
+    assert stats["shed"] >= 2
+    assert stats["last_lag_ms"] is not None
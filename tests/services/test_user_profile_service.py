@@ -0,0 +1,102 @@
+"""共享用户画像缓存测试"""
+
+import asyncio
+import time
+
+import pytest
+
+pytest.importorskip("aiosqlite")
+
+from sqlalchemy import event, update
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from models.database import Base, User, UserProfile
+from services.user_profile_service import (
+    ProfileCache,
+    UserProfileService,
+    profile_cache,
+)
+
+
+def test_profile_snapshot_cache_and_invalidation():
+    """命中共享缓存时只读取版本；失效或其他进程写入后重新加载到最新画像"""
+
+    async def run():
+        engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+        async with engine.begin() as conn:
+            await conn.run_sync(
+                Base.metadata.create_all,
+                tables=[User.__table__, UserProfile.__table__],
+            )
+
+        queries = {"n": 0}
+
+        @event.listens_for(engine.sync_engine, "before_cursor_execute")
+        def _on_execute(conn, cursor, statement, parameters, context, executemany):
+            queries["n"] += 1
+
+        profile_cache.clear()
+        session = AsyncSession(engine, expire_on_commit=False)
+        try:
+            session.add(User(id=1, openid="u1", nickname="小明"))
+            profile = UserProfile(user_id=1, age=30, height=175)
+            session.add(profile)
+            await session.commit()
+
+            first = await UserProfileService.get_profile_snapshot(1, session)
+            queries["n"] = 0
+            second = await UserProfileService.get_profile_snapshot(1, session)
+            cached_queries = queries["n"]
+
+            profile.age = 31
+            await session.commit()
+            await UserProfileService.invalidate_cache(1, session)
+            third = await UserProfileService.get_profile_snapshot(1, session)
+
+            # 模拟其他 worker 写入：不调用失效，版本（更新时间）变化后同样读到新值
+            await session.execute(
+                update(UserProfile).where(UserProfile.user_id == 1).values(points=50)
+            )
+            await session.commit()
+            fourth = await UserProfileService.get_profile_snapshot(1, session)
+
+            missing = await UserProfileService.get_profile_snapshot(2, session)
+        finally:
+            await session.close()
+            await engine.dispose()
+            profile_cache.clear()
+        return first, second, third, fourth, missing, cached_queries
+
+    first, second, third, fourth, missing, cached_queries = asyncio.run(run())
+
+    assert first["nickname"] == "小明"
+    assert first == second
+    assert cached_queries == 1
+    assert third["age"] == 31
+    assert fourth["points"] == 50
+    assert missing is None
+
+
+def test_stale_load_discarded_after_invalidation():
+    """加载期间发生失效时，旧结果不写入共享缓存"""
+    profile_cache.clear()
+    generation = profile_cache.generation(1)
+    profile_cache.invalidate(1)
+    profile_cache.set(1, "snapshot", {"age": 30}, generation)
+    assert UserProfileService.peek_profile_snapshot(1) is None
+
+    profile_cache.set(1, "snapshot", {"age": 31}, profile_cache.generation(1))
+    assert UserProfileService.peek_profile_snapshot(1) == {"age": 31}
+    profile_cache.clear()
+
+
+def test_entries_expire_and_check_version():
+    """条目超过 TTL 后失效；版本不一致视为未命中"""
+    cache = ProfileCache(ttl=0.05)
+    cache.set(1, "snapshot", {"age": 30}, cache.generation(1), version="v1")
+    assert cache.get(1, "snapshot", "v1") == {"age": 30}
+    assert cache.get(1, "snapshot", "v2") is None
+    assert cache.get(1, "snapshot") == {"age": 30}
+
+    time.sleep(0.06)
+    assert cache.get(1, "snapshot") is None
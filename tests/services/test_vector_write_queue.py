@@ -0,0 +1,86 @@
+"""向量存储后台写入队列测试"""
+
+import threading
+
+from services.vectorstore.write_queue import VectorWriteQueue
+
+
+class _Collection:
+    def __init__(self, fail_ids=()):
+        self.calls = []
+        self.fail_ids = set(fail_ids)
+        self.lock = threading.Lock()
+
+    def add(self, documents, metadatas, ids):
+        if len(set(ids)) != len(ids):
+            raise ValueError("duplicate ids in batch")
+        if self.fail_ids & set(ids):
+            raise ValueError("bad document")
+        with self.lock:
+            self.calls.append(list(ids))
+
+    @property
+    def written(self):
+        return [doc_id for call in self.calls for doc_id in call]
+
+
+def test_coalesces_writes_into_batches():
+    """同一集合的多次写入合并为批量 add；flush 后读取可见；批内重复 ID 去重"""
+    queue = VectorWriteQueue(batch_size=4, flush_interval=60, max_backlog=100)
+    a, b = _Collection(), _Collection()
+
+    for i in range(6):
+        assert queue.submit("a", a, [f"doc{i}"], [{}], [f"a{i}"])
+    assert queue.submit("a", a, ["dup"], [{}], ["a0"])
+    assert queue.submit("b", b, ["doc"], [{}], ["b0"])
+
+    assert queue.flush("a", timeout=5)
+    assert a.written == [f"a{i}" for i in range(6)]
+    assert all(len(call) <= 4 for call in a.calls)
+    assert len(a.calls) < 6
+
+    queue.close()
+    assert b.written == ["b0"]
+    assert queue.stats()["backlog"] == 0
+
+
+def test_backlog_limit_and_failed_batch():
+    """积压已满或关闭后拒绝入队；批量失败时逐条重试，只丢弃坏数据"""
+    queue = VectorWriteQueue(batch_size=10, flush_interval=60, max_backlog=3)
+    collection = _Collection(fail_ids={"bad"})
+
+    assert queue.submit("c", collection, ["x", "y"], [{}, {}], ["ok1", "bad"])
+    assert queue.submit("c", collection, ["z"], [{}], ["ok2"])
+    assert not queue.submit("c", collection, ["w"], [{}], ["ok3"])
+
+    queue.close()
+    assert collection.written == ["ok1", "ok2"]
+    assert not queue.submit("c", collection, ["w"], [{}], ["ok3"])
+
+
+def test_discard_and_non_blocking_flush():
+    """discard 撤下待写旧版本；timeout=0 的 flush 只唤醒不等待"""
+    queue = VectorWriteQueue(batch_size=100, flush_interval=60, max_backlog=100)
+    a = _Collection()
+    gate = threading.Event()
+    original_add = a.add
+
+    def slow_add(documents, metadatas, ids):
+        gate.wait(5)
+        original_add(documents, metadatas, ids)
+
+    a.add = slow_add
+    assert queue.submit("a", a, ["x", "y", "z"], [{}] * 3, ["a1", "a2", "a3"])
+    assert queue.discard("a", ["a2", "missing"]) == 1
+    assert queue.stats()["backlog"] == 2
+
+    # 后台线程卡在写入：不等待的 flush 立即返回 False
+    assert queue.flush("a", timeout=0) is False
+    gate.set()
+    assert queue.flush("a", timeout=5)
+    assert a.written == ["a1", "a3"]
+
+    assert queue.submit("a", a, ["w"], [{}], ["a4"])
+    assert queue.discard("a") == 1
+    assert queue.stats()["backlog"] == 0
+    queue.close()
@@ -0,0 +1,106 @@
+"""用户结果缓存测试"""
+
+import asyncio
+
+from utils.performance import clear_metrics, get_counters
+from utils.result_cache import MISSING, MemoryCacheBackend, UserResultCache
+
+
+def test_version_invalidation_and_counters():
+    """写入后递增版本号，旧结果不再命中；命中/未命中计入性能计数器"""
+
+    async def run():
+        cache = UserResultCache(MemoryCacheBackend(max_entries=16))
+        calls = {"n": 0}
+
+        async def compute():
+            calls["n"] += 1
+            return {"value": calls["n"]}
+
+        first = await cache.get_or_compute(1, "charts.weight_trend", compute)
+        second = await cache.get_or_compute(1, "charts.weight_trend", compute)
+        # 其他用户的写入不影响
+        await cache.invalidate_user(2)
+        third = await cache.get_or_compute(1, "charts.weight_trend", compute)
+        await cache.invalidate_user(1)
+        fourth = await cache.get_or_compute(1, "charts.weight_trend", compute)
+        return first, second, third, fourth
+
+    clear_metrics()
+    first, second, third, fourth = asyncio.run(run())
+
+    assert first == second == third == {"value": 1}
+    assert fourth == {"value": 2}
+    counters = get_counters()
+    assert counters["result_cache.hits"] == 2
+    assert counters["result_cache.misses"] == 2
+
+
+def test_stale_compute_not_served_after_write():
+    """计算期间发生写入时，结果写回旧版本，不会被后续读取命中"""
+
+    async def run():
+        cache = UserResultCache(MemoryCacheBackend())
+        version, value = await cache.get(1, "trends")
+        assert value is MISSING
+        await cache.invalidate_user(1)
+        await cache.set(1, version, "trends", "stale")
+        return await cache.get(1, "trends")
+
+    version, value = asyncio.run(run())
+    assert version == 1
+    assert value is MISSING
+
+
+def test_lru_eviction_and_failed_results():
+    """条目数有界，按最近使用淘汰；不可缓存的结果不写入"""
+
+    async def run():
+        backend = MemoryCacheBackend(max_entries=2)
+        cache = UserResultCache(backend)
+
+        async def ok():
+            return {"success": True}
+
+        async def failed():
+            return {"success": False}
+
+        await cache.get_or_compute(1, "a", ok)
+        await cache.get_or_compute(1, "b", ok)
+        await cache.get(1, "a")  # a 变为最近使用
+        await cache.get_or_compute(1, "c", ok)
+        await cache.get_or_compute(
+            1, "d", failed, cacheable=lambda r: bool(r.get("success"))
+        )
+
+        hits = {
+            key: (await cache.get(1, key))[1] is not MISSING for key in "abcd"
+        }
+        return len(backend), hits
+
+    size, hits = asyncio.run(run())
+    assert size == 2
+    assert hits == {"a": True, "b": False, "c": True, "d": False}
+
+
+def test_version_counters_bounded_without_reviving_stale_entries():
+    """版本计数器按 LRU 有界；被淘汰用户的新版本号不会与旧条目重合"""
+
+    async def run():
+        backend = MemoryCacheBackend(max_entries=16, max_counters=1)
+        cache = UserResultCache(backend)
+        version, _ = await cache.get(1, "trends")
+        await cache.set(1, version, "trends", "old")
+        await cache.invalidate_user(1)
+        # 用户 2 的写入淘汰了用户 1 的计数器
+        await cache.invalidate_user(2)
+        counters = len(backend._counters)
+        _, value = await cache.get(1, "trends")
+        await cache.set(1, await cache.get_version(1), "trends", "new")
+        _, fresh = await cache.get(1, "trends")
+        return counters, value, fresh
+
+    counters, value, fresh = asyncio.run(run())
+    assert counters == 1
+    assert value is MISSING
+    assert fresh == "new"
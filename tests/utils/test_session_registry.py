@@ -0,0 +1,65 @@
+"""会话注册表测试"""
+
+import time
+
+from utils.session_registry import SessionRegistry, get_registry_stats
+
+
+class _Session:
+    def __init__(self, size: int = 100):
+        self.size = size
+        self.closed = False
+
+    def estimated_bytes(self) -> int:
+        return self.size
+
+    def close(self):
+        self.closed = True
+
+
+def test_lru_eviction_closes_sessions():
+    """超过最大条目数时淘汰最久未使用的对象并调用 close"""
+    registry = SessionRegistry("test_lru", max_entries=2, idle_ttl=0, max_bytes=0)
+    a, b, c = _Session(), _Session(), _Session()
+
+    registry.put(1, a)
+    registry.put(2, b)
+    assert registry.get(1) is a  # 1 变为最近使用
+    registry.put(3, c)
+
+    assert 2 not in registry
+    assert b.closed and not a.closed and not c.closed
+    assert registry.stats()["evictions"] == 1
+
+
+def test_idle_ttl_and_memory_budget():
+    """空闲超时淘汰；估算内存超出预算时按 LRU 淘汰"""
+    idle = SessionRegistry("test_idle", max_entries=10, idle_ttl=0.05, max_bytes=0)
+    stale = _Session()
+    idle.put(1, stale)
+    time.sleep(0.06)
+    assert idle.get(1) is None
+    assert stale.closed
+
+    budget = SessionRegistry("test_budget", max_entries=10, idle_ttl=0, max_bytes=250)
+    sessions = [_Session(100) for _ in range(3)]
+    for key, session in enumerate(sessions):
+        budget.put(key, session)
+
+    assert len(budget) == 2
+    assert sessions[0].closed
+    assert budget.estimated_bytes() == 200
+
+    stats = get_registry_stats()
+    assert stats["registries"]["test_budget"]["live"] == 2
+    assert stats["registries"]["test_budget"]["estimated_bytes"] == 200
+
+
+def test_get_or_create_and_clear():
+    registry = SessionRegistry("test_clear", max_entries=10, idle_ttl=0, max_bytes=0)
+    first = registry.get_or_create(1, _Session)
+    assert registry.get_or_create(1, _Session) is first
+
+    assert registry.clear() == 1
+    assert first.closed
+    assert len(registry) == 0
@@ -192,6 +192,22 @@ async def measure_time_async_ctx(name: str):
     return AsyncTimingContext()
 
 
+# 全局计数器（如缓存命中/未命中）
+_counters: Dict[str, int] = defaultdict(int)
+
+
+def increment_counter(name: str, amount: int = 1):
+    """递增计数器"""
+    with _perf_lock:
+        _counters[name] += amount
+
+
+def get_counters() -> Dict[str, int]:
+    """获取所有计数器"""
+    with _perf_lock:
+        return dict(_counters)
+
+
 def get_all_metrics() -> Dict[str, Dict[str, Any]]:
     """获取所有监控器的指标"""
     with _monitors_lock:
@@ -213,10 +229,15 @@ def clear_metrics(name: Optional[str] = None):
     """清除指标数据"""
     with _monitors_lock:
         if name:
-            if name in _monitors:
-                _monitors.pop(name)
+            _monitors.pop(name, None)
         else:
             _monitors.clear()
+    # 计数器与 increment_counter 使用同一把锁
+    with _perf_lock:
+        if name:
+            _counters.pop(name, None)
+        else:
+            _counters.clear()
 
 
 # 关键路径监控点
@@ -271,7 +292,8 @@ def monitor_critical_path(name: str, description: Optional[str] = None):
 def report_performance():
     """生成性能报告"""
     all_metrics = get_all_metrics()
-    if not all_metrics:
+    counters = get_counters()
+    if not all_metrics and not counters:
         return "暂无性能数据"
 
     report_lines = ["=== 性能报告 ==="]
@@ -310,4 +332,10 @@ def report_performance():
         for name, stats in error_ops:
             report_lines.append(f"❌ {name}: {stats['error_count']}次错误")
 
+    # 计数器
+    if counters:
+        report_lines.append("\n=== 计数器 ===")
+        for name, value in sorted(counters.items()):
+            report_lines.append(f"{name}: {value}")
+
     return "\n".join(report_lines)
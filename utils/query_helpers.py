@@ -0,0 +1,56 @@
+"""
+查询辅助工具
+
+将“按天”过滤转换为 DateTime 列上的半开区间 [start, end)，
+替代 func.date(col) == day 这类无法使用 (user_id, record_time) 复合索引的写法。
+"""
+
+from datetime import date, datetime, timedelta
+from typing import Optional, Tuple, Union
+
+from sqlalchemy import and_
+
+
+def to_date(value: Union[date, datetime, str, None]) -> Optional[date]:
+    """将数据库返回的日期值（SQLite 下为字符串）统一转换为 date"""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value)[:10], "%Y-%m-%d").date()
+
+
+def day_start(day: date) -> datetime:
+    """某天 00:00:00"""
+    return datetime.combine(day, datetime.min.time())
+
+
+def day_bounds(start_date: date, end_date: Optional[date] = None) -> Tuple[datetime, datetime]:
+    """
+    将闭区间 [start_date, end_date] 转换为半开的时间区间 [start, end)
+
+    Args:
+        start_date: 开始日期
+        end_date: 结束日期（默认与开始日期相同，即单日）
+    """
+    end_date = end_date or start_date
+    return day_start(start_date), day_start(end_date + timedelta(days=1))
+
+
+def on_day(column, day: date):
+    """column 落在某一天内（可走索引）"""
+    start, end = day_bounds(day)
+    return and_(column >= start, column < end)
+
+
+def between_days(column, start_date: date, end_date: date):
+    """column 落在 [start_date, end_date] 这几天内（可走索引）"""
+    start, end = day_bounds(start_date, end_date)
+    return and_(column >= start, column < end)
+
+
+def since_day(column, day: date):
+    """column 不早于某天 00:00"""
+    return column >= day_start(day)
@@ -0,0 +1,232 @@
+"""
+用户结果缓存
+
+按用户缓存仪表盘分区、图表等只读计算结果。每个用户有一个数据版本号，
+写入记录后递增版本号，旧版本的缓存条目自然失效（不会再被读取，随 LRU/TTL 淘汰），
+因此在下一次写入之前，读取都是 O(1) 的缓存命中。
+
+默认使用进程内有界 LRU；多个 uvicorn worker 需要共享缓存时，
+实现 CacheBackend 接口（如基于 Redis）并通过 set_backend() 替换。
+"""
+
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import date
+from typing import Any, Awaitable, Callable, Optional, Tuple
+
+from config.logging_config import get_module_logger
+from config.settings import fastapi_settings
+from utils.performance import increment_counter
+
+logger = get_module_logger(__name__)
+
+# 未命中标记（缓存值本身可能为 None）
+MISSING = object()
+
+
+class CacheBackend(ABC):
+    """缓存后端接口"""
+
+    @abstractmethod
+    async def get(self, key: str) -> Any:
+        """读取条目，不存在或已过期时返回 MISSING"""
+        pass
+
+    @abstractmethod
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """写入条目"""
+        pass
+
+    @abstractmethod
+    async def get_counter(self, key: str) -> int:
+        """读取计数器（不存在时为 0）"""
+        pass
+
+    @abstractmethod
+    async def incr(self, key: str) -> int:
+        """原子递增计数器并返回新值"""
+        pass
+
+    @abstractmethod
+    async def clear(self) -> None:
+        """清空所有条目和计数器"""
+        pass
+
+
+class MemoryCacheBackend(CacheBackend):
+    """
+    进程内有界 LRU 后端
+
+    计数器（数据版本号）同样按 LRU 有界保存。被淘汰的计数器若从 0 重新计数，
+    可能重新命中该用户旧版本的缓存条目，因此记录被淘汰计数器的最大值 _counter_floor，
+    不存在的计数器从该值起算：新版本号总是大于该用户任何旧条目的版本号。
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 2048,
+        default_ttl: Optional[float] = None,
+        max_counters: Optional[int] = None,
+    ):
+        """
+        Args:
+            max_entries: 最大缓存条目数
+            default_ttl: 条目默认有效期（秒），None 表示不过期
+            max_counters: 最大计数器数，默认与 max_entries 相同
+        """
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.max_counters = max_counters or max_entries
+        self._entries: "OrderedDict[str, Tuple[Optional[float], Any]]" = OrderedDict()
+        self._counters: "OrderedDict[str, int]" = OrderedDict()
+        self._counter_floor = 0
+        self._lock = threading.Lock()
+
+    async def get(self, key: str) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return MISSING
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                return MISSING
+            self._entries.move_to_end(key)
+            return value
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = ttl if ttl is not None else self.default_ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                increment_counter("result_cache.evictions")
+
+    async def get_counter(self, key: str) -> int:
+        with self._lock:
+            value = self._counters.get(key)
+            if value is None:
+                return self._counter_floor
+            self._counters.move_to_end(key)
+            return value
+
+    async def incr(self, key: str) -> int:
+        with self._lock:
+            value = self._counters.pop(key, self._counter_floor) + 1
+            self._counters[key] = value
+            while len(self._counters) > self.max_counters:
+                _, evicted = self._counters.popitem(last=False)
+                self._counter_floor = max(self._counter_floor, evicted)
+                increment_counter("result_cache.counter_evictions")
+            return value
+
+    async def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._counters.clear()
+            self._counter_floor = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class UserResultCache:
+    """按用户数据版本号索引的结果缓存"""
+
+    def __init__(self, backend: CacheBackend, ttl: Optional[float] = None):
+        self.backend = backend
+        self.ttl = ttl
+
+    @staticmethod
+    def _version_key(user_id: int) -> str:
+        return f"version:{user_id}"
+
+    @staticmethod
+    def _entry_key(user_id: int, version: int, section: str) -> str:
+        # 带上日期：“今日”类结果在跨天后即使没有写入也需要重新计算
+        return f"result:{user_id}:{version}:{date.today().isoformat()}:{section}"
+
+    async def get_version(self, user_id: int) -> int:
+        """获取用户当前数据版本号"""
+        return await self.backend.get_counter(self._version_key(user_id))
+
+    async def invalidate_user(self, user_id: int) -> int:
+        """用户数据发生变化：递增版本号，使该用户所有缓存结果失效"""
+        try:
+            return await self.backend.incr(self._version_key(user_id))
+        except Exception as e:
+            # 缓存不可用时不影响写入流程
+            logger.warning("递增用户数据版本失败: user_id=%s, %s", user_id, e)
+            return 0
+
+    async def get(self, user_id: int, section: str) -> Tuple[int, Any]:
+        """
+        读取缓存结果
+
+        Returns:
+            (读取时的版本号, 结果或 MISSING)；写回时应使用同一版本号，
+            这样计算期间发生的写入不会被旧结果覆盖
+        """
+        try:
+            version = await self.get_version(user_id)
+            value = await self.backend.get(self._entry_key(user_id, version, section))
+        except Exception as e:
+            logger.warning("读取结果缓存失败: %s, %s", section, e)
+            return 0, MISSING
+
+        increment_counter(
+            "result_cache.misses" if value is MISSING else "result_cache.hits"
+        )
+        return version, value
+
+    async def set(self, user_id: int, version: int, section: str, value: Any) -> None:
+        """写入缓存结果"""
+        try:
+            await self.backend.set(
+                self._entry_key(user_id, version, section), value, self.ttl
+            )
+        except Exception as e:
+            logger.warning("写入结果缓存失败: %s, %s", section, e)
+
+    async def get_or_compute(
+        self,
+        user_id: int,
+        section: str,
+        compute: Callable[[], Awaitable[Any]],
+        cacheable: Callable[[Any], bool] = lambda value: True,
+    ) -> Any:
+        """
+        读取缓存，未命中时计算并写回
+
+        Args:
+            cacheable: 判断结果是否可缓存（如失败结果不缓存）
+        """
+        version, value = await self.get(user_id, section)
+        if value is not MISSING:
+            return value
+
+        value = await compute()
+        if cacheable(value):
+            await self.set(user_id, version, section, value)
+        return value
+
+
+result_cache = UserResultCache(
+    MemoryCacheBackend(fastapi_settings.RESULT_CACHE_MAX_ENTRIES),
+    ttl=fastapi_settings.RESULT_CACHE_TTL,
+)
+
+
+def set_backend(backend: CacheBackend) -> None:
+    """替换缓存后端（如多 worker 共享的 Redis 实现）"""
+    result_cache.backend = backend
+    logger.info("结果缓存后端已切换: %s", type(backend).__name__)
+
+
+async def invalidate_user(user_id: int) -> int:
+    """用户写入数据后调用，使其仪表盘/图表缓存失效"""
+    return await result_cache.invalidate_user(user_id)
@@ -0,0 +1,235 @@
+"""
+会话对象注册表
+
+按用户缓存 Agent、MemoryManager、向量存储等长生命周期对象，替代无上限的类级字典。
+淘汰策略：
+- LRU：超过最大条目数时淘汰最久未使用的对象
+- 空闲 TTL：超过空闲时间未被访问的对象在下一次访问注册表时淘汰
+- 内存预算：估算占用超过预算时按 LRU 继续淘汰（至少保留刚写入的对象）
+
+被淘汰的对象会调用关闭钩子（默认调用对象的 close() 方法）。
+所有注册表的实时数量和估算字节数可通过 get_registry_stats() 查看。
+"""
+
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Generic, List, Optional, Tuple, TypeVar
+
+from config.logging_config import get_module_logger
+from config.settings import fastapi_settings
+
+logger = get_module_logger(__name__)
+
+K = TypeVar("K")
+V = TypeVar("V")
+
+# 所有注册表（用于统计）
+_registries: Dict[str, "SessionRegistry"] = {}
+_registries_lock = threading.Lock()
+
+
+def _default_close(value: Any) -> None:
+    close = getattr(value, "close", None)
+    if callable(close):
+        close()
+
+
+def _default_sizeof(value: Any) -> int:
+    estimate = getattr(value, "estimated_bytes", None)
+    if callable(estimate):
+        return int(estimate())
+    return sys.getsizeof(value)
+
+
+class SessionRegistry(Generic[K, V]):
+    """带 LRU、空闲 TTL 和内存预算的对象注册表"""
+
+    def __init__(
+        self,
+        name: str,
+        max_entries: Optional[int] = None,
+        idle_ttl: Optional[float] = None,
+        max_bytes: Optional[int] = None,
+        close: Callable[[V], None] = _default_close,
+        sizeof: Callable[[V], int] = _default_sizeof,
+    ):
+        """
+        Args:
+            name: 注册表名称（统计用）
+            max_entries: 最大条目数，默认 SESSION_REGISTRY_MAX_ENTRIES
+            idle_ttl: 空闲淘汰时间（秒），默认 SESSION_REGISTRY_IDLE_TTL
+            max_bytes: 内存预算（字节），默认 SESSION_REGISTRY_MEMORY_BUDGET_MB
+            close: 淘汰时的关闭钩子
+            sizeof: 单个对象的内存估算函数
+        """
+        self.name = name
+        self.max_entries = max_entries or fastapi_settings.SESSION_REGISTRY_MAX_ENTRIES
+        self.idle_ttl = (
+            idle_ttl if idle_ttl is not None else fastapi_settings.SESSION_REGISTRY_IDLE_TTL
+        )
+        self.max_bytes = (
+            max_bytes
+            if max_bytes is not None
+            else fastapi_settings.SESSION_REGISTRY_MEMORY_BUDGET_MB * 1024 * 1024
+        )
+        self._close = close
+        self._sizeof = sizeof
+        # key -> (最后访问时间, 对象)，按访问顺序排列（最久未使用在前）
+        self._entries: "OrderedDict[K, Tuple[float, V]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+        with _registries_lock:
+            _registries[name] = self
+
+    def get(self, key: K) -> Optional[V]:
+        """获取对象并刷新访问时间，不存在时返回 None"""
+        with self._lock:
+            expired = self._pop_expired()
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries[key] = (time.monotonic(), entry[1])
+                self._entries.move_to_end(key)
+        self._close_all(expired)
+        return entry[1] if entry is not None else None
+
+    def put(self, key: K, value: V) -> None:
+        """写入对象，必要时淘汰旧对象"""
+        with self._lock:
+            replaced = self._entries.pop(key, None)
+            self._entries[key] = (time.monotonic(), value)
+            evicted = self._pop_expired() + self._pop_over_capacity()
+        if replaced is not None and replaced[1] is not value:
+            evicted.append((key, replaced[1]))
+        self._close_all(evicted)
+
+    def get_or_create(self, key: K, factory: Callable[[], V]) -> V:
+        """获取对象，不存在时用 factory 创建并写入"""
+        value = self.get(key)
+        if value is None:
+            value = factory()
+            self.put(key, value)
+        return value
+
+    def pop(self, key: K) -> bool:
+        """移除并关闭对象"""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        self._close_all([(key, entry[1])])
+        return True
+
+    def clear(self) -> int:
+        """移除并关闭所有对象，返回数量"""
+        with self._lock:
+            entries = [(key, value) for key, (_, value) in self._entries.items()]
+            self._entries.clear()
+        self._close_all(entries)
+        return len(entries)
+
+    def sweep(self) -> int:
+        """主动淘汰空闲超时的对象，返回数量"""
+        with self._lock:
+            expired = self._pop_expired()
+        self._close_all(expired)
+        return len(expired)
+
+    def values(self) -> List[V]:
+        with self._lock:
+            return [value for _, value in self._entries.values()]
+
+    def __contains__(self, key: K) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def estimated_bytes(self) -> int:
+        """当前所有对象的估算内存占用"""
+        return sum(self._safe_sizeof(value) for value in self.values())
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "live": len(self._entries),
+            "max_entries": self.max_entries,
+            "idle_ttl_seconds": self.idle_ttl,
+            "estimated_bytes": self.estimated_bytes(),
+            "max_bytes": self.max_bytes,
+            "evictions": self.evictions,
+        }
+
+    # ---- 内部方法（调用方需持有锁） ----
+
+    def _pop_expired(self) -> List[Tuple[K, V]]:
+        if not self.idle_ttl:
+            return []
+        deadline = time.monotonic() - self.idle_ttl
+        expired = []
+        # 按访问顺序排列，遇到第一个未过期的即可停止
+        while self._entries:
+            key, (last_used, value) = next(iter(self._entries.items()))
+            if last_used > deadline:
+                break
+            self._entries.popitem(last=False)
+            expired.append((key, value))
+        self.evictions += len(expired)
+        return expired
+
+    def _pop_over_capacity(self) -> List[Tuple[K, V]]:
+        evicted = []
+        while len(self._entries) > self.max_entries:
+            key, (_, value) = self._entries.popitem(last=False)
+            evicted.append((key, value))
+
+        if self.max_bytes:
+            total = sum(self._safe_sizeof(value) for _, value in self._entries.values())
+            while total > self.max_bytes and len(self._entries) > 1:
+                key, (_, value) = self._entries.popitem(last=False)
+                total -= self._safe_sizeof(value)
+                evicted.append((key, value))
+
+        self.evictions += len(evicted)
+        return evicted
+
+    # ---- 不持锁 ----
+
+    def _safe_sizeof(self, value: V) -> int:
+        try:
+            return self._sizeof(value)
+        except Exception:
+            return sys.getsizeof(value)
+
+    def _close_all(self, entries: List[Tuple[K, V]]) -> None:
+        for key, value in entries:
+            try:
+                self._close(value)
+            except Exception as e:
+                logger.warning("关闭会话对象失败: %s[%s], %s", self.name, key, e)
+        if entries:
+            logger.info("会话注册表淘汰: %s, 数量=%d", self.name, len(entries))
+
+
+def get_registry_stats() -> Dict[str, Any]:
+    """所有注册表的实时数量与估算内存（供管理后台确定 worker 规格）"""
+    with _registries_lock:
+        registries = list(_registries.values())
+    stats = {registry.name: registry.stats() for registry in registries}
+    return {
+        "registries": stats,
+        "total_live": sum(item["live"] for item in stats.values()),
+        "total_estimated_bytes": sum(
+            item["estimated_bytes"] for item in stats.values()
+        ),
+    }
+
+
+def sweep_all() -> int:
+    """淘汰所有注册表中空闲超时的对象"""
+    with _registries_lock:
+        registries = list(_registries.values())
+    return sum(registry.sweep() for registry in registries)
@@ -0,0 +1,18 @@
+"""
+SSE 消息格式化
+
+不依赖数据库模型与服务层，路由和 SSE 连接管理器都可以直接导入。
+"""
+
+import json
+from typing import Any
+
+
+def format_sse_event(event_type: str, data: Any) -> str:
+    """格式化一条带事件名的SSE消息（dict/list 序列化为 JSON）"""
+    if isinstance(data, (dict, list)):
+        data_str = json.dumps(data, ensure_ascii=False, default=str)
+    else:
+        data_str = str(data)
+
+    return f"event: {event_type}\ndata: {data_str}\n\n"